@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Build Zipapp - Bundles the chart scripts into one executable zip archive
+
+The archive holds every script module (tests excluded) at its root, so the
+modules import each other exactly as they do from scripts/, and a __main__.py
+that runs one of them by name:
+
+    python3 scripts/build_zipapp.py --output dist/chart-tools.pyz
+    python3 dist/chart-tools.pyz chart_tracker process --since HEAD~1
+    PYTHONPATH=dist/chart-tools.pyz python3 -c "import chart_tracker"
+
+Every module is also stored precompiled, as an unchecked hash-based .pyc for the
+building interpreter, so steps of a fresh checkout do not each compile the
+scripts again. Another Python version ignores that bytecode and compiles the
+source. PyYAML is not bundled; it is imported from the environment as before.
+"""
+
+import argparse
+import py_compile
+import re
+import shutil
+import sys
+import tempfile
+import zipapp
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+DEFAULT_OUTPUT = "dist/chart-tools.pyz"
+DEFAULT_INTERPRETER = "/usr/bin/env python3"
+# Developer tooling, not shipped in the archive.
+EXCLUDED = ("build_zipapp.py", "run_tests.py")
+
+EXIT_OK = 0
+EXIT_ERROR = 2
+
+MAIN_TEMPLATE = '''\
+"""chart-tools: run a bundled chart script, e.g. `python3 chart-tools.pyz chart_tracker cleanup`"""
+
+import sys
+
+TOOLS = {tools!r}
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] in ("-h", "--help"):
+        print(f"usage: {{sys.argv[0]}} TOOL [ARGS...]\\n\\ntools: {{', '.join(TOOLS)}}")
+        return 0 if len(sys.argv) > 1 else 2
+    tool = sys.argv[1].replace("-", "_")
+    tool = tool[:-len(".py")] if tool.endswith(".py") else tool
+    if tool not in TOOLS:
+        print(f"Error: unknown tool {{sys.argv[1]}} (tools: {{', '.join(TOOLS)}})", file=sys.stderr)
+        return 2
+    # The tool parses its arguments as if it had been run as scripts/<tool>.py.
+    sys.argv = [tool + ".py"] + sys.argv[2:]
+    return __import__(tool).main()
+
+
+sys.exit(main())
+'''
+
+
+def bundled_modules(scripts_dir=SCRIPTS_DIR):
+    """Return the script modules that go into the archive, sorted"""
+    return sorted(path for path in Path(scripts_dir).glob("*.py")
+                  if not path.name.startswith("test_") and path.name not in EXCLUDED)
+
+
+def tools(modules):
+    """Names of the modules with a main() entry point"""
+    return [module.stem for module in modules if re.search(r"^def main\(", module.read_text(), re.MULTILINE)]
+
+
+def build(output=DEFAULT_OUTPUT, interpreter=DEFAULT_INTERPRETER, scripts_dir=SCRIPTS_DIR, compile_bytecode=True):
+    """Write the archive to output; returns the tool names its __main__ dispatches to"""
+    modules = bundled_modules(scripts_dir)
+    names = tools(modules)
+    output = Path(output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory() as staging:
+        staging = Path(staging)
+        for module in modules:
+            shutil.copyfile(module, staging / module.name)
+        (staging / "__main__.py").write_text(MAIN_TEMPLATE.format(tools=tuple(names)))
+        if compile_bytecode:
+            for source in sorted(staging.glob("*.py")):
+                # A .pyc next to its .py at the archive root is what zipimport looks for first.
+                py_compile.compile(str(source), cfile=str(source.with_suffix(".pyc")), dfile=source.name,
+                                   doraise=True, invalidation_mode=py_compile.PycInvalidationMode.UNCHECKED_HASH)
+        zipapp.create_archive(staging, output, interpreter=interpreter)
+    return names
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Bundle the chart scripts into one executable zipapp",
+        epilog="Exit codes: 0=archive written, 2=error."
+    )
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Archive to write")
+    parser.add_argument("--python", default=DEFAULT_INTERPRETER,
+                        help="Interpreter for the archive's shebang line")
+    parser.add_argument("--no-compile", action="store_true",
+                        help="Store the sources only, without precompiled bytecode")
+    args = parser.parse_args()
+
+    try:
+        names = build(args.output, args.python, compile_bytecode=not args.no_compile)
+    except (OSError, py_compile.PyCompileError) as e:
+        print(f"Error: {e}")
+        return EXIT_ERROR
+    print(f"Wrote {args.output} ({len(names)} tools: {', '.join(names)})")
+    return EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,10 +4,24 @@ Bump chart version - Automatically increment patch version of a Helm chart
 """
 
 import argparse
+import re
 import sys
-import yaml
 from pathlib import Path
 
+# Matches the top-level `version:` field without a YAML parser.
+_VERSION_RE = re.compile(r'^version:\s*["\']?([^"\'\s#]+)', re.MULTILINE)
+
+
+def parse_chart_version(text):
+    """
+    Return the top-level version field of a Chart.yaml document, or None
+
+    This is a line scan, not a YAML parse: it is meant for hot paths (pre-commit
+    hooks, file watchers) that must not pay for importing PyYAML.
+    """
+    match = _VERSION_RE.search(text or "")
+    return match.group(1) if match else None
+
 
 def bump_patch_version(chart_path):
     """
@@ -19,6 +33,9 @@ def bump_patch_version(chart_path):
     Returns:
         bool: True if successful, False otherwise
     """
+    # PyYAML is imported here so importing this module (e.g. from chart_tracker) stays cheap.
+    import yaml
+
     chart_path = Path(chart_path)
     chart_yaml = chart_path / "Chart.yaml"
 
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Bump Plan - Sealed record of a `process` run that a later job can reuse
+
+A plan file records what `chart_tracker.py process` decided (changed charts,
+existing bumps, regenerated READMEs, charts to bump) together with what it
+looked at: the range, HEAD, the root tree id and each chart's tree id. The file
+is sealed with a sha256 digest, or an HMAC-SHA256 signature when
+CHART_TRACKER_PLAN_KEY is set. A later run reuses the decisions only if the seal
+holds, the inputs match and the checkout has the same tree; otherwise it
+recomputes them.
+"""
+
+import argparse
+import hashlib
+import hmac
+import json
+import os
+import sys
+from pathlib import Path
+
+from command_runner import CommandRunner
+
+PLAN_VERSION = 1
+PLAN_KEY_ENV = "CHART_TRACKER_PLAN_KEY"
+DECISIONS = ("changed_charts", "charts_with_existing_bumps", "changed_docs", "charts_to_bump")
+
+EXIT_OK = 0
+EXIT_STALE = 1
+EXIT_ERROR = 2
+
+
+def _git(runner, args, cwd=None):
+    return runner.run(["git"] + args, check=True, cwd=cwd).stdout
+
+
+def checkout_state(runner=None, charts_dir="charts", cwd=None):
+    """Return {"head", "tree", "charts"} for the checkout, or None if charts_dir has uncommitted changes.
+
+    "charts" maps each chart root to the id of its tree at HEAD; a chart's tree
+    id changes exactly when any file below it does.
+    """
+    runner = runner or CommandRunner()
+    charts_dir = charts_dir.rstrip("/")
+    if _git(runner, ["status", "--porcelain", "--", charts_dir], cwd=cwd).strip():
+        return None
+    head, tree = _git(runner, ["rev-parse", "HEAD", "HEAD^{tree}"], cwd=cwd).split()
+
+    trees, roots = {}, []
+    for entry in _git(runner, ["ls-tree", "-r", "-t", "-z", "HEAD", "--", charts_dir], cwd=cwd).split("\0"):
+        if not entry:
+            continue
+        info, path = entry.split("\t", 1)
+        _, kind, oid = info.split()
+        if kind == "tree":
+            trees[path] = oid
+        elif path.endswith("/Chart.yaml"):
+            # Same rule as ChartTracker._is_dependency_chart: vendored dependencies are not roots.
+            parts = path[len(charts_dir) + 1:].split("/")
+            if not (len(parts) >= 4 and parts[1] == "charts"):
+                roots.append(os.path.dirname(path))
+    return {"head": head, "tree": tree, "charts": {root: trees[root] for root in sorted(roots)}}
+
+
+def file_digest(path):
+    """Return the sha256 of a file's content, or None if there is no such file"""
+    try:
+        return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+def _seal(plan, key):
+    body = json.dumps({k: v for k, v in plan.items() if k != "seal"}, sort_keys=True, separators=(",", ":")).encode()
+    if key:
+        return {"algorithm": "hmac-sha256", "value": hmac.new(key.encode(), body, hashlib.sha256).hexdigest()}
+    return {"algorithm": "sha256", "value": hashlib.sha256(body).hexdigest()}
+
+
+class PlanFile:
+    """A plan file on disk; key defaults to $CHART_TRACKER_PLAN_KEY"""
+
+    def __init__(self, path, key=None):
+        self.path = Path(path)
+        self.key = key if key is not None else os.environ.get(PLAN_KEY_ENV, "")
+
+    def write(self, inputs, state, decisions):
+        """Seal and write a plan for the given inputs ({"since", ...}), checkout state and decisions"""
+        plan = {"version": PLAN_VERSION, "inputs": inputs, **state}
+        plan.update({name: decisions[name] for name in DECISIONS})
+        plan["seal"] = _seal(plan, self.key)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump(plan, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.path)
+        return plan
+
+    def load(self):
+        """Return the plan if its seal holds, else raise ValueError"""
+        with open(self.path, "r") as f:
+            plan = json.load(f)
+        if not isinstance(plan, dict) or plan.get("version") != PLAN_VERSION:
+            raise ValueError(f"{self.path} is not a version {PLAN_VERSION} bump plan")
+        expected = _seal(plan, self.key)
+        seal = plan.get("seal") or {}
+        # An unsigned plan is refused once a key is configured.
+        if seal.get("algorithm") != expected["algorithm"] or \
+                not hmac.compare_digest(str(seal.get("value")), expected["value"]):
+            raise ValueError(f"{self.path} failed {expected['algorithm']} verification")
+        return plan
+
+    def reusable(self, inputs, state):
+        """Return (plan, None) if the plan can stand in for a run with these inputs, else (None, reason)"""
+        if not self.path.exists():
+            return None, f"no plan at {self.path}"
+        if state is None:
+            return None, "charts have uncommitted changes"
+        try:
+            plan = self.load()
+        except (ValueError, OSError) as e:
+            return None, str(e)
+        if plan["inputs"] != inputs:
+            return None, f"plan was made for different inputs ({plan['inputs']})"
+        if plan["tree"] != state["tree"]:
+            changed = sorted(chart for chart in plan["charts"].keys() | state["charts"].keys()
+                             if plan["charts"].get(chart) != state["charts"].get(chart))
+            detail = f"; charts differ: {', '.join(changed)}" if changed else ""
+            return None, f"tree {state['tree'][:12]} differs from planned {plan['tree'][:12]}{detail}"
+        return plan, None
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Inspect and verify bump plans written by `chart_tracker.py process --plan-file`",
+        epilog="Exit codes: 0=ok (verify: plan is reusable), 1=plan is stale, 2=error."
+    )
+    subparsers = parser.add_subparsers(dest="command", help="Available commands")
+    changed_parser = subparsers.add_parser("changed", help="Print the plan's changed charts, one per line")
+    changed_parser.add_argument("plan", help="Plan file")
+    verify_parser = subparsers.add_parser("verify", help="Check that a plan can be reused for this checkout")
+    verify_parser.add_argument("plan", help="Plan file")
+    verify_parser.add_argument("--since", required=True, help="Since commit the plan must have been made for")
+    verify_parser.add_argument("--fingerprints", metavar="PATH",
+                               help="Fingerprint store the plan must have been made with")
+    args = parser.parse_args()
+
+    if not args.command:
+        parser.print_help()
+        return EXIT_ERROR
+
+    try:
+        plan_file = PlanFile(args.plan)
+        if args.command == "changed":
+            for chart in plan_file.load()["changed_charts"]:
+                print(chart)
+            return EXIT_OK
+
+        inputs = {"since": args.since, "fingerprints": file_digest(args.fingerprints) if args.fingerprints else None}
+        plan, reason = plan_file.reusable(inputs, checkout_state())
+        if plan is None:
+            print(f"Plan is stale: {reason}")
+            return EXIT_STALE
+        print(f"Plan is reusable for {plan['head'][:12]}")
+        return EXIT_OK
+    except Exception as e:
+        print(f"Error: {e}")
+        return EXIT_ERROR
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Case Equivalence - Finds tests/ci cases that render the same manifests
+
+Each case's zot values are deep-merged over charts/zot/values.yaml the way Helm
+coalesces them, so cases whose overrides only restate defaults have the same
+effective values and are equivalent without rendering. One case per remaining
+set of effective values is rendered through the render_snapshots suite (and its
+cache), and cases whose normalized manifests match are grouped. Installing more
+than one case of a group exercises nothing new, so ct_install_scheduler.py
+--skip-equivalent installs only the first case of each group.
+
+Cases with files of their own (umbrella templates such as the ldap server) are
+only grouped with cases that have the same files and umbrella-level values.
+"""
+
+import argparse
+import copy
+import hashlib
+import json
+import sys
+from pathlib import Path
+
+import yaml
+
+from render_snapshots import (
+    DEFAULT_CACHE_DIR,
+    DEFAULT_CASES_DIR,
+    DEFAULT_CHART,
+    DEFAULT_JOBS,
+    RenderSnapshotSuite,
+    load_case_values,
+)
+
+# Case files that do not reach the cluster: the subchart values are compared
+# after merging, and the umbrella chart's own metadata and built dependencies
+# do not change what the zot chart renders.
+_CASE_METADATA = {"Chart.yaml", "Chart.lock", "values.yaml", ".helmignore"}
+
+EXIT_OK = 0
+EXIT_EQUIVALENT = 1
+EXIT_ERROR = 2
+
+
+def coalesce_values(defaults, overrides):
+    """Deep-merge overrides over defaults like Helm: maps merge, null deletes a key, anything else replaces"""
+    merged = copy.deepcopy(defaults)
+    for key, value in overrides.items():
+        if value is None:
+            merged.pop(key, None)
+        elif isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = coalesce_values(merged[key], value)
+        else:
+            merged[key] = copy.deepcopy(value)
+    return merged
+
+
+def umbrella_key(case, subchart="zot"):
+    """Hash of what a case adds around the zot chart: its own files and umbrella-level values"""
+    base = Path(case)
+    digest = hashlib.sha256()
+    for path in sorted(p for p in base.rglob("*") if p.is_file()):
+        rel = path.relative_to(base)
+        if rel.parts[0] == "charts" or (len(rel.parts) == 1 and rel.name in _CASE_METADATA):
+            continue
+        digest.update(rel.as_posix().encode())
+        digest.update(b"\0")
+        digest.update(path.read_bytes())
+        digest.update(b"\0")
+    with open(base / "values.yaml", 'r') as f:
+        values = yaml.safe_load(f) or {}
+    umbrella_values = {k: v for k, v in values.items() if k not in (subchart, "global")}
+    digest.update(json.dumps(umbrella_values, sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+
+class CaseEquivalence:
+    def __init__(self, chart_dir=DEFAULT_CHART, cache_dir=DEFAULT_CACHE_DIR, helm="helm", jobs=DEFAULT_JOBS):
+        self.suite = RenderSnapshotSuite(chart_dir=chart_dir, cache_dir=cache_dir, helm=helm, jobs=jobs)
+        with open(Path(chart_dir) / "values.yaml", 'r') as f:
+            self.chart_values = yaml.safe_load(f) or {}
+
+    def effective_values(self, case):
+        """The values the zot chart renders a case with: its defaults coalesced with the case's overrides"""
+        return coalesce_values(self.chart_values, load_case_values(Path(case) / "values.yaml"))
+
+    def groups(self, cases):
+        """Group cases that render the same manifests; returns lists of cases, each in sorted order.
+
+        Groups are ordered by their first case. Only one case per distinct set of
+        effective values is rendered.
+        """
+        cases = sorted(cases)
+        by_values = {}
+        for case in cases:
+            key = (umbrella_key(case), json.dumps(self.effective_values(case), sort_keys=True, default=str))
+            by_values.setdefault(key, []).append(case)
+
+        representatives = [members[0] for members in by_values.values()]
+        rendered = self.suite.render_all(representatives)
+        for case, manifest in rendered.items():
+            if isinstance(manifest, Exception):
+                raise RuntimeError(f"Could not render {Path(case).name}: {manifest}")
+
+        by_manifest = {}
+        for (umbrella, _), members in by_values.items():
+            manifest = rendered[members[0]]
+            by_manifest.setdefault((umbrella, manifest), []).extend(members)
+        return sorted((sorted(members) for members in by_manifest.values()), key=lambda members: members[0])
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Group tests/ci cases whose zot values render identical manifests",
+        epilog="Exit codes: 0=all cases distinct, 1=equivalent cases found, 2=error."
+    )
+    parser.add_argument("cases", nargs="*",
+                        help="Case directories to compare (default: every case under --cases-dir)")
+    parser.add_argument("--cases-dir", default=DEFAULT_CASES_DIR,
+                        help="Directory containing one values.yaml per test case")
+    parser.add_argument("--chart", default=DEFAULT_CHART, help="Chart the cases configure")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR,
+                        help="Directory for cached renders keyed by input hash ('' disables)")
+    parser.add_argument("--helm", default="helm", help="helm executable to run")
+    parser.add_argument("-j", "--jobs", type=int, default=DEFAULT_JOBS,
+                        help="Number of parallel helm template workers")
+    parser.add_argument("--distinct", action="store_true",
+                        help="Only print the first case of every group, one per line")
+    args = parser.parse_args()
+
+    cases = args.cases or RenderSnapshotSuite.discover_cases(args.cases_dir)
+    if not cases:
+        print(f"No test cases found under {args.cases_dir}")
+        return EXIT_ERROR
+
+    try:
+        equivalence = CaseEquivalence(chart_dir=args.chart, cache_dir=args.cache_dir, helm=args.helm, jobs=args.jobs)
+        groups = equivalence.groups(cases)
+    except Exception as e:
+        print(f"Error: {e}")
+        return EXIT_ERROR
+
+    if args.distinct:
+        for members in groups:
+            print(members[0])
+        return EXIT_OK
+
+    redundant = [members for members in groups if len(members) > 1]
+    if not redundant:
+        print(f"All {len(cases)} cases render distinct manifests")
+        return EXIT_OK
+
+    print("Cases rendering the same manifests (the first of each group is enough to install):")
+    for members in redundant:
+        names = [Path(case).name for case in members]
+        print(f"  {names[0]}: {', '.join(names[1:])}")
+    print(f"{sum(len(members) - 1 for members in redundant)} of {len(cases)} cases are redundant")
+    return EXIT_EQUIVALENT
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+"""
+Chart Docs - Native README generator producing helm-docs output
+
+Renders a chart's README.md the way helm-docs renders it with its default
+template: the header, badges and description come from Chart.yaml, and the
+values table from values.yaml, where a `# -- text` comment above a key (plus
+the comment lines after it) is that key's description. Types, JSON defaults,
+key paths and row order follow helm-docs, so the output is byte-identical,
+footer included.
+
+Charts that need more than the default template (a README.md.gotmpl, or
+`@section` comments) raise UnsupportedChart; callers fall back to helm-docs.
+
+Generated READMEs are cached by a hash of their inputs, so a run only reads
+and renders the charts whose Chart.yaml, values.yaml or README.md changed.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+import yaml
+
+DEFAULT_CHARTS_DIR = "charts"
+DEFAULT_CACHE_FILE = ".chart-docs-cache.json"
+# The helm-docs release whose default template and footer are reproduced.
+HELM_DOCS_VERSION = "1.14.2"
+# Bump whenever the output changes, so cached results are not reused.
+GENERATOR_VERSION = "1"
+
+# Files that decide whether a chart's README is up to date.
+DOCS_INPUTS = ("Chart.yaml", "values.yaml", "README.md", "README.md.gotmpl")
+
+EXIT_OK = 0
+EXIT_STALE = 1
+EXIT_ERROR = 2
+
+_DESCRIPTION_RE = re.compile(r'^\s*#\s*(.*)\s+--\s*(.*)$')
+_CONTINUATION_RE = re.compile(r'^\s*#(\s?)(.*)$')
+_DEFAULT_RE = re.compile(r'^\s*# @default -- (.*)$')
+_TYPE_RE = re.compile(r'^\((.*?)\)\s*(.*)$')
+_RAW_RE = re.compile(r'^\s*#\s+@raw')
+_BOOL_RE = re.compile(r'^(?:true|True|TRUE|false|False|FALSE)$')
+
+
+class UnsupportedChart(Exception):
+    """The chart needs a helm-docs feature this generator does not implement"""
+
+
+class _ValuesLoader(yaml.SafeLoader):
+    """Resolves scalars like helm-docs' YAML 1.2 parser: only true/false are booleans, no timestamps"""
+
+
+_ValuesLoader.yaml_implicit_resolvers = {
+    first: [(tag, regexp) for tag, regexp in resolvers
+            if tag not in ("tag:yaml.org,2002:bool", "tag:yaml.org,2002:timestamp")]
+    for first, resolvers in yaml.SafeLoader.yaml_implicit_resolvers.items()
+}
+for _first in "tTfF":
+    _ValuesLoader.add_implicit_resolver("tag:yaml.org,2002:bool", _BOOL_RE, [_first])
+
+
+def _go_value(value):
+    """Turn whole floats into ints, as Go's JSON encoder prints them"""
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e21:
+        return int(value)
+    if isinstance(value, dict):
+        return {str(k): _go_value(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_go_value(v) for v in value]
+    return value
+
+
+def go_json(value):
+    """Compact JSON as Go's encoding/json writes it (sorted keys, HTML characters escaped)"""
+    text = json.dumps(_go_value(value), ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+    for char, escaped in (("<", "\\u003c"), (">", "\\u003e"), ("&", "\\u0026"),
+                          ("\u2028", "\\u2028"), ("\u2029", "\\u2029")):
+        text = text.replace(char, escaped)
+    return text
+
+
+def type_name(value):
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, int):
+        return "int"
+    if isinstance(value, float):
+        return "float"
+    if isinstance(value, dict):
+        return "object"
+    if isinstance(value, list):
+        return "list"
+    return "string"
+
+
+def parse_comment(lines):
+    """Return (description, type override, default override, ignored) of a key's comment lines.
+
+    Only the last `# --` line and the lines after it count, like helm-docs.
+    """
+    start = None
+    description = ""
+    for i, line in enumerate(lines):
+        match = _DESCRIPTION_RE.match(line)
+        # `# @default -- x` and old-style `# some.key -- x` lines are not this key's description.
+        if match and not match.group(1):
+            start, description = i, match.group(2)
+    if start is None:
+        return None, None, None, False
+
+    default = None
+    ignored = False
+    raw = False
+    for line in lines[start + 1:]:
+        if _RAW_RE.match(line):
+            raw = True
+            continue
+        match = _DEFAULT_RE.match(line)
+        if match:
+            default = match.group(1)
+            continue
+        stripped = line.strip()
+        if stripped.startswith("# @section"):
+            raise UnsupportedChart("values sections (`@section`) are not supported")
+        if stripped.startswith("# @ignore"):
+            ignored = True
+            continue
+        if stripped.startswith("# @notationType"):
+            continue
+        match = _CONTINUATION_RE.match(line)
+        if match:
+            description += ("\n" if raw else " ") + match.group(2)
+
+    value_type = None
+    match = _TYPE_RE.match(description)
+    if match:
+        value_type, description = match.group(1), match.group(2)
+    return description, value_type, default, ignored
+
+
+class _ValuesTable:
+    """Rows of the values table, read from the node tree so comments can be attached to keys"""
+
+    def __init__(self, text):
+        self.lines = text.splitlines()
+        self.loader = _ValuesLoader(text)
+        self.rows = []
+
+    def _comment_above(self, node):
+        """The comment lines directly above a key, up to the first blank or non-comment line"""
+        lines = []
+        index = node.start_mark.line - 1
+        while index >= 0 and self.lines[index].lstrip().startswith("#"):
+            lines.append(self.lines[index])
+            index -= 1
+        return lines[::-1]
+
+    def _row(self, key, value, comment, force):
+        description, value_type, default, ignored = comment
+        if ignored:
+            return
+        if description is None and not force:
+            return
+        self.rows.append((
+            key,
+            value_type or type_name(value),
+            default if default is not None else ("`nil`" if value is None else f"`{go_json(value)}`"),
+            description or "",
+        ))
+
+    def _walk(self, key, node, comment):
+        if comment[3]:
+            # `@ignore` drops the key and everything below it.
+            return
+        value = self.loader.construct_object(node, deep=True)
+        if isinstance(node, yaml.MappingNode) and node.value:
+            self._row(key, value, comment, force=False)
+            for key_node, value_node in node.value:
+                name = key_node.value
+                if "." in name:
+                    name = f'"{name}"'
+                child = f"{key}.{name}" if key else name
+                self._walk(child, value_node, parse_comment(self._comment_above(key_node)))
+        elif isinstance(node, yaml.SequenceNode) and node.value:
+            self._row(key, value, comment, force=False)
+            for i, item in enumerate(node.value):
+                self._walk(f"{key}[{i}]", item, (None, None, None, False))
+        else:
+            self._row(key, value, comment, force=True)
+
+    def build(self):
+        try:
+            root = self.loader.get_single_node()
+        finally:
+            self.loader.dispose()
+        if isinstance(root, yaml.MappingNode):
+            self._walk("", root, (None, None, None, False))
+        return sorted(self.rows)
+
+
+def values_rows(values_text):
+    """Return the (key, type, default, description) rows of a values.yaml text, in table order"""
+    return _ValuesTable(values_text).build()
+
+
+def render_readme(chart_text, values_text):
+    """Render README.md from the texts of Chart.yaml and values.yaml"""
+    try:
+        # Chart.yaml fields are printed as written, so keep every scalar a string.
+        chart = yaml.load(chart_text, Loader=yaml.BaseLoader) or {}
+        rows = values_rows(values_text) if values_text else []
+    except yaml.YAMLError as e:
+        raise ValueError(f"Invalid YAML: {e}") from e
+
+    sections = [f"# {chart.get('name', '')}"]
+    if chart.get("deprecated") == "true":
+        sections.append("> **:exclamation: This Helm Chart is deprecated!**")
+
+    version = chart.get("version", "")
+    badges = f"![Version: {version}](https://img.shields.io/badge/Version-{version.replace('-', '--')}" \
+             "-informational?style=flat-square) "
+    if chart.get("type"):
+        badges += f"![Type: {chart['type']}](https://img.shields.io/badge/Type-{chart['type']}" \
+                  "-informational?style=flat-square) "
+    if chart.get("appVersion"):
+        app_version = chart["appVersion"]
+        badges += f"![AppVersion: {app_version}](https://img.shields.io/badge/AppVersion-" \
+                  f"{app_version.replace('-', '--')}-informational?style=flat-square) "
+    sections.append(badges)
+    sections.append(chart.get("description", ""))
+    if chart.get("home"):
+        sections.append(f"**Homepage:** <{chart['home']}>")
+
+    if chart.get("maintainers"):
+        table = ["## Maintainers", "", "| Name | Email | Url |", "| ---- | ------ | --- |"]
+        for maintainer in chart["maintainers"]:
+            email = f"<{maintainer['email']}>" if maintainer.get("email") else ""
+            url = f"<{maintainer['url']}>" if maintainer.get("url") else ""
+            table.append(f"| {maintainer.get('name', '')} | {email} | {url} |")
+        sections.append("\n".join(table))
+
+    if chart.get("sources"):
+        sections.append("## Source Code\n\n" + "\n".join(f"* <{source}>" for source in chart["sources"]))
+
+    dependencies = chart.get("dependencies") or []
+    if dependencies or chart.get("kubeVersion"):
+        requirements = ["## Requirements"]
+        if chart.get("kubeVersion"):
+            requirements.append(f"Kubernetes: `{chart['kubeVersion']}`")
+        if dependencies:
+            table = ["| Repository | Name | Version |", "|------------|------|---------|"]
+            for dep in dependencies:
+                name = f"{dep['alias']}({dep.get('name', '')})" if dep.get("alias") else dep.get("name", "")
+                table.append(f"| {dep.get('repository', '')} | {name} | {dep.get('version', '')} |")
+            requirements.append("\n".join(table))
+        sections.append("\n\n".join(requirements))
+
+    if rows:
+        table = ["## Values", "", "| Key | Type | Default | Description |", "|-----|------|---------|-------------|"]
+        table.extend(f"| {key} | {value_type} | {default} | {description} |"
+                     for key, value_type, default, description in rows)
+        sections.append("\n".join(table))
+
+    sections.append("----------------------------------------------\n"
+                    f"Autogenerated from chart metadata using [helm-docs v{HELM_DOCS_VERSION}]"
+                    f"(https://github.com/norwoodj/helm-docs/releases/v{HELM_DOCS_VERSION})")
+
+    # helm-docs drops spaces before line ends and collapses runs of blank lines.
+    text = "\n\n".join(sections) + "\n"
+    text = re.sub(r' \n', "\n", text)
+    return re.sub(r'\n{3,}', "\n\n", text)
+
+
+def render_chart(chart_dir):
+    """Render the README of a chart directory; raises UnsupportedChart when helm-docs is needed"""
+    chart_dir = Path(chart_dir)
+    if (chart_dir / "README.md.gotmpl").exists():
+        raise UnsupportedChart("custom README.md.gotmpl templates are not supported")
+    values = chart_dir / "values.yaml"
+    try:
+        return render_readme((chart_dir / "Chart.yaml").read_text(), values.read_text() if values.exists() else "")
+    except ValueError as e:
+        raise ValueError(f"{chart_dir.as_posix()}: {e}") from e
+
+
+def discover_charts(charts_dir=DEFAULT_CHARTS_DIR):
+    """Return the chart directories below charts_dir (any depth, like helm-docs), in sorted order"""
+    base = Path(charts_dir)
+    if (base / "Chart.yaml").is_file():
+        return [base.as_posix()]
+    return sorted(p.parent.as_posix() for p in base.rglob("Chart.yaml")
+                  if "charts" not in p.parent.relative_to(base).parts)
+
+
+class ChartDocs:
+    """Regenerates chart READMEs, skipping charts whose inputs match the cache"""
+
+    def __init__(self, cache_file=DEFAULT_CACHE_FILE):
+        self.cache_file = Path(cache_file) if cache_file else None
+        self.cache = self._load_cache()
+        self.rendered = 0
+        self.cached = 0
+        # (Chart.yaml text, values.yaml text) -> README, shared by every tracker using this instance
+        self._renders = {}
+        self._lock = threading.Lock()
+
+    def _load_cache(self):
+        if self.cache_file and self.cache_file.exists():
+            try:
+                with open(self.cache_file, 'r') as f:
+                    data = json.load(f)
+                if isinstance(data, dict) and data.get("version") == GENERATOR_VERSION:
+                    return data.get("charts", {})
+            except (json.JSONDecodeError, OSError):
+                pass
+        return {}
+
+    def save_cache(self):
+        if not self.cache_file:
+            return
+        try:
+            with tempfile.NamedTemporaryFile('w', dir=self.cache_file.parent or ".", suffix=".tmp",
+                                             delete=False) as f:
+                json.dump({"version": GENERATOR_VERSION, "charts": self.cache}, f, indent=2, sort_keys=True)
+            os.replace(f.name, self.cache_file)
+        except OSError as e:
+            print(f"Warning: Could not save docs cache {self.cache_file}: {e}")
+
+    @staticmethod
+    def inputs_hash(chart_dir):
+        digest = hashlib.sha256()
+        for name in DOCS_INPUTS:
+            path = Path(chart_dir) / name
+            digest.update(name.encode() + b"\0")
+            digest.update(path.read_bytes() if path.exists() else b"\1missing")
+        return digest.hexdigest()
+
+    def render_texts(self, chart_text, values_text):
+        """render_readme() memoized on its inputs, so charts with the same content are parsed once"""
+        key = (chart_text, values_text)
+        with self._lock:
+            readme = self._renders.get(key)
+        if readme is None:
+            readme = render_readme(chart_text, values_text)
+            with self._lock:
+                self._renders[key] = readme
+        return readme
+
+    def update(self, charts, dry_run=False):
+        """Bring the READMEs of charts up to date; returns the README paths that changed (or would).
+
+        Charts this generator cannot render raise UnsupportedChart before any README is written.
+        """
+        pending = []
+        for chart in charts:
+            key = self.inputs_hash(chart)
+            if self.cache.get(chart) == key:
+                self.cached += 1
+                continue
+            pending.append((chart, render_chart(chart)))
+            self.rendered += 1
+
+        changed = []
+        for chart, content in pending:
+            readme = Path(chart) / "README.md"
+            current = readme.read_text() if readme.exists() else None
+            if current != content:
+                changed.append(readme.as_posix())
+                if dry_run:
+                    continue
+                readme.write_text(content)
+            self.cache[chart] = self.inputs_hash(chart)
+        self.save_cache()
+        return changed
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generate chart READMEs like helm-docs, in-process and only for charts whose inputs changed",
+        epilog="Exit codes: 0=READMEs up to date (or written), 1=--check found stale READMEs, 2=error."
+    )
+    parser.add_argument("charts", nargs="*", help="Chart directories (default: every chart under --chart-search-root)")
+    parser.add_argument("-c", "--chart-search-root", default=DEFAULT_CHARTS_DIR,
+                        help="Directory to search for charts")
+    parser.add_argument("--cache-file", default=DEFAULT_CACHE_FILE,
+                        help="JSON file with the input hashes of up-to-date READMEs ('' disables)")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("-d", "--dry-run", action="store_true",
+                       help="Print the generated READMEs instead of writing them")
+    group.add_argument("--check", action="store_true", help="Only report READMEs that are out of date")
+    args = parser.parse_args()
+
+    try:
+        charts = args.charts or discover_charts(args.chart_search_root)
+        if args.dry_run:
+            for chart in charts:
+                print(render_chart(chart), end="")
+            return EXIT_OK
+        docs = ChartDocs(cache_file=args.cache_file)
+        changed = docs.update(charts, dry_run=args.check)
+    except (UnsupportedChart, OSError, ValueError) as e:
+        print(f"Error: {e}")
+        return EXIT_ERROR
+
+    for readme in changed:
+        print(f"{'Out of date' if args.check else 'Updated'}: {readme}")
+    print(f"Docs: {docs.rendered} chart(s) rendered, {docs.cached} unchanged since the last run")
+    return EXIT_STALE if changed and args.check else EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Chart Fingerprint - Merkle content hashes of chart directories
+
+A chart's fingerprint is the root of a Merkle tree over exactly the files
+`helm package` would include: `.helmignore` rules are applied, each file is a
+leaf hashed by content and each directory hashes its sorted entries. The
+fingerprints of released versions are kept in a JSON store, so "changed since
+the last release" is one pass over the tree and needs no git range at all.
+"""
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import sys
+from pathlib import Path
+
+from bump_chart_version import parse_chart_version
+from helmignore import HelmIgnore
+
+DEFAULT_CHARTS_DIR = "charts"
+DEFAULT_STORE = ".chart-fingerprints.json"
+# Files at least this large (vendored dependency .tgz archives) are hashed through mmap.
+MMAP_THRESHOLD = 1 << 20
+
+EXIT_OK = 0
+EXIT_CHANGED = 1
+EXIT_ERROR = 2
+
+
+def hash_file(path):
+    """Return the sha256 of a file's content.
+
+    Large files are mapped rather than read, so hashing a vendored archive does
+    not copy it into Python memory first.
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size >= MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return hashlib.sha256(mapped).hexdigest()
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def merkle_tree(leaves):
+    """Return {path: digest} for every file and directory given {file path: content digest}.
+
+    The chart root is the empty path; its digest is the chart's fingerprint.
+    """
+    entries = {"": {}}
+    for path, digest in leaves.items():
+        parent, _, name = path.rpartition("/")
+        entries.setdefault(parent, {})[name] = "blob"
+        while parent:
+            grandparent, _, dirname = parent.rpartition("/")
+            siblings = entries.setdefault(grandparent, {})
+            if dirname in siblings:
+                break
+            siblings[dirname] = "tree"
+            parent = grandparent
+
+    tree = dict(leaves)
+    # Deepest directories first, so every child digest exists before its parent's.
+    for directory in sorted(entries, key=lambda d: -(d.count("/") + 1 if d else 0)):
+        prefix = directory + "/" if directory else ""
+        digest = hashlib.sha256()
+        for name, kind in sorted(entries[directory].items()):
+            digest.update(f"{kind} {name} {tree[prefix + name]}\n".encode())
+        tree[directory] = digest.hexdigest()
+    return tree
+
+
+def diff_trees(old, new):
+    """Return the top-most paths whose digests differ between two Merkle trees.
+
+    Subtrees with equal digests are skipped without looking at their contents.
+    """
+    children = {}
+    for path in old.keys() | new.keys():
+        if path:
+            children.setdefault(path.rpartition("/")[0], []).append(path)
+
+    changed = []
+    pending = [""]
+    while pending:
+        path = pending.pop()
+        if old.get(path) == new.get(path):
+            continue
+        if path in old and path in new and path in children:
+            pending.extend(children[path])
+        else:
+            changed.append(path)
+    return sorted(changed)
+
+
+class ChartFingerprinter:
+    """Fingerprints every chart root under charts_dir in one walk of the directory"""
+
+    def __init__(self, charts_dir=DEFAULT_CHARTS_DIR):
+        self.charts_dir = Path(charts_dir)
+
+    @staticmethod
+    def _is_dependency_chart(chart_yaml_rel):
+        # Same rule as ChartTracker._is_dependency_chart: vendored dependencies are not roots.
+        parts = chart_yaml_rel.split("/")
+        return len(parts) >= 4 and parts[1] == "charts"
+
+    def _walk(self):
+        """Return (chart roots, every file path) under charts_dir, relative to it"""
+        roots, files = [], []
+        for dirpath, dirnames, filenames in os.walk(self.charts_dir, followlinks=True):
+            dirnames.sort()
+            rel_dir = Path(dirpath).relative_to(self.charts_dir).as_posix()
+            prefix = "" if rel_dir == "." else rel_dir + "/"
+            for name in sorted(filenames):
+                files.append(prefix + name)
+                if name == "Chart.yaml" and prefix and not self._is_dependency_chart(prefix + name):
+                    roots.append(rel_dir)
+        return roots, files
+
+    def fingerprint_all(self):
+        """Return {chart root: Merkle tree} for every chart root (paths like charts/zot).
+
+        Nested chart roots are packaged as part of their parent as well, so each
+        file's content is hashed once and shared by every tree containing it.
+        """
+        roots, files = self._walk()
+        digests = {}
+        trees = {}
+        for root in roots:
+            rules = HelmIgnore.from_chart(self.charts_dir / root)
+            leaves = {}
+            for path in files:
+                if not path.startswith(root + "/"):
+                    continue
+                rel = path[len(root) + 1:]
+                if rules.excludes(rel):
+                    continue
+                if path not in digests:
+                    digests[path] = hash_file(self.charts_dir / path)
+                leaves[rel] = digests[path]
+            trees[(self.charts_dir / root).as_posix()] = merkle_tree(leaves)
+        return trees
+
+
+class FingerprintStore:
+    """JSON file holding each chart's last released version and its Merkle tree"""
+
+    def __init__(self, path=DEFAULT_STORE):
+        self.path = Path(path)
+        self.charts = self._load()
+
+    def _load(self):
+        if self.path.exists():
+            try:
+                with open(self.path, 'r') as f:
+                    data = json.load(f)
+                if isinstance(data.get("charts"), dict):
+                    return data["charts"]
+            except (json.JSONDecodeError, IOError, AttributeError) as e:
+                print(f"Warning: Could not load fingerprint store {self.path}: {e}")
+        return {}
+
+    def save(self):
+        with open(self.path, 'w') as f:
+            json.dump({"charts": self.charts}, f, indent=2, sort_keys=True)
+
+    def released(self, chart):
+        """Return {"version", "fingerprint", "tree"} of the chart's last release, or None"""
+        return self.charts.get(chart)
+
+    def record(self, chart, version, tree):
+        """Record tree as the content of the chart's released version"""
+        self.charts[chart] = {"version": version, "fingerprint": tree[""], "tree": tree}
+
+
+def chart_version(chart):
+    """Return the version in a chart's Chart.yaml, or None"""
+    try:
+        return parse_chart_version((Path(chart) / "Chart.yaml").read_text())
+    except OSError:
+        return None
+
+
+def changed_since_release(trees, store):
+    """Compare fingerprints with the store; returns one dict per chart that differs.
+
+    Each dict has the chart, its current and released versions and the top-most
+    changed paths. Charts never recorded have released_version None.
+    """
+    changes = []
+    for chart, tree in sorted(trees.items()):
+        released = store.released(chart)
+        if released is not None and released["fingerprint"] == tree[""]:
+            continue
+        changes.append({
+            "chart": chart,
+            "version": chart_version(chart),
+            "released_version": released["version"] if released else None,
+            "paths": diff_trees(released["tree"], tree) if released else [],
+        })
+    return changes
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Fingerprint chart directories and compare them with their last released content",
+        epilog="Exit codes: 0=ok (changed: nothing changed), 1=charts changed since their last release, 2=error."
+    )
+    parser.add_argument("--charts-dir", default=DEFAULT_CHARTS_DIR, help="Directory containing the charts")
+    parser.add_argument("--store", default=DEFAULT_STORE, help="JSON file with the released fingerprints")
+    subparsers = parser.add_subparsers(dest="command", help="Available commands")
+    subparsers.add_parser("show", help="Print the fingerprint of every chart")
+    subparsers.add_parser("changed", help="List charts whose content differs from their last release")
+    record_parser = subparsers.add_parser("record", help="Record the current content as released")
+    record_parser.add_argument("charts", nargs="*", help="Charts to record (default: all)")
+    args = parser.parse_args()
+
+    if not args.command:
+        parser.print_help()
+        return EXIT_ERROR
+
+    try:
+        trees = ChartFingerprinter(args.charts_dir).fingerprint_all()
+        if args.command == "show":
+            for chart, tree in sorted(trees.items()):
+                print(f"{tree['']}  {chart}")
+            return EXIT_OK
+
+        store = FingerprintStore(args.store)
+        if args.command == "record":
+            for chart in args.charts or sorted(trees):
+                chart = chart.rstrip("/")
+                if chart not in trees:
+                    raise ValueError(f"{chart} is not a chart root under {args.charts_dir}")
+                store.record(chart, chart_version(chart), trees[chart])
+                print(f"Recorded {chart} {chart_version(chart)}: {trees[chart]['']}")
+            store.save()
+            return EXIT_OK
+
+        changes = changed_since_release(trees, store)
+        for change in changes:
+            if change["released_version"] is None:
+                print(f"{change['chart']}: no released fingerprint")
+            else:
+                print(f"{change['chart']}: changed since {change['released_version']} "
+                      f"({', '.join(change['paths'])})")
+        return EXIT_CHANGED if changes else EXIT_OK
+    except Exception as e:
+        print(f"Error: {e}")
+        return EXIT_ERROR
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+"""
+Chart Fleet - Plans chart version bumps across many chart repositories at once
+
+`chart_tracker.py fleet` runs this. A manifest lists local clones laid out like
+this repository and the ranges to plan in each:
+
+    repositories:
+      - path: ../helm-charts-fork      # relative to the manifest
+        since: [origin/main]           # one revision or a list
+      - path: /srv/internal-charts
+        name: internal                 # default: the directory name
+        since: v1.2.0
+        commit: release                # default: HEAD
+        charts_dir: charts             # default: charts
+
+Every repository is planned from git objects, like `process --commit`, so no
+working tree is read or written. The repositories run as independent steps of a
+Pipeline on --jobs workers. Their trackers share one CommandRunner, which looks
+executables up on PATH once, and one ChartDocs, which renders each distinct
+Chart.yaml/values.yaml pair once, so forks carrying the same chart parse its YAML
+a single time. A repository that fails is reported without stopping the others.
+"""
+
+import contextlib
+import json
+import os
+import sys
+from pathlib import Path
+
+import yaml
+
+from pipeline import Pipeline
+from shallow_clone import has_commit
+
+
+def load_manifest(path):
+    """Return the repositories of a fleet manifest as dicts with name, path, since, commit and charts_dir"""
+    try:
+        with open(path, 'r') as f:
+            data = yaml.safe_load(f)
+    except yaml.YAMLError as e:
+        raise ValueError(f"Invalid fleet manifest {path}: {e}") from e
+    entries = data.get("repositories") if isinstance(data, dict) else None
+    if not isinstance(entries, list) or not entries:
+        raise ValueError(f"Fleet manifest {path} has no repositories list")
+
+    base = Path(path).resolve().parent
+    repos = []
+    for number, entry in enumerate(entries, 1):
+        if not isinstance(entry, dict) or not entry.get("path"):
+            raise ValueError(f"Repository {number} in {path} has no path")
+        since = entry.get("since")
+        if isinstance(since, str):
+            since = [since]
+        if not since or not isinstance(since, list) or not all(isinstance(rev, str) and rev for rev in since):
+            raise ValueError(f"Repository {number} in {path} needs at least one since revision")
+        repo_path = (base / os.path.expanduser(str(entry["path"]))).resolve()
+        name = str(entry.get("name") or repo_path.name)
+        if any(repo["name"] == name for repo in repos):
+            raise ValueError(f"Repository name {name} appears twice in {path}; set a distinct name")
+        repos.append({
+            "name": name,
+            "path": str(repo_path),
+            "since": since,
+            "commit": str(entry.get("commit") or "HEAD"),
+            "charts_dir": str(entry.get("charts_dir") or "charts"),
+        })
+    return repos
+
+
+class Fleet:
+    """Plans the ranges of every manifest repository with trackers derived from one tracker"""
+
+    def __init__(self, tracker, repos, jobs=4):
+        self.tracker = tracker
+        self.repos = repos
+        self.jobs = jobs
+
+    def plan_repository(self, repo):
+        """Return the bump plans of one repository; raises when a revision cannot be resolved"""
+        if not (Path(repo["path"]) / ".git").exists():
+            raise ValueError(f"{repo['path']} is not a git repository")
+        tracker = self.tracker.for_repository(repo["path"])
+        try:
+            tracker.ensure_history(repo["since"], until=repo["commit"])
+            for rev in repo["since"] + [repo["commit"]]:
+                if not has_commit(rev, cwd=repo["path"], runner=tracker.runner):
+                    raise ValueError(f"Unknown revision {rev}")
+            return tracker.plan_ranges(repo["since"], repo["charts_dir"], commit=repo["commit"])
+        finally:
+            tracker.close()
+
+    def _step(self, repo):
+        try:
+            return {"plans": self.plan_repository(repo), "error": None}
+        except Exception as e:
+            return {"plans": [], "error": str(e)}
+
+    def run(self, verbose=False, log=None):
+        """Plan every repository and return one report entry per repository, in manifest order.
+
+        What each repository's tracker prints is held back; with verbose it is
+        replayed per repository (to log, default stdout), otherwise only for the
+        repositories that failed.
+        """
+        pipeline = Pipeline(max_workers=self.jobs)
+        for repo in self.repos:
+            pipeline.step(repo["name"], lambda repo=repo: self._step(repo))
+        results = pipeline.run()
+
+        report = []
+        for repo in self.repos:
+            result = results[repo["name"]]
+            if verbose or result["error"]:
+                with contextlib.redirect_stdout(log or sys.stdout):
+                    print(f"== {repo['name']} ({repo['path']})")
+                    pipeline.replay(repo["name"])
+            report.append({
+                "name": repo["name"],
+                "path": repo["path"],
+                "commit": repo["commit"],
+                "plans": result["plans"],
+                "error": result["error"],
+                "seconds": round(pipeline.durations[repo["name"]], 3),
+            })
+        return report
+
+
+def charts_to_bump(report):
+    """Number of (repository, chart) pairs that need a bump in at least one range"""
+    return sum(len({chart for plan in entry["plans"] for chart in plan["charts_to_bump"]}) for entry in report)
+
+
+def format_report(report):
+    """Return the consolidated report as lines of text"""
+    failed = sum(1 for entry in report if entry["error"])
+    lines = [f"Fleet bump plans: {len(report)} repositories, {charts_to_bump(report)} chart(s) to bump, "
+             f"{failed} failed"]
+    for entry in report:
+        lines.append(f"{entry['name']} ({entry['path']}, {entry['seconds']:.2f}s):")
+        if entry["error"]:
+            lines.append(f"  Error: {entry['error']}")
+        for plan in entry["plans"]:
+            lines.append(f"  {plan['since']}..{plan['until']}:")
+            lines.extend(f"    - {chart}" for chart in plan["charts_to_bump"])
+            if not plan["charts_to_bump"]:
+                lines.append("    No charts to bump")
+    return lines
+
+
+def format_json(report):
+    return json.dumps({
+        "repositories": report,
+        "charts_to_bump": charts_to_bump(report),
+        "failed": sum(1 for entry in report if entry["error"]),
+    }, indent=2)
@@ -1,31 +1,100 @@
 #!/usr/bin/env python3
 """
 Chart Tracker - Manages chart version bumping with JSON state tracking
+
+Every workflow step starts a fresh interpreter, so only what all commands need is
+imported at the top: json, subprocess, the git backend and .helmignore parsing
+are imported by the code paths that use them, and `cleanup` loads none of them.
 """
 
-import json
+import contextlib
 import os
 import sys
 import argparse
-import subprocess
 from pathlib import Path
 
 # Import the version bumping function directly
-from bump_chart_version import bump_patch_version
+from bump_chart_version import bump_patch_version, parse_chart_version
+from command_runner import DEFAULT_MAX_WORKERS, CommandRunner
+from shallow_clone import ensure_revisions, has_commit
 
 EXIT_NO_BUMP = 0
 EXIT_BUMPED = 1
 EXIT_ERROR = 2
+# precommit --strict: a staged chart change lacks a version bump
+EXIT_MISSING_BUMP = 1
+
+NULL_OID = "0" * 40
+
+
+class NdjsonEventWriter:
+    """Writes tracker events as newline-delimited JSON, flushing after every event"""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def __call__(self, event, **fields):
+        import json
+
+        self.stream.write(json.dumps({"event": event, **fields}) + "\n")
+        self.stream.flush()
 
 
 class ChartTracker:
-    def __init__(self, state_file=".chart-tracker.json"):
+    def __init__(self, state_file=".chart-tracker.json", events=None, ledger=None, runner=None, git=None,
+                 fingerprints=None, metrics=None, docs=None, cwd=None):
         self.state_file = Path(state_file)
         self.state = self._load_state()
+        # Repository the git calls run in (default: the current directory); see for_repository().
+        self.cwd = cwd
+        # Every git and helm-docs call goes through this runner (timeouts, memoization, timings).
+        self.runner = runner or CommandRunner()
+        # Committed content (diffs, blobs, trees) is read through a GitBackend; tests pass a MemoryGitBackend.
+        self._git = git
+        # Optional callable(event, **fields) receiving machine-readable progress events.
+        self.events = events
+        # Optional VersionLedger answering version bump checks from its index.
+        self.ledger = ledger
+        # Optional FingerprintStore of released chart content, used when `since` cannot be diffed.
+        self.fingerprints = fingerprints
+        # Optional run_metrics.RunMetrics collecting phase times and chart counts for the textfile.
+        self.metrics = metrics
+        # Optional chart_docs.ChartDocs generating READMEs in-process; None runs helm-docs.
+        self.docs = docs
+        # .helmignore text -> compiled HelmIgnore
+        self._helmignore_rules = {}
+
+    @property
+    def git(self):
+        """The GitBackend, a CliGitBackend in cwd unless one was passed in"""
+        if self._git is None:
+            from git_backend import CliGitBackend
+            self._git = CliGitBackend(cwd=self.cwd, runner=self.runner)
+        return self._git
+
+    def for_repository(self, path):
+        """Return a tracker for the repository at path sharing this tracker's runner and docs generator.
+
+        Only the git-object planning (plan_ranges with a commit) is independent of
+        the current directory, so that is all such a tracker should be used for.
+        """
+        return ChartTracker(Path(path) / ".chart-tracker.json", runner=self.runner, docs=self.docs, cwd=path)
+
+    def _emit(self, event, **fields):
+        """Send an event to the configured event sink, if any"""
+        if self.events is not None:
+            self.events(event, **fields)
+
+    def _gauge(self, name, value):
+        """Set a run metric, if metrics are collected"""
+        if self.metrics is not None:
+            self.metrics.set(name, value)
 
     def _load_state(self):
         """Load the current state from JSON file"""
         if self.state_file.exists():
+            import json
+
             try:
                 with open(self.state_file, 'r') as f:
                     return json.load(f)
@@ -38,6 +107,8 @@ class ChartTracker:
 
     def _save_state(self):
         """Save the current state to JSON file"""
+        import json
+
         try:
             with open(self.state_file, 'w') as f:
                 json.dump(self.state, f, indent=2)
@@ -68,6 +139,7 @@ class ChartTracker:
         for doc_path in doc_list:
             if doc_path.endswith('/README.md'):
                 chart_path = os.path.dirname(doc_path)
+                self._emit("doc_changed", path=doc_path, chart=chart_path, skipped=chart_path in skip)
                 if chart_path in skip:
                     continue
                 self.add_chart(chart_path)
@@ -86,28 +158,44 @@ class ChartTracker:
         else:
             print("No charts to bump")
 
+    def close(self):
+        """Release the git backend (e.g. its long-lived cat-file process), if one was used"""
+        if self._git is not None:
+            self._git.close()
+
     def cleanup(self):
         """Clean up the state file after processing"""
         if self.state_file.exists():
             self.state_file.unlink()
 
+    def _native_docs(self, charts_dir):
+        """Regenerate READMEs with self.docs; returns False when a chart needs helm-docs instead"""
+        from chart_docs import UnsupportedChart, discover_charts
+
+        try:
+            self.docs.update(discover_charts(charts_dir))
+        except UnsupportedChart as e:
+            print(f"Running helm-docs instead of the native generator: {e}")
+            return False
+        return True
+
     def run_helm_docs(self, charts_dir="charts"):
-        """Run helm-docs and return list of changed documentation files"""
+        """Regenerate chart READMEs (natively or with helm-docs) and return list of changed documentation files"""
+        import subprocess
+        import time
+
         try:
-            # Run helm-docs
-            result = subprocess.run(
-                ["helm-docs", "--chart-search-root", charts_dir],
-                capture_output=True,
-                text=True,
-                check=True
-            )
+            start = time.perf_counter()
+            try:
+                if self.docs is None or not self._native_docs(charts_dir):
+                    # Run helm-docs
+                    self.runner.run(["helm-docs", "--chart-search-root", charts_dir], check=True)
+            finally:
+                # Timed here: the native generator starts no command for the runner to time.
+                self._gauge("helm_docs_seconds", time.perf_counter() - start)
 
             # Check which README.md files were modified or created
-            result = subprocess.run(
-                ["git", "status", "--porcelain", f"{charts_dir}/*/README.md"],
-                capture_output=True,
-                text=True
-            )
+            result = self.runner.run(["git", "status", "--porcelain", f"{charts_dir}/*/README.md"])
 
             changed_docs = []
             if result.stdout.strip():
@@ -119,9 +207,12 @@ class ChartTracker:
 
             return changed_docs
 
-        except (subprocess.CalledProcessError, FileNotFoundError) as e:
+        except (subprocess.SubprocessError, FileNotFoundError) as e:
             print(f"Error running helm-docs: {e}")
             return []
+        except (OSError, ValueError) as e:
+            print(f"Error generating docs: {e}")
+            return []
 
     def _discover_chart_dirs(self, charts_dir="charts"):
         """Return chart root directories under charts_dir.
@@ -138,145 +229,506 @@ class ChartTracker:
         # Exclude vendored dependency charts under <chart>/charts/<dep>/Chart.yaml, since those are
         # dependencies and not intended as independent bump targets in this repo.
         for chart_yaml in base.rglob("Chart.yaml"):
-            rel = chart_yaml.relative_to(base).as_posix()
-            parts = rel.split("/")
-            # Skip Helm dependency charts under charts/<chart>/charts/<dep>/Chart.yaml.
-            if len(parts) >= 4 and parts[1] == "charts":
+            if self._is_dependency_chart(chart_yaml.relative_to(base).as_posix()):
                 continue
 
             roots.add(chart_yaml.parent.as_posix())
 
         return roots
 
-    def get_changed_charts_from_git(self, since, charts_dir="charts"):
+    def _discover_chart_dirs_at(self, rev, charts_dir="charts"):
+        """Return chart root directories under charts_dir at rev, read from the git tree"""
+        roots = set()
+        for path in self.git.list_tree(rev, charts_dir):
+            if os.path.basename(path) != "Chart.yaml":
+                continue
+            if self._is_dependency_chart(path[len(charts_dir) + 1:]):
+                continue
+            roots.add(os.path.dirname(path))
+        return roots
+
+    @staticmethod
+    def _is_dependency_chart(chart_yaml_rel):
+        """True for Helm dependency charts under charts/<chart>/charts/<dep>/Chart.yaml"""
+        parts = chart_yaml_rel.split("/")
+        return len(parts) >= 4 and parts[1] == "charts"
+
+    @staticmethod
+    def _sort_chart_roots(chart_roots):
+        """Order chart roots longest-first so nested roots win prefix matches"""
+        return sorted(chart_roots, key=lambda p: (-len(p), p))
+
+    def _packaged_files(self, chart_dir, files, helmignore_text):
+        """Return the files of chart_dir that `helm package` includes under the given .helmignore text.
+
+        Each distinct .helmignore is compiled once per tracker.
+        """
+        from helmignore import HelmIgnore
+
+        rules = self._helmignore_rules.get(helmignore_text)
+        if rules is None:
+            rules = self._helmignore_rules[helmignore_text] = HelmIgnore.parse(helmignore_text or "")
+        return [path for path in files if not rules.excludes(path[len(chart_dir) + 1:])]
+
+    @staticmethod
+    def _attribute_file(file_path, chart_roots_sorted):
+        """Return the deepest chart root containing file_path, or None"""
+        for root in chart_roots_sorted:
+            if file_path == root or file_path.startswith(root + "/"):
+                return root
+        return None
+
+    def get_changed_charts_from_git(self, since, charts_dir="charts", chart_roots=None, until="HEAD"):
         """Get list of changed charts using git operations.
 
         Note: In GitHub Actions `push` events, `since` is typically `github.event.before`.
         We want the files changed by the push itself, i.e. `since..HEAD`.
+
+        chart_roots: previously discovered chart roots, to skip rediscovery when
+        several ranges are analyzed in one run; by default they are read from the tree at until.
+        until: end of the range; any commit can be analyzed without checking it out.
         """
+        from helmignore import HELMIGNORE
+
         try:
             # Use git diff to find changed files introduced by this range.
-            result = subprocess.run(
-                ['git', 'diff', f'{since}..HEAD', '--name-only'],
-                capture_output=True,
-                text=True
-            )
-            if result.returncode != 0:
-                return []
+            changed_files = self.git.diff_names(since, until)
 
-            changed_files = result.stdout.strip().split('\n') if result.stdout.strip() else []
-
-            chart_roots = self._discover_chart_dirs(charts_dir)
+            if chart_roots is None:
+                chart_roots = self._discover_chart_dirs_at(until, charts_dir)
+                for root in sorted(chart_roots):
+                    self._emit("chart_discovered", chart=root)
+                self._gauge("charts_discovered", len(chart_roots))
             if not chart_roots:
                 return []
 
             # Deterministic longest-prefix match (handles nested chart roots correctly).
-            chart_roots_sorted = sorted(chart_roots, key=lambda p: (-len(p), p))
+            chart_roots_sorted = self._sort_chart_roots(chart_roots)
 
             # Determine chart directories impacted by changed files.
             # Any change under charts/<chart>/ should be considered a chart change,
             # since it affects rendered output (templates, values, etc.), not just Chart.yaml.
             changed_charts = []
+            files_by_chart = {}
             for file_path in changed_files:
                 if not file_path.startswith(f"{charts_dir}/"):
                     continue
 
                 # Attribute the changed file to the chart root it belongs to.
-                chart_dir = None
-                for root in chart_roots_sorted:
-                    if file_path == root or file_path.startswith(root + "/"):
-                        chart_dir = root
-                        break
+                chart_dir = self._attribute_file(file_path, chart_roots_sorted)
                 if not chart_dir:
                     continue
 
+                files_by_chart.setdefault(chart_dir, []).append(file_path)
                 if chart_dir not in changed_charts:
                     changed_charts.append(chart_dir)
 
+            # Files the chart's .helmignore (at the end of the range) leaves out of the package do not count.
+            for chart_dir in list(changed_charts):
+                files = self._packaged_files(chart_dir, files_by_chart[chart_dir],
+                                             self.git.read_text(until, f"{chart_dir}/{HELMIGNORE}"))
+                if len(files) < len(files_by_chart[chart_dir]):
+                    print(f"Ignoring {len(files_by_chart[chart_dir]) - len(files)} changed file(s) "
+                          f"excluded by {chart_dir}/{HELMIGNORE}")
+                if files:
+                    files_by_chart[chart_dir] = files
+                else:
+                    changed_charts.remove(chart_dir)
+
+            for chart_dir in changed_charts:
+                self._emit("changed_files", since=since, chart=chart_dir, files=files_by_chart[chart_dir])
+
             return changed_charts
 
         except Exception as e:
             print(f"Error getting changed charts: {e}")
             return []
 
-    def check_version_bumps_in_commits(self, chart_paths, since):
-        """Check if chart versions have already been bumped in the commits"""
-        charts_with_bumps = []
-
-        for chart_path in chart_paths:
-            chart_yaml = Path(chart_path) / "Chart.yaml"
-            if not chart_yaml.exists():
-                continue
+    def ensure_history(self, sinces, until="HEAD", remote="origin"):
+        """Fetch the commits needed for since..until when running in a shallow clone.
 
+        With a fingerprint store a `since` that cannot be fetched (force-pushed away)
+        is left missing: process_all_changes then compares with the released fingerprints.
+        """
+        import subprocess
+
+        # An all-zero `since` (first push of a branch) names no commit, so there is nothing to fetch.
+        revs = [rev for rev in list(sinces) + [until] if rev != NULL_OID]
+        if self.fingerprints is None:
+            ensure_revisions(revs, remote=remote, cwd=self.cwd, runner=self.runner)
+            return
+        ensure_revisions([until], remote=remote, cwd=self.cwd, runner=self.runner)
+        for since in revs[:-1]:
             try:
-                # Get the git diff for this specific Chart.yaml file
-                # Compare from the 'since' commit to HEAD to see what changed in the current branch
-                result = subprocess.run(
-                    ["git", "diff", f"{since}..HEAD", "--", str(chart_yaml)],
-                    capture_output=True,
-                    text=True,
-                    check=True
-                )
-
-                # Check if the diff shows a version change
-                if result.stdout.strip():
-                    # Look for version changes in the diff
-                    lines = result.stdout.split('\n')
-                    version_changed = False
-                    old_version = None
-                    new_version = None
-
-                    for line in lines:
-                        # Look for version field changes (added/removed lines)
-                        if line.startswith('-') and 'version:' in line:
-                            # Extract old version
-                            old_version = line.split('version:')[1].strip()
-                        elif line.startswith('+') and 'version:' in line:
-                            # Extract new version
-                            new_version = line.split('version:')[1].strip()
-
-                    # Only consider it a version bump if the version actually changed
-                    if old_version and new_version and old_version != new_version:
-                        version_changed = True
-
-                    if version_changed:
-                        print(f"Version already bumped in commits for: {chart_path}")
-                        charts_with_bumps.append(chart_path)
-                    else:
-                        print(f"No version bump found in commits for: {chart_path}")
-                else:
-                    print(f"No changes to Chart.yaml in commits for: {chart_path}")
+                ensure_revisions([since], remote=remote, cwd=self.cwd, runner=self.runner)
+            except (RuntimeError, subprocess.SubprocessError) as e:
+                print(f"Cannot fetch {since}: {e}")
 
-            except subprocess.CalledProcessError as e:
-                print(f"Error checking git diff for {chart_path}: {e}")
+    def since_is_usable(self, since):
+        """Return True if since names a commit that exists locally (not all zeros, not force-pushed away)"""
+        return since != NULL_OID and has_commit(since, cwd=self.cwd, runner=self.runner)
+
+    def check_fingerprints(self, charts_dir="charts"):
+        """Return (changed_charts, charts_with_existing_bumps) relative to the last released content.
+
+        A chart has changed when its fingerprint differs from the one recorded for
+        its last released version; it is already bumped when its Chart.yaml version
+        is no longer that version. Charts never recorded are skipped.
+        """
+        from chart_fingerprint import ChartFingerprinter, changed_since_release
+
+        changed_charts = []
+        charts_with_existing_bumps = []
+        trees = ChartFingerprinter(charts_dir).fingerprint_all()
+        self._gauge("charts_discovered", len(trees))
+        for change in changed_since_release(trees, self.fingerprints):
+            chart = change["chart"]
+            if change["released_version"] is None:
+                print(f"No released fingerprint for {chart}; skipping")
+                continue
+            changed_charts.append(chart)
+            print(f"{chart} changed since release {change['released_version']}: {', '.join(change['paths'])}")
+            if change["version"] != change["released_version"]:
+                print(f"Version already bumped since release {change['released_version']} for: {chart}")
+                self._emit("existing_bump", chart=chart, old_version=change["released_version"],
+                           new_version=change["version"])
+                charts_with_existing_bumps.append(chart)
+        return changed_charts, charts_with_existing_bumps
+
+    def check_version_bumps_in_commits(self, chart_paths, since, until="HEAD"):
+        """Check if chart versions have already been bumped in the commits since..until.
+
+        Chart.yaml is read at both ends through the git backend; charts without a
+        Chart.yaml at until (deleted charts) are skipped.
+        """
+        charts_with_bumps = []
+        for chart_path in chart_paths:
+            chart_yaml = f"{chart_path}/Chart.yaml"
+            try:
+                new_text = self.git.read_text(until, chart_yaml)
+                old_text = self.git.read_text(since, chart_yaml) if new_text is not None else None
+            except (OSError, RuntimeError, ValueError) as e:
+                print(f"Error reading {chart_yaml}: {e}")
                 # If we can't check, assume no version bump
                 continue
+            if new_text is None:
+                continue
+
+            if old_text == new_text:
+                print(f"No changes to Chart.yaml in commits for: {chart_path}")
+                continue
+
+            # Only consider it a version bump if the version actually changed
+            old_version = parse_chart_version(old_text) if old_text is not None else None
+            new_version = parse_chart_version(new_text)
+            if old_version and new_version and old_version != new_version:
+                print(f"Version already bumped in commits for: {chart_path}")
+                self._emit("existing_bump", chart=chart_path, old_version=old_version, new_version=new_version)
+                charts_with_bumps.append(chart_path)
+            else:
+                print(f"No version bump found in commits for: {chart_path}")
+
+        return charts_with_bumps
 
+    def check_version_bumps_from_blobs(self, chart_paths, since, until="HEAD"):
+        """Return the charts whose Chart.yaml version differs between since and until.
+
+        Versions are read from the object database through the git backend, whose
+        blob reader is shared, so HEAD blobs are read once no matter how many ranges
+        are checked.
+        """
+        charts_with_bumps = []
+        for chart_path in chart_paths:
+            old_version = parse_chart_version(self.git.read_text(since, f"{chart_path}/Chart.yaml"))
+            new_version = parse_chart_version(self.git.read_text(until, f"{chart_path}/Chart.yaml"))
+            if old_version and new_version and old_version != new_version:
+                print(f"Version already bumped in {since}..{until} for: {chart_path}")
+                self._emit("existing_bump", since=since, chart=chart_path,
+                           old_version=old_version, new_version=new_version)
+                charts_with_bumps.append(chart_path)
         return charts_with_bumps
 
+    def check_version_bumps_from_ledger(self, chart_paths, since, until="HEAD"):
+        """Return the charts whose version differs between since and until, using the ledger.
+
+        Only commits the ledger has not indexed yet are walked; the comparison
+        itself is two indexed lookups per chart.
+        """
+        self.ledger.update([until, since])
+        since_sha = self.ledger.resolve(since)
+        head_sha = self.ledger.resolve(until)
+
+        charts_with_bumps = []
+        for chart_path in chart_paths:
+            old_version = self.ledger.version_at(chart_path, since_sha)
+            new_version = self.ledger.version_at(chart_path, head_sha)
+            if old_version and new_version and old_version != new_version:
+                print(f"Version already bumped in commits for: {chart_path}")
+                self._emit("existing_bump", chart=chart_path, old_version=old_version, new_version=new_version)
+                charts_with_bumps.append(chart_path)
+            else:
+                print(f"No version bump found in commits for: {chart_path}")
+        return charts_with_bumps
+
+    def _native_readme_at(self, rev, chart_path):
+        """README.md the native generator renders from the blobs at rev, or None when helm-docs is needed"""
+        from chart_docs import UnsupportedChart
+
+        if self.git.read_text(rev, f"{chart_path}/README.md.gotmpl") is not None:
+            return None
+        try:
+            return self.docs.render_texts(self.git.read_text(rev, f"{chart_path}/Chart.yaml") or "",
+                                          self.git.read_text(rev, f"{chart_path}/values.yaml") or "")
+        except UnsupportedChart:
+            return None
+
+    def check_docs_from_objects(self, chart_paths, rev):
+        """Return the charts whose README.md at rev differs from what helm-docs generates.
+
+        With self.docs the README is rendered from the Chart.yaml and values.yaml
+        blobs. Otherwise (or for charts the native generator cannot render) each
+        chart is exported from the object database into a temporary directory and
+        rendered with `helm-docs --dry-run`; the working tree is not used.
+        """
+        import subprocess
+        import tempfile
+
+        stale_docs = []
+        with tempfile.TemporaryDirectory() as export_dir:
+            for chart_path in chart_paths:
+                try:
+                    generated = self._native_readme_at(rev, chart_path) if self.docs is not None else None
+                except ValueError as e:
+                    print(f"Error generating docs: {e}")
+                    return []
+                if generated is None:
+                    chart_dir = self.git.export(rev, chart_path, export_dir)
+                    try:
+                        result = self.runner.run(["helm-docs", "--dry-run", "--chart-search-root", str(chart_dir)],
+                                                 check=True)
+                    except (subprocess.SubprocessError, FileNotFoundError) as e:
+                        print(f"Error running helm-docs: {e}")
+                        return []
+                    generated = result.stdout
+
+                current = self.git.read_text(rev, f"{chart_path}/README.md") or ""
+                if generated.strip() != current.strip():
+                    stale_docs.append(chart_path)
+        return stale_docs
+
+    def plan_ranges(self, sinces, charts_dir="charts", commit=None):
+        """Compute one bump plan per `since` range without bumping anything.
+
+        Chart discovery, Chart.yaml blob reads and helm-docs are shared by all
+        ranges; only the `since..HEAD` diff runs once per range.
+
+        With commit, the ranges end at that commit instead of HEAD and all chart
+        content is read from the object database, so the commit need not be checked out.
+        """
+        until = commit or "HEAD"
+        chart_roots = self._discover_chart_dirs_at(until, charts_dir)
+        for root in sorted(chart_roots):
+            self._emit("chart_discovered", chart=root)
+
+        plans = []
+        for since in sinces:
+            changed_charts = self.get_changed_charts_from_git(since, charts_dir, chart_roots=chart_roots, until=until)
+            if self.ledger is not None:
+                existing = self.check_version_bumps_from_ledger(changed_charts, since, until=until)
+            else:
+                existing = self.check_version_bumps_from_blobs(changed_charts, since, until=until)
+            plans.append({
+                "since": since,
+                "until": until,
+                "changed_charts": changed_charts,
+                "charts_with_existing_bumps": existing,
+                "charts_to_bump": [chart for chart in changed_charts if chart not in existing],
+            })
+
+        if commit is None:
+            # helm-docs output depends on the working tree only, so it is shared as well.
+            changed_docs = self.run_helm_docs(charts_dir)
+        else:
+            changed_docs = [f"{chart}/README.md" for chart in self.check_docs_from_objects(sorted(chart_roots), commit)]
+
+        for plan in plans:
+            for doc_path in changed_docs:
+                chart_path = os.path.dirname(doc_path)
+                if (doc_path.endswith('/README.md') and chart_path not in plan["charts_with_existing_bumps"]
+                        and chart_path not in plan["charts_to_bump"]):
+                    plan["charts_to_bump"].append(chart_path)
+            self._emit("range_plan", **plan)
+
+        return plans
+
+    def get_staged_changes(self):
+        """Return {path: (old_blob, new_blob)} for the staged changes (index vs HEAD).
+
+        Uses a single `git diff --cached -z --raw` call; blob ids are the null oid for
+        added or deleted files.
+        """
+        result = self.runner.run(["git", "diff", "--cached", "-z", "--raw", "--no-abbrev", "--no-renames"],
+                                 check=True, text=False)
+
+        changes = {}
+        fields = result.stdout.decode().split('\0')
+        # Records are ":<old mode> <new mode> <old oid> <new oid> <status>\0<path>\0"
+        for meta, path in zip(fields[0::2], fields[1::2]):
+            if not meta.startswith(':'):
+                continue
+            parts = meta[1:].split()
+            changes[path] = (parts[2], parts[3])
+        return changes
+
+    def check_staged_changes(self, charts_dir="charts"):
+        """Return (changed_charts, charts_missing_bump) for the staged changes.
+
+        A chart misses a bump when any of its files is staged but the version in the
+        staged Chart.yaml equals the HEAD version. New charts do not need a bump.
+        """
+        from git_objects import GitBlobReader
+        from helmignore import HELMIGNORE
+
+        changes = self.get_staged_changes()
+        staged = [path for path in changes if path.startswith(f"{charts_dir}/")]
+        if not staged:
+            return [], []
+
+        chart_roots_sorted = self._sort_chart_roots(self._discover_chart_dirs(charts_dir))
+        files_by_chart = {}
+        for file_path in staged:
+            chart_dir = self._attribute_file(file_path, chart_roots_sorted)
+            if chart_dir:
+                files_by_chart.setdefault(chart_dir, []).append(file_path)
+
+        missing_bump = []
+        with GitBlobReader(runner=self.runner) as blobs:
+            # Only the staged .helmignore decides what the next package contains.
+            changed_charts = [chart for chart, files in files_by_chart.items()
+                              if self._packaged_files(chart, files, blobs.read_text(f":{chart}/{HELMIGNORE}"))]
+            for chart in changed_charts:
+                chart_yaml = f"{chart}/Chart.yaml"
+                if chart_yaml not in changes:
+                    missing_bump.append(chart)
+                    continue
+                old_oid, new_oid = changes[chart_yaml]
+                if old_oid == NULL_OID:
+                    continue
+                old_version = parse_chart_version(blobs.read_text(old_oid))
+                new_version = parse_chart_version(blobs.read_text(new_oid)) if new_oid != NULL_OID else None
+                if new_version is None or old_version == new_version:
+                    missing_bump.append(chart)
+
+        return changed_charts, missing_bump
+
     def bump_chart_versions(self):
         """Bump versions for all tracked charts"""
         for chart_path in self.state["charts_to_bump"]:
             try:
                 if bump_patch_version(chart_path):
                     print(f"Bumped version for: {chart_path}")
+                    self._emit("bump_result", chart=chart_path, ok=True,
+                               version=self._read_chart_version(chart_path))
                 else:
                     print(f"Failed to bump version for: {chart_path}")
+                    self._emit("bump_result", chart=chart_path, ok=False)
             except Exception as e:
                 print(f"Error bumping version for {chart_path}: {e}")
+                self._emit("bump_result", chart=chart_path, ok=False, error=str(e))
 
-    def process_all_changes(self, since, charts_dir="charts"):
-        """Process all chart changes and documentation updates"""
-        charts_with_existing_bumps = []
+    @staticmethod
+    def _read_chart_version(chart_path):
+        """Return the version currently in a chart's Chart.yaml, or None"""
+        try:
+            return parse_chart_version((Path(chart_path) / "Chart.yaml").read_text())
+        except OSError:
+            return None
+
+    def _reuse_plan(self, plan_file, plan, since):
+        """Take the decisions of a verified plan file instead of recomputing them"""
+        print(f"Reusing bump plan {plan_file.path} for {since}..{plan['head'][:12]}")
+        self._emit("plan_reused", path=str(plan_file.path), head=plan["head"], charts_to_bump=plan["charts_to_bump"])
+        if plan["charts_to_bump"]:
+            print(f"Adding {len(plan['charts_to_bump'])} charts that need version bumps")
+            self.add_charts_from_list(plan["charts_to_bump"])
+        self.save()
+        return len(self.state["charts_to_bump"]) > 0
 
-        # Get changed charts using git operations
-        changed_charts = self.get_changed_charts_from_git(since, charts_dir)
-        if changed_charts:
+    def process_all_changes(self, since, charts_dir="charts", plan_file=None):
+        """Process all chart changes and documentation updates.
+
+        Change detection, bump detection and helm-docs run as a pipeline: helm-docs
+        runs alongside the other steps, except that on the fingerprint path it waits
+        for the fingerprints to be taken before it rewrites READMEs. Output and
+        events come in the order of a sequential run: detection's as it happens,
+        helm-docs' replayed after the bump summary.
+
+        plan_file (a bump_plan.PlanFile) is reused when it verifies against the
+        checkout and rewritten otherwise.
+        """
+        if plan_file is not None:
+            from bump_plan import checkout_state, file_digest
+
+            inputs = {"since": since,
+                      "fingerprints": file_digest(self.fingerprints.path) if self.fingerprints is not None else None}
+            # Taken before helm-docs runs, since it rewrites READMEs in the working tree.
+            checkout = checkout_state(self.runner, charts_dir)
+            plan, reason = plan_file.reusable(inputs, checkout)
+            if plan is not None:
+                return self._reuse_plan(plan_file, plan, since)
+            print(f"Recomputing bump plan: {reason}")
+
+        from pipeline import Pipeline
+
+        pipeline = Pipeline(max_workers=self.runner.max_workers)
+
+        docs_deps = ()
+        if self.fingerprints is not None and not self.since_is_usable(since):
+            # check_fingerprints hashes the READMEs that helm-docs rewrites, so it must finish first.
+            docs_deps = ("changes",)
+
+            def changes():
+                # A force-push or a new branch leaves no range to diff; compare with the last releases instead.
+                print(f"Cannot diff from {since}; comparing charts with their last released fingerprints")
+                return self.check_fingerprints(charts_dir)
+        else:
+            def changes():
+                # Get changed charts using git operations
+                return self.get_changed_charts_from_git(since, charts_dir), None
+
+        def bumps(changes):
+            changed_charts, fingerprint_bumps = changes
+            if not changed_charts:
+                return []
             print(f"Found {len(changed_charts)} changed charts")
 
             # Check which charts already have version bumps in the commits
-            charts_with_existing_bumps = self.check_version_bumps_in_commits(changed_charts, since)
-
+            if fingerprint_bumps is not None:
+                return fingerprint_bumps
+            if self.ledger is not None:
+                return self.check_version_bumps_from_ledger(changed_charts, since)
+            return self.check_version_bumps_in_commits(changed_charts, since)
+
+        # Detection output and events stream as they happen; helm-docs is held back for its place below.
+        pipeline.step("changes", changes, stream=True)
+        pipeline.step("bumps", bumps, deps=["changes"], stream=True)
+        pipeline.step("docs", lambda **_: self.run_helm_docs(charts_dir), deps=docs_deps)
+
+        events = self.events
+        if events is not None:
+            self.events = pipeline.capture_events(events)
+        try:
+            results = pipeline.run()
+        finally:
+            self.events = events
+            if self.metrics is not None:
+                for name, seconds in pipeline.durations.items():
+                    self.metrics.observe("phase_duration_seconds", seconds, phase=name)
+
+        changed_charts, _ = results["changes"]
+        charts_with_existing_bumps = results["bumps"]
+        self._gauge("charts_changed", len(changed_charts))
+        if changed_charts:
             # Only add charts that don't already have version bumps
             charts_needing_bumps = [chart for chart in changed_charts if chart not in charts_with_existing_bumps]
 
@@ -286,8 +738,9 @@ class ChartTracker:
             else:
                 print("All changed charts already have version bumps in commits")
 
-        # Run helm-docs and get changed documentation
-        changed_docs = self.run_helm_docs(charts_dir)
+        # helm-docs and the README status check
+        pipeline.replay("docs")
+        changed_docs = results["docs"]
         if changed_docs:
             print(f"Found {len(changed_docs)} changed documentation files")
             self.add_charts_from_docs(changed_docs, skip_chart_paths=charts_with_existing_bumps)
@@ -295,22 +748,86 @@ class ChartTracker:
         # Save the state
         self.save()
 
+        if plan_file is not None:
+            if checkout is None:
+                print(f"Not writing {plan_file.path}: charts have uncommitted changes")
+            else:
+                plan_file.write(inputs, checkout, {
+                    "changed_charts": changed_charts,
+                    "charts_with_existing_bumps": charts_with_existing_bumps,
+                    "changed_docs": changed_docs,
+                    "charts_to_bump": self.state["charts_to_bump"],
+                })
+                print(f"Wrote bump plan {plan_file.path}")
+
         return len(self.state["charts_to_bump"]) > 0
 
 
 def main():
     parser = argparse.ArgumentParser(
         description="Chart Tracker - Manage chart version bumping",
-        epilog="Exit codes: 0=no bump needed, 1=bumped, 2=error."
+        epilog="Exit codes: 0=no bump needed, 1=bumped (precommit --strict: bump missing), 2=error."
     )
     parser.add_argument("--state-file", default=".chart-tracker.json",
                        help="Path to the state JSON file")
+    parser.add_argument("--timings", action="store_true",
+                       help="Print per-command call counts and wall time to stderr when done")
+    parser.add_argument("--docs-generator", choices=["native", "helm-docs"], default="native",
+                       help="Generate chart READMEs in-process (falling back to helm-docs for charts with a "
+                            "README.md.gotmpl) or always with the helm-docs binary")
+    parser.add_argument("--metrics-file", metavar="PATH", default=os.environ.get("CHART_METRICS_FILE"),
+                       help="OpenMetrics textfile to update with this run's phase times, chart counts, "
+                            "subprocess counts and peak RSS (default: $CHART_METRICS_FILE)")
 
     subparsers = parser.add_subparsers(dest="command", help="Available commands")
 
     # Process command
     process_parser = subparsers.add_parser("process", help="Process all changes and detect charts to bump")
-    process_parser.add_argument("--since", required=True, help="Since commit for git diff comparison")
+    process_parser.add_argument("--since", required=True, action="append",
+                                help="Since commit for git diff comparison; repeat to plan several ranges "
+                                     "in one run (planning only, nothing is bumped)")
+    process_parser.add_argument("--output", choices=["text", "ndjson"], default="text",
+                                help="ndjson: stream one JSON event per line on stdout (human text goes to stderr)")
+    process_parser.add_argument("--ledger", metavar="PATH",
+                                help="SQLite version ledger used for bump detection (e.g. .chart-ledger.sqlite); "
+                                     "only commits it has not indexed yet are walked")
+    process_parser.add_argument("--commit", metavar="REV",
+                                help="Plan the ranges ending at this commit, reading charts from git objects "
+                                     "instead of the working tree (planning only, nothing is bumped)")
+    process_parser.add_argument("--fingerprints", metavar="PATH",
+                                help="Store of released chart fingerprints (e.g. .chart-fingerprints.json); "
+                                     "used instead of the git range when --since is all zeros or missing")
+    process_parser.add_argument("--plan-file", metavar="PATH",
+                                help="Reuse the bump plan in PATH when it verifies against this checkout; "
+                                     "otherwise recompute and write it (e.g. bump-plan.json)")
+    process_parser.add_argument("--plan-only", action="store_true",
+                                help="With --plan-file: write the plan but do not bump any chart")
+
+    # Watch command
+    watch_parser = subparsers.add_parser("watch", help="Keep the bump plan warm and serve it over a Unix socket")
+    watch_parser.add_argument("--since", required=True, help="Since commit the working tree is compared against")
+    watch_parser.add_argument("--socket", default=".chart-tracker.sock",
+                              help="Path of the Unix socket answering plan queries")
+
+    # Fleet command
+    fleet_parser = subparsers.add_parser("fleet", help="Plan bumps in every repository of a manifest concurrently")
+    fleet_parser.add_argument("--manifest", required=True, metavar="PATH",
+                              help="YAML file listing the repositories (path, since and optionally name, "
+                                   "commit, charts_dir)")
+    fleet_parser.add_argument("--jobs", type=int, default=DEFAULT_MAX_WORKERS,
+                              help="Repositories planned at once (and external commands run at once)")
+    fleet_parser.add_argument("--output", choices=["text", "json"], default="text",
+                              help="json: print the consolidated report as one JSON document")
+    fleet_parser.add_argument("--verbose", action="store_true",
+                              help="Show each repository's tracker output, not only for repositories that failed")
+
+    # Pre-commit command
+    precommit_parser = subparsers.add_parser(
+        "precommit",
+        help="Check staged chart changes for a version bump (exit 1 with --strict if one is missing)"
+    )
+    precommit_parser.add_argument("--strict", action="store_true",
+                                  help="Fail instead of warning when a staged chart change lacks a version bump")
 
     # Cleanup command
     subparsers.add_parser("cleanup", help="Remove state file")
@@ -321,20 +838,134 @@ def main():
         parser.print_help()
         return EXIT_ERROR
 
-    tracker = ChartTracker(args.state_file)
+    events = None
+    human_output = contextlib.nullcontext()
+    if getattr(args, "output", "text") == "ndjson":
+        events = NdjsonEventWriter(sys.stdout)
+        # stdout carries nothing but events; human-readable progress moves to stderr.
+        human_output = contextlib.redirect_stdout(sys.stderr)
+    if args.command == "fleet" and args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+
+    metrics = None
+    if args.metrics_file:
+        # Imported here so runs without a metrics file do not pay for it.
+        from run_metrics import RunMetrics
+        metrics = RunMetrics(f"chart-tracker-{args.command}")
+
+    if args.command == "fleet":
+        # Repositories share the runner, so its bound follows --jobs; PATH is searched once per binary.
+        runner = CommandRunner(max_workers=args.jobs, resolve_executables=True)
+    else:
+        runner = CommandRunner()
+    with human_output, contextlib.ExitStack() as stack:
+        ledger = None
+        if getattr(args, "ledger", None):
+            # Imported here so runs without a ledger do not load sqlite3.
+            from version_ledger import VersionLedger
+            ledger = stack.enter_context(VersionLedger(args.ledger, runner=runner))
+        fingerprints = None
+        if getattr(args, "fingerprints", None):
+            from chart_fingerprint import FingerprintStore
+            fingerprints = FingerprintStore(args.fingerprints)
+        docs = None
+        if args.docs_generator == "native" and args.command in ("process", "watch", "fleet"):
+            from chart_docs import ChartDocs
+            docs = ChartDocs()
+        tracker = ChartTracker(args.state_file, events=events, ledger=ledger, runner=runner,
+                               fingerprints=fingerprints, metrics=metrics, docs=docs)
+        stack.callback(tracker.close)
+        exit_code = _run_command(tracker, args)
+
+    if metrics is not None:
+        if args.command != "fleet":
+            metrics.set("charts_to_bump", len(tracker.state.get("charts_to_bump", [])))
+        metrics.record_runner(runner)
+        metrics.finish(exit_code)
+        try:
+            metrics.write(args.metrics_file)
+        except OSError as e:
+            print(f"Warning: Could not write metrics file {args.metrics_file}: {e}", file=sys.stderr)
+
+    if args.timings:
+        for line in runner.format_timings():
+            print(line, file=sys.stderr)
+    return exit_code
 
+
+def _run_command(tracker, args):
+    """Run the parsed subcommand and return the process exit code"""
     try:
         if args.command == "process":
-            has_changes = tracker.process_all_changes(args.since)
+            tracker.ensure_history(args.since, until=args.commit or "HEAD")
+
+        if args.command == "process" and (len(args.since) > 1 or args.commit):
+            for plan in tracker.plan_ranges(args.since, commit=args.commit):
+                print(f"Bump plan for {plan['since']}..{plan['until']}:")
+                if plan["charts_to_bump"]:
+                    for chart in plan["charts_to_bump"]:
+                        print(f"  - {chart}")
+                else:
+                    print("  No charts to bump")
+            tracker._emit("summary", ranges=len(args.since), exit_code=EXIT_NO_BUMP)
+            return EXIT_NO_BUMP
+
+        elif args.command == "process":
+            plan_file = None
+            if args.plan_file:
+                from bump_plan import PlanFile
+                plan_file = PlanFile(args.plan_file)
+            elif args.plan_only:
+                raise ValueError("--plan-only requires --plan-file")
+            has_changes = tracker.process_all_changes(args.since[0], plan_file=plan_file)
+            if args.plan_only:
+                print(f"Charts to bump: {', '.join(tracker.state['charts_to_bump']) or 'none'}")
+                tracker._emit("summary", charts_to_bump=tracker.state["charts_to_bump"], exit_code=EXIT_NO_BUMP)
+                return EXIT_NO_BUMP
             if has_changes:
                 print("Charts need version bumps:")
                 tracker.print_status()
                 tracker.bump_chart_versions()
+                tracker._emit("summary", charts_to_bump=tracker.state["charts_to_bump"], exit_code=EXIT_BUMPED)
                 return EXIT_BUMPED
             else:
                 print("No charts need version bumps")
+                tracker._emit("summary", charts_to_bump=[], exit_code=EXIT_NO_BUMP)
                 return EXIT_NO_BUMP
 
+        elif args.command == "watch":
+            # Imported here so other commands do not pay for the daemon's dependencies.
+            from chart_watch import ChartWatchDaemon, WatchState
+
+            daemon = ChartWatchDaemon(WatchState(tracker, args.since), socket_path=args.socket)
+            print(f"Watching charts since {args.since}; query with: scripts/chart_watch.py --socket {args.socket}")
+            try:
+                daemon.serve_forever()
+            except KeyboardInterrupt:
+                pass
+
+        elif args.command == "fleet":
+            # Imported here so other commands do not pay for the pipeline and manifest parsing.
+            from chart_fleet import Fleet, charts_to_bump, format_json, format_report, load_manifest
+
+            fleet = Fleet(tracker, load_manifest(args.manifest), jobs=args.jobs)
+            report = fleet.run(verbose=args.verbose, log=sys.stderr if args.output == "json" else None)
+            tracker._gauge("charts_to_bump", charts_to_bump(report))
+            if args.output == "json":
+                print(format_json(report))
+            else:
+                for line in format_report(report):
+                    print(line)
+            return EXIT_ERROR if any(entry["error"] for entry in report) else EXIT_NO_BUMP
+
+        elif args.command == "precommit":
+            _, missing_bump = tracker.check_staged_changes()
+            for chart in missing_bump:
+                level = "Error" if args.strict else "Warning"
+                print(f"{level}: staged changes to {chart} without a version bump in {chart}/Chart.yaml")
+            if missing_bump and args.strict:
+                return EXIT_MISSING_BUMP
+
         elif args.command == "cleanup":
             tracker.cleanup()
 
@@ -342,6 +973,7 @@ def main():
 
     except Exception as e:
         print(f"Error: {e}")
+        tracker._emit("error", message=str(e), exit_code=EXIT_ERROR)
         return EXIT_ERROR
 
 
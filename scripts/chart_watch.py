@@ -0,0 +1,512 @@
+#!/usr/bin/env python3
+"""
+Chart Watch - Keeps the chart bump plan warm while developing
+
+`chart_tracker.py watch` runs this daemon. It builds the chart index, the base tree
+of the `since` commit and the docs state once, then applies file system events
+incrementally: only the touched files are re-hashed and only charts whose docs
+inputs changed re-run helm-docs. Queries are answered over a local Unix socket
+from memory.
+
+The plan compares the working tree against `since`, i.e. what `process` would
+decide if the current edits were committed.
+"""
+
+import argparse
+import ctypes
+import ctypes.util
+import errno
+import hashlib
+import json
+import os
+import select
+import socket
+import socketserver
+import struct
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+from bump_chart_version import parse_chart_version
+from helmignore import HELMIGNORE
+
+DEFAULT_SOCKET = ".chart-tracker.sock"
+DOCS_INPUTS = ("Chart.yaml", "values.yaml", "README.md", "README.md.gotmpl")
+
+# inotify(7) constants
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+              | IN_CREATE | IN_DELETE | IN_DELETE_SELF)
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def git_blob_id(data):
+    """Return the git object id of a blob with the given content"""
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+class InotifyWatcher:
+    """Recursive directory watcher on top of the Linux inotify API (via ctypes)"""
+
+    def __init__(self):
+        libc_name = ctypes.util.find_library("c")
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self._libc, "inotify_init1"):
+            raise OSError(errno.ENOSYS, "inotify is not available")
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self._paths = {}
+
+    def add_tree(self, root):
+        """Watch root and every directory below it"""
+        for dirpath, _, _ in os.walk(root):
+            self.add_dir(dirpath)
+
+    def add_dir(self, path):
+        """Watch a single directory (not its subdirectories)"""
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd >= 0:
+            self._paths[wd] = path
+
+    def wait(self, timeout):
+        """Block up to timeout seconds; return the set of changed paths"""
+        changed = set()
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return changed
+
+        # Collect a short burst of events (editors write, rename and chmod in quick succession).
+        deadline = time.monotonic() + 0.05
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                data = b""
+            self._parse(data, changed)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not select.select([self.fd], [], [], remaining)[0]:
+                break
+        return changed
+
+    def _parse(self, data, changed):
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0").decode(errors="surrogateescape")
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                changed.add(None)
+                continue
+            base = self._paths.get(wd)
+            if base is None:
+                continue
+            if mask & IN_IGNORED:
+                del self._paths[wd]
+                continue
+
+            path = os.path.join(base, name) if name else base
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                # New directories need their own watches; files already inside are reported too.
+                self.add_tree(path)
+                for dirpath, _, filenames in os.walk(path):
+                    changed.update(os.path.join(dirpath, f) for f in filenames)
+            changed.add(path)
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Portable fallback watcher that compares mtimes of every file in the watched trees"""
+
+    def __init__(self, interval=0.5):
+        self.interval = interval
+        self._roots = []
+        self._mtimes = {}
+
+    def add_tree(self, root):
+        self._roots.append((root, True))
+        self._mtimes.update(self._scan_root(root, True))
+
+    def add_dir(self, path):
+        self._roots.append((path, False))
+        self._mtimes.update(self._scan_root(path, False))
+
+    @staticmethod
+    def _scan_root(root, recursive):
+        mtimes = {}
+        for dirpath, dirnames, filenames in os.walk(root):
+            if not recursive:
+                dirnames.clear()
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                try:
+                    mtimes[path] = os.stat(path).st_mtime_ns
+                except OSError:
+                    continue
+        return mtimes
+
+    def wait(self, timeout):
+        time.sleep(min(timeout, self.interval))
+        current = {}
+        for root, recursive in self._roots:
+            current.update(self._scan_root(root, recursive))
+        changed = {p for p in current.keys() | self._mtimes.keys()
+                   if current.get(p) != self._mtimes.get(p)}
+        self._mtimes = current
+        return changed
+
+    def close(self):
+        pass
+
+
+def create_watcher():
+    """Return an inotify watcher where available, else a polling watcher"""
+    try:
+        return InotifyWatcher()
+    except (OSError, AttributeError, TypeError):
+        return PollingWatcher()
+
+
+class WatchState:
+    """In-memory chart index, attribution map and docs state for one `since` commit"""
+
+    def __init__(self, tracker, since, charts_dir="charts", helm_docs="helm-docs"):
+        self.tracker = tracker
+        self.since = since
+        self.charts_dir = charts_dir.rstrip("/")
+        self.helm_docs = helm_docs
+        self.lock = threading.Lock()
+        self.generation = 0
+        self.base_commit = None
+        self.base_tree = {}
+        self.base_versions = {}
+        self.chart_roots = set()
+        self._roots_sorted = []
+        self.changed_files = set()
+        self.docs = {}
+        self.rebuild()
+
+    def _git(self, args, memoize=False):
+        # Through the tracker's runner, like every other git call: timeouts, timings and memoization.
+        return self.tracker.runner.run(["git"] + args, check=True, text=False, cwd=self.tracker.cwd,
+                                       memoize=memoize).stdout
+
+    def _visible_files(self, paths):
+        """Return those of paths (files or directories) that git does not ignore: tracked or untracked"""
+        # `process` diffs commits, so gitignored files such as vendored charts/*/charts/*.tgz are never changes.
+        out = self._git(["--literal-pathspecs", "ls-files", "-z", "--cached", "--others", "--exclude-standard",
+                         "--"] + sorted(paths))
+        return {path.decode() for path in out.split(b"\0") if path}
+
+    def resolve_base(self):
+        """Return the commit id `since` currently points at"""
+        return self._git(["rev-parse", "--verify", f"{self.since}^{{commit}}"]).decode().strip()
+
+    def rebuild(self):
+        """Recompute everything from scratch (startup, HEAD moves, event overflow)"""
+        with self.lock:
+            self.base_commit = self.resolve_base()
+            self.base_tree = {}
+            out = self._git(["ls-tree", "-r", "-z", self.base_commit, "--", f"{self.charts_dir}/"], memoize=True)
+            for entry in out.split(b"\0"):
+                if not entry:
+                    continue
+                meta, path = entry.split(b"\t", 1)
+                self.base_tree[path.decode()] = meta.split()[2].decode()
+
+            self._set_chart_roots(self.tracker._discover_chart_dirs(self.charts_dir))
+            self.base_versions = self._read_base_versions()
+
+            paths = set(self.base_tree) | self._visible_files([f"{self.charts_dir}/"])
+            self.changed_files = {p for p in paths if self._differs_from_base(p)}
+
+            self.docs = {}
+            for chart in self.chart_roots:
+                self._refresh_docs(chart)
+            self.generation += 1
+
+    def _set_chart_roots(self, roots):
+        self.chart_roots = set(roots)
+        self._roots_sorted = self.tracker._sort_chart_roots(self.chart_roots)
+
+    def _read_base_versions(self):
+        versions = {}
+        for chart in self.chart_roots:
+            blob = self.base_tree.get(f"{chart}/Chart.yaml")
+            if blob:
+                versions[chart] = parse_chart_version(self._git(["cat-file", "blob", blob], memoize=True).decode())
+        return versions
+
+    def _differs_from_base(self, path):
+        try:
+            with open(path, 'rb') as f:
+                current = git_blob_id(f.read())
+        except (FileNotFoundError, IsADirectoryError, NotADirectoryError):
+            current = None
+        return current != self.base_tree.get(path)
+
+    def _docs_inputs_hash(self, chart):
+        digest = hashlib.sha256()
+        for name in DOCS_INPUTS:
+            path = Path(chart) / name
+            digest.update(name.encode() + b"\0")
+            digest.update(path.read_bytes() if path.exists() else b"\1missing")
+        return digest.hexdigest()
+
+    def _refresh_docs(self, chart):
+        """Re-run helm-docs for a chart only if its docs inputs changed"""
+        inputs = self._docs_inputs_hash(chart)
+        previous = self.docs.get(chart)
+        if previous and previous["inputs"] == inputs:
+            return
+
+        stale = None
+        try:
+            generated = self._render_natively(chart)
+            if generated is None:
+                generated = self.tracker.runner.run([self.helm_docs, "--dry-run", "--chart-search-root", chart],
+                                                    check=True).stdout
+            readme = Path(chart) / "README.md"
+            current = readme.read_text() if readme.exists() else ""
+            stale = generated.strip() != current.strip()
+        except (subprocess.SubprocessError, OSError, ValueError):
+            pass
+        self.docs[chart] = {"inputs": inputs, "stale": stale}
+
+    def _render_natively(self, chart):
+        """README from the tracker's native generator, or None when it has none or helm-docs is needed"""
+        if self.tracker.docs is None:
+            return None
+        from chart_docs import UnsupportedChart, render_chart
+
+        try:
+            return render_chart(chart)
+        except UnsupportedChart:
+            return None
+
+    def apply(self, paths):
+        """Incrementally apply changed repo-relative paths"""
+        with self.lock:
+            touched = [p for p in paths if p == self.charts_dir or p.startswith(f"{self.charts_dir}/")]
+            if not touched:
+                return False
+
+            if any(os.path.basename(p) == "Chart.yaml" or not os.path.isfile(p) for p in touched):
+                # Chart.yaml appeared/disappeared or a directory moved: re-derive chart roots.
+                roots = self.tracker._discover_chart_dirs(self.charts_dir)
+                if roots != self.chart_roots:
+                    self._set_chart_roots(roots)
+                    self.base_versions = self._read_base_versions()
+                    self.docs = {c: d for c, d in self.docs.items() if c in self.chart_roots}
+
+            docs_dirty = set()
+            new_paths = [p for p in touched if p not in self.base_tree]
+            visible = self._visible_files(new_paths) if new_paths else set()
+            for path in touched:
+                if os.path.isdir(path):
+                    continue
+                if path not in self.base_tree and path not in visible:
+                    self.changed_files.discard(path)
+                elif self._differs_from_base(path):
+                    self.changed_files.add(path)
+                else:
+                    self.changed_files.discard(path)
+                chart = self.tracker._attribute_file(path, self._roots_sorted)
+                if chart and os.path.basename(path) in DOCS_INPUTS:
+                    docs_dirty.add(chart)
+
+            # Deleted directories: drop tracked files under them that no longer exist.
+            for path in list(self.changed_files):
+                if path not in self.base_tree and not os.path.exists(path):
+                    self.changed_files.discard(path)
+
+            for chart in docs_dirty | (self.chart_roots - set(self.docs)):
+                self._refresh_docs(chart)
+
+            self.generation += 1
+            return True
+
+    @staticmethod
+    def _read_helmignore(chart):
+        path = Path(chart) / HELMIGNORE
+        return path.read_text() if path.exists() else None
+
+    def plan(self):
+        """Return the current bump plan, mirroring `process` decisions"""
+        with self.lock:
+            files_by_chart = {}
+            for path in sorted(self.changed_files):
+                chart = self.tracker._attribute_file(path, self._roots_sorted)
+                if chart:
+                    files_by_chart.setdefault(chart, []).append(path)
+            changed_charts = [chart for chart, files in files_by_chart.items()
+                              if self.tracker._packaged_files(chart, files, self._read_helmignore(chart))]
+
+            existing_bumps = []
+            for chart in changed_charts:
+                chart_yaml = Path(chart) / "Chart.yaml"
+                current = parse_chart_version(chart_yaml.read_text()) if chart_yaml.exists() else None
+                base = self.base_versions.get(chart)
+                if base and current and base != current:
+                    existing_bumps.append(chart)
+
+            charts_to_bump = [c for c in changed_charts if c not in existing_bumps]
+            stale_docs = sorted(c for c, d in self.docs.items() if d["stale"])
+            for chart in stale_docs:
+                if chart not in existing_bumps and chart not in charts_to_bump:
+                    charts_to_bump.append(chart)
+
+            return {
+                "since": self.since,
+                "base": self.base_commit,
+                "generation": self.generation,
+                "changed_charts": changed_charts,
+                "charts_with_existing_bumps": existing_bumps,
+                "stale_docs": stale_docs,
+                "charts_to_bump": charts_to_bump,
+            }
+
+    def charts(self):
+        with self.lock:
+            return sorted(self.chart_roots)
+
+
+class _QueryHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        command = self.rfile.readline().decode().strip() or "plan"
+        response = self.server.daemon.answer(command)
+        self.wfile.write((json.dumps(response) + "\n").encode())
+
+
+class _QueryServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class ChartWatchDaemon:
+    """Runs the watcher loop and serves plan queries over a Unix socket"""
+
+    def __init__(self, state, socket_path=DEFAULT_SOCKET, watcher=None, git_dir=".git"):
+        self.state = state
+        self.socket_path = socket_path
+        self.watcher = watcher or create_watcher()
+        self.git_dir = git_dir
+        self._stop = threading.Event()
+        self._server = None
+
+    def answer(self, command):
+        if command == "plan":
+            return self.state.plan()
+        if command == "charts":
+            return {"charts": self.state.charts()}
+        if command == "ping":
+            return {"ok": True, "generation": self.state.generation}
+        if command == "shutdown":
+            self._stop.set()
+            return {"ok": True}
+        return {"error": f"unknown command: {command}"}
+
+    def start(self):
+        """Start watching and serving; returns immediately"""
+        self.watcher.add_tree(self.state.charts_dir)
+        if os.path.isdir(self.git_dir):
+            # HEAD, index and ref updates all touch the top-level git dir.
+            self.watcher.add_dir(self.git_dir)
+
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self._server = _QueryServer(self.socket_path, _QueryHandler)
+        self._server.daemon = self
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def step(self, timeout=0.5):
+        """Wait for one batch of events and apply it"""
+        changed = self.watcher.wait(timeout)
+        if not changed:
+            return
+        if None in changed:
+            self.state.rebuild()
+            return
+
+        paths = set()
+        git_touched = False
+        for path in changed:
+            rel = os.path.relpath(path)
+            if rel == self.git_dir or rel.startswith(self.git_dir + os.sep):
+                git_touched = True
+            else:
+                paths.add(Path(rel).as_posix())
+
+        if git_touched and self.state.resolve_base() != self.state.base_commit:
+            self.state.rebuild()
+        elif paths:
+            self.state.apply(paths)
+
+    def serve_forever(self):
+        self.start()
+        try:
+            while not self._stop.is_set():
+                self.step()
+        finally:
+            self.stop()
+
+    def stop(self):
+        self._stop.set()
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self.watcher.close()
+
+
+def query(socket_path=DEFAULT_SOCKET, command="plan", timeout=5.0):
+    """Send one command to a running watch daemon and return the decoded response"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+        sock.sendall((command + "\n").encode())
+        data = b""
+        while not data.endswith(b"\n"):
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            data += chunk
+    return json.loads(data.decode())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query a running `chart_tracker.py watch` daemon")
+    parser.add_argument("command", nargs="?", default="plan", choices=["plan", "charts", "ping", "shutdown"])
+    parser.add_argument("--socket", default=DEFAULT_SOCKET, help="Path to the daemon's Unix socket")
+    args = parser.parse_args()
+
+    try:
+        print(json.dumps(query(args.socket, args.command), indent=2))
+        return 0
+    except (OSError, ValueError) as e:
+        print(f"Error querying {args.socket}: {e}")
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
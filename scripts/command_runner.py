@@ -0,0 +1,169 @@
+"""
+Command Runner - Shared execution layer for git, helm-docs and helm calls
+
+Every external command the tracker runs goes through one CommandRunner, which
+bounds how many run at once, applies a timeout to each call, memoizes pure
+queries for the lifetime of the runner and keeps per-command timing counters.
+"""
+
+import os
+import threading
+import time
+from pathlib import Path
+
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_TIMEOUT = 300
+
+
+def find_git_dir(cwd=None):
+    """Return the git directory for cwd without running git, or None outside a repository"""
+    path = Path(cwd or os.getcwd()).resolve()
+    for directory in [path] + list(path.parents):
+        dot_git = directory / ".git"
+        if dot_git.is_dir():
+            return dot_git
+        if dot_git.is_file():
+            # Worktrees and submodules: ".git" is a file containing "gitdir: <path>"
+            content = dot_git.read_text().strip()
+            if content.startswith("gitdir:"):
+                return (directory / content[len("gitdir:"):].strip()).resolve()
+    return None
+
+
+def read_head_state(git_dir):
+    """Return a string identifying the commit HEAD points to, read from the ref files.
+
+    This is what memoized results are keyed on; reading two small files is much
+    cheaper than the `git rev-parse HEAD` it replaces.
+    """
+    if git_dir is None:
+        return None
+    head = (git_dir / "HEAD").read_text().strip()
+    if not head.startswith("ref:"):
+        return head
+    ref = head[len("ref:"):].strip()
+
+    common_dir = git_dir
+    if (git_dir / "commondir").exists():
+        common_dir = (git_dir / (git_dir / "commondir").read_text().strip()).resolve()
+    for base in (git_dir, common_dir):
+        loose = base / ref
+        if loose.is_file():
+            return f"{ref} {loose.read_text().strip()}"
+
+    packed = common_dir / "packed-refs"
+    if packed.exists():
+        for line in packed.read_text().splitlines():
+            if line.endswith(" " + ref):
+                return f"{ref} {line.split()[0]}"
+    # Unborn branch
+    return ref
+
+
+def command_name(args):
+    """Return the counter name for a command, e.g. "git diff" or "helm-docs" """
+    name = os.path.basename(args[0])
+    if name != "git":
+        return name
+    rest = iter(args[1:])
+    for arg in rest:
+        if arg in ("-c", "-C"):
+            next(rest, None)
+        elif not arg.startswith("-"):
+            return f"git {arg}"
+    return name
+
+
+class CommandRunner:
+    """Runs external commands with bounded concurrency, timeouts and memoization.
+
+    memoize=True marks a call as a pure query of the repository: its result is
+    cached under (argv, cwd, input, HEAD state), so repeating it while HEAD has not
+    moved is answered from memory. Only use it for commands that depend on nothing
+    but committed content (not the index or working tree).
+
+    resolve_executables=True looks each bare command name up on PATH once and runs
+    the absolute path from then on, instead of searching PATH for every process.
+    """
+
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS, timeout=DEFAULT_TIMEOUT, resolve_executables=False):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_workers)
+        self._lock = threading.Lock()
+        self._cache = {}
+        self._git_dirs = {}
+        # command name -> absolute path (None when not on PATH), with resolve_executables
+        self._executables = {} if resolve_executables else None
+        # command name -> {"calls": n, "cached": n, "seconds": total wall time}
+        self.timings = {}
+
+    def _record(self, name, seconds=0.0, cached=False):
+        with self._lock:
+            counters = self.timings.setdefault(name, {"calls": 0, "cached": 0, "seconds": 0.0})
+            counters["calls"] += 1
+            counters["cached"] += int(cached)
+            counters["seconds"] += seconds
+
+    def _resolve(self, args):
+        if self._executables is None or os.sep in args[0]:
+            return args
+        with self._lock:
+            if args[0] not in self._executables:
+                # Imported here: shutil is only needed when lookups are cached.
+                import shutil
+                self._executables[args[0]] = shutil.which(args[0])
+            path = self._executables[args[0]]
+        return [path] + list(args[1:]) if path else args
+
+    def _memo_key(self, args, cwd, input):
+        key_cwd = os.path.abspath(cwd or os.getcwd())
+        if key_cwd not in self._git_dirs:
+            self._git_dirs[key_cwd] = find_git_dir(key_cwd)
+        return (tuple(args), key_cwd, input, read_head_state(self._git_dirs[key_cwd]))
+
+    def run(self, args, check=False, text=True, input=None, cwd=None, timeout=None, memoize=False):
+        """Run a command and return its CompletedProcess (stdout and stderr captured).
+
+        Raises CalledProcessError (with check) and TimeoutExpired like subprocess.run.
+        timeout defaults to the runner's timeout.
+        """
+        # Imported on first use: commands that start no process (cleanup) do not load subprocess.
+        import subprocess
+
+        name = command_name(args)
+        key = None
+        if memoize:
+            key = self._memo_key(args, cwd, input)
+            with self._lock:
+                cached = self._cache.get(key)
+            if cached is not None:
+                self._record(name, cached=True)
+                return cached
+
+        kwargs = {"capture_output": True, "text": text, "check": check,
+                  "timeout": timeout if timeout is not None else self.timeout}
+        if input is not None:
+            kwargs["input"] = input
+        if cwd is not None:
+            kwargs["cwd"] = cwd
+
+        start = time.perf_counter()
+        try:
+            with self._slots:
+                result = subprocess.run(self._resolve(args), **kwargs)
+        finally:
+            self._record(name, time.perf_counter() - start)
+
+        if key is not None:
+            with self._lock:
+                self._cache[key] = result
+        return result
+
+    def format_timings(self):
+        """Return one human-readable line per command, slowest first"""
+        lines = []
+        for name, counters in sorted(self.timings.items(), key=lambda item: -item[1]["seconds"]):
+            lines.append(f"{name}: {counters['calls']} calls ({counters['cached']} cached), "
+                         f"{counters['seconds']:.3f}s")
+        return lines
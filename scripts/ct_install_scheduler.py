@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+CT Install Scheduler - Runs tests/ci cases through `ct install` concurrently
+
+Every case is installed by its own `ct install --charts <case>` process. Since no
+`--namespace` is passed, ct installs each release into its own generated namespace,
+so concurrent cases sharing one kind cluster do not collide.
+
+Per-case durations are recorded in a JSON history file and later runs start the
+longest cases first (longest-processing-time-first), which keeps the total wall
+time close to the slowest single case once enough workers are available.
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+DEFAULT_CASES_DIR = "tests/ci"
+DEFAULT_HISTORY_FILE = ".ct-install-history.json"
+DEFAULT_JOBS = 2
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_ERROR = 2
+
+
+class CtInstallScheduler:
+    def __init__(self, ct="ct", jobs=DEFAULT_JOBS, history_file=DEFAULT_HISTORY_FILE,
+                 target_branch=None, extra_args=None):
+        self.ct = ct
+        self.jobs = max(1, int(jobs))
+        self.history_file = Path(history_file)
+        self.target_branch = target_branch
+        self.extra_args = list(extra_args or [])
+        self.history = self._load_history()
+        self._print_lock = threading.Lock()
+
+    def _load_history(self):
+        """Load recorded case durations from the history file"""
+        if self.history_file.exists():
+            try:
+                with open(self.history_file, 'r') as f:
+                    data = json.load(f)
+                if isinstance(data.get("durations"), dict):
+                    return data
+            except (json.JSONDecodeError, IOError, AttributeError) as e:
+                print(f"Warning: Could not load history file {self.history_file}: {e}")
+
+        return {
+            "durations": {}
+        }
+
+    def save_history(self):
+        """Save recorded case durations to the history file"""
+        try:
+            with open(self.history_file, 'w') as f:
+                json.dump(self.history, f, indent=2, sort_keys=True)
+        except IOError as e:
+            print(f"Warning: Could not save history file {self.history_file}: {e}")
+
+    @staticmethod
+    def discover_cases(cases_dir=DEFAULT_CASES_DIR):
+        """Return test case directories (any directory with a Chart.yaml) under cases_dir"""
+        base = Path(cases_dir)
+        if not base.is_dir():
+            return []
+        return sorted(p.parent.as_posix() for p in base.glob("*/Chart.yaml"))
+
+    def order_cases(self, cases):
+        """Order cases longest-first using recorded durations.
+
+        Cases without history are scheduled before all known cases: they may be the
+        slowest ones, and starting them late is what stretches the total wall time.
+        """
+        durations = self.history["durations"]
+
+        def key(case):
+            name = Path(case).name
+            if name not in durations:
+                return (0, 0.0, name)
+            return (1, -float(durations[name]), name)
+
+        return sorted(cases, key=key)
+
+    def build_command(self, case):
+        """Build the ct install command line for a single case"""
+        cmd = [self.ct, "install"]
+        if self.target_branch:
+            cmd += ["--target-branch", self.target_branch]
+        cmd += ["--charts", str(Path(case).resolve())]
+        cmd += self.extra_args
+        return cmd
+
+    def run_case(self, case):
+        """Run ct install for one case and return (case, returncode, duration)"""
+        name = Path(case).name
+        cmd = self.build_command(case)
+        with self._print_lock:
+            print(f"Starting test {name}")
+
+        start = time.monotonic()
+        try:
+            result = subprocess.run(cmd, capture_output=True, text=True)
+            returncode, output = result.returncode, result.stdout + result.stderr
+        except (OSError, subprocess.SubprocessError) as e:
+            returncode, output = EXIT_ERROR, f"Error running {self.ct}: {e}\n"
+        duration = time.monotonic() - start
+
+        # Print each case's output as one block so concurrent runs do not interleave.
+        with self._print_lock:
+            status = "passed" if returncode == 0 else f"failed (exit={returncode})"
+            print(f"{'='*60}")
+            print(f"Test {name} {status} in {duration:.1f}s")
+            print(f"{'='*60}")
+            if output:
+                print(output, end="" if output.endswith("\n") else "\n")
+
+        return case, returncode, duration
+
+    def run(self, cases):
+        """Run all cases with bounded concurrency; returns {case: (returncode, duration)}"""
+        ordered = self.order_cases(cases)
+        results = {}
+        # The executor hands out work in submission order, so the longest cases start first.
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            for case, returncode, duration in pool.map(self.run_case, ordered):
+                results[case] = (returncode, duration)
+                self.history["durations"][Path(case).name] = round(duration, 3)
+
+        self.save_history()
+        return results
+
+
+def skip_equivalent(cases, chart_dir, helm="helm"):
+    """Keep the first case of every group that renders the same manifests.
+
+    If the cases cannot be rendered, all of them are kept: a redundant install
+    only costs time, a skipped distinct one loses coverage.
+    """
+    # Imported here: it needs PyYAML and helm, which plain scheduling does not.
+    from case_equivalence import CaseEquivalence
+
+    try:
+        groups = CaseEquivalence(chart_dir=chart_dir, helm=helm).groups(cases)
+    except Exception as e:
+        print(f"Warning: Could not compare rendered cases, installing all of them: {e}")
+        return cases
+
+    for members in groups:
+        for case in members[1:]:
+            print(f"Skipping {Path(case).name}: renders the same manifests as {Path(members[0]).name}")
+    return [members[0] for members in groups]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run tests/ci cases through ct install concurrently, longest first",
+        epilog="Exit codes: 0=all passed, 1=a case failed, 2=error."
+    )
+    parser.add_argument("cases", nargs="*",
+                        help="Case directories to install (default: every case under --cases-dir)")
+    parser.add_argument("--cases-dir", default=DEFAULT_CASES_DIR,
+                        help="Directory containing one chart per test case")
+    parser.add_argument("-j", "--jobs", type=int, default=DEFAULT_JOBS,
+                        help="Maximum number of concurrent ct install runs")
+    parser.add_argument("--history-file", default=DEFAULT_HISTORY_FILE,
+                        help="Path to the JSON file with recorded case durations")
+    parser.add_argument("--ct", default="ct", help="ct executable to run")
+    parser.add_argument("--target-branch", help="Passed through to ct install")
+    parser.add_argument("--ct-arg", action="append", default=[], dest="ct_args",
+                        help="Extra argument passed to every ct install call (repeatable)")
+    parser.add_argument("--skip-equivalent", action="store_true",
+                        help="Install only the first of the cases that render the same manifests (needs helm)")
+    parser.add_argument("--chart", default="charts/zot",
+                        help="Chart the cases configure (with --skip-equivalent)")
+    parser.add_argument("--helm", default="helm", help="helm executable to render with (with --skip-equivalent)")
+    args = parser.parse_args()
+
+    cases = args.cases or CtInstallScheduler.discover_cases(args.cases_dir)
+    if not cases:
+        print(f"No test cases found under {args.cases_dir}")
+        return EXIT_ERROR
+
+    if args.skip_equivalent:
+        cases = skip_equivalent(cases, args.chart, args.helm)
+
+    scheduler = CtInstallScheduler(
+        ct=args.ct,
+        jobs=args.jobs,
+        history_file=args.history_file,
+        target_branch=args.target_branch,
+        extra_args=args.ct_args,
+    )
+
+    print(f"Running {len(cases)} test cases with {scheduler.jobs} parallel jobs")
+    results = scheduler.run(cases)
+
+    failed = sorted(Path(case).name for case, (rc, _) in results.items() if rc != 0)
+    if failed:
+        print(f"Failed test cases ({len(failed)}):")
+        for name in failed:
+            print(f"  - {name}")
+        return EXIT_FAILED
+
+    print("All test cases passed")
+    return EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Dependency Cache - `helm dependency build` once per Chart.lock, shared by every tool
+
+Charts with `dependencies` need their charts/*.tgz archives before lint, template,
+package or install. This script builds them once per run: each chart's archives
+are cached under a key derived from its Chart.lock (plus the declared dependencies
+and the content of `file://` dependencies), and a chart whose key is already cached
+gets its archives copied back without calling helm. Later tools find the archives
+in place; the cache directory can be kept across CI runs.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import yaml
+
+from render_snapshots import hash_chart_dir
+
+DEFAULT_CHARTS_DIR = "charts"
+DEFAULT_CACHE_DIR = ".helm-dependency-cache"
+DEFAULT_JOBS = os.cpu_count() or 2
+
+# Bump whenever the cache key or the layout of cache entries changes.
+CACHE_VERSION = "1"
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_ERROR = 2
+
+
+def declared_dependencies(chart_dir):
+    """Return the `dependencies` list of a chart's Chart.yaml"""
+    with open(Path(chart_dir) / "Chart.yaml", 'r') as f:
+        return (yaml.safe_load(f) or {}).get("dependencies") or []
+
+
+def discover_charts(charts_dir=DEFAULT_CHARTS_DIR):
+    """Return top-level chart directories that declare dependencies, in sorted order"""
+    base = Path(charts_dir)
+    if not base.is_dir():
+        return []
+    return sorted(p.parent.as_posix() for p in base.glob("*/Chart.yaml") if declared_dependencies(p.parent))
+
+
+class DependencyCache:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, helm="helm", jobs=DEFAULT_JOBS, skip_refresh=False):
+        self.cache_dir = Path(cache_dir)
+        self.helm = helm
+        self.jobs = max(1, int(jobs))
+        self.skip_refresh = skip_refresh
+        self._helm_version = None
+        self.used = set()
+        self.stats = {"restored": 0, "built": 0, "uncached": 0}
+
+    def helm_version(self):
+        """Return the helm client version (part of the cache key)"""
+        if self._helm_version is None:
+            result = subprocess.run(
+                [self.helm, "version", "--template", "{{.Version}}"],
+                capture_output=True,
+                text=True,
+                check=True
+            )
+            self._helm_version = result.stdout.strip()
+        return self._helm_version
+
+    def lock_key(self, chart_dir):
+        """Cache key of a chart's resolved dependencies, or None when they cannot be pinned.
+
+        Chart.lock pins every dependency's version and the digest helm checks it against;
+        the declared dependencies are hashed too, so a lock that is out of sync with
+        Chart.yaml misses and lets `helm dependency build` report it. `file://`
+        dependencies are pinned by path only, so their content is part of the key, and
+        a chart whose dependencies are all `file://` (the tests/ci cases) needs no lock.
+        """
+        lock = Path(chart_dir) / "Chart.lock"
+        dependencies = declared_dependencies(chart_dir)
+        local_only = all((dep.get("repository") or "").startswith("file://") for dep in dependencies)
+        if not lock.is_file() and not local_only:
+            return None
+        digest = hashlib.sha256()
+        for part in (CACHE_VERSION, self.helm_version(), lock.read_text() if lock.is_file() else "",
+                     json.dumps(dependencies, sort_keys=True)):
+            digest.update(part.encode())
+            digest.update(b"\0")
+        for dependency in dependencies:
+            repository = dependency.get("repository") or ""
+            if repository.startswith("file://"):
+                local = Path(chart_dir) / repository[len("file://"):]
+                digest.update(hash_chart_dir(local).encode())
+                digest.update(b"\0")
+        return digest.hexdigest()
+
+    def _entry(self, key):
+        return self.cache_dir / key
+
+    @staticmethod
+    def _archives(chart_dir):
+        return sorted((Path(chart_dir) / "charts").glob("*.tgz"))
+
+    def _restore(self, chart_dir, entry):
+        target = Path(chart_dir) / "charts"
+        target.mkdir(exist_ok=True)
+        cached = {p.name for p in entry.glob("*.tgz")}
+        # Like `helm dependency build`, drop archives the lock no longer lists.
+        for stale in self._archives(chart_dir):
+            if stale.name not in cached:
+                stale.unlink()
+        for name in sorted(cached):
+            shutil.copy2(entry / name, target / name)
+        return sorted(cached)
+
+    def _store(self, chart_dir, key):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        # Fill a temporary directory then rename it, so a reader never sees a partial entry.
+        staging = Path(tempfile.mkdtemp(dir=self.cache_dir, suffix=".tmp"))
+        for archive in self._archives(chart_dir):
+            shutil.copy2(archive, staging / archive.name)
+        try:
+            os.replace(staging, self._entry(key))
+        except OSError:
+            # Another chart with the same Chart.lock stored it first.
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def build_command(self, chart_dir):
+        command = [self.helm, "dependency", "build", str(chart_dir)]
+        if self.skip_refresh:
+            command.append("--skip-refresh")
+        return command
+
+    def _helm_build(self, chart_dir):
+        result = subprocess.run(self.build_command(chart_dir), capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"helm dependency build failed: {result.stderr.strip()}")
+
+    def prepare(self, chart_dir):
+        """Put a chart's dependency archives in place; returns (status, archive names).
+
+        status is "restored" (from the cache), "built" (by helm, then cached) or
+        "uncached" (built by helm; remote dependencies without a Chart.lock have no stable key).
+        """
+        key = self.lock_key(chart_dir)
+        if key is None:
+            self._helm_build(chart_dir)
+            return "uncached", [p.name for p in self._archives(chart_dir)]
+
+        self.used.add(key)
+        entry = self._entry(key)
+        if entry.is_dir():
+            return "restored", self._restore(chart_dir, entry)
+
+        self._helm_build(chart_dir)
+        self._store(chart_dir, key)
+        return "built", [p.name for p in self._archives(chart_dir)]
+
+    def prepare_all(self, charts):
+        """Prepare every chart on the worker pool; returns {chart: (status, archives) or exception}"""
+        # Resolve the shared key part up front instead of racing for it in every worker.
+        self.helm_version()
+
+        def prepare(chart):
+            try:
+                return chart, self.prepare(chart)
+            except Exception as e:
+                return chart, e
+
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            results = dict(pool.map(prepare, charts))
+        for outcome in results.values():
+            if not isinstance(outcome, Exception):
+                self.stats[outcome[0]] += 1
+        return results
+
+    def prune(self):
+        """Remove cache entries no chart used in this run; returns how many were removed"""
+        if not self.cache_dir.is_dir():
+            return 0
+        removed = 0
+        for entry in self.cache_dir.iterdir():
+            if entry.is_dir() and entry.name not in self.used:
+                shutil.rmtree(entry, ignore_errors=True)
+                removed += 1
+        return removed
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build chart dependencies once per Chart.lock, serving repeats from a cache",
+        epilog="Exit codes: 0=all dependencies in place, 1=a chart's dependencies could not be built, 2=error."
+    )
+    parser.add_argument("charts", nargs="*",
+                        help="Chart directories; those without dependencies are skipped (default: every chart under --charts-dir)")
+    parser.add_argument("--charts-dir", default=DEFAULT_CHARTS_DIR, help="Directory containing the charts")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR,
+                        help="Directory for dependency archives keyed by Chart.lock")
+    parser.add_argument("--helm", default="helm", help="helm executable to run")
+    parser.add_argument("-j", "--jobs", type=int, default=DEFAULT_JOBS,
+                        help="Number of charts prepared at once")
+    parser.add_argument("--skip-refresh", action="store_true",
+                        help="Pass --skip-refresh to helm (do not update repository indexes)")
+    parser.add_argument("--prune", action="store_true",
+                        help="Remove cache entries that no chart used in this run")
+    args = parser.parse_args()
+
+    try:
+        if args.charts:
+            charts = [chart for chart in args.charts if declared_dependencies(chart)]
+        else:
+            charts = discover_charts(args.charts_dir)
+        if not charts:
+            print("No charts with dependencies")
+            return EXIT_OK
+        cache = DependencyCache(cache_dir=args.cache_dir, helm=args.helm, jobs=args.jobs,
+                                skip_refresh=args.skip_refresh)
+        results = cache.prepare_all(charts)
+    except Exception as e:
+        print(f"Error: {e}")
+        return EXIT_ERROR
+
+    failed = []
+    for chart in charts:
+        outcome = results[chart]
+        if isinstance(outcome, Exception):
+            failed.append(chart)
+            print(f"Failed to prepare dependencies of {chart}: {outcome}")
+            continue
+        status, archives = outcome
+        print(f"{chart}: {status} {', '.join(archives) or 'no archives'}")
+
+    if args.prune and not failed:
+        removed = cache.prune()
+        if removed:
+            print(f"Pruned {removed} unused cache entr{'y' if removed == 1 else 'ies'}")
+    print(f"Dependencies: {cache.stats['restored']} restored from cache, {cache.stats['built']} built, "
+          f"{cache.stats['uncached']} built without a stable key")
+    return EXIT_FAILED if failed else EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
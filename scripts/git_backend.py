@@ -0,0 +1,182 @@
+"""
+Git Backend - The repository queries ChartTracker needs, behind a small interface
+
+CliGitBackend answers them with git itself. MemoryGitBackend is a pure-Python
+repository for tests: scenarios are built from dicts of files and run in
+milliseconds, while a thin conformance suite checks that both backends agree.
+"""
+
+import hashlib
+import re
+import subprocess
+from pathlib import Path
+
+from command_runner import CommandRunner
+from git_objects import GitBlobReader, list_tree
+
+REGULAR_MODE = "100644"
+_REV_SUFFIX_RE = re.compile(r"(~\d*|\^)$")
+
+
+class GitBackend:
+    """Read-only queries against committed content.
+
+    Revisions are anything the backend can resolve (commit ids, branch names,
+    HEAD, `<rev>~N`, `<rev>^`). Paths are repository-relative with `/` separators.
+    """
+
+    def diff_names(self, since, until="HEAD"):
+        """Return the paths that differ between two revisions (like `git diff --name-only`)"""
+        raise NotImplementedError
+
+    def read_file(self, rev, path):
+        """Return the content of path at rev as bytes, or None if it does not exist"""
+        raise NotImplementedError
+
+    def list_tree(self, rev, path=None):
+        """Return {path: (mode, oid)} for every file under path at rev"""
+        raise NotImplementedError
+
+    def read_text(self, rev, path):
+        content = self.read_file(rev, path)
+        return content.decode(errors="replace") if content is not None else None
+
+    def export(self, rev, path, dest):
+        """Write the files under path at rev to dest/<path>; returns the exported directory"""
+        entries = self.list_tree(rev, path)
+        if not entries:
+            raise FileNotFoundError(f"{path} does not exist at {rev}")
+        for name in sorted(entries):
+            target = Path(dest) / name
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_bytes(self.read_file(rev, name))
+        return Path(dest) / path
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class CliGitBackend(GitBackend):
+    """GitBackend running git commands in cwd (default: the current directory)"""
+
+    def __init__(self, cwd=None, runner=None):
+        self.cwd = cwd
+        self.runner = runner or CommandRunner()
+        self.blobs = GitBlobReader(cwd=cwd, runner=self.runner)
+
+    def diff_names(self, since, until="HEAD"):
+        args = ["git", "diff", f"{since}..{until}", "--name-only"]
+        kwargs = {"cwd": self.cwd} if self.cwd is not None else {}
+        result = self.runner.run(args, memoize=True, **kwargs)
+        if result.returncode != 0:
+            raise subprocess.CalledProcessError(result.returncode, args, result.stdout, result.stderr)
+        return result.stdout.strip().split("\n") if result.stdout.strip() else []
+
+    def read_file(self, rev, path):
+        return self.blobs.read(f"{rev}:{path}")
+
+    def list_tree(self, rev, path=None):
+        return list_tree(rev, path, self.cwd, runner=self.runner)
+
+    def export(self, rev, path, dest):
+        # GitBlobReader.export also keeps file modes and prefetches blobs in partial clones.
+        return self.blobs.export(rev, path, dest)
+
+    def close(self):
+        self.blobs.close()
+
+
+def _blob_oid(content):
+    return hashlib.sha1(b"blob %d\0" % len(content) + content).hexdigest()
+
+
+class MemoryGitBackend(GitBackend):
+    """In-memory repository with branches; commits are snapshots of {path: bytes}.
+
+    Build a scenario with commit(), branch() and checkout(), then hand the backend
+    to ChartTracker(git=...). Files are regular (mode 100644) and history follows
+    first parents only.
+    """
+
+    def __init__(self, branch="main"):
+        # commit id -> (parent id or None, {path: bytes})
+        self.commits = {}
+        self.branches = {}
+        self.head = branch  # branch name, or a commit id when detached
+
+    def commit(self, changes=None, remove=(), message=""):
+        """Commit file changes on top of HEAD and advance it; returns the new commit id.
+
+        changes maps paths to str/bytes content; remove lists paths (or directory
+        prefixes) to delete.
+        """
+        parent = self._head_commit()
+        files = dict(self.commits[parent][1]) if parent else {}
+        for prefix in remove:
+            for path in [p for p in files if p == prefix or p.startswith(prefix.rstrip("/") + "/")]:
+                del files[path]
+        for path, content in (changes or {}).items():
+            files[path] = content.encode() if isinstance(content, str) else content
+
+        digest = hashlib.sha1(repr((parent, sorted(files.items()), message, len(self.commits))).encode())
+        commit_id = digest.hexdigest()
+        self.commits[commit_id] = (parent, files)
+        if self.head in self.branches or self.head not in self.commits:
+            self.branches[self.head] = commit_id
+        else:
+            self.head = commit_id
+        return commit_id
+
+    def branch(self, name, start="HEAD"):
+        self.branches[name] = self.resolve(start)
+
+    def checkout(self, ref):
+        self.head = ref if ref in self.branches else self.resolve(ref)
+
+    def _head_commit(self):
+        return self.branches.get(self.head, self.head if self.head in self.commits else None)
+
+    def resolve(self, rev):
+        """Return the commit id for rev; raises KeyError for unknown revisions"""
+        match = _REV_SUFFIX_RE.search(rev)
+        if match:
+            suffix = match.group(1)
+            steps = 1 if suffix in ("~", "^") else int(suffix[1:])
+            commit_id = self.resolve(rev[:match.start()])
+            for _ in range(steps):
+                commit_id = self.commits[commit_id][0]
+                if commit_id is None:
+                    raise KeyError(rev)
+            return commit_id
+        if rev == "HEAD":
+            commit_id = self._head_commit()
+        else:
+            commit_id = self.branches.get(rev, rev)
+        if commit_id not in self.commits:
+            raise KeyError(rev)
+        return commit_id
+
+    def _files(self, rev):
+        return self.commits[self.resolve(rev)][1]
+
+    def diff_names(self, since, until="HEAD"):
+        old, new = self._files(since), self._files(until)
+        return sorted(path for path in old.keys() | new.keys() if old.get(path) != new.get(path))
+
+    def read_file(self, rev, path):
+        try:
+            return self._files(rev).get(path)
+        except KeyError:
+            return None
+
+    def list_tree(self, rev, path=None):
+        prefix = path.rstrip("/") + "/" if path else ""
+        return {name: (REGULAR_MODE, _blob_oid(content))
+                for name, content in sorted(self._files(rev).items())
+                if not path or name == path or name.startswith(prefix)}
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Git Objects - Batched access to blobs in the git object database
+
+Also usable as a script to write chart directories of a commit without a checkout:
+
+    python3 scripts/git_objects.py export <rev> charts/zot --dest /tmp/src
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from command_runner import CommandRunner
+
+SYMLINK_MODE = "120000"
+EXECUTABLE_MODE = "100755"
+
+
+def list_tree(rev, path=None, cwd=None, runner=None):
+    """Return {path: (mode, oid)} for every blob under path at rev.
+
+    Uses one `git ls-tree -r` call, which only reads tree objects, so it also works
+    in blobless clones.
+    """
+    args = ["git", "ls-tree", "-r", "-z", "--full-tree", rev]
+    if path:
+        args += ["--", path]
+    runner = runner or CommandRunner()
+    output = runner.run(args, cwd=cwd, check=True, text=False, memoize=True).stdout.decode()
+
+    entries = {}
+    for record in output.split("\0"):
+        if not record:
+            continue
+        meta, _, name = record.partition("\t")
+        mode, kind, oid = meta.split()
+        if kind == "blob":
+            entries[name] = (mode, oid)
+    return entries
+
+
+def prefetch_missing(rev, path, cwd=None, runner=None):
+    """Fetch the blobs under rev:path that a partial clone lacks, in one request.
+
+    Without this every missing blob is fetched lazily with its own round trip.
+    Returns the number of blobs fetched (0 for regular clones).
+    """
+    runner = runner or CommandRunner()
+    result = runner.run(["git", "config", "--get-regexp", r"^remote\..*\.promisor$"], cwd=cwd)
+    remotes = [line.split()[0][len("remote."):-len(".promisor")]
+               for line in result.stdout.splitlines() if line.split()[-1] == "true"]
+    if not remotes:
+        return 0
+
+    listing = runner.run(["git", "rev-list", "--objects", "--missing=print", f"{rev}:{path}"],
+                         cwd=cwd, check=True).stdout
+    missing = [line[1:] for line in listing.splitlines() if line.startswith("?")]
+    if missing:
+        runner.run(
+            ["git", "-c", "fetch.negotiationAlgorithm=noop", "fetch", remotes[0], "--no-tags",
+             "--no-write-fetch-head", "--recurse-submodules=no", "--filter=blob:none", "--stdin"],
+            cwd=cwd, input="\n".join(missing) + "\n", check=True
+        )
+    return len(missing)
+
+
+class GitBlobReader:
+    """Reads objects through one long-lived `git cat-file --batch` process.
+
+    Objects are addressed by anything cat-file accepts: an object id or `<rev>:<path>`.
+    Results are cached per spec, so charts that share a commit (e.g. HEAD across
+    several ranges) are read only once.
+    """
+
+    def __init__(self, cwd=None, runner=None):
+        self.cwd = cwd
+        # Runs the one-shot git commands of export(); cat-file itself is a long-lived process.
+        self.runner = runner or CommandRunner()
+        self._proc = None
+        self._cache = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _start(self):
+        self._proc = subprocess.Popen(
+            ["git", "cat-file", "--batch"],
+            cwd=self.cwd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL
+        )
+
+    def read(self, spec):
+        """Return the content of an object as bytes, or None if it does not exist"""
+        if spec in self._cache:
+            return self._cache[spec]
+        if "\n" in spec:
+            raise ValueError(f"Invalid object spec: {spec!r}")
+        if self._proc is None:
+            self._start()
+
+        self._proc.stdin.write(spec.encode() + b"\n")
+        self._proc.stdin.flush()
+        header = self._proc.stdout.readline()
+        if not header:
+            raise RuntimeError("git cat-file --batch exited unexpectedly")
+
+        # "<oid> <type> <size>" or "<spec> missing" / "<spec> ambiguous"
+        parts = header.decode().split()
+        content = None
+        if len(parts) == 3 and parts[-1].isdigit():
+            size = int(parts[2])
+            content = self._proc.stdout.read(size)
+            self._proc.stdout.read(1)  # trailing newline
+
+        self._cache[spec] = content
+        return content
+
+    def read_text(self, spec):
+        """Return the content of an object decoded as UTF-8, or None"""
+        content = self.read(spec)
+        return content.decode(errors="replace") if content is not None else None
+
+    def export(self, rev, path, dest):
+        """Write the files under path at rev to dest/<path>, without touching the working tree.
+
+        Executable bits and symlinks are preserved. Returns the exported directory.
+        """
+        entries = list_tree(rev, path, self.cwd, runner=self.runner)
+        if not entries:
+            raise FileNotFoundError(f"{path} does not exist at {rev}")
+        prefetch_missing(rev, path, self.cwd, runner=self.runner)
+
+        for name, (mode, oid) in sorted(entries.items()):
+            target = Path(dest) / name
+            target.parent.mkdir(parents=True, exist_ok=True)
+            content = self.read(oid)
+            if mode == SYMLINK_MODE:
+                os.symlink(content.decode(), target)
+                continue
+            target.write_bytes(content)
+            if mode == EXECUTABLE_MODE:
+                target.chmod(0o755)
+        return Path(dest) / path
+
+    def close(self):
+        if self._proc is not None:
+            self._proc.stdin.close()
+            self._proc.stdout.close()
+            self._proc.wait()
+            self._proc = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Read chart content straight from git objects")
+    subparsers = parser.add_subparsers(dest="command")
+    export_parser = subparsers.add_parser("export", help="Write directories of a commit without a checkout")
+    export_parser.add_argument("rev", help="Commit to read from")
+    export_parser.add_argument("paths", nargs="+", help="Repository-relative directories to export")
+    export_parser.add_argument("--dest", required=True, help="Directory the paths are written under")
+    args = parser.parse_args()
+
+    if args.command != "export":
+        parser.print_help()
+        return 2
+
+    try:
+        with GitBlobReader() as blobs:
+            for path in args.paths:
+                print(blobs.export(args.rev, path.rstrip("/"), args.dest))
+    except (FileNotFoundError, subprocess.SubprocessError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
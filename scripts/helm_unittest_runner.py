@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Helm Unittest Runner - Runs a chart's helm-unittest files as parallel, cached jobs
+
+Every unittests/*.yaml file of the chart runs in its own `helm unittest --file`
+process on a worker pool. A passing file's JUnit report is cached by a hash of
+its inputs (the chart's templates and values, the test file and its snapshot),
+so later runs skip files whose inputs are unchanged. The per-file reports are
+merged into a single JUnit file.
+"""
+
+import argparse
+import hashlib
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+DEFAULT_CHART = "charts/zot"
+DEFAULT_CACHE_DIR = ".unittest-cache"
+DEFAULT_JOBS = os.cpu_count() or 2
+TESTS_DIR = "unittests"
+SNAPSHOT_DIR = "__snapshot__"
+
+# Bump whenever the cache key or the cached report format changes.
+CACHE_VERSION = "1"
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_ERROR = 2
+
+
+def hash_chart_inputs(chart_dir):
+    """Hash every chart file outside unittests/ (path and content) in a stable order.
+
+    That covers templates, helpers, values, Chart.yaml and vendored dependencies;
+    test files and snapshots are hashed per job instead.
+    """
+    digest = hashlib.sha256()
+    base = Path(chart_dir)
+    for path in sorted(p for p in base.rglob("*") if p.is_file()):
+        rel = path.relative_to(base)
+        if rel.parts[0] == TESTS_DIR:
+            continue
+        digest.update(rel.as_posix().encode())
+        digest.update(b"\0")
+        digest.update(path.read_bytes())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def merge_junit(reports):
+    """Merge JUnit reports (XML strings) into one <testsuites> document.
+
+    Test suites keep their order; the root's tests, failures, errors and time
+    attributes are the sums over all suites.
+    """
+    merged = ET.Element("testsuites")
+    totals = {"tests": 0, "failures": 0, "errors": 0}
+    total_time = 0.0
+    for report in reports:
+        root = ET.fromstring(report)
+        suites = [root] if root.tag == "testsuite" else root.findall("testsuite")
+        for suite in suites:
+            for name in totals:
+                totals[name] += int(suite.get(name, 0) or 0)
+            total_time += float(suite.get("time", 0) or 0)
+            merged.append(suite)
+    for name, value in totals.items():
+        merged.set(name, str(value))
+    merged.set("time", f"{total_time:.3f}")
+    return ET.tostring(merged, encoding="unicode")
+
+
+class HelmUnittestRunner:
+    def __init__(self, chart_dir=DEFAULT_CHART, cache_dir=DEFAULT_CACHE_DIR, helm="helm",
+                 jobs=DEFAULT_JOBS, extra_args=None):
+        self.chart_dir = Path(chart_dir)
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.helm = helm
+        self.jobs = max(1, int(jobs))
+        self.extra_args = list(extra_args or [])
+        self._chart_hash = None
+        self._tool_versions = None
+        # Guards printing and the ran/cached counters, which workers update concurrently.
+        self._print_lock = threading.Lock()
+        self.ran = 0
+        self.cached = 0
+
+    def discover_tests(self):
+        """Return the chart's unittest files (relative to the chart), in sorted order"""
+        base = self.chart_dir / TESTS_DIR
+        if not base.is_dir():
+            return []
+        return sorted(f"{TESTS_DIR}/{p.name}" for p in base.glob("*.yaml"))
+
+    def snapshot_path(self, test_file):
+        """helm-unittest keeps a test file's snapshots in __snapshot__/<file>.snap next to it"""
+        test_path = self.chart_dir / test_file
+        return test_path.parent / SNAPSHOT_DIR / f"{test_path.name}.snap"
+
+    def tool_versions(self):
+        """Return the helm and helm-unittest plugin versions (part of the cache key)"""
+        if self._tool_versions is None:
+            helm = subprocess.run([self.helm, "version", "--template", "{{.Version}}"],
+                                  capture_output=True, text=True, check=True).stdout.strip()
+            plugins = subprocess.run([self.helm, "plugin", "list"],
+                                     capture_output=True, text=True, check=True).stdout
+            unittest = next((line.split()[1] for line in plugins.splitlines()
+                             if line.split()[:1] == ["unittest"] and len(line.split()) > 1), "")
+            self._tool_versions = f"{helm} unittest/{unittest}"
+        return self._tool_versions
+
+    def input_hash(self, test_file):
+        """Hash of everything that determines the result of one test file"""
+        if self._chart_hash is None:
+            self._chart_hash = hash_chart_inputs(self.chart_dir)
+        snapshot = self.snapshot_path(test_file)
+        digest = hashlib.sha256()
+        for part in (CACHE_VERSION.encode(), self.tool_versions().encode(), "\0".join(self.extra_args).encode(),
+                     self._chart_hash.encode(), test_file.encode(), (self.chart_dir / test_file).read_bytes(),
+                     snapshot.read_bytes() if snapshot.exists() else b""):
+            digest.update(part)
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def _cache_path(self, key):
+        return self.cache_dir / f"{key}.xml"
+
+    def _store(self, key, report):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        # Write then rename, so concurrent workers never read a partial entry.
+        with tempfile.NamedTemporaryFile('w', dir=self.cache_dir, suffix=".tmp", delete=False) as f:
+            f.write(report)
+        os.replace(f.name, self._cache_path(key))
+
+    def build_command(self, test_file, report_file):
+        """Build the helm unittest command line for a single test file"""
+        return [self.helm, "unittest", "--strict", "--file", test_file,
+                "--output-type", "JUnit", "--output-file", str(report_file)] + self.extra_args + [str(self.chart_dir)]
+
+    def run_test_file(self, test_file):
+        """Run one test file; returns (test_file, returncode, JUnit report or None, cached)"""
+        key = self.input_hash(test_file)
+        if self.cache_dir and self._cache_path(key).exists():
+            with self._print_lock:
+                self.cached += 1
+                print(f"{test_file}: unchanged, passed (cached)")
+            return test_file, 0, self._cache_path(key).read_text(), True
+
+        with tempfile.TemporaryDirectory() as report_dir:
+            report_file = Path(report_dir) / "report.xml"
+            try:
+                result = subprocess.run(self.build_command(test_file, report_file), capture_output=True, text=True)
+                returncode, output = result.returncode, result.stdout + result.stderr
+            except (OSError, subprocess.SubprocessError) as e:
+                returncode, output = EXIT_ERROR, f"Error running {self.helm} unittest: {e}\n"
+            report = report_file.read_text() if report_file.exists() else None
+        with self._print_lock:
+            self.ran += 1
+
+        if returncode == 0 and report is not None and self.cache_dir:
+            # helm-unittest writes snapshots for new tests, so key the entry by the inputs as they are now.
+            self._store(self.input_hash(test_file), report)
+
+        # Print each file's output as one block so concurrent runs do not interleave.
+        with self._print_lock:
+            status = "passed" if returncode == 0 else f"failed (exit={returncode})"
+            print(f"{'='*60}")
+            print(f"{test_file}: {status}")
+            print(f"{'='*60}")
+            if output:
+                print(output, end="" if output.endswith("\n") else "\n")
+
+        return test_file, returncode, report, False
+
+    def run(self, test_files):
+        """Run all test files on the worker pool; returns {test_file: (returncode, report, cached)}"""
+        # Resolve the shared key parts up front instead of racing for them in every worker.
+        self.tool_versions()
+        self._chart_hash = hash_chart_inputs(self.chart_dir)
+
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            return {test_file: (returncode, report, cached)
+                    for test_file, returncode, report, cached in pool.map(self.run_test_file, test_files)}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run a chart's helm-unittest files in parallel, skipping files whose inputs are unchanged",
+        epilog="Exit codes: 0=all passed, 1=a test file failed, 2=error."
+    )
+    parser.add_argument("tests", nargs="*",
+                        help="Test files relative to the chart, e.g. unittests/pdb_test.yaml (default: all)")
+    parser.add_argument("--chart", default=DEFAULT_CHART, help="Chart whose unittests to run")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR,
+                        help="Directory for cached reports keyed by input hash ('' disables)")
+    parser.add_argument("--junit-output", help="Write the merged JUnit report to this file")
+    parser.add_argument("--helm", default="helm", help="helm executable to run")
+    parser.add_argument("-j", "--jobs", type=int, default=DEFAULT_JOBS,
+                        help="Number of parallel helm unittest processes")
+    parser.add_argument("--unittest-arg", action="append", default=[], dest="unittest_args",
+                        help="Extra argument passed to every helm unittest call (repeatable)")
+    args = parser.parse_args()
+
+    runner = HelmUnittestRunner(
+        chart_dir=args.chart,
+        cache_dir=args.cache_dir,
+        helm=args.helm,
+        jobs=args.jobs,
+        extra_args=args.unittest_args,
+    )
+    test_files = args.tests or runner.discover_tests()
+    if not test_files:
+        # ct runs this for every changed chart; charts without unittests have nothing to do.
+        print(f"No unittest files found in {runner.chart_dir / TESTS_DIR}")
+        return EXIT_OK
+
+    try:
+        results = runner.run(test_files)
+    except Exception as e:
+        print(f"Error: {e}")
+        return EXIT_ERROR
+
+    if args.junit_output:
+        reports = [report for _, report, _ in results.values() if report is not None]
+        Path(args.junit_output).write_text(merge_junit(reports))
+
+    print(f"Ran {runner.ran} test file(s), {runner.cached} served from cache")
+    failed = [test_file for test_file, (returncode, _, _) in results.items() if returncode != 0]
+    if failed:
+        print(f"Failed test files ({len(failed)}):")
+        for test_file in failed:
+            print(f"  - {test_file}")
+        return EXIT_FAILED
+
+    print("All test files passed")
+    return EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+"""
+Helm Ignore - `.helmignore` rules with the semantics of Helm's chart loader
+
+Patterns use Go's filepath.Match syntax (`*`, `?`, `[...]` with `^` negation and
+backslash escapes; no `**`). A pattern without a slash matches the base name, a
+pattern with a slash matches the path relative to the chart root, `/` anchors it
+there, a trailing `/` restricts it to directories and `!` negates it. Like
+`helm package`, a path is excluded when it or any of its parent directories is
+ignored, and hidden files directly under templates/ are always ignored.
+"""
+
+import re
+from pathlib import Path
+
+HELMIGNORE = ".helmignore"
+
+# Rules Helm adds to every chart (ignore.Rules.AddDefaults).
+DEFAULT_RULES = ("templates/.?*",)
+
+
+def translate(pattern):
+    """Translate a Go filepath.Match pattern into a regular expression (whole string).
+
+    Raises ValueError for malformed patterns, as filepath.ErrBadPattern.
+    """
+    out = []
+    i, n = 0, len(pattern)
+    while i < n:
+        char = pattern[i]
+        i += 1
+        if char == "*":
+            out.append("[^/]*")
+        elif char == "?":
+            out.append("[^/]")
+        elif char == "\\":
+            if i == n:
+                raise ValueError(f"bad pattern {pattern!r}: trailing backslash")
+            out.append(re.escape(pattern[i]))
+            i += 1
+        elif char == "[":
+            i, char_class = _translate_class(pattern, i)
+            out.append(char_class)
+        else:
+            out.append(re.escape(char))
+    return "".join(out)
+
+
+def _translate_class(pattern, i):
+    """Translate the character class starting after `[` at pattern[i]; returns (end, regex)"""
+    n = len(pattern)
+    negated = i < n and pattern[i] == "^"
+    if negated:
+        i += 1
+    ranges = []
+    count = 0
+    while True:
+        if i < n and pattern[i] == "]" and count:
+            i += 1
+            break
+        count += 1
+        lo, i = _class_char(pattern, i)
+        hi = lo
+        if i < n and pattern[i] == "-":
+            hi, i = _class_char(pattern, i + 1)
+        if lo > hi:
+            # A reversed range is valid in Go and matches nothing.
+            continue
+        ranges.append(re.escape(lo) if lo == hi else f"{re.escape(lo)}-{re.escape(hi)}")
+    if not ranges:
+        return i, "(?s:.)" if negated else "(?!)"
+    # Unlike `?` and `*`, Go's character classes may match the separator.
+    return i, f"[{'^' if negated else ''}{''.join(ranges)}]"
+
+
+def _class_char(pattern, i):
+    n = len(pattern)
+    if i >= n or pattern[i] in "-]":
+        raise ValueError(f"bad pattern {pattern!r}: unterminated or empty character class")
+    if pattern[i] == "\\":
+        i += 1
+        if i >= n:
+            raise ValueError(f"bad pattern {pattern!r}: trailing backslash")
+    return pattern[i], i + 1
+
+
+class _Rule:
+    __slots__ = ("raw", "negate", "must_dir", "base_only", "regex")
+
+    def __init__(self, raw):
+        self.raw = raw
+        rule = raw
+        if "**" in rule:
+            raise ValueError(f"bad pattern {raw!r}: double-star (**) syntax is not supported")
+        self.negate = rule.startswith("!")
+        if self.negate:
+            rule = rule[1:]
+        self.must_dir = rule.endswith("/")
+        if self.must_dir:
+            rule = rule[:-1]
+        # A leading slash anchors the pattern at the chart root, which relative paths already are.
+        self.base_only = "/" not in rule
+        self.regex = re.compile(translate(rule.lstrip("/")), re.DOTALL)
+
+    def matches(self, path):
+        name = path.rsplit("/", 1)[-1] if self.base_only else path
+        return self.regex.fullmatch(name) is not None
+
+
+class HelmIgnore:
+    """Compiled `.helmignore` rules of one chart; paths are relative to the chart root"""
+
+    def __init__(self, rules=()):
+        self.rules = [_Rule(rule) for rule in rules]
+
+    @classmethod
+    def parse(cls, text, defaults=True):
+        """Compile the rules in a `.helmignore` file's text (plus Helm's defaults)"""
+        rules = []
+        for line in text.splitlines():
+            line = line.strip()
+            if line and not line.startswith("#"):
+                rules.append(line)
+        if defaults:
+            rules.extend(DEFAULT_RULES)
+        return cls(rules)
+
+    @classmethod
+    def from_chart(cls, chart_dir):
+        """Compile the rules of a chart directory; a missing `.helmignore` only has the defaults"""
+        path = Path(chart_dir) / HELMIGNORE
+        return cls.parse(path.read_text() if path.exists() else "")
+
+    def ignores(self, path, is_dir=False):
+        """Return True if the rules ignore this path itself (parents are not checked).
+
+        Mirrors ignore.Rules.Ignore, including its handling of negated rules: a
+        path that does not match a `!` rule is ignored.
+        """
+        if path in ("", ".", "./"):
+            return False
+        for rule in self.rules:
+            if rule.negate:
+                if rule.must_dir and not is_dir:
+                    return True
+                if not rule.matches(path):
+                    return True
+                continue
+            if rule.must_dir and not is_dir:
+                continue
+            if rule.matches(path):
+                return True
+        return False
+
+    def excludes(self, path):
+        """Return True if a file at path is left out of the package.
+
+        The loader skips ignored directories entirely, so every parent directory
+        is checked as well as the file.
+        """
+        parts = path.split("/")
+        for depth in range(1, len(parts)):
+            if self.ignores("/".join(parts[:depth]), is_dir=True):
+                return True
+        return self.ignores(path)
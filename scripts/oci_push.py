@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+"""
+OCI Push - Push packaged charts to an OCI registry without re-uploading blobs
+
+A chart artifact is the manifest Helm writes: a config blob with the chart's
+metadata, the chart archive as a layer and, when present, its .prov file as a
+second layer. Before a blob is uploaded its digest is checked with a HEAD
+request, and a blob already pushed to another repository of the same registry
+(in this run, or in a --mount-from namespace) is mounted across repositories
+instead of uploaded again. Several charts are pushed at once over a pool of
+kept-alive HTTP connections.
+"""
+
+import argparse
+import base64
+import hashlib
+import http.client
+import json
+import os
+import queue
+import re
+import sys
+import tarfile
+import threading
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+
+from sign_charts import chart_metadata
+
+MANIFEST_MEDIA_TYPE = "application/vnd.oci.image.manifest.v1+json"
+CONFIG_MEDIA_TYPE = "application/vnd.cncf.helm.config.v1+json"
+CHART_MEDIA_TYPE = "application/vnd.cncf.helm.chart.content.v1.tar+gzip"
+PROV_MEDIA_TYPE = "application/vnd.cncf.helm.chart.provenance.v1.prov"
+
+DEFAULT_JOBS = 4
+DEFAULT_TIMEOUT = 120
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_ERROR = 2
+
+
+class RegistryError(RuntimeError):
+    """A registry request failed; status is the HTTP status (None for transport errors)"""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+class Blob:
+    """Content addressed by its sha256 digest"""
+
+    def __init__(self, media_type, data):
+        self.media_type = media_type
+        self.data = data
+        self.digest = "sha256:" + hashlib.sha256(data).hexdigest()
+
+    def descriptor(self):
+        return {"mediaType": self.media_type, "digest": self.digest, "size": len(self.data)}
+
+
+def parse_reference(reference):
+    """Split oci://host[:port]/namespace into (host, namespace)"""
+    if not reference.startswith("oci://"):
+        raise ValueError(f"{reference} is not an oci:// reference")
+    host, _, namespace = reference[len("oci://"):].strip("/").partition("/")
+    return host, namespace
+
+
+def chart_artifact(package):
+    """Return (repository name, tag, config blob, layer blobs, annotations) for a packaged chart.
+
+    Mirrors `helm push`: the tag is the chart version with "+" replaced by "_",
+    and a <package>.prov next to the archive becomes a second layer.
+    """
+    metadata = chart_metadata(package)
+    config = Blob(CONFIG_MEDIA_TYPE, json.dumps(metadata, separators=(",", ":")).encode())
+    layers = [Blob(CHART_MEDIA_TYPE, Path(package).read_bytes())]
+    prov = Path(f"{package}.prov")
+    if prov.exists():
+        layers.append(Blob(PROV_MEDIA_TYPE, prov.read_bytes()))
+    annotations = {"org.opencontainers.image.title": metadata["name"],
+                   "org.opencontainers.image.version": metadata["version"]}
+    if metadata.get("description"):
+        annotations["org.opencontainers.image.description"] = metadata["description"]
+    return metadata["name"], metadata["version"].replace("+", "_"), config, layers, annotations
+
+
+def build_manifest(config, layers, annotations):
+    return json.dumps({
+        "schemaVersion": 2,
+        "mediaType": MANIFEST_MEDIA_TYPE,
+        "config": config.descriptor(),
+        "layers": [layer.descriptor() for layer in layers],
+        "annotations": annotations,
+    }, separators=(",", ":")).encode()
+
+
+def _parse_challenge(header):
+    """Return (scheme, {param: value}) from a WWW-Authenticate header"""
+    scheme, _, rest = header.partition(" ")
+    return scheme.lower(), dict(re.findall(r'(\w+)="([^"]*)"', rest))
+
+
+class ConnectionPool:
+    """Kept-alive HTTP(S) connections to one host, handed out to one thread at a time"""
+
+    def __init__(self, host, plain_http=False, size=DEFAULT_JOBS, timeout=DEFAULT_TIMEOUT):
+        self.host = host
+        self.plain_http = plain_http
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self.opened = 0
+
+    def _connect(self):
+        with self._lock:
+            self.opened += 1
+        if self.plain_http:
+            return http.client.HTTPConnection(self.host, timeout=self.timeout)
+        return http.client.HTTPSConnection(self.host, timeout=self.timeout)
+
+    @contextmanager
+    def connection(self):
+        with self._slots:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._connect()
+            try:
+                yield conn
+            except BaseException:
+                # The connection may be mid-response; never hand it out again.
+                conn.close()
+                raise
+            self._idle.put(conn)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class RegistryClient:
+    """Pushes chart artifacts to one registry host (OCI distribution API)"""
+
+    def __init__(self, host, username=None, password=None, plain_http=False, jobs=DEFAULT_JOBS,
+                 timeout=DEFAULT_TIMEOUT):
+        self.host = host
+        self.username = username
+        self.password = password
+        self.jobs = max(1, jobs)
+        self.pool = ConnectionPool(host, plain_http=plain_http, size=self.jobs, timeout=timeout)
+        self._lock = threading.Lock()
+        self._challenge = None
+        self._tokens = {}
+        # digest -> repository it is known to exist in, used as a mount source
+        self._known = {}
+        self.stats = {"exists": 0, "mounted": 0, "uploaded": 0}
+
+    def close(self):
+        self.pool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- transport -------------------------------------------------------
+
+    def _send(self, method, path, body=None, headers=None):
+        for attempt in range(2):
+            with self.pool.connection() as conn:
+                reused = conn.sock is not None
+                try:
+                    conn.request(method, path, body=body, headers=headers or {})
+                    response = conn.getresponse()
+                    return response.status, response.headers, response.read()
+                except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError) as e:
+                    # The server may close an idle kept-alive connection; retry once on a new one.
+                    if not reused or attempt:
+                        raise RegistryError(f"{method} {path}: {e}") from e
+                    conn.close()
+                except (OSError, http.client.HTTPException) as e:
+                    raise RegistryError(f"{method} {path}: {e}") from e
+
+    def _basic_credentials(self):
+        return base64.b64encode(f"{self.username}:{self.password}".encode()).decode()
+
+    def _fetch_token(self, scopes):
+        realm = self._challenge[1].get("realm")
+        if not realm:
+            raise RegistryError("Bearer challenge without a realm")
+        params = [("scope", scope) for scope in scopes]
+        if self._challenge[1].get("service"):
+            params.insert(0, ("service", self._challenge[1]["service"]))
+        url = urllib.parse.urlsplit(realm)
+        path = url.path + "?" + urllib.parse.urlencode(params)
+        headers = {"Authorization": f"Basic {self._basic_credentials()}"} if self.username else {}
+        if url.netloc == self.host:
+            status, _, data = self._send("GET", path, headers=headers)
+        else:
+            conn_class = http.client.HTTPConnection if url.scheme == "http" else http.client.HTTPSConnection
+            conn = conn_class(url.netloc, timeout=self.pool.timeout)
+            try:
+                conn.request("GET", path, headers=headers)
+                response = conn.getresponse()
+                status, data = response.status, response.read()
+            except (OSError, http.client.HTTPException) as e:
+                raise RegistryError(f"GET {realm}: {e}") from e
+            finally:
+                conn.close()
+        if status != 200:
+            raise RegistryError(f"Token request to {realm} failed with HTTP {status}", status)
+        payload = json.loads(data)
+        return payload.get("token") or payload.get("access_token")
+
+    def _auth_header(self, scopes):
+        if self._challenge is None:
+            return {}
+        scheme, _ = self._challenge
+        if scheme == "basic":
+            return {"Authorization": f"Basic {self._basic_credentials()}"}
+        key = tuple(sorted(scopes))
+        with self._lock:
+            token = self._tokens.get(key)
+        if token is None:
+            token = self._fetch_token(key)
+            with self._lock:
+                self._tokens[key] = token
+        return {"Authorization": f"Bearer {token}"}
+
+    def request(self, method, path, scopes, body=None, headers=None):
+        """Send a request with credentials for scopes; returns (status, headers, body).
+
+        A 401 records the registry's challenge and the request is retried once
+        with a Basic header or a Bearer token for the scopes.
+        """
+        headers = dict(headers or {})
+        status, response_headers, data = self._send(method, path, body, {**headers, **self._auth_header(scopes)})
+        if status == 401 and response_headers.get("WWW-Authenticate"):
+            challenge = _parse_challenge(response_headers["WWW-Authenticate"])
+            with self._lock:
+                self._challenge = challenge
+                self._tokens.pop(tuple(sorted(scopes)), None)
+            status, response_headers, data = self._send(method, path, body,
+                                                        {**headers, **self._auth_header(scopes)})
+        return status, response_headers, data
+
+    @staticmethod
+    def _location_path(location):
+        """Upload locations may be absolute URLs or paths; requests go to the registry host either way"""
+        url = urllib.parse.urlsplit(location)
+        return url.path + (f"?{url.query}" if url.query else "")
+
+    # --- blobs and manifests ---------------------------------------------
+
+    def blob_exists(self, repository, digest):
+        # Same scope as the push that follows, so both share one token.
+        status, _, _ = self.request("HEAD", f"/v2/{repository}/blobs/{digest}", [f"repository:{repository}:pull,push"])
+        return status == 200
+
+    def _start_upload(self, repository, digest=None, source=None):
+        """POST an upload; returns (mounted, location). With source, asks to mount digest from it"""
+        scopes = [f"repository:{repository}:pull,push"]
+        path = f"/v2/{repository}/blobs/uploads/"
+        if source:
+            scopes.append(f"repository:{source}:pull")
+            path += "?" + urllib.parse.urlencode({"mount": digest, "from": source})
+        status, headers, data = self.request("POST", path, scopes, body=b"", headers={"Content-Length": "0"})
+        if status == 201:
+            return True, None
+        if status != 202:
+            raise RegistryError(f"Starting an upload to {repository} failed with HTTP {status}: "
+                                f"{data.decode(errors='replace')[:200]}", status)
+        return False, self._location_path(headers["Location"])
+
+    def push_blob(self, repository, blob, mount_from=()):
+        """Make blob exist in repository; returns "exists", "mounted" or "uploaded".
+
+        A blob this client already pushed elsewhere on the registry is the preferred
+        mount source; otherwise the first mount_from repository is tried.
+        """
+        if self.blob_exists(repository, blob.digest):
+            outcome = "exists"
+        else:
+            with self._lock:
+                known = self._known.get(blob.digest)
+            source = next((repo for repo in [known, *mount_from] if repo and repo != repository), None)
+            mounted, location = False, None
+            if source is not None:
+                # If the registry cannot mount, it opens a regular upload session instead.
+                mounted, location = self._start_upload(repository, blob.digest, source)
+            if mounted:
+                outcome = "mounted"
+            else:
+                if location is None:
+                    _, location = self._start_upload(repository)
+                separator = "&" if "?" in location else "?"
+                status, _, data = self.request(
+                    "PUT", f"{location}{separator}digest={urllib.parse.quote(blob.digest)}",
+                    [f"repository:{repository}:pull,push"], body=blob.data,
+                    headers={"Content-Type": "application/octet-stream", "Content-Length": str(len(blob.data))})
+                if status != 201:
+                    raise RegistryError(f"Uploading {blob.digest} to {repository} failed with HTTP {status}: "
+                                        f"{data.decode(errors='replace')[:200]}", status)
+                outcome = "uploaded"
+        with self._lock:
+            self._known[blob.digest] = repository
+            self.stats[outcome] += 1
+        return outcome
+
+    def put_manifest(self, repository, tag, manifest):
+        status, headers, data = self.request(
+            "PUT", f"/v2/{repository}/manifests/{tag}", [f"repository:{repository}:pull,push"], body=manifest,
+            headers={"Content-Type": MANIFEST_MEDIA_TYPE, "Content-Length": str(len(manifest))})
+        if status != 201:
+            raise RegistryError(f"Pushing manifest {repository}:{tag} failed with HTTP {status}: "
+                                f"{data.decode(errors='replace')[:200]}", status)
+        return headers.get("Docker-Content-Digest") or "sha256:" + hashlib.sha256(manifest).hexdigest()
+
+    def push_chart(self, package, namespace, mount_from=()):
+        """Push one packaged chart to <namespace>/<chart name>:<version>; returns a result dict"""
+        name, tag, config, layers, annotations = chart_artifact(package)
+        repository = f"{namespace}/{name}" if namespace else name
+        sources = [f"{source}/{name}" for source in mount_from]
+        blobs = {blob.digest: self.push_blob(repository, blob, sources) for blob in [config, *layers]}
+        digest = self.put_manifest(repository, tag, build_manifest(config, layers, annotations))
+        return {"reference": f"{self.host}/{repository}:{tag}", "digest": digest, "blobs": blobs}
+
+    def push_charts(self, packages, namespace, mount_from=()):
+        """Push packages concurrently; returns {package: (result or None, error or None)}"""
+        def push_one(package):
+            try:
+                return package, (self.push_chart(package, namespace, mount_from), None)
+            except (RegistryError, OSError, ValueError, KeyError, tarfile.TarError) as e:
+                return package, (None, str(e))
+
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            return dict(pool.map(push_one, packages))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Push packaged charts to an OCI registry, skipping blobs the registry already has",
+        epilog="Exit codes: 0=all pushed, 1=a chart could not be pushed, 2=error."
+    )
+    parser.add_argument("packages", nargs="+", help="Chart packages (.tgz); <package>.prov is pushed with it")
+    parser.add_argument("--repository", required=True,
+                        help="Target namespace, e.g. oci://ghcr.io/project-zot/helm-charts")
+    parser.add_argument("--mount-from", action="append", default=[], metavar="NAMESPACE",
+                        help="Namespace on the same registry whose blobs may be mounted (repeatable)")
+    parser.add_argument("--username", default=os.environ.get("REGISTRY_USERNAME"), help="Registry username")
+    parser.add_argument("--password-stdin", action="store_true", help="Read the registry password from stdin")
+    parser.add_argument("--plain-http", action="store_true", help="Use plain HTTP instead of HTTPS")
+    parser.add_argument("-j", "--jobs", type=int, default=DEFAULT_JOBS,
+                        help="Charts pushed at once (and pooled connections)")
+    args = parser.parse_args()
+
+    try:
+        host, namespace = parse_reference(args.repository)
+        mount_from = [parse_reference(source)[1] if source.startswith("oci://") else source
+                      for source in args.mount_from]
+        password = sys.stdin.readline().rstrip("\r\n") if args.password_stdin else os.environ.get("REGISTRY_PASSWORD")
+        with RegistryClient(host, args.username, password, plain_http=args.plain_http, jobs=args.jobs) as client:
+            results = client.push_charts(args.packages, namespace, mount_from)
+    except Exception as e:
+        print(f"Error: {e}")
+        return EXIT_ERROR
+
+    failed = []
+    for package, (result, error) in results.items():
+        if error is None:
+            print(f"Pushed: {result['reference']}")
+            print(f"Digest: {result['digest']}")
+        else:
+            failed.append(package)
+            print(f"Failed to push {package}: {error}")
+    print(f"Blobs: {client.stats['uploaded']} uploaded, {client.stats['mounted']} mounted, "
+          f"{client.stats['exists']} already present")
+    return EXIT_FAILED if failed else EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
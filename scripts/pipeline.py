@@ -0,0 +1,174 @@
+"""
+Pipeline - Run dependent steps concurrently, with the output of a sequential run
+
+Steps are plain functions wired together by name. An asyncio event loop starts
+each step as soon as the steps it depends on have finished and runs it on a
+bounded thread pool, where its external commands go through the usual
+CommandRunner. What a step prints, and the events it emits, are held back and
+replayed in declaration order, so the output does not depend on scheduling.
+
+Steps declared with stream=True are not held back while they are next in
+declaration order: their output goes straight through as it happens, and only a
+streamed step that runs ahead of an unfinished earlier one is buffered until its
+turn comes.
+"""
+
+import asyncio
+import contextlib
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from command_runner import DEFAULT_MAX_WORKERS
+
+
+class _StepOutput:
+    """stdout proxy that records writes from step threads and passes others through"""
+
+    def __init__(self, stream, pipeline):
+        self.stream = stream
+        self.pipeline = pipeline
+        self.local = threading.local()
+
+    def write(self, text):
+        name = getattr(self.local, "step", None)
+        if name is None:
+            return self.stream.write(text)
+        self.pipeline._record(name, ("write", text))
+        return len(text)
+
+    def flush(self):
+        if getattr(self.local, "step", None) is None:
+            self.stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+class Pipeline:
+    """A dependency graph of steps run with bounded concurrency.
+
+    step() declares a step; run() executes the graph and returns {name: result}.
+    Each step function receives the results of its dependencies as keyword
+    arguments named after them.
+    """
+
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS):
+        self.max_workers = max_workers
+        self.steps = {}
+        self.outputs = {}
+        # step name -> wall time of its function, for the steps that ran
+        self.durations = {}
+        self._output = None
+        self._streamed = set()
+        # The streamed step whose output currently goes straight through, and the
+        # index of the first step in declaration order that has not been delivered.
+        self._live = None
+        self._next = 0
+        self._finished = set()
+        self._lock = threading.RLock()
+
+    def step(self, name, fn, deps=(), stream=False):
+        for dep in deps:
+            if dep not in self.steps:
+                raise ValueError(f"Step {name} depends on undeclared step {dep}")
+        self.steps[name] = (fn, tuple(deps))
+        self.outputs[name] = []
+        if stream:
+            self._streamed.add(name)
+
+    def capture_events(self, sink):
+        """Wrap an event sink so that events emitted by steps are replayed with their output"""
+        def emit(event, **fields):
+            name = getattr(self._output.local, "step", None) if self._output else None
+            if name is None:
+                sink(event, **fields)
+            else:
+                self._record(name, ("event", (sink, event, fields)))
+        return emit
+
+    def _deliver(self, kind, value, stream=None):
+        if kind == "write":
+            (stream or sys.stdout).write(value)
+        else:
+            sink, event, fields = value
+            sink(event, **fields)
+
+    def _record(self, name, item):
+        with self._lock:
+            if name == self._live:
+                # Straight to the real stream: sys.stdout is this step's proxy.
+                self._deliver(*item, stream=self._output.stream)
+            else:
+                self.outputs[name].append(item)
+
+    def _advance(self):
+        """Deliver the streamed steps whose turn has come and pick the one to go live"""
+        order = list(self.steps)
+        self._live = None
+        while self._next < len(order) and order[self._next] in self._streamed:
+            name = order[self._next]
+            self.replay(name)
+            if name not in self._finished:
+                self._live = name
+                return
+            self._next += 1
+
+    def _call(self, name, fn, kwargs):
+        self._output.local.step = name
+        start = time.perf_counter()
+        try:
+            result = fn(**kwargs)
+        except BaseException:
+            with self._lock:
+                # Nothing after a failed step streams; run() replays up to it.
+                self._live = None
+                self._next = len(self.steps)
+            raise
+        finally:
+            self.durations[name] = time.perf_counter() - start
+            self._output.local.step = None
+        with self._lock:
+            self._finished.add(name)
+            if self._next < len(self.steps):
+                self._advance()
+        return result
+
+    async def _run_all(self, pool):
+        loop = asyncio.get_running_loop()
+        tasks = {}
+
+        async def run_step(name, fn, deps):
+            kwargs = {dep: await tasks[dep] for dep in deps}
+            return await loop.run_in_executor(pool, self._call, name, fn, kwargs)
+
+        for name, (fn, deps) in self.steps.items():
+            tasks[name] = asyncio.ensure_future(run_step(name, fn, deps))
+        results = await asyncio.gather(*tasks.values(), return_exceptions=True)
+        return dict(zip(tasks, results))
+
+    def run(self):
+        """Run every step and return {name: result}.
+
+        If a step fails, the output of the steps declared up to it is replayed
+        and its exception is raised (a failed dependency fails its dependents).
+        """
+        self._output = _StepOutput(sys.stdout, self)
+        with contextlib.redirect_stdout(self._output), ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            with self._lock:
+                self._advance()
+            results = asyncio.run(self._run_all(pool))
+
+        for name, result in results.items():
+            if isinstance(result, BaseException):
+                self.replay(*list(self.steps)[:list(self.steps).index(name) + 1])
+                raise result
+        return results
+
+    def replay(self, *names):
+        """Write the held-back output and events of the named steps, in the given order"""
+        for name in names:
+            for kind, value in self.outputs[name]:
+                self._deliver(kind, value)
+            self.outputs[name] = []
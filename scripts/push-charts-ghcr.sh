@@ -3,18 +3,30 @@
 # Skips vendored dependency charts under charts/<name>/charts/<dep>/.
 #
 # Environment:
-#   GITHUB_TOKEN     — required; used for helm registry login
+#   GITHUB_TOKEN     — required; registry password for the push
 #   GITHUB_ACTOR     — username for ghcr.io login (set automatically in GitHub Actions)
 #   CHARTS_ROOT      — default: charts
-#   REGISTRY_HOST    — default: ghcr.io
 #   OCI_REPOSITORY — default: oci://ghcr.io/project-zot/helm-charts
+#   OCI_MOUNT_FROM   — optional; namespace on the same registry whose blobs are mounted
+#                      instead of uploaded (e.g. a staging namespace holding the same packages)
+#   PUSH_JOBS        — default: 4; charts pushed at once
+#   CHART_METRICS_FILE — optional; OpenMetrics textfile that gets the wall time, exit code and
+#                      peak RSS of each phase (dependencies, package, sign, push) as task "release"
+#   CHART_COMMIT     — optional; package the charts of this commit, read from git objects
+#                      (no checkout of it needed, works in sparse/blobless clones)
+#   CHART_TOOLS      — optional; zipapp built by build_zipapp.py to run the Python scripts from
 #
-# Optional GPG signing (Helm provenance .prov — uploaded with helm push when present):
+# Optional GPG signing (Helm provenance .prov — pushed as a layer of the chart when present):
 #   HELM_SIGN_KEY          — secret key name / UID (matches chart-releaser CR_KEY / gpg uid)
 #   HELM_KEYRING           — default: keyring.gpg — must contain *private* keys.
-#                            Binary OpenPGP (same as: gpg --export-secret-keys without -a).
-#                            ASCII-armored (.asc / many .pgp exports): script runs gpg --dearmor automatically.
+#                            Binary OpenPGP (gpg --export-secret-keys) or ASCII-armored (-a) both work.
 #   HELM_PASSPHRASE_FILE   — default: passphrase-file.txt (passphrase for that private key)
+#   SIGN_JOBS              — default: number of CPUs; packages signed at once
+#
+# Signing is a separate stage after packaging: sign_charts.py loads the key once and
+# writes every <chart>.tgz.prov in parallel (instead of helm package --sign per chart).
+# oci_push.py then pushes all packages over pooled connections and skips blobs the
+# registry already has (instead of helm push per chart).
 
 set -euo pipefail
 
@@ -23,20 +35,35 @@ REPO_ROOT="$(cd "$SCRIPT_DIR/.." && pwd)"
 cd "$REPO_ROOT"
 
 CHARTS_ROOT="${CHARTS_ROOT:-charts}"
-REGISTRY_HOST="${REGISTRY_HOST:-ghcr.io}"
 OCI_REPOSITORY="${OCI_REPOSITORY:-oci://ghcr.io/project-zot/helm-charts}"
 HELM_KEYRING="${HELM_KEYRING:-keyring.gpg}"
 HELM_PASSPHRASE_FILE="${HELM_PASSPHRASE_FILE:-passphrase-file.txt}"
 
-_helm_ring_bin=""
+# tool_argv <name>
+# Sets TOOL to the command running scripts/<name>.py, or the same tool from the $CHART_TOOLS
+# zipapp, whose precompiled modules spare every call compiling the scripts.
+tool_argv() {
+  if [[ -n "${CHART_TOOLS:-}" ]]; then
+    TOOL=(python3 "$CHART_TOOLS" "$1")
+  else
+    TOOL=(python3 "$SCRIPT_DIR/$1.py")
+  fi
+}
+
+# timed <phase> [run_metrics.py options] -- <command...>
+# Runs a command as one phase of the release in the metrics textfile (just runs it without one).
+timed() {
+  local phase="$1"
+  shift
+  tool_argv run_metrics
+  "${TOOL[@]}" time --task release --phase "$phase" "$@"
+}
+
 cleanup_push_charts() {
   echo "Cleanup"
   # Best-effort only: under `set -e`, a failing EXIT trap overrides the script's exit status.
-  # That produced CI failures where `helm push` printed Pushed/Digest then the step exited 1.
+  # That produced CI failures where the push printed Pushed/Digest then the step exited 1.
   rm -rf "${WORKDIR:-}" || true
-  if [[ -n "${_helm_ring_bin:-}" && -f "${_helm_ring_bin}" ]]; then
-    rm -f "${_helm_ring_bin}" || true
-  fi
 }
 
 if [[ -z "${GITHUB_TOKEN:-}" ]]; then
@@ -49,44 +76,51 @@ if [[ -z "${GITHUB_ACTOR:-}" ]]; then
   exit 1
 fi
 
-echo "$GITHUB_TOKEN" | helm registry login "$REGISTRY_HOST" --username "$GITHUB_ACTOR" --password-stdin
-
 WORKDIR="$(mktemp -d)"
 trap cleanup_push_charts EXIT
 mkdir -p "$WORKDIR/packaged"
 
-mapfile -t chart_yamls < <(
-  find "$CHARTS_ROOT" -maxdepth 3 -path "${CHARTS_ROOT}/*/charts/*" -prune -o -path "${CHARTS_ROOT}/*/Chart.yaml" -print | sort
-)
+if [[ -n "${CHART_COMMIT:-}" ]]; then
+  mapfile -t chart_yamls < <(
+    git ls-tree -r --name-only "$CHART_COMMIT" -- "$CHARTS_ROOT" | grep -E "^${CHARTS_ROOT}/[^/]+/Chart\.yaml$" | sort
+  )
+else
+  mapfile -t chart_yamls < <(
+    find "$CHARTS_ROOT" -maxdepth 3 -path "${CHARTS_ROOT}/*/charts/*" -prune -o -path "${CHARTS_ROOT}/*/Chart.yaml" -print | sort
+  )
+fi
 
 if [[ ${#chart_yamls[@]} -eq 0 ]]; then
   echo "No Chart.yaml files found under ${CHARTS_ROOT}/" >&2
   exit 1
 fi
 
-sign_opts=()
-if [[ -n "${HELM_SIGN_KEY:-}" && -f "$HELM_KEYRING" && -f "$HELM_PASSPHRASE_FILE" ]]; then
-  keyring_for_helm="$HELM_KEYRING"
-  # Helm uses Go openpgp and expects binary packets; ASCII armor yields: openpgp: invalid data: tag byte does not have MSB set
-  if grep -q '^-----BEGIN PGP' "$HELM_KEYRING" 2>/dev/null; then
-    _helm_ring_bin="$(mktemp)"
-    gpg --batch --yes --dearmor --output "$_helm_ring_bin" "$HELM_KEYRING"
-    keyring_for_helm="$_helm_ring_bin"
-    echo "HELM_KEYRING is ASCII-armored; using dearmored copy for Helm"
-  fi
-
-  echo "GPG signing enabled for packaged charts (key=$HELM_SIGN_KEY)"
-  sign_opts=(--sign --key "$HELM_SIGN_KEY" --keyring "$keyring_for_helm" --passphrase-file "$HELM_PASSPHRASE_FILE")
-else
-  echo "GPG signing skipped (set HELM_SIGN_KEY and ensure $HELM_KEYRING and $HELM_PASSPHRASE_FILE exist)"
-fi
-
+chart_dirs=()
+tool_argv git_objects
 for chart_yaml in "${chart_yamls[@]}"; do
   chart_dir="$(dirname "$chart_yaml")"
-  echo "Packaging: $chart_dir"
-  helm package "$chart_dir" --destination "$WORKDIR/packaged" "${sign_opts[@]}"
+  if [[ -n "${CHART_COMMIT:-}" ]]; then
+    chart_dir="$("${TOOL[@]}" export "$CHART_COMMIT" "$chart_dir" --dest "$WORKDIR/src")"
+  fi
+  chart_dirs+=("$chart_dir")
 done
 
+# helm package only bundles the dependency archives already under charts/; build them (or restore
+# them from the cache keyed by Chart.lock) first.
+tool_argv dependency_cache
+timed dependencies -- "${TOOL[@]}" --cache-dir "$REPO_ROOT/.helm-dependency-cache" "${chart_dirs[@]}"
+
+package_charts() {
+  set -euo pipefail
+  for chart_dir in "$@"; do
+    echo "Packaging: $chart_dir"
+    helm package "$chart_dir" --destination "$WORKDIR/packaged"
+  done
+}
+export -f package_charts
+export WORKDIR
+timed package -- bash -c 'package_charts "$@"' package_charts "${chart_dirs[@]}"
+
 shopt -s nullglob
 pkgs=("$WORKDIR"/packaged/*.tgz)
 shopt -u nullglob
@@ -99,7 +133,25 @@ fi
 
 mapfile -t pkgs_sorted < <(printf '%s\n' "${pkgs[@]}" | sort)
 
-for pkg in "${pkgs_sorted[@]}"; do
-  echo "Pushing: $pkg"
-  helm push "$pkg" "$OCI_REPOSITORY"
-done
+if [[ -n "${HELM_SIGN_KEY:-}" && -f "$HELM_KEYRING" && -f "$HELM_PASSPHRASE_FILE" ]]; then
+  echo "GPG signing enabled for packaged charts (key=$HELM_SIGN_KEY)"
+  sign_args=(--key "$HELM_SIGN_KEY" --keyring "$HELM_KEYRING" --passphrase-file "$HELM_PASSPHRASE_FILE")
+  if [[ -n "${SIGN_JOBS:-}" ]]; then
+    sign_args+=(--jobs "$SIGN_JOBS")
+  fi
+  tool_argv sign_charts
+  timed sign -- "${TOOL[@]}" "${sign_args[@]}" "${pkgs_sorted[@]}"
+else
+  echo "GPG signing skipped (set HELM_SIGN_KEY and ensure $HELM_KEYRING and $HELM_PASSPHRASE_FILE exist)"
+fi
+
+push_args=(--repository "$OCI_REPOSITORY" --username "$GITHUB_ACTOR" --password-stdin)
+if [[ -n "${OCI_MOUNT_FROM:-}" ]]; then
+  push_args+=(--mount-from "$OCI_MOUNT_FROM")
+fi
+if [[ -n "${PUSH_JOBS:-}" ]]; then
+  push_args+=(--jobs "$PUSH_JOBS")
+fi
+echo "Pushing ${#pkgs_sorted[@]} chart package(s) to $OCI_REPOSITORY"
+tool_argv oci_push
+echo "$GITHUB_TOKEN" | timed push --set "charts_packaged=${#pkgs_sorted[@]}" -- "${TOOL[@]}" "${push_args[@]}" "${pkgs_sorted[@]}"
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Render Benchmark - Times `helm template` of the zot chart across values profiles
+
+The zot templates run `tpl` over user values (nodeSelector, affinity,
+tolerations) and render configmap.yaml and secret.yaml a second time for the
+checksum/config and checksum/secret pod annotations, so rendering cost grows
+with the size of those values. Each profile below stresses one of them. Every
+profile is rendered --warmup times untimed, then --repeat times timed, one call
+after another so runs do not compete for the CPU.
+
+Results are appended to a JSON history file. A profile regresses when its
+median is more than --threshold above the median of the previous --window runs
+made with the same helm version (and at least --min-delta seconds slower, so
+sub-millisecond jitter on fast profiles is not flagged).
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import yaml
+
+from render_snapshots import DEFAULT_CHART, NAMESPACE, RELEASE_NAME, hash_chart_dir
+
+DEFAULT_HISTORY_FILE = ".render-benchmark.json"
+DEFAULT_REPEAT = 5
+DEFAULT_WARMUP = 1
+DEFAULT_WINDOW = 5
+DEFAULT_THRESHOLD = 0.25
+DEFAULT_MIN_DELTA = 0.02
+HISTORY_LIMIT = 50
+
+EXIT_OK = 0
+EXIT_REGRESSION = 1
+EXIT_ERROR = 2
+
+
+def _filler(seed, size):
+    """Deterministic printable filler of the given length"""
+    chunks = []
+    counter = 0
+    while sum(len(c) for c in chunks) < size:
+        chunks.append(hashlib.sha256(f"{seed}-{counter}".encode()).hexdigest())
+        counter += 1
+    return "".join(chunks)[:size]
+
+
+def config_files_profile():
+    """mountConfig with a large config.json (many sync registries) and extra config files"""
+    registries = [{
+        "urls": [f"https://registry-{i}.example.com"],
+        "onDemand": i % 2 == 0,
+        "pollInterval": "6h",
+        "tlsVerify": True,
+        "content": [{"prefix": f"team-{i}/**", "destination": f"/mirror/team-{i}", "tags": {"regex": ".*"}}],
+    } for i in range(400)]
+    config = {
+        "storage": {"rootDirectory": "/var/lib/registry"},
+        "http": {"address": "0.0.0.0", "port": "5000"},
+        "log": {"level": "info"},
+        "extensions": {"sync": {"enable": True, "registries": registries}},
+    }
+    files = {"config.json": json.dumps(config, indent=2)}
+    for i in range(20):
+        files[f"policy-{i:02d}.json"] = _filler(f"policy-{i}", 16 * 1024)
+    return {"mountConfig": True, "configFiles": files}
+
+
+def secret_files_profile():
+    """mountSecret with a large htpasswd and certificate-sized secret files"""
+    htpasswd = "\n".join(f"user{i}:$2y$05${_filler(f'hash-{i}', 53)}" for i in range(5000))
+    files = {"htpasswd": htpasswd}
+    for i in range(20):
+        files[f"cert-{i:02d}.pem"] = _filler(f"cert-{i}", 8 * 1024)
+    return {"mountSecret": True, "secretFiles": files}
+
+
+def extra_containers_profile():
+    """Many sidecars, each with environment variables and a volume of its own"""
+    containers = [{
+        "name": f"sidecar-{i}",
+        "image": "busybox:1.36",
+        "command": ["sh", "-c", f"while true; do echo sidecar-{i}; sleep 60; done"],
+        "env": [{"name": f"VAR_{j}", "value": f"value-{i}-{j}"} for j in range(20)],
+        "resources": {"requests": {"cpu": "10m", "memory": "16Mi"}},
+        "volumeMounts": [{"name": f"scratch-{i}", "mountPath": f"/scratch/{i}"}],
+    } for i in range(50)]
+    volumes = [{"name": f"scratch-{i}", "emptyDir": {}} for i in range(50)]
+    return {"extraContainers": containers, "extraVolumes": volumes}
+
+
+def tpl_values_profile():
+    """nodeSelector, affinity and tolerations full of template expressions for `tpl`"""
+    pool = "{{ .Values.global.pool }}"
+    return {
+        "global": {"pool": "registry"},
+        "nodeSelector": {f"example.com/label-{i}": f"{pool}-{i}" for i in range(50)},
+        "affinity": {"nodeAffinity": {"requiredDuringSchedulingIgnoredDuringExecution": {"nodeSelectorTerms": [
+            {"matchExpressions": [{"key": f"example.com/zone-{i}", "operator": "In",
+                                   "values": [f"{pool}-{i}-{j}" for j in range(10)]}]}
+            for i in range(50)]}}},
+        "tolerations": [{"key": f"example.com/taint-{i}", "operator": "Equal", "value": f"{pool}-{i}",
+                         "effect": "NoSchedule"} for i in range(100)],
+    }
+
+
+def combined_profile():
+    values = {}
+    for profile in (config_files_profile, secret_files_profile, extra_containers_profile, tpl_values_profile):
+        values.update(profile())
+    return values
+
+
+PROFILES = {
+    "default": lambda: {},
+    "config-files": config_files_profile,
+    "secret-files": secret_files_profile,
+    "extra-containers": extra_containers_profile,
+    "tpl-values": tpl_values_profile,
+    "combined": combined_profile,
+}
+
+
+class RenderBenchmark:
+    def __init__(self, chart_dir=DEFAULT_CHART, helm="helm", repeat=DEFAULT_REPEAT, warmup=DEFAULT_WARMUP):
+        self.chart_dir = Path(chart_dir)
+        self.helm = helm
+        self.repeat = max(1, int(repeat))
+        self.warmup = max(0, int(warmup))
+
+    def helm_version(self):
+        result = subprocess.run(
+            [self.helm, "version", "--template", "{{.Version}}"],
+            capture_output=True,
+            text=True,
+            check=True
+        )
+        return result.stdout.strip()
+
+    def _render(self, values_file):
+        start = time.perf_counter()
+        result = subprocess.run(
+            [self.helm, "template", RELEASE_NAME, str(self.chart_dir),
+             "--namespace", NAMESPACE, "--values", values_file],
+            capture_output=True,
+            text=True
+        )
+        elapsed = time.perf_counter() - start
+        if result.returncode != 0:
+            raise RuntimeError(f"helm template failed: {result.stderr.strip()}")
+        return elapsed, len(result.stdout.encode())
+
+    def measure(self, name):
+        """Render one profile; returns its median, min and max seconds, and the output size"""
+        with tempfile.NamedTemporaryFile('w', suffix=".yaml", delete=False) as f:
+            yaml.safe_dump(PROFILES[name](), f, default_flow_style=False, sort_keys=True)
+            values_file = f.name
+        try:
+            for _ in range(self.warmup):
+                self._render(values_file)
+            samples = []
+            for _ in range(self.repeat):
+                elapsed, size = self._render(values_file)
+                samples.append(elapsed)
+        finally:
+            os.unlink(values_file)
+        return {
+            "median": round(statistics.median(samples), 6),
+            "min": round(min(samples), 6),
+            "max": round(max(samples), 6),
+            "bytes": size,
+        }
+
+    def run(self, profiles):
+        """Measure the profiles in order; returns a history entry"""
+        return {
+            "timestamp": round(time.time(), 3),
+            "helm": self.helm_version(),
+            "chart": hash_chart_dir(self.chart_dir),
+            "repeat": self.repeat,
+            "profiles": {name: self.measure(name) for name in profiles},
+        }
+
+
+def load_history(history_file):
+    """Load earlier runs from the history file"""
+    path = Path(history_file)
+    if path.exists():
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+            if isinstance(data.get("runs"), list):
+                return data
+        except (json.JSONDecodeError, OSError, AttributeError) as e:
+            print(f"Warning: Could not load history file {history_file}: {e}")
+    return {"runs": []}
+
+
+def save_history(history, history_file):
+    """Write the history file, keeping the last HISTORY_LIMIT runs"""
+    history["runs"] = history["runs"][-HISTORY_LIMIT:]
+    try:
+        with open(history_file, 'w') as f:
+            json.dump(history, f, indent=2, sort_keys=True)
+    except OSError as e:
+        print(f"Warning: Could not save history file {history_file}: {e}")
+
+
+def baselines(history, helm_version, window=DEFAULT_WINDOW):
+    """Median of each profile's medians over the last `window` runs with the same helm version"""
+    medians = {}
+    for run in reversed(history["runs"]):
+        if run.get("helm") != helm_version:
+            continue
+        for name, result in run.get("profiles", {}).items():
+            recorded = medians.setdefault(name, [])
+            if len(recorded) < window:
+                recorded.append(result["median"])
+    return {name: statistics.median(values) for name, values in medians.items()}
+
+
+def find_regressions(result, baseline, threshold=DEFAULT_THRESHOLD, min_delta=DEFAULT_MIN_DELTA):
+    """Return (profile, median, baseline) for each profile slower than its baseline allows"""
+    regressions = []
+    for name, measured in result["profiles"].items():
+        if name not in baseline:
+            continue
+        median, base = measured["median"], baseline[name]
+        if median > base * (1 + threshold) and median - base >= min_delta:
+            regressions.append((name, median, base))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time `helm template` of the zot chart across values profiles and flag regressions",
+        epilog="Exit codes: 0=no regression, 1=a profile rendered slower than its baseline, 2=error."
+    )
+    parser.add_argument("profiles", nargs="*", metavar="PROFILE",
+                        help=f"Profiles to run (default: all of {', '.join(PROFILES)})")
+    parser.add_argument("--chart", default=DEFAULT_CHART, help="Chart to render")
+    parser.add_argument("--helm", default="helm", help="helm executable to run")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="Timed renders per profile")
+    parser.add_argument("--warmup", type=int, default=DEFAULT_WARMUP, help="Untimed renders per profile first")
+    parser.add_argument("--history-file", default=DEFAULT_HISTORY_FILE,
+                        help="JSON file the results are appended to and baselines are read from")
+    parser.add_argument("--window", type=int, default=DEFAULT_WINDOW,
+                        help="Number of earlier runs a profile's baseline is the median of")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed slowdown over the baseline, as a fraction")
+    parser.add_argument("--min-delta", type=float, default=DEFAULT_MIN_DELTA,
+                        help="Smallest slowdown in seconds that counts as a regression")
+    parser.add_argument("--no-record", action="store_true",
+                        help="Compare against the history without appending this run to it")
+    args = parser.parse_args()
+
+    unknown = [name for name in args.profiles if name not in PROFILES]
+    if unknown:
+        parser.error(f"unknown profile(s): {', '.join(unknown)}")
+    profiles = args.profiles or list(PROFILES)
+    history = load_history(args.history_file)
+    try:
+        result = RenderBenchmark(chart_dir=args.chart, helm=args.helm, repeat=args.repeat,
+                                 warmup=args.warmup).run(profiles)
+    except Exception as e:
+        print(f"Error: {e}")
+        return EXIT_ERROR
+
+    baseline = baselines(history, result["helm"], args.window)
+    regressions = find_regressions(result, baseline, args.threshold, args.min_delta)
+
+    reference = result["profiles"].get("default", {}).get("median")
+    print(f"{'profile':<18} {'median':>9} {'min':>9} {'baseline':>9} {'change':>8} {'vs default':>10} {'output':>9}")
+    for name, measured in result["profiles"].items():
+        base = baseline.get(name)
+        change = f"{(measured['median'] / base - 1) * 100:+.0f}%" if base else "-"
+        relative = f"{measured['median'] / reference:.1f}x" if reference else "-"
+        print(f"{name:<18} {measured['median'] * 1000:>7.1f}ms {measured['min'] * 1000:>7.1f}ms "
+              f"{f'{base * 1000:.1f}ms' if base else '-':>9} {change:>8} {relative:>10} "
+              f"{measured['bytes'] / 1024:>7.1f}KB")
+
+    if not args.no_record:
+        history["runs"].append(result)
+        save_history(history, args.history_file)
+
+    if not baseline:
+        print(f"No earlier runs with helm {result['helm']} to compare against")
+    for name, median, base in regressions:
+        print(f"Regression: {name} rendered in {median * 1000:.1f}ms, baseline {base * 1000:.1f}ms "
+              f"(+{(median / base - 1) * 100:.0f}%)")
+    return EXIT_REGRESSION if regressions else EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+Render Snapshots - Offline `helm template` snapshot suite for the tests/ci cases
+
+Every tests/ci/<case>/values.yaml is an umbrella chart values file whose `zot:`
+section configures the zot chart. The suite renders charts/zot with each case's
+values through `helm template` on a worker pool, normalizes the output and compares
+it against tests/snapshots/<case>.yaml. Rendered output is cached by a hash of
+every input, so unchanged cases never call helm.
+
+With --list-changed-since REV only the cases that render differently from their
+snapshot committed at REV, or whose own files (templates, Chart.yaml, umbrella
+values) differ from REV, are printed; CI skips the kind install when there are none.
+"""
+
+import argparse
+import difflib
+import hashlib
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import yaml
+
+DEFAULT_CHART = "charts/zot"
+DEFAULT_CASES_DIR = "tests/ci"
+DEFAULT_SNAPSHOT_DIR = "tests/snapshots"
+DEFAULT_CACHE_DIR = ".render-cache"
+DEFAULT_JOBS = os.cpu_count() or 2
+RELEASE_NAME = "zot"
+NAMESPACE = "default"
+
+# Bump whenever normalize_manifest changes, so cached renders are not reused.
+NORMALIZER_VERSION = "1"
+
+# randAlphaNum pod annotation that forces a rollout on every upgrade.
+_ROLLME_RE = re.compile(r'^(\s*rollme: )"[^"]*"$', re.MULTILINE)
+
+EXIT_OK = 0
+EXIT_MISMATCH = 1
+EXIT_ERROR = 2
+
+
+def load_case_values(values_file, subchart="zot"):
+    """Return the values a case passes to the zot subchart.
+
+    `global` is merged in as well, since Helm hands it to every subchart.
+    """
+    with open(values_file, 'r') as f:
+        data = yaml.safe_load(f) or {}
+    if not isinstance(data, dict):
+        raise ValueError(f"{values_file} does not contain a YAML mapping")
+
+    values = dict(data.get(subchart) or {})
+    if "global" in data:
+        values["global"] = data["global"]
+    return values
+
+
+def read_chart_metadata(chart_dir):
+    """Return the parsed Chart.yaml of a chart directory"""
+    with open(Path(chart_dir) / "Chart.yaml", 'r') as f:
+        return yaml.safe_load(f) or {}
+
+
+def hash_chart_dir(chart_dir):
+    """Hash every file of a chart directory (path and content) in a stable order"""
+    digest = hashlib.sha256()
+    base = Path(chart_dir)
+    for path in sorted(p for p in base.rglob("*") if p.is_file()):
+        digest.update(path.relative_to(base).as_posix().encode())
+        digest.update(b"\0")
+        digest.update(path.read_bytes())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def normalize_manifest(text, chart_name, chart_version):
+    """Normalize `helm template` output so snapshots only change on real rendering changes.
+
+    - the chart version in `helm.sh/chart` labels is masked, so auto-bumps do not churn snapshots
+    - random `rollme` annotations are masked
+    - trailing whitespace is stripped and the output ends with exactly one newline
+    """
+    chart_label = f"{chart_name}-{chart_version}".replace("+", "_")
+    text = text.replace(chart_label, f"{chart_name}-VERSION")
+    text = _ROLLME_RE.sub(r'\1"RANDOM"', text)
+    lines = [line.rstrip() for line in text.splitlines()]
+    return "\n".join(lines).strip("\n") + "\n"
+
+
+class RenderSnapshotSuite:
+    def __init__(self, chart_dir=DEFAULT_CHART, snapshot_dir=DEFAULT_SNAPSHOT_DIR,
+                 cache_dir=DEFAULT_CACHE_DIR, helm="helm", jobs=DEFAULT_JOBS):
+        self.chart_dir = Path(chart_dir)
+        self.snapshot_dir = Path(snapshot_dir)
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.helm = helm
+        self.jobs = max(1, int(jobs))
+        self.metadata = read_chart_metadata(self.chart_dir)
+        self._chart_hash = None
+        self._helm_version = None
+        # Counters are incremented from the worker threads.
+        self._lock = threading.Lock()
+        self.rendered = 0
+        self.cached = 0
+
+    @staticmethod
+    def discover_cases(cases_dir=DEFAULT_CASES_DIR):
+        """Return test case directories that carry a values.yaml, in sorted order"""
+        base = Path(cases_dir)
+        if not base.is_dir():
+            return []
+        return sorted(p.parent.as_posix() for p in base.glob("*/values.yaml"))
+
+    def helm_version(self):
+        """Return the helm client version (part of the cache key)"""
+        if self._helm_version is None:
+            result = subprocess.run(
+                [self.helm, "version", "--template", "{{.Version}}"],
+                capture_output=True,
+                text=True,
+                check=True
+            )
+            self._helm_version = result.stdout.strip()
+        return self._helm_version
+
+    def input_hash(self, values):
+        """Hash of everything that determines a case's rendered output"""
+        if self._chart_hash is None:
+            self._chart_hash = hash_chart_dir(self.chart_dir)
+        digest = hashlib.sha256()
+        for part in (NORMALIZER_VERSION, self.helm_version(), self._chart_hash,
+                     json.dumps(values, sort_keys=True)):
+            digest.update(part.encode())
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def _cache_path(self, key):
+        return self.cache_dir / f"{key}.yaml"
+
+    def helm_template(self, values):
+        """Render the chart with the given values and return the normalized manifest"""
+        with tempfile.NamedTemporaryFile('w', suffix=".yaml", delete=False) as f:
+            yaml.safe_dump(values, f, default_flow_style=False, sort_keys=True)
+            values_file = f.name
+        try:
+            result = subprocess.run(
+                [self.helm, "template", RELEASE_NAME, str(self.chart_dir),
+                 "--namespace", NAMESPACE, "--values", values_file],
+                capture_output=True,
+                text=True
+            )
+        finally:
+            os.unlink(values_file)
+
+        if result.returncode != 0:
+            raise RuntimeError(f"helm template failed: {result.stderr.strip()}")
+
+        return normalize_manifest(result.stdout, self.metadata.get("name", ""),
+                                  str(self.metadata.get("version", "")))
+
+    def render_case(self, case):
+        """Render one case, serving it from the cache when the inputs are unchanged"""
+        values = load_case_values(Path(case) / "values.yaml")
+        key = self.input_hash(values)
+
+        if self.cache_dir:
+            cached = self._cache_path(key)
+            if cached.exists():
+                with self._lock:
+                    self.cached += 1
+                return cached.read_text()
+
+        manifest = self.helm_template(values)
+        with self._lock:
+            self.rendered += 1
+
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            # Write then rename, so concurrent workers never read a partial entry.
+            with tempfile.NamedTemporaryFile('w', dir=self.cache_dir, suffix=".tmp", delete=False) as f:
+                f.write(manifest)
+            os.replace(f.name, self._cache_path(key))
+
+        return manifest
+
+    def snapshot_path(self, case):
+        return self.snapshot_dir / f"{Path(case).name}.yaml"
+
+    def committed_snapshot(self, case, rev):
+        """Return the snapshot of case as committed at rev, or None if it has none there"""
+        snapshot = self.snapshot_path(case)
+        if not snapshot.parent.is_dir():
+            return None
+        # `<rev>:./<name>` is resolved relative to the snapshot directory, wherever the repository root is.
+        result = subprocess.run(["git", "show", f"{rev}:./{snapshot.name}"], cwd=snapshot.parent,
+                                capture_output=True, text=True)
+        return result.stdout if result.returncode == 0 else None
+
+    @staticmethod
+    def case_files_changed(case, rev):
+        """Return True if any file under the case directory differs from rev (or rev is unknown)"""
+        # The snapshot only covers charts/zot; the case's own templates and dependencies are installed too.
+        result = subprocess.run(["git", "diff", "--quiet", rev, "--", "."], cwd=case, capture_output=True)
+        if result.returncode != 0:
+            return True
+        untracked = subprocess.run(["git", "ls-files", "--others", "--exclude-standard", "--", "."], cwd=case,
+                                   capture_output=True, text=True)
+        return untracked.returncode != 0 or bool(untracked.stdout.strip())
+
+    def changed_since(self, cases, rev):
+        """Return the cases whose rendered output or own files differ from rev.
+
+        A case without a snapshot at rev (or an unknown rev) counts as changed, so
+        callers skipping work on an empty result only do so when that is safe.
+        """
+        rendered = self.render_all(cases)
+        for case in cases:
+            if isinstance(rendered[case], Exception):
+                raise RuntimeError(f"Error rendering {Path(case).name}: {rendered[case]}")
+        return [case for case in cases
+                if self.committed_snapshot(case, rev) != rendered[case] or self.case_files_changed(case, rev)]
+
+    def render_all(self, cases):
+        """Render all cases on the worker pool; returns {case: manifest or exception}"""
+        # Resolve the shared key parts up front instead of racing for them in every worker.
+        self.helm_version()
+        self._chart_hash = hash_chart_dir(self.chart_dir)
+
+        def render(case):
+            try:
+                return case, self.render_case(case)
+            except Exception as e:
+                return case, e
+
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            return dict(pool.map(render, cases))
+
+    def run(self, cases, update=False):
+        """Compare (or with update=True, rewrite) snapshots; returns the cases that changed"""
+        rendered = self.render_all(cases)
+        changed = []
+        errors = []
+
+        for case in cases:
+            name = Path(case).name
+            manifest = rendered[case]
+            if isinstance(manifest, Exception):
+                print(f"Error rendering {name}: {manifest}")
+                errors.append(case)
+                continue
+
+            snapshot = self.snapshot_path(case)
+            expected = snapshot.read_text() if snapshot.exists() else None
+            if expected == manifest:
+                continue
+
+            changed.append(case)
+            if update:
+                self.snapshot_dir.mkdir(parents=True, exist_ok=True)
+                snapshot.write_text(manifest)
+                print(f"Updated snapshot: {snapshot}")
+            elif expected is None:
+                print(f"Missing snapshot for {name}: {snapshot}")
+            else:
+                print(f"Snapshot mismatch for {name}:")
+                sys.stdout.writelines(difflib.unified_diff(
+                    expected.splitlines(keepends=True),
+                    manifest.splitlines(keepends=True),
+                    fromfile=str(snapshot),
+                    tofile=f"{name} (rendered)"
+                ))
+
+        if errors:
+            raise RuntimeError(f"{len(errors)} case(s) failed to render")
+
+        return changed
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Render the zot chart for every tests/ci case and compare against snapshots",
+        epilog="Exit codes: 0=snapshots match (or were updated), 1=mismatch, 2=error."
+    )
+    parser.add_argument("cases", nargs="*",
+                        help="Case directories to render (default: every case under --cases-dir)")
+    parser.add_argument("--cases-dir", default=DEFAULT_CASES_DIR,
+                        help="Directory containing one values.yaml per test case")
+    parser.add_argument("--chart", default=DEFAULT_CHART, help="Chart to render")
+    parser.add_argument("--snapshot-dir", default=DEFAULT_SNAPSHOT_DIR,
+                        help="Directory holding the <case>.yaml snapshots")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR,
+                        help="Directory for cached renders keyed by input hash ('' disables)")
+    parser.add_argument("--helm", default="helm", help="helm executable to run")
+    parser.add_argument("-j", "--jobs", type=int, default=DEFAULT_JOBS,
+                        help="Number of parallel helm template workers")
+    parser.add_argument("-u", "--update", action="store_true",
+                        help="Rewrite snapshots instead of comparing against them")
+    parser.add_argument("--list-changed-since", metavar="REV",
+                        help="Only print the cases whose rendered output differs from their snapshot at REV, "
+                             "one per line (empty when a kind install would test nothing new)")
+    args = parser.parse_args()
+
+    cases = args.cases or RenderSnapshotSuite.discover_cases(args.cases_dir)
+    if not cases:
+        print(f"No test cases found under {args.cases_dir}")
+        return EXIT_ERROR
+
+    try:
+        suite = RenderSnapshotSuite(
+            chart_dir=args.chart,
+            snapshot_dir=args.snapshot_dir,
+            cache_dir=args.cache_dir,
+            helm=args.helm,
+            jobs=args.jobs,
+        )
+        if args.list_changed_since:
+            for case in suite.changed_since(cases, args.list_changed_since):
+                print(case)
+            return EXIT_OK
+        changed = suite.run(cases, update=args.update)
+    except Exception as e:
+        print(f"Error: {e}")
+        return EXIT_ERROR
+
+    print(f"Rendered {suite.rendered} case(s), {suite.cached} served from cache")
+    if changed and not args.update:
+        print(f"{len(changed)} snapshot(s) out of date; run with --update to accept the new output")
+        return EXIT_MISMATCH
+
+    print("All snapshots up to date" if not changed else f"Updated {len(changed)} snapshot(s)")
+    return EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
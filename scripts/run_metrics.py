@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Run Metrics - OpenMetrics textfile output for chart automation runs
+
+A run records its phase wall times, chart counts, subprocess counts and peak RSS
+and writes them when it exits, to a file node-exporter's textfile collector can
+serve. Counters and histograms accumulate across runs: the previous file is read
+back and added to, so rates and quantiles can be charted over time. Gauges hold
+the last value written for each label set. Every sample carries a `task` label
+naming the run (`job` is left to the scraper).
+
+`run_metrics.py time` records one phase of a shell pipeline (the release job)
+around any command.
+"""
+
+import argparse
+import contextlib
+import math
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+METRICS_FILE_ENV = "CHART_METRICS_FILE"
+PREFIX = "chart_automation_"
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+# name -> (type, help); sample names are PREFIX + name (+ _total / _bucket, _sum, _count)
+FAMILIES = {
+    "runs": ("counter", "Completed runs by exit code"),
+    "subprocess_calls": ("counter", "External commands started (memoized calls excluded)"),
+    "subprocess_seconds": ("counter", "Wall time spent in external commands"),
+    "phase_duration_seconds": ("histogram", "Wall time of each phase of a run"),
+    "charts_discovered": ("gauge", "Charts found under the charts directory in the last run"),
+    "charts_changed": ("gauge", "Charts with changes in the last run"),
+    "charts_to_bump": ("gauge", "Charts that needed a version bump in the last run"),
+    "charts_packaged": ("gauge", "Chart packages produced in the last run"),
+    "git_subprocesses": ("gauge", "git commands started in the last run"),
+    "helm_docs_seconds": ("gauge", "Wall time of README generation (native or helm-docs) in the last run"),
+    "peak_rss_bytes": ("gauge", "Peak resident set size of the last run, of the process itself or its children"),
+    "last_run_duration_seconds": ("gauge", "Wall time of the last run"),
+    "last_run_timestamp_seconds": ("gauge", "Unix time the last run finished"),
+    "last_run_exit_code": ("gauge", "Exit code of the last run"),
+}
+
+_SAMPLE_RE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(.*)\})?\s+(\S+)$')
+_LABEL_RE = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\]|\\.)*)"')
+
+EXIT_ERROR = 2
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _unescape(value):
+    return re.sub(r'\\(.)', lambda m: "\n" if m.group(1) == "n" else m.group(1), value)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _family_of(sample_name):
+    """Return (family, suffix) of a sample written by this module, or (None, None)"""
+    if not sample_name.startswith(PREFIX):
+        return None, None
+    name = sample_name[len(PREFIX):]
+    for suffix in ("_total", "_bucket", "_sum", "_count", ""):
+        family = name[:len(name) - len(suffix)] if suffix else name
+        if name.endswith(suffix) and family in FAMILIES:
+            return family, suffix
+    return None, None
+
+
+def peak_rss_bytes(who=None):
+    """Peak RSS of this process (or, with who=RUSAGE_CHILDREN, its largest waited-for child)"""
+    import resource
+
+    usage = resource.getrusage(resource.RUSAGE_SELF if who is None else who)
+    # Linux reports kilobytes, macOS bytes.
+    return usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+
+
+class RunMetrics:
+    """Metrics of one run, merged into the textfile by write()"""
+
+    def __init__(self, task):
+        self.task = task
+        self.started = time.perf_counter()
+        # (family, sorted label tuple) -> value; histograms keep [bucket counts..., sum, count]
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+
+    def _key(self, family, labels):
+        return family, tuple(sorted((name, str(value)) for name, value in {"task": self.task, **labels}.items()))
+
+    def inc(self, family, value=1, **labels):
+        key = self._key(family, labels)
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, family, value, **labels):
+        self.gauges[self._key(family, labels)] = value
+
+    def observe(self, family, value, **labels):
+        key = self._key(family, labels)
+        histogram = self.histograms.setdefault(key, [0] * len(BUCKETS) + [0.0, 0])
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                histogram[i] += 1
+        histogram[-2] += value
+        histogram[-1] += 1
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """Observe the wall time of the enclosed block as phase `name`"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe("phase_duration_seconds", time.perf_counter() - start, phase=name)
+
+    def record_runner(self, runner):
+        """Record the external commands a CommandRunner started"""
+        git = 0
+        for command, counters in runner.timings.items():
+            started = counters["calls"] - counters["cached"]
+            self.inc("subprocess_calls", started, command=command)
+            self.inc("subprocess_seconds", counters["seconds"], command=command)
+            if command.split()[0] == "git":
+                git += started
+            if command == "helm-docs":
+                # README generation timed by the caller (which covers the native generator) takes precedence.
+                self.gauges.setdefault(self._key("helm_docs_seconds", {}), counters["seconds"])
+        self.set("git_subprocesses", git)
+
+    def finish(self, exit_code, **labels):
+        """Record the run's outcome, duration and peak RSS; call once, right before write()"""
+        import resource
+
+        duration = time.perf_counter() - self.started
+        self.inc("runs", exit_code=exit_code, **labels)
+        self.observe("phase_duration_seconds", duration, phase=labels.get("phase", "total"))
+        self.set("last_run_duration_seconds", duration, **labels)
+        self.set("last_run_timestamp_seconds", round(time.time(), 3), **labels)
+        self.set("last_run_exit_code", exit_code, **labels)
+        self.set("peak_rss_bytes", peak_rss_bytes(), process="self", **labels)
+        self.set("peak_rss_bytes", peak_rss_bytes(resource.RUSAGE_CHILDREN), process="children", **labels)
+
+    def _merge_previous(self, text):
+        """Fold the samples of a previous textfile into this run's values"""
+        counters, gauges, histograms = dict(self.counters), dict(self.gauges), {}
+        for line in text.splitlines():
+            match = _SAMPLE_RE.match(line)
+            if not match or line.startswith("#"):
+                continue
+            family, suffix = _family_of(match.group(1))
+            if family is None:
+                continue
+            labels = dict((name, _unescape(value)) for name, value in _LABEL_RE.findall(match.group(2) or ""))
+            value = float(match.group(3))
+            kind = FAMILIES[family][0]
+            if kind == "counter" and suffix == "_total":
+                key = (family, tuple(sorted(labels.items())))
+                counters[key] = counters.get(key, 0) + value
+            elif kind == "gauge" and suffix == "":
+                gauges.setdefault((family, tuple(sorted(labels.items()))), value)
+            elif kind == "histogram":
+                bound = labels.pop("le", None)
+                histogram = histograms.setdefault((family, tuple(sorted(labels.items()))),
+                                                  [0] * len(BUCKETS) + [0.0, 0])
+                if suffix == "_bucket" and bound != "+Inf" and float(bound) in BUCKETS:
+                    histogram[BUCKETS.index(float(bound))] = value
+                elif suffix == "_sum":
+                    histogram[-2] = value
+                elif suffix == "_count":
+                    histogram[-1] = value
+        for key, values in self.histograms.items():
+            previous = histograms.get(key, [0] * len(values))
+            histograms[key] = [a + b for a, b in zip(previous, values)]
+        return counters, gauges, histograms
+
+    def render(self, previous=""):
+        """Return the OpenMetrics text for this run merged with the previous file's content"""
+        counters, gauges, histograms = self._merge_previous(previous)
+        lines = []
+        for family in sorted(FAMILIES):
+            kind, help_text = FAMILIES[family]
+            values = {"counter": counters, "gauge": gauges, "histogram": histograms}[kind]
+            series = sorted(labels for name, labels in values if name == family)
+            if not series:
+                continue
+            lines.append(f"# TYPE {PREFIX}{family} {kind}")
+            lines.append(f"# HELP {PREFIX}{family} {help_text}")
+            for labels in series:
+                value = values[(family, labels)]
+                if kind == "counter":
+                    lines.append(f"{PREFIX}{family}_total{_format_labels(labels)} {_format_value(value)}")
+                elif kind == "gauge":
+                    lines.append(f"{PREFIX}{family}{_format_labels(labels)} {_format_value(value)}")
+                else:
+                    for bound, count in zip(BUCKETS + (math.inf,), value[:len(BUCKETS)] + [value[-1]]):
+                        bucket_labels = labels + (("le", _format_value(bound)),)
+                        lines.append(f"{PREFIX}{family}_bucket{_format_labels(bucket_labels)} {_format_value(count)}")
+                    lines.append(f"{PREFIX}{family}_sum{_format_labels(labels)} {_format_value(value[-2])}")
+                    lines.append(f"{PREFIX}{family}_count{_format_labels(labels)} {_format_value(value[-1])}")
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Merge into the textfile at path, replacing it atomically (the collector never reads half a file)"""
+        import fcntl
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Runs finishing at the same time take turns, so neither loses the other's counts.
+        with open(f"{path}.lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            previous = path.read_text() if path.exists() else ""
+            with tempfile.NamedTemporaryFile('w', dir=path.parent, prefix=f".{path.name}.", delete=False) as f:
+                f.write(self.render(previous))
+            os.chmod(f.name, 0o644)
+            os.replace(f.name, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Record chart automation metrics in an OpenMetrics textfile",
+        epilog="Exit codes: the timed command's exit code, or 2 if it could not be run."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    time_parser = subparsers.add_parser("time", help="Run a command and record it as one phase of a task")
+    time_parser.add_argument("--file", default=os.environ.get(METRICS_FILE_ENV),
+                             help=f"Textfile to update (default: ${METRICS_FILE_ENV}; unset: just run the command)")
+    time_parser.add_argument("--task", required=True, help="Task label, e.g. release")
+    time_parser.add_argument("--phase", required=True, help="Phase label, e.g. sign")
+    time_parser.add_argument("--set", action="append", default=[], metavar="GAUGE=VALUE",
+                             help="Also set a gauge for the task, e.g. charts_packaged=3 (repeatable)")
+    time_parser.add_argument("cmd", nargs=argparse.REMAINDER, help="Command to run, after --")
+    args = parser.parse_args()
+
+    cmd = args.cmd[1:] if args.cmd[:1] == ["--"] else args.cmd
+    if not cmd:
+        parser.error("no command given")
+    gauges = []
+    for item in args.set:
+        name, _, value = item.partition("=")
+        if FAMILIES.get(name, ("",))[0] != "gauge":
+            parser.error(f"unknown gauge {name}")
+        gauges.append((name, float(value)))
+
+    metrics = RunMetrics(args.task)
+    try:
+        exit_code = subprocess.run(cmd).returncode
+    except OSError as e:
+        print(f"Error: {e}")
+        exit_code = EXIT_ERROR
+    if args.file:
+        for name, value in gauges:
+            metrics.set(name, value)
+        metrics.finish(exit_code, phase=args.phase)
+        try:
+            metrics.write(args.file)
+        except OSError as e:
+            print(f"Warning: Could not write metrics file {args.file}: {e}", file=sys.stderr)
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -45,7 +45,28 @@ def main():
     test_files = [
         scripts_dir / "test_bump_chart_version.py",
         scripts_dir / "test_chart_tracker.py",
-        scripts_dir / "test_chart_tracker_integration.py"
+        scripts_dir / "test_chart_tracker_integration.py",
+        scripts_dir / "test_ct_install_scheduler.py",
+        scripts_dir / "test_render_snapshots.py",
+        scripts_dir / "test_helm_unittest_runner.py",
+        scripts_dir / "test_chart_watch.py",
+        scripts_dir / "test_version_ledger.py",
+        scripts_dir / "test_shallow_clone.py",
+        scripts_dir / "test_command_runner.py",
+        scripts_dir / "test_git_backend.py",
+        scripts_dir / "test_helmignore.py",
+        scripts_dir / "test_chart_fingerprint.py",
+        scripts_dir / "test_pipeline.py",
+        scripts_dir / "test_bump_plan.py",
+        scripts_dir / "test_sign_charts.py",
+        scripts_dir / "test_oci_push.py",
+        scripts_dir / "test_dependency_cache.py",
+        scripts_dir / "test_case_equivalence.py",
+        scripts_dir / "test_run_metrics.py",
+        scripts_dir / "test_render_benchmark.py",
+        scripts_dir / "test_chart_docs.py",
+        scripts_dir / "test_chart_fleet.py",
+        scripts_dir / "test_build_zipapp.py",
     ]
 
     print("Chart Tracker Test Suite")
@@ -0,0 +1,67 @@
+"""
+Shallow Clone - Fetch only the history a since..HEAD range needs
+"""
+
+import re
+
+from command_runner import CommandRunner
+
+FULL_SHA_RE = re.compile(r"^[0-9a-f]{40}$")
+# Fetches can be slow on large remotes; other git calls use the runner's timeout.
+FETCH_TIMEOUT = 900
+
+
+def is_shallow(cwd=None, runner=None):
+    """Return True if the repository is a shallow clone"""
+    runner = runner or CommandRunner()
+    return runner.run(["git", "rev-parse", "--is-shallow-repository"], cwd=cwd, check=True).stdout.strip() == "true"
+
+
+def has_commit(rev, cwd=None, runner=None):
+    """Return True if rev resolves to a commit that exists locally"""
+    runner = runner or CommandRunner()
+    return runner.run(["git", "rev-parse", "--verify", "--quiet", f"{rev}^{{commit}}"], cwd=cwd).returncode == 0
+
+
+def ensure_revisions(revs, remote="origin", cwd=None, runner=None):
+    """Make every revision in revs resolvable, fetching from remote if the clone is shallow.
+
+    Full commit ids and `<remote>/<branch>` refs are first fetched on their own with
+    depth 1. Anything else (e.g. `HEAD~5`) deepens the existing history by 1, 2, 4, ...
+    commits until it resolves, so at most twice the required depth is fetched.
+    Returns the number of fetches made; full clones are never touched.
+    """
+    runner = runner or CommandRunner()
+    if not is_shallow(cwd, runner):
+        return 0
+
+    fetches = 0
+    for rev in revs:
+        if has_commit(rev, cwd, runner):
+            continue
+
+        refspec = None
+        if FULL_SHA_RE.match(rev):
+            refspec = rev
+        elif rev.startswith(remote + "/"):
+            branch = rev[len(remote) + 1:]
+            refspec = f"+refs/heads/{branch}:refs/remotes/{remote}/{branch}"
+        if refspec is not None:
+            print(f"Fetching {rev} from {remote} (depth 1)")
+            fetches += 1
+            fetch = runner.run(["git", "fetch", "--no-tags", "--depth=1", remote, refspec],
+                               cwd=cwd, timeout=FETCH_TIMEOUT)
+            if fetch.returncode == 0 and has_commit(rev, cwd, runner):
+                continue
+
+        step = 1
+        while not has_commit(rev, cwd, runner):
+            if not is_shallow(cwd, runner):
+                raise RuntimeError(f"Revision {rev} not found in the complete history of {remote}")
+            print(f"Deepening shallow clone by {step} commit(s) to resolve {rev}")
+            runner.run(["git", "fetch", "--no-tags", f"--deepen={step}", remote],
+                       cwd=cwd, check=True, timeout=FETCH_TIMEOUT)
+            fetches += 1
+            step *= 2
+
+    return fetches
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Sign Charts - Helm provenance (.prov) files for many packaged charts at once
+
+`helm package --sign` reads the keyring and passphrase again for every chart
+and signs one chart at a time. This script imports the keyring into a private
+GNUPGHOME and hands the passphrase to its gpg-agent once per release, then
+writes `<chart>.tgz.prov` for every package in parallel. Each .prov is the
+clearsigned message Helm writes: the chart's metadata, a `...` YAML document
+end marker, and the sha256 of the archive.
+"""
+
+import argparse
+import hashlib
+import os
+import shutil
+import subprocess
+import sys
+import tarfile
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import yaml
+
+DEFAULT_KEYRING = "keyring.gpg"
+DEFAULT_PASSPHRASE_FILE = "passphrase-file.txt"
+DEFAULT_JOBS = os.cpu_count() or 2
+
+# Fields of Helm's chart.Metadata in declaration order, the only ones it writes to a .prov
+# or an OCI config blob; all are omitempty.
+METADATA_FIELDS = ("name", "home", "sources", "version", "description", "keywords", "maintainers", "icon",
+                   "apiVersion", "condition", "tags", "appVersion", "deprecated", "annotations",
+                   "kubeVersion", "dependencies", "type")
+STRING_FIELDS = ("name", "version", "appVersion", "kubeVersion", "apiVersion")
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_ERROR = 2
+
+
+def _dump_yaml(data):
+    return yaml.safe_dump(data, sort_keys=True, default_flow_style=False, width=1 << 16)
+
+
+def read_chart_metadata(package):
+    """Return the parsed Chart.yaml of a packaged chart (<name>/Chart.yaml in the archive)"""
+    with tarfile.open(package, "r:gz") as tar:
+        for member in tar:
+            parts = member.name.split("/")
+            if len(parts) == 2 and parts[1] == "Chart.yaml" and member.isfile():
+                return yaml.safe_load(tar.extractfile(member)) or {}
+    raise ValueError(f"{package} has no Chart.yaml")
+
+
+def chart_metadata(package):
+    """Return the packaged chart's metadata as Helm's chart.Metadata holds it.
+
+    Only Helm's fields are kept, in its field order, with empty ones left out.
+    """
+    metadata = read_chart_metadata(package)
+    fields = {}
+    for name in METADATA_FIELDS:
+        value = metadata.get(name)
+        if value in (None, "", [], {}, False):
+            continue
+        fields[name] = str(value) if name in STRING_FIELDS else value
+    return fields
+
+
+def provenance_message(package):
+    """Return the message a .prov signs for package, in the layout Helm writes.
+
+    Helm marshals chart.Metadata with sorted keys and empty fields left out, then
+    "...", then the archive checksum as `files: {<basename>: sha256:<hex>}`.
+    """
+    digest = hashlib.sha256(Path(package).read_bytes()).hexdigest()
+    return (_dump_yaml(chart_metadata(package)) + "\n...\n" +
+            _dump_yaml({"files": {Path(package).name: f"sha256:{digest}"}}))
+
+
+class ProvenanceSigner:
+    """Signs chart packages with one key loaded into a throwaway gpg home.
+
+    Use as a context manager: entering imports the keyring and presets the
+    passphrase in the agent, leaving stops the agent and removes the home.
+    """
+
+    def __init__(self, key, keyring=DEFAULT_KEYRING, passphrase_file=DEFAULT_PASSPHRASE_FILE,
+                 gpg="gpg", jobs=DEFAULT_JOBS):
+        self.key = key
+        self.keyring = keyring
+        self.passphrase_file = passphrase_file
+        self.gpg = gpg
+        self.jobs = max(1, jobs)
+        self.home = None
+
+    def _run(self, args, **kwargs):
+        env = dict(os.environ, GNUPGHOME=self.home)
+        return subprocess.run(args, env=env, capture_output=True, check=True, **kwargs)
+
+    def __enter__(self):
+        self.home = tempfile.mkdtemp(prefix="chart-sign-")
+        try:
+            # The passphrase is given to the agent once, up front, so signing needs no pinentry. The
+            # agent re-protects imported keys with the cheapest S2K count: this home only lives for
+            # the run, and otherwise every signature pays the full key derivation again.
+            Path(self.home, "gpg-agent.conf").write_text("allow-preset-passphrase\ns2k-count 65536\n")
+            # gpg reads binary and ASCII-armored keyrings alike; no --dearmor copy needed.
+            self._run([self.gpg, "--batch", "--import", self.keyring])
+            listing = self._run([self.gpg, "--batch", "--with-colons", "--with-keygrip",
+                                 "--list-secret-keys", self.key], text=True).stdout
+            keygrips = [line.split(":")[9] for line in listing.splitlines() if line.startswith("grp:")]
+            passphrase = Path(self.passphrase_file).read_bytes().rstrip(b"\r\n")
+            commands = "".join(f"PRESET_PASSPHRASE {grip} -1 {passphrase.hex()}\n" for grip in keygrips)
+            self._run(["gpg-connect-agent"], input=(commands + "/bye\n").encode())
+            # The first signature converts the imported key to the agent's format; do it before the
+            # parallel signatures instead of letting all of them race to do it.
+            self._run(self._sign_command(), input=b"")
+        except BaseException:
+            self.close()
+            raise
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self.home is None:
+            return
+        subprocess.run(["gpgconf", "--kill", "gpg-agent"], env=dict(os.environ, GNUPGHOME=self.home),
+                       capture_output=True)
+        shutil.rmtree(self.home, ignore_errors=True)
+        self.home = None
+
+    def _sign_command(self):
+        # Helm clearsigns with SHA512 as well.
+        return [self.gpg, "--batch", "--yes", "--pinentry-mode", "loopback", "--local-user", self.key,
+                "--digest-algo", "SHA512", "--clearsign"]
+
+    def sign(self, package):
+        """Write <package>.prov and return its path"""
+        prov = Path(f"{package}.prov")
+        signed = self._run(self._sign_command(), input=provenance_message(package).encode()).stdout
+        prov.write_bytes(signed)
+        return prov
+
+    def sign_all(self, packages):
+        """Sign every package in parallel; returns {package: (prov path or None, error or None)}"""
+        def sign_one(package):
+            try:
+                return package, (self.sign(package), None)
+            except subprocess.CalledProcessError as e:
+                return package, (None, (e.stderr or b"").decode(errors="replace").strip() or str(e))
+            except (OSError, ValueError, tarfile.TarError) as e:
+                return package, (None, str(e))
+
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            return dict(pool.map(sign_one, packages))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Write Helm provenance (.prov) files for packaged charts, loading the signing key once",
+        epilog="Exit codes: 0=all signed, 1=a package could not be signed, 2=error."
+    )
+    parser.add_argument("packages", nargs="+", help="Chart packages (.tgz) to sign")
+    parser.add_argument("--key", required=True, help="Secret key name, UID or fingerprint")
+    parser.add_argument("--keyring", default=DEFAULT_KEYRING, help="Keyring with the private key (binary or armored)")
+    parser.add_argument("--passphrase-file", default=DEFAULT_PASSPHRASE_FILE, help="File holding the key's passphrase")
+    parser.add_argument("--gpg", default="gpg", help="gpg executable to run")
+    parser.add_argument("-j", "--jobs", type=int, default=DEFAULT_JOBS, help="Number of packages signed at once")
+    args = parser.parse_args()
+
+    try:
+        with ProvenanceSigner(args.key, args.keyring, args.passphrase_file, gpg=args.gpg, jobs=args.jobs) as signer:
+            results = signer.sign_all(args.packages)
+    except subprocess.CalledProcessError as e:
+        print(f"Error: {' '.join(e.cmd)} failed: {(e.stderr or b'').decode(errors='replace').strip()}")
+        return EXIT_ERROR
+    except Exception as e:
+        print(f"Error: {e}")
+        return EXIT_ERROR
+
+    failed = []
+    for package, (prov, error) in results.items():
+        if error is None:
+            print(f"Signed: {prov}")
+        else:
+            failed.append(package)
+            print(f"Failed to sign {package}: {error}")
+    return EXIT_FAILED if failed else EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
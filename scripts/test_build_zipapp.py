@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Tests for build_zipapp.py and the cold start of trivial chart_tracker.py commands
+"""
+
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+import zipfile
+from contextlib import redirect_stdout
+from pathlib import Path
+from unittest.mock import patch
+
+from build_zipapp import EXIT_OK, build, main
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+# Wall-clock budget for `chart_tracker.py cleanup`, from the scripts and from the archive (best of several runs).
+STARTUP_BUDGET_MS = float(os.environ.get("CHART_TRACKER_STARTUP_BUDGET_MS", "100"))
+# Modules `cleanup` must not import.
+HEAVY_MODULES = ("yaml", "json", "subprocess", "hashlib", "git_backend", "git_objects", "helmignore")
+
+
+class TestBuildZipapp(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.test_dir = tempfile.TemporaryDirectory()
+        cls.root = Path(cls.test_dir.name)
+        cls.archive = cls.root / "dist" / "chart-tools.pyz"
+        cls.tools = build(cls.archive)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.test_dir.cleanup()
+
+    def _run(self, *args):
+        return subprocess.run([sys.executable, str(self.archive)] + list(args), cwd=self.root, capture_output=True,
+                              text=True)
+
+    def test_archive_contents(self):
+        with zipfile.ZipFile(self.archive) as archive:
+            names = set(archive.namelist())
+        self.assertTrue(self.archive.read_bytes().startswith(b"#!/usr/bin/env python3\n"))
+        self.assertTrue(os.access(self.archive, os.X_OK))
+        self.assertTrue({"__main__.py", "__main__.pyc", "chart_tracker.py", "chart_tracker.pyc",
+                         "command_runner.pyc"} <= names)
+        self.assertFalse([name for name in names if name.startswith("test_") or name.startswith("run_tests")])
+        self.assertIn("chart_tracker", self.tools)
+        self.assertIn("git_objects", self.tools)
+        self.assertNotIn("command_runner", self.tools)
+
+    def test_dispatches_to_tools(self):
+        state_file = self.root / "state.json"
+        state_file.write_text('{"charts_to_bump": []}')
+        result = self._run("chart_tracker", "--state-file", str(state_file), "cleanup")
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertFalse(state_file.exists())
+
+        # Tools answer to their script and dashed names as well; usage shows the script name.
+        for name in ("chart_tracker.py", "chart-tracker"):
+            result = self._run(name, "--help")
+            self.assertEqual(result.returncode, 0, result.stderr)
+            self.assertTrue(result.stdout.startswith("usage: chart_tracker.py"))
+
+        result = self._run("no-such-tool")
+        self.assertEqual(result.returncode, 2)
+        self.assertIn("Error: unknown tool no-such-tool", result.stderr)
+        self.assertEqual(self._run().returncode, 2)
+        self.assertIn("chart_tracker", self._run("--help").stdout)
+
+    def test_modules_import_from_bytecode(self):
+        code = "import chart_tracker; print(chart_tracker.__file__)"
+        result = subprocess.run([sys.executable, "-c", code], cwd=self.root, capture_output=True, text=True,
+                                check=True, env={**os.environ, "PYTHONPATH": str(self.archive)})
+        self.assertEqual(result.stdout.strip(), os.path.join(str(self.archive), "chart_tracker.pyc"))
+
+        sources_only = self.root / "sources.pyz"
+        argv = ["build_zipapp.py", "--output", str(sources_only), "--no-compile"]
+        with patch.object(sys, "argv", argv), redirect_stdout(io.StringIO()) as out:
+            self.assertEqual(main(), EXIT_OK)
+        self.assertIn(f"Wrote {sources_only} (", out.getvalue())
+        result = subprocess.run([sys.executable, "-c", code], cwd=self.root, capture_output=True, text=True,
+                                check=True, env={**os.environ, "PYTHONPATH": str(sources_only)})
+        self.assertEqual(result.stdout.strip(), os.path.join(str(sources_only), "chart_tracker.py"))
+
+    def test_cleanup_does_not_load_heavy_modules(self):
+        """Startup regression guard: cleanup imports nothing beyond argument parsing and the state file"""
+        code = ("import sys, chart_tracker; "
+                "sys.argv = ['chart_tracker.py', '--state-file', 'missing.json', 'cleanup']; chart_tracker.main(); "
+                f"print(sorted(set({HEAVY_MODULES!r}) & set(sys.modules)))")
+        result = subprocess.run([sys.executable, "-c", code], cwd=self.root, capture_output=True, text=True,
+                                check=True, env={**os.environ, "PYTHONPATH": str(SCRIPTS_DIR)})
+        self.assertEqual(result.stdout.strip(), "[]")
+
+    def test_cleanup_startup_budget(self):
+        """Startup regression guard: `cleanup` stays within STARTUP_BUDGET_MS, as a script and from the archive"""
+        commands = {
+            "script": [sys.executable, str(SCRIPTS_DIR / "chart_tracker.py"), "cleanup"],
+            "zipapp": [sys.executable, str(self.archive), "chart_tracker", "cleanup"],
+        }
+        for label, cmd in commands.items():
+            timings = []
+            for _ in range(5):
+                start = time.perf_counter()
+                result = subprocess.run(cmd, cwd=self.root, capture_output=True, text=True)
+                timings.append((time.perf_counter() - start) * 1000)
+                self.assertEqual(result.returncode, 0, result.stdout + result.stderr)
+            self.assertLess(min(timings), STARTUP_BUDGET_MS,
+                            f"{label} cleanup took {min(timings):.1f}ms (budget {STARTUP_BUDGET_MS:.0f}ms)")
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
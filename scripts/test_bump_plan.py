@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Tests for bump_plan.py and `process --plan-file`
+"""
+
+import io
+import json
+import os
+import sys
+import unittest
+from contextlib import redirect_stdout
+from unittest.mock import patch
+
+import bump_plan
+from bump_plan import EXIT_OK, EXIT_STALE, PlanFile, checkout_state
+from chart_tracker import ChartTracker
+from chart_tracker import main as tracker_main
+from test_chart_tracker_integration import ChartRepoTestCase
+
+
+class TestBumpPlan(ChartRepoTestCase):
+
+    def setUp(self):
+        super().setUp()
+        os.chdir(self.repo_path)
+        self._create_branch('feature-branch')
+        self._modify_chart('charts/test-chart-1/values.yaml', {'replicaCount: 1': 'replicaCount: 2'})
+        self._modify_chart('charts/test-chart-2/values.yaml', {'replicaCount: 1': 'replicaCount: 3'})
+        self._modify_chart('charts/test-chart-2/Chart.yaml', {'version: 2.0.0': 'version: 2.0.1'})
+        self._write_native_readmes()
+        self._commit_changes('Change both charts, bump chart 2')
+        self.plan_path = self.repo_path / "bump-plan.json"
+        self.env = patch.dict(os.environ, {bump_plan.PLAN_KEY_ENV: ""})
+        self.env.start()
+
+    def tearDown(self):
+        self.env.stop()
+        super().tearDown()
+
+    def _process(self, since="HEAD~1", key=None):
+        """Run process_all_changes with a fresh state file; returns (tracker, output, detection calls)"""
+        self.state_file.unlink(missing_ok=True)
+        tracker = ChartTracker(str(self.state_file))
+        self.addCleanup(tracker.close)
+        with patch.object(tracker, "run_helm_docs", return_value=[]), \
+                patch.object(tracker, "get_changed_charts_from_git",
+                             wraps=tracker.get_changed_charts_from_git) as mock_changes, \
+                redirect_stdout(io.StringIO()) as out:
+            tracker.process_all_changes(since, plan_file=PlanFile(self.plan_path, key=key))
+        return tracker, out.getvalue(), mock_changes.call_count
+
+    def test_checkout_state(self):
+        state = checkout_state()
+        self.assertEqual(sorted(state["charts"]), ["charts/test-chart-1", "charts/test-chart-2"])
+        self.assertEqual(state["charts"]["charts/test-chart-1"],
+                         self._run_git(['rev-parse', 'HEAD:charts/test-chart-1']).stdout.strip())
+        self.chart1_values.write_text("dirty: true\n")
+        self.assertIsNone(checkout_state())
+
+    def test_plan_is_written_then_reused(self):
+        tracker, output, calls = self._process()
+        self.assertEqual(calls, 1)
+        self.assertIn("Recomputing bump plan: no plan at", output)
+        plan = json.loads(self.plan_path.read_text())
+        self.assertEqual(plan["inputs"], {"since": "HEAD~1", "fingerprints": None})
+        self.assertEqual(plan["head"], self._run_git(['rev-parse', 'HEAD']).stdout.strip())
+        self.assertEqual(plan["charts_with_existing_bumps"], ["charts/test-chart-2"])
+        self.assertEqual(plan["charts_to_bump"], ["charts/test-chart-1"])
+        self.assertEqual(plan["seal"]["algorithm"], "sha256")
+
+        tracker, output, calls = self._process()
+        self.assertEqual(calls, 0)
+        self.assertIn("Reusing bump plan", output)
+        self.assertEqual(tracker.state["charts_to_bump"], ["charts/test-chart-1"])
+
+    def test_new_commit_recomputes(self):
+        self._process()
+        self._modify_chart('charts/test-chart-2/values.yaml', {'replicaCount: 3': 'replicaCount: 4'})
+        self._commit_changes('Change chart 2 again')
+        _, output, calls = self._process()
+        self.assertEqual(calls, 1)
+        self.assertIn("charts differ: charts/test-chart-2", output)
+
+    def test_other_inputs_recompute(self):
+        self._process()
+        _, output, calls = self._process(since="HEAD")
+        self.assertEqual(calls, 1)
+        self.assertIn("plan was made for different inputs", output)
+
+    def test_tampered_plan_recomputes(self):
+        self._process()
+        plan = json.loads(self.plan_path.read_text())
+        plan["charts_to_bump"] = []
+        self.plan_path.write_text(json.dumps(plan))
+        tracker, output, calls = self._process()
+        self.assertEqual(calls, 1)
+        self.assertIn("failed sha256 verification", output)
+        self.assertEqual(tracker.state["charts_to_bump"], ["charts/test-chart-1"])
+
+    def test_key_requires_signature(self):
+        self._process()
+        _, output, calls = self._process(key="secret")
+        self.assertEqual(calls, 1)
+        self.assertIn("failed hmac-sha256 verification", output)
+        self.assertEqual(json.loads(self.plan_path.read_text())["seal"]["algorithm"], "hmac-sha256")
+        self.assertEqual(self._process(key="secret")[2], 0)
+        self.assertEqual(self._process(key="other")[2], 1)
+
+    def test_dirty_charts_are_not_planned(self):
+        self.chart1_values.write_text("dirty: true\n")
+        _, output, calls = self._process()
+        self.assertEqual(calls, 1)
+        self.assertIn("Not writing", output)
+        self.assertFalse(self.plan_path.exists())
+
+    def test_plan_only_and_cli(self):
+        # The committed READMEs are what the docs generator renders, so the plan verifies afterwards.
+        argv = ['chart_tracker.py', '--state-file', str(self.state_file),
+                'process', '--since', 'HEAD~1', '--plan-file', str(self.plan_path), '--plan-only']
+        with patch.object(sys, 'argv', argv), redirect_stdout(io.StringIO()) as out:
+            self.assertEqual(tracker_main(), 0)
+        self.assertIn("Charts to bump: charts/test-chart-1", out.getvalue())
+        self.assertIn("version: 1.0.0", self.chart1_yaml.read_text())
+
+        def plan_cli(*args):
+            with patch.object(sys, 'argv', ['bump_plan.py'] + list(args)), redirect_stdout(io.StringIO()) as out:
+                return bump_plan.main(), out.getvalue()
+
+        self.assertEqual(plan_cli('changed', str(self.plan_path)),
+                         (EXIT_OK, "charts/test-chart-1\ncharts/test-chart-2\n"))
+        self.assertEqual(plan_cli('verify', str(self.plan_path), '--since', 'HEAD~1')[0], EXIT_OK)
+        self.assertEqual(plan_cli('verify', str(self.plan_path), '--since', 'main')[0], EXIT_STALE)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Unit tests for case_equivalence.py using a fake helm executable
+"""
+
+import io
+import os
+import sys
+import tempfile
+import textwrap
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+from unittest.mock import patch
+
+from case_equivalence import (
+    EXIT_EQUIVALENT,
+    EXIT_ERROR,
+    EXIT_OK,
+    CaseEquivalence,
+    coalesce_values,
+    main,
+)
+from ct_install_scheduler import skip_equivalent
+
+# Fake `helm`: `version` prints a version, `template` coalesces the --values file over
+# the chart's values.yaml and renders only replicaCount and service.type, so values
+# the templates never read do not change the output.
+FAKE_HELM = textwrap.dedent("""\
+    #!{python}
+    import os, sys, yaml
+    args = sys.argv[1:]
+    with open(os.environ["FAKE_HELM_LOG"], "a") as f:
+        f.write(" ".join(args) + "\\n")
+    if args[0] == "version":
+        print("v3.19.4", end="")
+        sys.exit(0)
+    def merge(base, over):
+        for key, value in over.items():
+            if value is None:
+                base.pop(key, None)
+            elif isinstance(value, dict) and isinstance(base.get(key), dict):
+                merge(base[key], value)
+            else:
+                base[key] = value
+        return base
+    values = yaml.safe_load(open(os.path.join(args[2], "values.yaml")))
+    values = merge(values, yaml.safe_load(open(args[args.index("--values") + 1])) or {{}})
+    if values.get("fail"):
+        sys.stderr.write("Error: render failed\\n")
+        sys.exit(1)
+    print("kind: Deployment")
+    print("replicas: " + str(values.get("replicaCount")))
+    print("kind: Service")
+    print("type: " + str((values.get("service") or {{}}).get("type")))
+""")
+
+
+class TestCaseEquivalence(unittest.TestCase):
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.test_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.test_dir.cleanup)
+        self.root = Path(self.test_dir.name)
+
+        self.chart_dir = self.root / "charts" / "zot"
+        (self.chart_dir / "templates").mkdir(parents=True)
+        (self.chart_dir / "Chart.yaml").write_text("apiVersion: v2\nname: zot\nversion: 0.1.122\n")
+        (self.chart_dir / "values.yaml").write_text(
+            "replicaCount: 1\nservice:\n  type: NodePort\n  port: 5000\nstartupProbe:\n  periodSeconds: 10\n")
+
+        self.cases_dir = self.root / "tests" / "ci"
+        self.log_file = self.root / "helm.log"
+        self.fake_helm = self.root / "helm"
+        self.fake_helm.write_text(FAKE_HELM.format(python=sys.executable))
+        self.fake_helm.chmod(0o755)
+
+        env = patch.dict(os.environ, {"FAKE_HELM_LOG": str(self.log_file)})
+        env.start()
+        self.addCleanup(env.stop)
+
+        self.default = self._case("default", "zot: {}\n")
+        # Only restates a default: same effective values, never rendered on its own.
+        self.restated = self._case("restated", "zot:\n  service:\n    type: NodePort\n")
+        # Changes a value the templates do not read: rendered, same manifests.
+        self.probe = self._case("startup-probe", "zot:\n  startupProbe:\n    periodSeconds: 5\n")
+        self.cluster_ip = self._case("cluster-ip", "zot:\n  service:\n    type: ClusterIP\n")
+
+    def _case(self, name, values, files=None):
+        case = self.cases_dir / name
+        case.mkdir(parents=True)
+        (case / "Chart.yaml").write_text(f"apiVersion: v2\nname: {name}\nversion: 0.1.0\n")
+        (case / "values.yaml").write_text(values)
+        for path, content in (files or {}).items():
+            (case / path).parent.mkdir(parents=True, exist_ok=True)
+            (case / path).write_text(content)
+        return case.as_posix()
+
+    def _equivalence(self):
+        return CaseEquivalence(chart_dir=str(self.chart_dir), cache_dir="", helm=str(self.fake_helm), jobs=2)
+
+    def _renders(self):
+        return [line for line in self.log_file.read_text().splitlines() if line.startswith("template")]
+
+    def test_coalesce_values(self):
+        defaults = {"service": {"type": "NodePort", "port": 5000}, "image": {"tag": "v1"}, "args": ["a"]}
+        merged = coalesce_values(defaults, {"service": {"type": "ClusterIP"}, "image": None, "args": ["b"]})
+        self.assertEqual(merged, {"service": {"type": "ClusterIP", "port": 5000}, "args": ["b"]})
+        self.assertEqual(defaults["service"]["type"], "NodePort")
+
+    def test_groups_cases_with_identical_manifests(self):
+        groups = self._equivalence().groups([self.probe, self.default, self.cluster_ip, self.restated])
+        self.assertEqual(groups, [[self.cluster_ip], [self.default, self.restated, self.probe]])
+        # default and restated share effective values, so only three renders.
+        self.assertEqual(len(self._renders()), 3)
+
+    def test_cases_with_their_own_files_stay_apart(self):
+        ldap = self._case("ldap", "zot: {}\n", {"templates/openldap.yaml": "kind: Deployment\n"})
+        umbrella = self._case("umbrella-values", "zot: {}\nldap:\n  enabled: true\n")
+        ignored = self._case("helmignore", "zot: {}\n", {".helmignore": "*.bak\n", "charts/zot-0.1.122.tgz": "x"})
+        groups = self._equivalence().groups([self.default, ldap, umbrella, ignored])
+        self.assertEqual(groups, [[self.default, ignored], [ldap], [umbrella]])
+
+    def test_render_failure(self):
+        broken = self._case("broken", "zot:\n  fail: true\n")
+        with self.assertRaisesRegex(RuntimeError, "Could not render broken"):
+            self._equivalence().groups([self.default, broken])
+
+    def test_main(self):
+        argv = ["case_equivalence.py", "--cases-dir", str(self.cases_dir), "--chart", str(self.chart_dir),
+                "--cache-dir", "", "--helm", str(self.fake_helm)]
+        with patch.object(sys, "argv", argv), redirect_stdout(io.StringIO()) as out:
+            self.assertEqual(main(), EXIT_EQUIVALENT)
+        self.assertIn("  default: restated, startup-probe", out.getvalue())
+        self.assertIn("2 of 4 cases are redundant", out.getvalue())
+
+        with patch.object(sys, "argv", argv + ["--distinct"]), redirect_stdout(io.StringIO()) as out:
+            self.assertEqual(main(), EXIT_OK)
+        self.assertEqual(out.getvalue().splitlines(), [self.cluster_ip, self.default])
+
+        with patch.object(sys, "argv", argv + [self.default, self.cluster_ip]), redirect_stdout(io.StringIO()) as out:
+            self.assertEqual(main(), EXIT_OK)
+        self.assertIn("All 2 cases render distinct manifests", out.getvalue())
+
+        with patch.object(sys, "argv", argv[:-2] + ["--helm", str(self.root / "missing")]), \
+                redirect_stdout(io.StringIO()) as out:
+            self.assertEqual(main(), EXIT_ERROR)
+
+    def test_scheduler_skips_equivalent_cases(self):
+        # The scheduler renders through the default .render-cache in the working directory.
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(self.root)
+        cases = [self.cluster_ip, self.default, self.restated, self.probe]
+        with redirect_stdout(io.StringIO()) as out:
+            self.assertEqual(skip_equivalent(cases, str(self.chart_dir), str(self.fake_helm)),
+                             [self.cluster_ip, self.default])
+        self.assertIn("Skipping startup-probe: renders the same manifests as default", out.getvalue())
+
+        # Without a working helm every case is still installed.
+        with redirect_stdout(io.StringIO()) as out:
+            self.assertEqual(skip_equivalent(cases, str(self.chart_dir), str(self.root / "missing")), cases)
+        self.assertIn("installing all of them", out.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
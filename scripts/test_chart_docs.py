@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Unit tests for chart_docs.py and the tracker's native README generation
+"""
+
+import io
+import os
+import sys
+import tempfile
+import textwrap
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+from unittest.mock import patch
+
+from chart_docs import (
+    EXIT_ERROR,
+    EXIT_OK,
+    EXIT_STALE,
+    ChartDocs,
+    UnsupportedChart,
+    discover_charts,
+    go_json,
+    main,
+    render_chart,
+    render_readme,
+    values_rows,
+)
+from chart_tracker import ChartTracker
+from git_backend import MemoryGitBackend
+from test_chart_tracker_integration import ChartRepoTestCase
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+CHART_YAML = "apiVersion: v2\nname: demo\nversion: 1.0.0-rc.1\nappVersion: \"2.0\"\ndescription: A demo chart\n"
+
+
+class TestRenderReadme(unittest.TestCase):
+
+    def test_zot_readme_matches_helm_docs(self):
+        chart = REPO_ROOT / "charts" / "zot"
+        self.assertEqual(render_chart(chart), (chart / "README.md").read_text())
+
+    def test_values_rows(self):
+        rows = values_rows(textwrap.dedent("""\
+            # Regular comments are not descriptions
+            replicaCount: 1
+            ratio: 1.0
+            half: 0.5
+            enabled: yes
+            empty:
+            # -- Pod annotations, rendered
+            # as given.
+            podAnnotations:
+              "prometheus.io/scrape": "true"
+            image:
+              # -- (string) Image tag
+              # @default -- the chart appVersion
+              tag: null
+              pullPolicy: IfNotPresent
+            hosts:
+              - host: a.example.com
+                paths: ["/"]
+            # -- Hidden
+            # @ignore
+            internal:
+              secret: x
+            html: "<b> & </b>"
+        """))
+        self.assertEqual(rows, [
+            ("empty", "string", "`nil`", ""),
+            ("enabled", "string", '`"yes"`', ""),
+            ("half", "float", "`0.5`", ""),
+            ("hosts[0].host", "string", '`"a.example.com"`', ""),
+            ("hosts[0].paths[0]", "string", '`"/"`', ""),
+            ("html", "string", '`"\\u003cb\\u003e \\u0026 \\u003c/b\\u003e"`', ""),
+            ("image.pullPolicy", "string", '`"IfNotPresent"`', ""),
+            ("image.tag", "string", "the chart appVersion", "Image tag"),
+            ("podAnnotations", "object", '`{"prometheus.io/scrape":"true"}`', "Pod annotations, rendered as given."),
+            ('podAnnotations."prometheus.io/scrape"', "string", '`"true"`', ""),
+            ("ratio", "float", "`1`", ""),
+            ("replicaCount", "int", "`1`", ""),
+        ])
+
+    def test_go_json(self):
+        self.assertEqual(go_json({"b": [1.0, None, True], "a": "é\n"}), '{"a":"é\\n","b":[1,null,true]}')
+
+    def test_chart_sections(self):
+        chart = CHART_YAML + textwrap.dedent("""\
+            type: application
+            home: https://example.com
+            kubeVersion: ">=1.25"
+            sources:
+              - https://github.com/example/demo
+            maintainers:
+              - name: Jo
+                email: jo@example.com
+            dependencies:
+              - name: redis
+                alias: cache
+                version: 1.2.3
+                repository: https://charts.example.com
+        """)
+        readme = render_readme(chart, "")
+        self.assertEqual(readme, textwrap.dedent("""\
+            # demo
+
+            ![Version: 1.0.0-rc.1](https://img.shields.io/badge/Version-1.0.0--rc.1-informational?style=flat-square) ![Type: application](https://img.shields.io/badge/Type-application-informational?style=flat-square) ![AppVersion: 2.0](https://img.shields.io/badge/AppVersion-2.0-informational?style=flat-square)
+
+            A demo chart
+
+            **Homepage:** <https://example.com>
+
+            ## Maintainers
+
+            | Name | Email | Url |
+            | ---- | ------ | --- |
+            | Jo | <jo@example.com> |  |
+
+            ## Source Code
+
+            * <https://github.com/example/demo>
+
+            ## Requirements
+
+            Kubernetes: `>=1.25`
+
+            | Repository | Name | Version |
+            |------------|------|---------|
+            | https://charts.example.com | cache(redis) | 1.2.3 |
+
+            ----------------------------------------------
+            Autogenerated from chart metadata using [helm-docs v1.14.2](https://github.com/norwoodj/helm-docs/releases/v1.14.2)
+        """))
+
+    def test_unsupported_and_invalid(self):
+        with self.assertRaises(UnsupportedChart):
+            values_rows("# -- Grouped\n# @section -- Networking\nport: 80\n")
+        with self.assertRaisesRegex(ValueError, "Invalid YAML"):
+            render_readme(CHART_YAML, "a: [\n")
+
+
+class TestChartDocs(unittest.TestCase):
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.test_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.test_dir.cleanup)
+        self.root = Path(self.test_dir.name)
+        self.charts_dir = self.root / "charts"
+        self.cache_file = self.root / "docs-cache.json"
+        self.charts = [self._chart("alpha"), self._chart("beta")]
+        # Vendored dependencies are not documented on their own.
+        self._chart("alpha/charts/vendored")
+
+    def _chart(self, name):
+        chart = self.charts_dir / name
+        chart.mkdir(parents=True)
+        (chart / "Chart.yaml").write_text(CHART_YAML.replace("name: demo", f"name: {Path(name).name}"))
+        (chart / "values.yaml").write_text("# -- Replicas\nreplicaCount: 1\n")
+        return chart.as_posix()
+
+    def test_update_only_renders_changed_charts(self):
+        self.assertEqual(discover_charts(self.charts_dir), self.charts)
+        docs = ChartDocs(cache_file=self.cache_file)
+        self.assertEqual(docs.update(self.charts), [f"{chart}/README.md" for chart in self.charts])
+        self.assertIn("| replicaCount | int | `1` | Replicas |", Path(self.charts[0], "README.md").read_text())
+        self.assertEqual(docs.rendered, 2)
+
+        docs = ChartDocs(cache_file=self.cache_file)
+        self.assertEqual(docs.update(self.charts), [])
+        self.assertEqual((docs.rendered, docs.cached), (0, 2))
+
+        Path(self.charts[1], "values.yaml").write_text("# -- Replicas\nreplicaCount: 3\n")
+        docs = ChartDocs(cache_file=self.cache_file)
+        self.assertEqual(docs.update(self.charts, dry_run=True), [f"{self.charts[1]}/README.md"])
+        self.assertEqual((docs.rendered, docs.cached), (1, 1))
+        self.assertIn("`1`", Path(self.charts[1], "README.md").read_text())
+
+        # A README edited by hand is regenerated even though Chart.yaml and values.yaml did not change.
+        Path(self.charts[0], "README.md").write_text("# edited\n")
+        self.assertEqual(docs.update(self.charts), [f"{chart}/README.md" for chart in self.charts])
+
+    def test_custom_template_is_unsupported(self):
+        Path(self.charts[1], "README.md.gotmpl").write_text("{{ template \"chart.header\" . }}\n")
+        with self.assertRaises(UnsupportedChart):
+            ChartDocs(cache_file="").update(self.charts)
+        self.assertFalse(Path(self.charts[0], "README.md").exists())
+
+    def test_main(self):
+        argv = ["chart_docs.py", "--chart-search-root", str(self.charts_dir), "--cache-file", str(self.cache_file)]
+        with patch.object(sys, "argv", argv + ["--check"]), redirect_stdout(io.StringIO()) as out:
+            self.assertEqual(main(), EXIT_STALE)
+        self.assertIn(f"Out of date: {self.charts[0]}/README.md", out.getvalue())
+
+        with patch.object(sys, "argv", argv), redirect_stdout(io.StringIO()) as out:
+            self.assertEqual(main(), EXIT_OK)
+        with patch.object(sys, "argv", argv + ["--check"]), redirect_stdout(io.StringIO()) as out:
+            self.assertEqual(main(), EXIT_OK)
+        self.assertIn("0 chart(s) rendered, 2 unchanged", out.getvalue())
+
+        with patch.object(sys, "argv", argv + ["--dry-run", self.charts[0]]), redirect_stdout(io.StringIO()) as out:
+            self.assertEqual(main(), EXIT_OK)
+        self.assertEqual(out.getvalue(), Path(self.charts[0], "README.md").read_text())
+
+        Path(self.charts[0], "values.yaml").write_text("a: [\n")
+        with patch.object(sys, "argv", argv), redirect_stdout(io.StringIO()) as out:
+            self.assertEqual(main(), EXIT_ERROR)
+        self.assertIn(f"Error: {self.charts[0]}: Invalid YAML", out.getvalue())
+
+
+class TestTrackerNativeDocs(ChartRepoTestCase):
+
+    def test_run_helm_docs_without_helm_docs(self):
+        os.chdir(self.repo_path)
+        tracker = ChartTracker(str(self.state_file), docs=ChartDocs(cache_file=""))
+        with redirect_stdout(io.StringIO()):
+            changed = tracker.run_helm_docs("charts")
+        self.assertEqual(changed, ["charts/test-chart-1/README.md", "charts/test-chart-2/README.md"])
+        self.assertNotIn("helm-docs", tracker.runner.timings)
+        self.assertTrue(self.chart1_readme.read_text().startswith("# test-chart-1\n"))
+
+        # A chart with its own template is left to helm-docs.
+        (self.chart2_dir / "README.md.gotmpl").write_text("custom\n")
+        with patch.object(tracker.runner, "run", wraps=tracker.runner.run) as run, \
+                redirect_stdout(io.StringIO()) as out:
+            tracker.run_helm_docs("charts")
+        self.assertEqual(run.call_args_list[0].args[0], ["helm-docs", "--chart-search-root", "charts"])
+        self.assertIn("Running helm-docs instead of the native generator", out.getvalue())
+
+    def test_check_docs_from_objects_reads_blobs(self):
+        repo = MemoryGitBackend()
+        chart_yaml = CHART_YAML.replace("name: demo", "name: zot")
+        repo.commit({
+            "charts/zot/Chart.yaml": chart_yaml,
+            "charts/zot/values.yaml": "replicaCount: 1\n",
+            "charts/zot/README.md": render_readme(chart_yaml, "replicaCount: 1\n"),
+            "charts/other/Chart.yaml": chart_yaml.replace("name: zot", "name: other"),
+            "charts/other/README.md": "# outdated\n",
+        })
+        tracker = ChartTracker("unused-tracker-state.json", git=repo, docs=ChartDocs(cache_file=""))
+        with patch("subprocess.run") as mock_run:
+            self.assertEqual(tracker.check_docs_from_objects(["charts/other", "charts/zot"], "HEAD"),
+                             ["charts/other"])
+        mock_run.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
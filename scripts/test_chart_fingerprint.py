@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Tests for chart_fingerprint.py and the tracker's fingerprint fallback
+"""
+
+import hashlib
+import io
+import os
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+from unittest.mock import patch
+
+import chart_fingerprint
+from chart_fingerprint import (
+    EXIT_CHANGED,
+    EXIT_OK,
+    ChartFingerprinter,
+    FingerprintStore,
+    changed_since_release,
+    diff_trees,
+    hash_file,
+    main,
+    merkle_tree,
+)
+from chart_tracker import ChartTracker, NULL_OID
+from test_chart_tracker_integration import ChartRepoTestCase
+
+
+class TestChartFingerprint(unittest.TestCase):
+
+    def setUp(self):
+        """Create charts/zot with a vendored dependency and a nested chart"""
+        self.test_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.test_dir.name)
+        self.original_cwd = os.getcwd()
+        os.chdir(self.root)
+        self._write("charts/zot/Chart.yaml", "apiVersion: v2\nname: zot\nversion: 0.1.0\n")
+        self._write("charts/zot/values.yaml", "replicaCount: 1\n")
+        self._write("charts/zot/templates/deployment.yaml", "kind: Deployment\n")
+        self._write("charts/zot/.helmignore", "*.bak\nci/\n")
+        self._write("charts/zot/charts/redis/Chart.yaml", "name: redis\nversion: 7.0.0\n")
+        self._write("charts/zot/extra/Chart.yaml", "name: extra\nversion: 0.1.0\n")
+        self._write("charts/other/Chart.yaml", "name: other\nversion: 1.0.0\n")
+
+    def tearDown(self):
+        os.chdir(self.original_cwd)
+        self.test_dir.cleanup()
+
+    def _write(self, path, content):
+        target = self.root / path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text(content)
+
+    def _fingerprints(self):
+        return {chart: tree[""] for chart, tree in ChartFingerprinter("charts").fingerprint_all().items()}
+
+    def test_merkle_tree(self):
+        tree = merkle_tree({"a.yaml": "1", "templates/x.yaml": "2", "templates/y.yaml": "3"})
+        self.assertEqual(sorted(tree), ["", "a.yaml", "templates", "templates/x.yaml", "templates/y.yaml"])
+        templates = hashlib.sha256(b"blob x.yaml 2\nblob y.yaml 3\n").hexdigest()
+        self.assertEqual(tree["templates"], templates)
+        self.assertEqual(tree[""], hashlib.sha256(f"blob a.yaml 1\ntree templates {templates}\n".encode()).hexdigest())
+
+    def test_diff_trees_reports_top_most_changes(self):
+        old = merkle_tree({"a.yaml": "1", "templates/x.yaml": "2", "templates/y.yaml": "3", "ci/v.yaml": "4"})
+        new = merkle_tree({"a.yaml": "1", "templates/x.yaml": "2", "templates/y.yaml": "5", "docs/d.md": "6"})
+        self.assertEqual(diff_trees(old, new), ["ci", "docs", "templates/y.yaml"])
+        self.assertEqual(diff_trees(old, old), [])
+
+    def test_roots_exclude_vendored_dependencies(self):
+        self.assertEqual(sorted(self._fingerprints()), ["charts/other", "charts/zot", "charts/zot/extra"])
+
+    def test_ignored_files_do_not_change_the_fingerprint(self):
+        before = self._fingerprints()
+        self._write("charts/zot/values.yaml.bak", "old\n")
+        self._write("charts/zot/ci/test-values.yaml", "a: 1\n")
+        self._write("charts/zot/templates/.editorconfig", "root = true\n")
+        self.assertEqual(self._fingerprints(), before)
+
+        self._write("charts/zot/templates/service.yaml", "kind: Service\n")
+        after = self._fingerprints()
+        self.assertNotEqual(after["charts/zot"], before["charts/zot"])
+        self.assertEqual(after["charts/other"], before["charts/other"])
+
+    def test_nested_chart_counts_for_its_parent(self):
+        before = self._fingerprints()
+        self._write("charts/zot/extra/values.yaml", "a: 1\n")
+        after = self._fingerprints()
+        self.assertNotEqual(after["charts/zot/extra"], before["charts/zot/extra"])
+        self.assertNotEqual(after["charts/zot"], before["charts/zot"])
+
+    def test_each_file_is_hashed_once(self):
+        with patch("chart_fingerprint.hash_file", side_effect=hash_file) as mock_hash:
+            ChartFingerprinter("charts").fingerprint_all()
+        hashed = [Path(call[0][0]).as_posix() for call in mock_hash.call_args_list]
+        self.assertEqual(len(hashed), len(set(hashed)))
+        self.assertIn("charts/zot/extra/Chart.yaml", hashed)
+        self.assertNotIn("charts/zot/values.yaml.bak", hashed)
+
+    def test_large_files_are_hashed_through_mmap(self):
+        archive = self.root / "charts/zot/charts/redis-7.0.0.tgz"
+        archive.write_bytes(os.urandom(4096))
+        with patch.object(chart_fingerprint, "MMAP_THRESHOLD", 1024), \
+                patch("chart_fingerprint.mmap.mmap", wraps=chart_fingerprint.mmap.mmap) as mock_mmap:
+            digest = hash_file(archive)
+            hash_file(self.root / "charts/zot/values.yaml")
+        self.assertEqual(digest, hashlib.sha256(archive.read_bytes()).hexdigest())
+        self.assertEqual(mock_mmap.call_count, 1)
+
+    def test_changed_since_release(self):
+        store = FingerprintStore(self.root / "store.json")
+        for chart, tree in ChartFingerprinter("charts").fingerprint_all().items():
+            store.record(chart, chart_fingerprint.chart_version(chart), tree)
+        store.save()
+
+        self._write("charts/zot/templates/deployment.yaml", "kind: Deployment\nspec: {}\n")
+        self._write("charts/new/Chart.yaml", "name: new\nversion: 0.0.1\n")
+        changes = changed_since_release(ChartFingerprinter("charts").fingerprint_all(),
+                                        FingerprintStore(self.root / "store.json"))
+        self.assertEqual(changes, [
+            {"chart": "charts/new", "version": "0.0.1", "released_version": None, "paths": []},
+            {"chart": "charts/zot", "version": "0.1.0", "released_version": "0.1.0",
+             "paths": ["templates/deployment.yaml"]},
+        ])
+
+    def test_main_record_and_changed(self):
+        def run(*args):
+            with patch.object(sys, "argv", ["chart_fingerprint.py", "--store", "store.json"] + list(args)), \
+                    redirect_stdout(io.StringIO()) as out:
+                return main(), out.getvalue()
+
+        self.assertEqual(run("changed")[0], EXIT_CHANGED)
+        self.assertEqual(run("record")[0], EXIT_OK)
+        self.assertEqual(run("changed"), (EXIT_OK, ""))
+
+        self._write("charts/other/values.yaml", "a: 1\n")
+        code, output = run("changed")
+        self.assertEqual(code, EXIT_CHANGED)
+        self.assertEqual(output, "charts/other: changed since 1.0.0 (values.yaml)\n")
+
+        code, output = run("show")
+        self.assertEqual(len(output.splitlines()), 3)
+
+
+class TestFingerprintFallback(ChartRepoTestCase):
+    """process falls back to released fingerprints when --since cannot be diffed"""
+
+    def setUp(self):
+        super().setUp()
+        os.chdir(self.repo_path)
+        self.store_path = self.repo_path / ".chart-fingerprints.json"
+        with redirect_stdout(io.StringIO()):
+            main_args = ["chart_fingerprint.py", "--store", str(self.store_path), "record"]
+            with patch.object(sys, "argv", main_args):
+                main()
+        self.tracker = ChartTracker(str(self.state_file), fingerprints=FingerprintStore(self.store_path))
+
+    def _process(self, since):
+        with patch.object(self.tracker, "run_helm_docs", return_value=[]), redirect_stdout(io.StringIO()) as out:
+            self.tracker.process_all_changes(since)
+        return out.getvalue()
+
+    def test_zero_since_uses_fingerprints(self):
+        self._modify_chart('charts/test-chart-1/values.yaml', {'replicaCount: 1': 'replicaCount: 2'})
+        self._modify_chart('charts/test-chart-2/values.yaml', {'replicaCount: 1': 'replicaCount: 3'})
+        self._modify_chart('charts/test-chart-2/Chart.yaml', {'version: 2.0.0': 'version: 2.0.1'})
+        self._commit_changes('Change both charts')
+
+        output = self._process(NULL_OID)
+        self.assertIn("comparing charts with their last released fingerprints", output)
+        self.assertEqual(self.tracker.state["charts_to_bump"], ["charts/test-chart-1"])
+
+    def test_force_pushed_since_uses_fingerprints(self):
+        self._modify_chart('charts/test-chart-1/values.yaml', {'replicaCount: 1': 'replicaCount: 2'})
+        self._commit_changes('Change chart 1')
+        self._process("1234567890abcdef1234567890abcdef12345678")
+        self.assertEqual(self.tracker.state["charts_to_bump"], ["charts/test-chart-1"])
+
+    def test_usable_since_keeps_git_range(self):
+        self._modify_chart('charts/test-chart-2/values.yaml', {'replicaCount: 1': 'replicaCount: 3'})
+        self._commit_changes('Change chart 2')
+        # The range wins over the store, which would also report chart 2.
+        self._modify_chart('charts/test-chart-1/values.yaml', {'replicaCount: 1': 'replicaCount: 2'})
+        self._process("HEAD")
+        self.assertEqual(self.tracker.state["charts_to_bump"], [])
+
+    def test_zero_since_in_ensure_history(self):
+        with patch("chart_tracker.ensure_revisions") as mock_ensure:
+            self.tracker.ensure_history([NULL_OID], until="HEAD")
+        mock_ensure.assert_called_once_with(["HEAD"], remote="origin", cwd=None, runner=self.tracker.runner)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Tests for chart_fleet.py and `chart_tracker.py fleet`
+"""
+
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import textwrap
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+from unittest.mock import patch
+
+import chart_docs
+from chart_docs import ChartDocs, render_chart
+from chart_fleet import Fleet, format_report, load_manifest
+from chart_tracker import EXIT_ERROR, EXIT_NO_BUMP, ChartTracker
+from chart_tracker import main as tracker_main
+from command_runner import CommandRunner
+from test_chart_tracker_integration import ChartRepoTestCase
+
+
+class TestChartFleet(ChartRepoTestCase):
+
+    def setUp(self):
+        """A repository with a chart 1 change and a fork with a bumped chart 2 change on top"""
+        super().setUp()
+        for chart in (self.chart1_dir, self.chart2_dir):
+            (chart / "README.md").write_text(render_chart(chart))
+        self._commit_all('Generate READMEs')
+        self._modify_chart('charts/test-chart-1/values.yaml', {'replicaCount: 1': 'replicaCount: 2'})
+        (self.chart1_dir / "README.md").write_text(render_chart(self.chart1_dir))
+        self._commit_all('Change chart 1')
+
+        self.fleet_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.fleet_dir.cleanup)
+        self.root = Path(self.fleet_dir.name)
+        self.fork_path = self.root / "forks" / "fork"
+        self._run_git(['clone', '-q', str(self.repo_path), str(self.fork_path)], cwd=self.root)
+        for key, value in (('user.name', 'Test User'), ('user.email', 'test@example.com'),
+                           ('commit.gpgsign', 'false')):
+            self._run_git(['config', key, value], cwd=self.fork_path)
+
+        fork_chart2 = self.fork_path / "charts" / "test-chart-2"
+        (fork_chart2 / "values.yaml").write_text((fork_chart2 / "values.yaml").read_text()
+                                                 .replace("replicaCount: 1", "replicaCount: 3"))
+        (fork_chart2 / "Chart.yaml").write_text((fork_chart2 / "Chart.yaml").read_text()
+                                                .replace("version: 2.0.0", "version: 2.0.1"))
+        (fork_chart2 / "README.md").write_text(render_chart(fork_chart2))
+        self._commit_all('Change and bump chart 2', cwd=self.fork_path)
+
+        self.manifest = self.root / "fleet.yaml"
+        self.manifest.write_text(textwrap.dedent(f"""\
+            repositories:
+              - path: {self.repo_path}
+                name: upstream
+                since: HEAD~1
+              - path: forks/fork
+                since: [HEAD~1, HEAD~2]
+        """))
+        # Neither working tree is used: run from outside both repositories.
+        os.chdir(self.root)
+
+    def _commit_all(self, message, cwd=None):
+        self._run_git(['add', '-A'], cwd=cwd)
+        self._run_git(['commit', '-q', '-m', message], cwd=cwd)
+
+    def _fleet(self, *args):
+        argv = ['chart_tracker.py', '--state-file', str(self.state_file), 'fleet',
+                '--manifest', str(self.manifest)] + list(args)
+        with patch.object(sys, 'argv', argv), redirect_stdout(io.StringIO()) as out:
+            code = tracker_main()
+        return code, out.getvalue()
+
+    def test_fleet_reports_every_repository(self):
+        code, out = self._fleet('--output', 'json', '--jobs', '2')
+        self.assertEqual(code, EXIT_NO_BUMP)
+        report = json.loads(out)
+        self.assertEqual((report["charts_to_bump"], report["failed"]), (2, 0))
+        upstream, fork = report["repositories"]
+        self.assertEqual((upstream["name"], fork["name"]), ("upstream", "fork"))
+        self.assertEqual(fork["path"], str(self.fork_path.resolve()))
+        self.assertEqual([plan["charts_to_bump"] for plan in upstream["plans"]], [["charts/test-chart-1"]])
+        self.assertEqual([(plan["since"], plan["changed_charts"], plan["charts_to_bump"]) for plan in fork["plans"]], [
+            ("HEAD~1", ["charts/test-chart-2"], []),
+            ("HEAD~2", ["charts/test-chart-1", "charts/test-chart-2"], ["charts/test-chart-1"]),
+        ])
+        for repo in (self.repo_path, self.fork_path):
+            self.assertEqual(self._run_git(['status', '--porcelain'], cwd=repo).stdout, "")
+        self.assertFalse(self.state_file.exists())
+
+    def test_failed_repository_does_not_stop_the_others(self):
+        with open(self.manifest, 'a') as f:
+            f.write("  - path: forks/fork\n    name: stale\n    since: no-such-branch\n"
+                    "  - path: missing\n    since: HEAD~1\n")
+        code, out = self._fleet()
+        self.assertEqual(code, EXIT_ERROR)
+        self.assertIn("Fleet bump plans: 4 repositories, 2 chart(s) to bump, 2 failed", out)
+        self.assertIn("  HEAD~2..HEAD:\n    - charts/test-chart-1\n", out)
+        self.assertIn("  HEAD~1..HEAD:\n    No charts to bump\n", out)
+        self.assertIn("  Error: Unknown revision no-such-branch\n", out)
+        self.assertIn(f"  Error: {self.root.resolve() / 'missing'} is not a git repository\n", out)
+
+    def test_repositories_share_caches(self):
+        runner = CommandRunner(resolve_executables=True)
+        tracker = ChartTracker(str(self.state_file), runner=runner, docs=ChartDocs(cache_file=""))
+        fleet = Fleet(tracker, load_manifest(self.manifest), jobs=2)
+        with patch('chart_docs.render_readme', wraps=chart_docs.render_readme) as render, \
+                patch('shutil.which', wraps=shutil.which) as which, redirect_stdout(io.StringIO()) as out:
+            report = fleet.run()
+        self.assertEqual(out.getvalue(), "")
+        self.assertEqual(format_report(report)[0], "Fleet bump plans: 2 repositories, 2 chart(s) to bump, 0 failed")
+        # Chart 1 is the same in both repositories, so four READMEs take three renders.
+        self.assertEqual(render.call_count, 3)
+        self.assertEqual([call.args[0] for call in which.call_args_list], ["git"])
+        self.assertNotIn("helm-docs", runner.timings)
+
+        with redirect_stdout(io.StringIO()) as out:
+            fleet.run(verbose=True)
+        self.assertEqual(render.call_count, 3)
+        self.assertIn("== upstream (", out.getvalue())
+
+    def test_load_manifest(self):
+        upstream, fork = load_manifest(self.manifest)
+        self.assertEqual(upstream, {"name": "upstream", "path": str(self.repo_path.resolve()), "since": ["HEAD~1"],
+                                    "commit": "HEAD", "charts_dir": "charts"})
+        self.assertEqual(fork["name"], "fork")
+
+        for content, message in (
+                ("repositories: []\n", "has no repositories list"),
+                ("repositories:\n  - since: HEAD\n", "Repository 1 .* has no path"),
+                ("repositories:\n  - path: a\n", "Repository 1 .* needs at least one since revision"),
+                ("repositories:\n  - {path: a, since: x}\n  - {path: b/a, since: x}\n", "appears twice"),
+                ("repositories: [\n", "Invalid fleet manifest")):
+            self.manifest.write_text(content)
+            with self.assertRaisesRegex(ValueError, message):
+                load_manifest(self.manifest)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
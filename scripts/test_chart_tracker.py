@@ -4,11 +4,13 @@ Unit tests for ChartTracker class
 """
 
 import unittest
+import io
 import os
 import sys
 import tempfile
 import json
 import subprocess
+from contextlib import redirect_stdout
 from pathlib import Path
 from unittest.mock import patch
 
@@ -20,15 +22,24 @@ from chart_tracker import (
     EXIT_NO_BUMP,
     main,
 )
+from command_runner import DEFAULT_TIMEOUT
+from git_backend import MemoryGitBackend
+
+
+def chart_yaml(name, version, description="Test chart"):
+    return f"apiVersion: v2\ndescription: {description}\nname: {name}\nversion: {version}\n"
 
 
 class TestChartTracker(unittest.TestCase):
 
     def setUp(self):
-        """Set up test fixtures"""
+        """Set up test fixtures: committed content comes from an in-memory repository with two charts"""
         self.test_dir = tempfile.TemporaryDirectory()
         self.state_file = Path(self.test_dir.name) / "test-tracker.json"
-        self.tracker = ChartTracker(str(self.state_file))
+        self.repo = MemoryGitBackend()
+        self.repo.commit({"charts/test1/Chart.yaml": chart_yaml("test1", "1.2.3"),
+                          "charts/test2/Chart.yaml": chart_yaml("test2", "0.1.0")})
+        self.tracker = ChartTracker(str(self.state_file), git=self.repo)
 
     def tearDown(self):
         """Clean up test fixtures"""
@@ -169,8 +180,10 @@ class TestChartTracker(unittest.TestCase):
 
         # Verify both commands were called
         self.assertEqual(mock_run.call_count, 2)
-        mock_run.assert_any_call(["helm-docs", "--chart-search-root", "charts"], capture_output=True, text=True, check=True)
-        mock_run.assert_any_call(["git", "status", "--porcelain", "charts/*/README.md"], capture_output=True, text=True)
+        mock_run.assert_any_call(["helm-docs", "--chart-search-root", "charts"], capture_output=True, text=True,
+                                 check=True, timeout=DEFAULT_TIMEOUT)
+        mock_run.assert_any_call(["git", "status", "--porcelain", "charts/*/README.md"], capture_output=True, text=True,
+                                 check=False, timeout=DEFAULT_TIMEOUT)
 
     @patch('subprocess.run')
     def test_run_helm_docs_failure(self, mock_run):
@@ -181,35 +194,24 @@ class TestChartTracker(unittest.TestCase):
         result = self.tracker.run_helm_docs()
         self.assertEqual(result, [])
 
-    @patch('subprocess.run')
-    def test_get_changed_charts_from_git_success(self, mock_run):
+    def test_get_changed_charts_from_git_success(self):
         """Test successful git-based chart detection"""
-        # Mock successful git diff operation
-        mock_run.return_value = type('MockResult', (), {
-            'returncode': 0,
-            'stdout': 'charts/test1/Chart.yaml\ncharts/test2/templates/deployment.yaml\n'
-        })()
+        self.repo.commit({"charts/test1/Chart.yaml": chart_yaml("test1", "1.2.4"),
+                          "charts/test2/templates/deployment.yaml": "kind: Deployment\n",
+                          "README.md": "top-level files belong to no chart\n"})
 
-        with patch.object(ChartTracker, '_discover_chart_dirs', return_value={"charts/test1", "charts/test2"}):
+        with patch('builtins.print'):
             result = self.tracker.get_changed_charts_from_git("HEAD~1")
         self.assertEqual(result, ["charts/test1", "charts/test2"])
+        # Everything was read from the backend: no process was started.
+        self.assertEqual(self.tracker.runner.timings, {})
 
-        # Verify git diff was called with correct parameters
-        mock_run.assert_called_once_with(
-            ['git', 'diff', 'HEAD~1..HEAD', '--name-only'],
-            capture_output=True,
-            text=True
-        )
-
-    @patch('subprocess.run')
-    def test_get_changed_charts_from_git_failure(self, mock_run):
+    def test_get_changed_charts_from_git_failure(self):
         """Test git-based chart detection failure"""
-        # Mock failed git run
-        mock_run.side_effect = subprocess.CalledProcessError(1, "git")
-
-        with patch.object(ChartTracker, '_discover_chart_dirs', return_value={"charts/test1"}):
-            result = self.tracker.get_changed_charts_from_git("HEAD~1")
+        with patch('builtins.print') as mock_print:
+            result = self.tracker.get_changed_charts_from_git("no-such-commit")
         self.assertEqual(result, [])
+        self.assertTrue(mock_print.call_args[0][0].startswith("Error getting changed charts:"))
 
     def test_discover_chart_dirs_excludes_vendored_dependency(self):
         """Vendored Helm deps live at charts/<chart>/charts/<dep>/Chart.yaml — not bump roots."""
@@ -241,20 +243,27 @@ class TestChartTracker(unittest.TestCase):
         bar_root = str((charts / "foo" / "bar").resolve())
         self.assertIn(bar_root, discovered)
 
-    @patch('subprocess.run')
-    def test_get_changed_charts_prefers_longest_chart_root_prefix(self, mock_run):
+    def test_get_changed_charts_prefers_longest_chart_root_prefix(self):
         """Changed files map to the deepest matching chart root (nested charts)."""
-        mock_run.return_value = type('MockResult', (), {
-            'returncode': 0,
-            'stdout': 'charts/parent/subk/templates/deploy.yaml\n'
-        })()
+        self.repo.commit({"charts/parent/Chart.yaml": chart_yaml("parent", "1.0.0"),
+                          "charts/parent/subk/Chart.yaml": chart_yaml("subk", "1.0.0")})
+        self.repo.commit({"charts/parent/subk/templates/deploy.yaml": "kind: Deployment\n"})
 
-        roots = {"charts/parent", "charts/parent/subk"}
-        with patch.object(ChartTracker, '_discover_chart_dirs', return_value=roots):
-            result = self.tracker.get_changed_charts_from_git("HEAD~1")
+        result = self.tracker.get_changed_charts_from_git("HEAD~1")
 
         self.assertEqual(result, ["charts/parent/subk"])
 
+    def test_get_changed_charts_discovers_roots_at_until(self):
+        """Chart roots come from the tree at the end of the range, excluding vendored dependencies"""
+        self.repo.commit({"charts/test1/charts/redis/Chart.yaml": chart_yaml("redis", "17.0.0"),
+                          "charts/test3/Chart.yaml": chart_yaml("test3", "0.1.0")})
+        self.assertEqual(self.tracker._discover_chart_dirs_at("HEAD"),
+                         {"charts/test1", "charts/test2", "charts/test3"})
+
+        with patch('builtins.print'):
+            result = self.tracker.get_changed_charts_from_git("HEAD~1")
+        self.assertEqual(result, ["charts/test1", "charts/test3"])
+
     @patch.object(sys, 'argv', ['chart_tracker.py'])
     def test_main_no_subcommand_returns_exit_error(self):
         """Missing process/cleanup must return EXIT_ERROR (CI treats EXIT_BUMPED specially)."""
@@ -388,83 +397,56 @@ class TestChartTracker(unittest.TestCase):
         self.assertEqual(len(self.tracker.state["charts_to_bump"]), 1)
         self.assertEqual(self.tracker.state["charts_to_bump"], ["charts/test1"])
 
-    @patch('subprocess.run')
-    def test_check_version_bumps_in_commits_with_version_change(self, mock_run):
+    def test_check_version_bumps_in_commits_with_version_change(self):
         """Test check_version_bumps_in_commits detects version changes"""
-        # Mock git diff showing version change
-        mock_run.return_value.stdout = """
-diff --git a/charts/test1/Chart.yaml b/charts/test1/Chart.yaml
-index 1234567..abcdefg 100644
---- a/charts/test1/Chart.yaml
-+++ b/charts/test1/Chart.yaml
-@@ -5,7 +5,7 @@ description: Test chart
- name: test1
- type: application
--version: 1.2.3
-+version: 1.2.4
-"""
-
-        # Create a temporary chart directory and Chart.yaml for the test
-        test_chart_dir = Path(self.test_dir.name) / "charts" / "test1"
-        test_chart_dir.mkdir(parents=True)
-        test_chart_yaml = test_chart_dir / "Chart.yaml"
-        test_chart_yaml.write_text("version: 1.2.3")
+        self.repo.commit({"charts/test1/Chart.yaml": chart_yaml("test1", "1.2.4")})
 
-        charts = [str(test_chart_dir)]
-        result = self.tracker.check_version_bumps_in_commits(charts, "HEAD~1")
+        with patch('builtins.print') as mock_print:
+            result = self.tracker.check_version_bumps_in_commits(["charts/test1", "charts/test2"], "HEAD~1")
 
-        self.assertEqual(result, [str(test_chart_dir)])
-        mock_run.assert_called_with(
-            ["git", "diff", "HEAD~1..HEAD", "--", str(test_chart_yaml)],
-            capture_output=True,
-            text=True,
-            check=True
-        )
+        self.assertEqual(result, ["charts/test1"])
+        calls = [call[0][0] for call in mock_print.call_args_list]
+        self.assertEqual(calls, ["Version already bumped in commits for: charts/test1",
+                                 "No changes to Chart.yaml in commits for: charts/test2"])
 
-    @patch('subprocess.run')
-    def test_check_version_bumps_in_commits_without_version_change(self, mock_run):
+    def test_check_version_bumps_in_commits_without_version_change(self):
         """Test check_version_bumps_in_commits when no version change"""
-        # Mock git diff showing other changes but no version change
-        mock_run.return_value.stdout = """
-diff --git a/charts/test1/Chart.yaml b/charts/test1/Chart.yaml
-index 1234567..abcdefg 100644
---- a/charts/test1/Chart.yaml
-+++ b/charts/test1/Chart.yaml
-@@ -2,7 +2,7 @@ apiVersion: v2
- appVersion: "1.0.0"
--description: Old description
-+description: New description
- name: test1
- type: application
- version: 1.2.3
-"""
+        self.repo.commit({"charts/test1/Chart.yaml": chart_yaml("test1", "1.2.3", description="New description")})
 
-        charts = ["charts/test1"]
-        result = self.tracker.check_version_bumps_in_commits(charts, "HEAD~1")
+        with patch('builtins.print') as mock_print:
+            result = self.tracker.check_version_bumps_in_commits(["charts/test1"], "HEAD~1")
 
         self.assertEqual(result, [])
+        mock_print.assert_called_once_with("No version bump found in commits for: charts/test1")
 
-    @patch('subprocess.run')
-    def test_check_version_bumps_in_commits_no_changes(self, mock_run):
+    def test_check_version_bumps_in_commits_no_changes(self):
         """Test check_version_bumps_in_commits when no changes to Chart.yaml"""
-        # Mock git diff with no output
-        mock_run.return_value.stdout = ""
+        self.repo.commit({"charts/test1/values.yaml": "replicaCount: 2\n"})
 
-        charts = ["charts/test1"]
-        result = self.tracker.check_version_bumps_in_commits(charts, "HEAD~1")
+        with patch('builtins.print'):
+            result = self.tracker.check_version_bumps_in_commits(["charts/test1"], "HEAD~1")
 
         self.assertEqual(result, [])
 
-    @patch('subprocess.run')
-    def test_check_version_bumps_in_commits_git_error(self, mock_run):
-        """Test check_version_bumps_in_commits handles git errors"""
-        # Mock git command failure
-        mock_run.side_effect = subprocess.CalledProcessError(1, "git")
+    def test_check_version_bumps_in_commits_new_and_deleted_charts(self):
+        """A new chart has no earlier version to compare; a deleted chart is skipped"""
+        self.repo.commit({"charts/test3/Chart.yaml": chart_yaml("test3", "0.1.0")}, remove=["charts/test2"])
 
-        charts = ["charts/test1"]
-        result = self.tracker.check_version_bumps_in_commits(charts, "HEAD~1")
+        with patch('builtins.print') as mock_print:
+            result = self.tracker.check_version_bumps_in_commits(["charts/test2", "charts/test3"], "HEAD~1")
 
         self.assertEqual(result, [])
+        mock_print.assert_called_once_with("No version bump found in commits for: charts/test3")
+
+    def test_check_version_bumps_in_commits_git_error(self):
+        """Test check_version_bumps_in_commits handles git errors"""
+        error = RuntimeError("git cat-file --batch exited unexpectedly")
+        with patch.object(self.repo, 'read_file', side_effect=error), patch('builtins.print') as mock_print:
+            result = self.tracker.check_version_bumps_in_commits(["charts/test1"], "HEAD~1")
+
+        self.assertEqual(result, [])
+        mock_print.assert_called_once_with(
+            "Error reading charts/test1/Chart.yaml: git cat-file --batch exited unexpectedly")
 
     @patch.object(ChartTracker, 'get_changed_charts_from_git')
     @patch.object(ChartTracker, 'run_helm_docs')
@@ -529,6 +511,151 @@ index 1234567..abcdefg 100644
         self.assertEqual(self.tracker.state["charts_to_bump"], [])
 
 
+class TestChartTrackerEvents(unittest.TestCase):
+    """Machine-readable events emitted for --output ndjson"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.test_dir = tempfile.TemporaryDirectory()
+        self.state_file = Path(self.test_dir.name) / "test-tracker.json"
+        self.events = []
+        self.repo = MemoryGitBackend()
+        self.repo.commit({"charts/a/Chart.yaml": chart_yaml("a", "1.2.3"),
+                          "charts/b/Chart.yaml": chart_yaml("b", "1.0.0")})
+        self.tracker = ChartTracker(str(self.state_file), git=self.repo,
+                                    events=lambda event, **fields: self.events.append(dict(event=event, **fields)))
+
+    def tearDown(self):
+        """Clean up test fixtures"""
+        self.test_dir.cleanup()
+
+    def _events(self, name):
+        return [e for e in self.events if e["event"] == name]
+
+    def test_no_sink_emits_nothing(self):
+        tracker = ChartTracker(str(self.state_file))
+        tracker._emit("anything", x=1)  # must not raise
+
+    def test_discovery_and_changed_file_batches(self):
+        self.repo.commit({"charts/b/values.yaml": "x: 1\n", "charts/a/Chart.yaml": chart_yaml("a", "1.2.4"),
+                          "charts/b/templates/x.yaml": "kind: ConfigMap\n", "README.md": "hello\n"})
+
+        self.tracker.get_changed_charts_from_git("HEAD~1")
+
+        self.assertEqual([e["chart"] for e in self._events("chart_discovered")], ["charts/a", "charts/b"])
+        self.assertEqual(self._events("changed_files"), [
+            {"event": "changed_files", "since": "HEAD~1", "chart": "charts/a",
+             "files": ["charts/a/Chart.yaml"]},
+            {"event": "changed_files", "since": "HEAD~1", "chart": "charts/b",
+             "files": ["charts/b/templates/x.yaml", "charts/b/values.yaml"]},
+        ])
+
+    def test_existing_bump_event(self):
+        self.repo.commit({"charts/a/Chart.yaml": chart_yaml("a", "1.2.4")})
+
+        with patch('builtins.print'):
+            self.tracker.check_version_bumps_in_commits(["charts/a"], "HEAD~1")
+        self.assertEqual(self._events("existing_bump"), [
+            {"event": "existing_bump", "chart": "charts/a", "old_version": "1.2.3", "new_version": "1.2.4"}
+        ])
+
+    def test_doc_changed_events(self):
+        self.tracker.add_charts_from_docs(["charts/a/README.md", "charts/b/README.md", "charts/c/values.yaml"],
+                                          skip_chart_paths=["charts/a"])
+        self.assertEqual(self._events("doc_changed"), [
+            {"event": "doc_changed", "path": "charts/a/README.md", "chart": "charts/a", "skipped": True},
+            {"event": "doc_changed", "path": "charts/b/README.md", "chart": "charts/b", "skipped": False},
+        ])
+
+    def test_bump_result_events(self):
+        chart_dir = Path(self.test_dir.name) / "charts" / "ok"
+        chart_dir.mkdir(parents=True)
+        (chart_dir / "Chart.yaml").write_text("name: ok\nversion: 1.0.0\n")
+        self.tracker.add_chart(str(chart_dir))
+        self.tracker.add_chart(str(Path(self.test_dir.name) / "charts" / "missing"))
+
+        with patch('builtins.print'):
+            self.tracker.bump_chart_versions()
+        results = self._events("bump_result")
+        self.assertEqual(results[0], {"event": "bump_result", "chart": str(chart_dir), "ok": True, "version": "1.0.1"})
+        self.assertFalse(results[1]["ok"])
+
+    @patch.object(ChartTracker, 'get_changed_charts_from_git', return_value=[])
+    @patch.object(ChartTracker, 'run_helm_docs', return_value=[])
+    def test_main_ndjson_keeps_stdout_machine_readable(self, mock_helm_docs, mock_changed):
+        """stdout carries only JSON events; human-readable text goes to stderr"""
+        argv = ['chart_tracker.py', '--state-file', str(self.state_file),
+                'process', '--since', 'HEAD~1', '--output', 'ndjson']
+        stdout, stderr = io.StringIO(), io.StringIO()
+        with patch.object(sys, 'argv', argv), patch.object(sys, 'stdout', stdout), patch.object(sys, 'stderr', stderr):
+            self.assertEqual(main(), EXIT_NO_BUMP)
+
+        events = [json.loads(line) for line in stdout.getvalue().splitlines()]
+        self.assertEqual(events, [{"event": "summary", "charts_to_bump": [], "exit_code": EXIT_NO_BUMP}])
+        self.assertIn("No charts need version bumps", stderr.getvalue())
+
+
+class TestProcessInMemory(unittest.TestCase):
+    """process_all_changes scenarios against MemoryGitBackend: no repository, no git subprocesses"""
+
+    def setUp(self):
+        self.test_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.test_dir.cleanup)
+        self.repo = MemoryGitBackend()
+        self.repo.commit({
+            "charts/zot/Chart.yaml": chart_yaml("zot", "1.0.0"),
+            "charts/zot/values.yaml": "replicas: 1\n",
+            "charts/zot/charts/redis/Chart.yaml": chart_yaml("redis", "7.0.0"),
+            "charts/other/Chart.yaml": chart_yaml("other", "2.0.0"),
+        })
+        self.tracker = ChartTracker(str(Path(self.test_dir.name) / "state.json"), git=self.repo)
+        # README generation works on the working tree; it is covered by the helm-docs tests.
+        patcher = patch.object(self.tracker, "run_helm_docs", return_value=[])
+        self.run_helm_docs = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _process(self, since):
+        with redirect_stdout(io.StringIO()) as out:
+            result = self.tracker.process_all_changes(since)
+        return result, out.getvalue()
+
+    def test_unbumped_change_is_queued(self):
+        self.repo.commit({"charts/zot/values.yaml": "replicas: 2\n"})
+        result, out = self._process("HEAD~1")
+        self.assertTrue(result)
+        self.assertEqual(self.tracker.state["charts_to_bump"], ["charts/zot"])
+        self.assertIn("No changes to Chart.yaml in commits for: charts/zot", out)
+        self.assertEqual(self.tracker.runner.timings, {})
+
+    def test_mixed_bumps_over_several_commits(self):
+        self.repo.commit({"charts/zot/Chart.yaml": chart_yaml("zot", "1.0.0", description="Updated")})
+        self.repo.commit({"charts/zot/Chart.yaml": chart_yaml("zot", "1.0.1", description="Updated")})
+        self.repo.commit({"charts/other/Chart.yaml": chart_yaml("other", "2.0.0", description="Updated")})
+        result, out = self._process("HEAD~3")
+        self.assertTrue(result)
+        self.assertEqual(self.tracker.state["charts_to_bump"], ["charts/other"])
+        self.assertIn("Version already bumped in commits for: charts/zot", out)
+
+    def test_vendored_dependency_change_belongs_to_parent(self):
+        self.repo.commit({"charts/zot/Chart.yaml": chart_yaml("zot", "1.0.1"),
+                          "charts/zot/charts/redis/values.yaml": "a: 1\n"})
+        result, out = self._process("HEAD~1")
+        self.assertFalse(result)
+        self.assertIn("All changed charts already have version bumps in commits", out)
+
+    def test_docs_of_bumped_chart_are_not_queued_again(self):
+        self.repo.commit({"charts/zot/Chart.yaml": chart_yaml("zot", "1.0.1")})
+        self.run_helm_docs.return_value = ["charts/zot/README.md", "charts/other/README.md"]
+        result, _ = self._process("HEAD~1")
+        self.assertTrue(result)
+        self.assertEqual(self.tracker.state["charts_to_bump"], ["charts/other"])
+
+    def test_unknown_since_finds_nothing(self):
+        result, out = self._process("no-such-commit")
+        self.assertFalse(result)
+        self.assertIn("Error getting changed charts:", out)
+
+
 class TestChartTrackerIntegration(unittest.TestCase):
     """Integration tests for ChartTracker"""
 
@@ -3,18 +3,38 @@
 Integration tests for chart_tracker.py using real git repositories
 """
 
+import json
 import os
+import shutil
 import sys
 import tempfile
+import textwrap
+import time
 import unittest
 import subprocess
 from pathlib import Path
-
-from chart_tracker import ChartTracker
+from unittest.mock import patch
+
+from chart_docs import render_chart
+from chart_tracker import ChartTracker, EXIT_MISSING_BUMP, main
+from git_objects import GitBlobReader, prefetch_missing
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+# Wall-clock budget for `chart_tracker.py precommit` (best of several runs).
+PRECOMMIT_BUDGET_MS = float(os.environ.get("CHART_TRACKER_PRECOMMIT_BUDGET_MS", "100"))
+
+# Fake `helm-docs --dry-run`: the "generated" README is the chart directory name plus its values.yaml.
+FAKE_HELM_DOCS = textwrap.dedent("""\
+    #!{python}
+    import os, sys
+    chart = sys.argv[sys.argv.index("--chart-search-root") + 1]
+    print("# " + os.path.basename(chart))
+    print(open(os.path.join(chart, "values.yaml")).read())
+""")
 
 
-class TestChartTrackerGitIntegration(unittest.TestCase):
-    """Integration tests using real git repositories"""
+class ChartRepoTestCase(unittest.TestCase):
+    """Base class providing a temporary git repository with two test charts"""
 
     def setUp(self):
         """Set up a temporary git repository with test charts"""
@@ -193,6 +213,15 @@ validate-maintainers: false
         self._run_git(['add', '.'])
         self._run_git(['commit', '-m', message])
 
+    def _write_native_readmes(self):
+        """Write the READMEs the native docs generator renders, so that `process` leaves them as they are"""
+        for chart_dir in (self.chart1_dir, self.chart2_dir):
+            (chart_dir / "README.md").write_text(render_chart(chart_dir))
+
+
+class TestChartTrackerGitIntegration(ChartRepoTestCase):
+    """Integration tests using real git repositories"""
+
     def test_basic_chart_detection(self):
         """Test basic chart detection with chart tracker using real git operations"""
         # Create a feature branch and modify a chart
@@ -553,5 +582,260 @@ version: 16.0.0
         self.assertNotIn('charts/test-chart-1', self.tracker.state["charts_to_bump"])
 
 
+class TestNdjsonOutput(ChartRepoTestCase):
+    """`process --output ndjson` against a real repository"""
+
+    def test_process_streams_events(self):
+        self._create_branch('feature-branch')
+        self._modify_chart('charts/test-chart-1/values.yaml', {'replicaCount: 1': 'replicaCount: 2'})
+        self._modify_chart('charts/test-chart-2/Chart.yaml', {'version: 2.0.0': 'version: 2.0.1'})
+        self._commit_changes('Change chart1 values, bump chart2')
+
+        result = subprocess.run(
+            [sys.executable, str(SCRIPTS_DIR / 'chart_tracker.py'), 'process', '--since', 'HEAD~1', '--output', 'ndjson'],
+            cwd=self.repo_path, capture_output=True, text=True
+        )
+        self.assertEqual(result.returncode, 1, result.stderr)
+        events = [json.loads(line) for line in result.stdout.splitlines()]
+        by_type = {}
+        for event in events:
+            by_type.setdefault(event['event'], []).append(event)
+
+        self.assertEqual([e['chart'] for e in by_type['chart_discovered']],
+                         ['charts/test-chart-1', 'charts/test-chart-2'])
+        self.assertEqual({e['chart'] for e in by_type['changed_files']},
+                         {'charts/test-chart-1', 'charts/test-chart-2'})
+        self.assertEqual(by_type['existing_bump'][0]['chart'], 'charts/test-chart-2')
+        self.assertEqual(by_type['bump_result'],
+                         [{'event': 'bump_result', 'chart': 'charts/test-chart-1', 'ok': True, 'version': '1.0.1'}])
+        self.assertEqual(events[-1], {'event': 'summary', 'charts_to_bump': ['charts/test-chart-1'], 'exit_code': 1})
+        self.assertIn('Bumped version for: charts/test-chart-1', result.stderr)
+
+
+class TestMultiRangePlanning(ChartRepoTestCase):
+    """`process` with several --since ranges plans every range in one run"""
+
+    def setUp(self):
+        super().setUp()
+        os.chdir(self.repo_path)
+        self._create_branch('feature-branch')
+        # HEAD~1: bump chart1; HEAD: change chart1 values without another bump
+        self._modify_chart('charts/test-chart-1/Chart.yaml', {'version: 1.0.0': 'version: 1.0.1'})
+        self._commit_changes('Bump chart1')
+        self._modify_chart('charts/test-chart-1/values.yaml', {'replicaCount: 1': 'replicaCount: 2'})
+        self._commit_changes('Change chart1 values')
+
+    def test_plan_per_range(self):
+        with patch('builtins.print'):
+            plans = self.tracker.plan_ranges(['HEAD~1', 'HEAD~2'])
+
+        self.assertEqual([p['since'] for p in plans], ['HEAD~1', 'HEAD~2'])
+        self.assertEqual(plans[0]['charts_to_bump'], ['charts/test-chart-1'])
+        self.assertEqual(plans[0]['charts_with_existing_bumps'], [])
+        self.assertEqual(plans[1]['charts_to_bump'], [])
+        self.assertEqual(plans[1]['charts_with_existing_bumps'], ['charts/test-chart-1'])
+
+    def test_discovery_and_blob_reader_are_shared(self):
+        import git_objects
+
+        discover_at = self.tracker._discover_chart_dirs_at
+        with patch.object(ChartTracker, '_discover_chart_dirs_at', wraps=discover_at) as discover, \
+                patch.object(git_objects.subprocess, 'Popen', wraps=subprocess.Popen) as popen, \
+                patch('builtins.print'):
+            self.tracker.plan_ranges(['HEAD~1', 'HEAD~2', 'HEAD~1'])
+
+        self.assertEqual(discover.call_count, 1)
+        cat_file_calls = [c for c in popen.call_args_list if 'cat-file' in c[0][0]]
+        self.assertEqual(len(cat_file_calls), 1)
+
+    def test_duplicate_git_queries_are_memoized(self):
+        with patch('builtins.print'):
+            self.tracker.plan_ranges(['HEAD~1', 'HEAD~2', 'HEAD~1'])
+        diffs = self.tracker.runner.timings['git diff']
+        self.assertEqual((diffs['calls'], diffs['cached']), (3, 1))
+
+    def test_main_plans_without_bumping(self):
+        argv = ['chart_tracker.py', '--state-file', str(self.state_file),
+                'process', '--since', 'HEAD~1', '--since', 'HEAD~2']
+        with patch.object(sys, 'argv', argv), patch('builtins.print') as mock_print:
+            self.assertEqual(main(), 0)
+
+        output = [call[0][0] for call in mock_print.call_args_list if call[0]]
+        self.assertIn('Bump plan for HEAD~1..HEAD:', output)
+        self.assertIn('Bump plan for HEAD~2..HEAD:', output)
+        self.assertIn('version: 1.0.1', self.chart1_yaml.read_text())
+
+
+class TestPrecommitMode(ChartRepoTestCase):
+    """`precommit` checks the staged changes (index vs HEAD) of a real repository"""
+
+    def setUp(self):
+        super().setUp()
+        os.chdir(self.repo_path)
+
+    def _stage(self, chart_path, changes):
+        self._modify_chart(chart_path, changes)
+        self._run_git(['add', chart_path])
+
+    def test_nothing_staged(self):
+        self.assertEqual(self.tracker.check_staged_changes(), ([], []))
+
+    def test_staged_change_without_bump(self):
+        self._stage('charts/test-chart-1/values.yaml', {'replicaCount: 1': 'replicaCount: 3'})
+        changed, missing = self.tracker.check_staged_changes()
+        self.assertEqual(changed, ['charts/test-chart-1'])
+        self.assertEqual(missing, ['charts/test-chart-1'])
+
+    def test_staged_change_with_bump(self):
+        self._stage('charts/test-chart-1/values.yaml', {'replicaCount: 1': 'replicaCount: 3'})
+        self._stage('charts/test-chart-1/Chart.yaml', {'version: 1.0.0': 'version: 1.0.1'})
+        self.assertEqual(self.tracker.check_staged_changes(), (['charts/test-chart-1'], []))
+
+    def test_unstaged_bump_does_not_count(self):
+        """Only the index matters: a bump left in the working tree is not committed"""
+        self._stage('charts/test-chart-1/values.yaml', {'replicaCount: 1': 'replicaCount: 3'})
+        self._modify_chart('charts/test-chart-1/Chart.yaml', {'version: 1.0.0': 'version: 1.0.1'})
+        self.assertEqual(self.tracker.check_staged_changes()[1], ['charts/test-chart-1'])
+
+    def test_helmignored_file_needs_no_bump(self):
+        (self.chart1_dir / '.helmignore').write_text('*.orig\n')
+        self._commit_changes('Add .helmignore')
+        (self.chart1_dir / 'values.yaml.orig').write_text('replicaCount: 3\n')
+        self._run_git(['add', 'charts/test-chart-1'])
+        self.assertEqual(self.tracker.check_staged_changes(), ([], []))
+
+        # The staged .helmignore decides: dropping the rule makes the file part of the package.
+        (self.chart1_dir / '.helmignore').write_text('')
+        self._run_git(['add', 'charts/test-chart-1'])
+        self.assertEqual(self.tracker.check_staged_changes(), (['charts/test-chart-1'], ['charts/test-chart-1']))
+
+    def test_new_chart_needs_no_bump(self):
+        new_chart = self.charts_dir / 'new-chart'
+        new_chart.mkdir()
+        (new_chart / 'Chart.yaml').write_text('apiVersion: v2\nname: new-chart\nversion: 0.1.0\n')
+        self._run_git(['add', 'charts/new-chart'])
+        self.assertEqual(self.tracker.check_staged_changes(), (['charts/new-chart'], []))
+
+    def test_main_warns_or_fails(self):
+        self._stage('charts/test-chart-2/values.yaml', {'replicaCount: 1': 'replicaCount: 3'})
+        state_file = str(self.state_file)
+        with patch.object(sys, 'argv', ['chart_tracker.py', '--state-file', state_file, 'precommit']), \
+                patch('builtins.print') as mock_print:
+            self.assertEqual(main(), 0)
+        self.assertIn('Warning: staged changes to charts/test-chart-2', mock_print.call_args_list[0][0][0])
+
+        with patch.object(sys, 'argv', ['chart_tracker.py', '--state-file', state_file, 'precommit', '--strict']), \
+                patch('builtins.print'):
+            self.assertEqual(main(), EXIT_MISSING_BUMP)
+
+    def test_import_does_not_load_yaml(self):
+        """Startup regression guard: PyYAML must only load when a bump actually happens"""
+        result = subprocess.run(
+            [sys.executable, '-c', "import sys, chart_tracker; print('yaml' in sys.modules)"],
+            cwd=SCRIPTS_DIR, capture_output=True, text=True, check=True
+        )
+        self.assertEqual(result.stdout.strip(), 'False')
+
+    def test_precommit_startup_budget(self):
+        """Startup regression guard: the whole hook stays within PRECOMMIT_BUDGET_MS"""
+        self._stage('charts/test-chart-1/values.yaml', {'replicaCount: 1': 'replicaCount: 3'})
+        self._stage('charts/test-chart-1/Chart.yaml', {'version: 1.0.0': 'version: 1.0.1'})
+        cmd = [sys.executable, str(SCRIPTS_DIR / 'chart_tracker.py'), 'precommit', '--strict']
+
+        timings = []
+        for _ in range(5):
+            start = time.perf_counter()
+            result = subprocess.run(cmd, capture_output=True, text=True)
+            timings.append((time.perf_counter() - start) * 1000)
+            self.assertEqual(result.returncode, 0, result.stdout + result.stderr)
+
+        self.assertLess(min(timings), PRECOMMIT_BUDGET_MS,
+                        f"precommit took {min(timings):.1f}ms (budget {PRECOMMIT_BUDGET_MS:.0f}ms)")
+
+
+class TestCommitMode(ChartRepoTestCase):
+    """`process --commit` plans from git objects alone, without a checkout of the commit"""
+
+    def setUp(self):
+        super().setUp()
+        os.chdir(self.repo_path)
+        bin_dir = self.repo_path / "bin"
+        bin_dir.mkdir()
+        helm_docs = bin_dir / "helm-docs"
+        helm_docs.write_text(FAKE_HELM_DOCS.format(python=sys.executable))
+        helm_docs.chmod(0o755)
+        self.path_env = patch.dict(os.environ, {"PATH": f"{bin_dir}{os.pathsep}{os.environ['PATH']}"})
+        self.path_env.start()
+
+        # feature: bump chart1 with up-to-date docs; change chart2 values and leave its README stale
+        self._create_branch('feature-branch')
+        self._modify_chart('charts/test-chart-1/Chart.yaml', {'version: 1.0.0': 'version: 1.0.1'})
+        self.chart1_readme.write_text("# test-chart-1\n" + self.chart1_values.read_text())
+        self._modify_chart('charts/test-chart-2/values.yaml', {'replicaCount: 1': 'replicaCount: 3'})
+        self._run_git(['add', 'charts'])
+        self._run_git(['commit', '-m', 'Feature changes'])
+        self.commit = self._run_git(['rev-parse', 'HEAD']).stdout.strip()
+
+        # The analysis must not depend on the working tree: check out main and delete the charts.
+        self._run_git(['checkout', 'main'])
+        shutil.rmtree(self.charts_dir)
+
+    def tearDown(self):
+        self.path_env.stop()
+        super().tearDown()
+
+    def test_plan_from_objects(self):
+        with patch('builtins.print'):
+            plan, = self.tracker.plan_ranges(['main'], commit=self.commit)
+
+        self.assertEqual(plan['until'], self.commit)
+        self.assertEqual(sorted(plan['changed_charts']), ['charts/test-chart-1', 'charts/test-chart-2'])
+        self.assertEqual(plan['charts_with_existing_bumps'], ['charts/test-chart-1'])
+        self.assertEqual(plan['charts_to_bump'], ['charts/test-chart-2'])
+        self.assertFalse(self.charts_dir.exists())
+
+    def test_export_preserves_modes(self):
+        self._run_git(['checkout', 'feature-branch'])
+        script = self.chart1_dir / 'run.sh'
+        script.write_text('#!/bin/sh\n')
+        script.chmod(0o755)
+        os.symlink('values.yaml', self.chart1_dir / 'values-link.yaml')
+        self._commit_changes('Add script and link')
+
+        with tempfile.TemporaryDirectory() as dest, GitBlobReader() as blobs:
+            chart_dir = blobs.export('HEAD', 'charts/test-chart-1', dest)
+            self.assertEqual(chart_dir, Path(dest) / 'charts/test-chart-1')
+            self.assertTrue(os.access(chart_dir / 'run.sh', os.X_OK))
+            self.assertFalse(os.access(chart_dir / 'Chart.yaml', os.X_OK))
+            self.assertEqual(os.readlink(chart_dir / 'values-link.yaml'), 'values.yaml')
+            with self.assertRaises(FileNotFoundError):
+                blobs.export('HEAD', 'charts/missing', dest)
+
+    def test_blobless_clone_prefetches_in_one_request(self):
+        bare = Path(self.test_dir.name) / 'remote.git'
+        self._run_git(['clone', '--bare', str(self.repo_path), str(bare)])
+        self._run_git(['config', 'uploadpack.allowFilter', 'true'], cwd=bare)
+        clone = Path(self.test_dir.name) / 'blobless'
+        self._run_git(['clone', '--filter=blob:none', '--no-checkout', f'file://{bare}', str(clone)])
+
+        self.assertEqual(prefetch_missing(self.commit, 'charts/test-chart-2', cwd=clone), 3)
+        self.assertEqual(prefetch_missing(self.commit, 'charts/test-chart-2', cwd=clone), 0)
+
+        os.chdir(clone)
+        with patch('builtins.print'):
+            plan, = self.tracker.plan_ranges(['origin/main'], commit=self.commit)
+        self.assertEqual(plan['charts_to_bump'], ['charts/test-chart-2'])
+
+    def test_main_with_commit(self):
+        argv = ['chart_tracker.py', '--state-file', str(self.state_file),
+                'process', '--since', 'main', '--commit', self.commit]
+        with patch.object(sys, 'argv', argv), patch('builtins.print') as mock_print:
+            self.assertEqual(main(), 0)
+
+        output = [call[0][0] for call in mock_print.call_args_list if call[0]]
+        self.assertIn(f'Bump plan for main..{self.commit}:', output)
+        self.assertIn('  - charts/test-chart-2', output)
+
+
 if __name__ == '__main__':
     unittest.main(verbosity=2)
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Tests for chart_watch.py (watch daemon) using real git repositories
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import textwrap
+import threading
+import time
+import unittest
+from pathlib import Path
+
+from bump_chart_version import parse_chart_version
+from chart_tracker import ChartTracker
+from chart_watch import (
+    ChartWatchDaemon,
+    InotifyWatcher,
+    PollingWatcher,
+    WatchState,
+    git_blob_id,
+    query,
+)
+
+# Fake `helm-docs --dry-run`: the "generated" README is the chart name plus its values.yaml.
+FAKE_HELM_DOCS = textwrap.dedent("""\
+    #!{python}
+    import os, sys
+    chart = sys.argv[sys.argv.index("--chart-search-root") + 1]
+    with open(os.environ["FAKE_HELM_DOCS_LOG"], "a") as f:
+        f.write(chart + "\\n")
+    print("# " + os.path.basename(chart))
+    print(open(os.path.join(chart, "values.yaml")).read())
+""")
+
+
+def _inotify_available():
+    try:
+        InotifyWatcher().close()
+        return True
+    except (OSError, AttributeError, TypeError):
+        return False
+
+
+class TestChartWatch(unittest.TestCase):
+
+    def setUp(self):
+        """Set up a temporary git repository with one chart"""
+        self.test_dir = tempfile.TemporaryDirectory()
+        self.repo_path = Path(self.test_dir.name)
+        self.original_cwd = os.getcwd()
+        os.chdir(self.repo_path)
+
+        self._run_git(['init'])
+        self._run_git(['config', 'user.name', 'Test User'])
+        self._run_git(['config', 'user.email', 'test@example.com'])
+        self._run_git(['config', 'commit.gpgsign', 'false'])
+
+        self.chart_dir = Path("charts/app")
+        self.chart_dir.mkdir(parents=True)
+        (self.chart_dir / "Chart.yaml").write_text("apiVersion: v2\nname: app\nversion: 1.0.0\n")
+        (self.chart_dir / "values.yaml").write_text("replicaCount: 1\n")
+        (self.chart_dir / "README.md").write_text("# app\nreplicaCount: 1\n")
+        self._run_git(['add', '.'])
+        self._run_git(['commit', '-m', 'Initial commit'])
+
+        self.helm_docs = self.repo_path.parent / f"{self.repo_path.name}-helm-docs"
+        self.helm_docs.write_text(FAKE_HELM_DOCS.format(python=sys.executable))
+        self.helm_docs.chmod(0o755)
+        self.docs_log = self.repo_path.parent / f"{self.repo_path.name}-helm-docs.log"
+        os.environ["FAKE_HELM_DOCS_LOG"] = str(self.docs_log)
+
+        self.tracker = ChartTracker(str(self.repo_path / ".chart-tracker.json"))
+
+    def tearDown(self):
+        """Clean up test repository"""
+        os.chdir(self.original_cwd)
+        self.helm_docs.unlink()
+        if self.docs_log.exists():
+            self.docs_log.unlink()
+        os.environ.pop("FAKE_HELM_DOCS_LOG", None)
+        self.test_dir.cleanup()
+
+    def _run_git(self, args):
+        result = subprocess.run(['git'] + args, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"Git command failed: {' '.join(args)}\n{result.stderr}")
+        return result
+
+    def _state(self, since="HEAD"):
+        return WatchState(self.tracker, since, helm_docs=str(self.helm_docs))
+
+    def _docs_runs(self):
+        return len(self.docs_log.read_text().splitlines()) if self.docs_log.exists() else 0
+
+    def test_helpers(self):
+        self.assertEqual(git_blob_id(b"hello\n"), "ce013625030ba8dba906f756967f9e9ca394464a")
+        self.assertEqual(parse_chart_version("name: a\nversion: \"1.2.3\"  # x\n"), "1.2.3")
+        self.assertIsNone(parse_chart_version("name: a\n"))
+
+    def test_clean_tree_has_empty_plan(self):
+        plan = self._state().plan()
+        self.assertEqual(plan["charts_to_bump"], [])
+        self.assertEqual(plan["stale_docs"], [])
+
+    def test_edit_and_revert_values(self):
+        """Editing a file queues the chart; restoring the content clears it again"""
+        state = self._state()
+        values = self.chart_dir / "values.yaml"
+        values.write_text("replicaCount: 2\n")
+        state.apply({values.as_posix()})
+        plan = state.plan()
+        self.assertEqual(plan["changed_charts"], ["charts/app"])
+        self.assertEqual(plan["charts_to_bump"], ["charts/app"])
+
+        values.write_text("replicaCount: 1\n")
+        state.apply({values.as_posix()})
+        self.assertEqual(state.plan()["charts_to_bump"], [])
+
+    def test_helmignored_files_are_not_changes(self):
+        state = self._state()
+        (self.chart_dir / ".helmignore").write_text("*.bak\n")
+        backup = self.chart_dir / "values.yaml.bak"
+        backup.write_text("replicaCount: 2\n")
+        state.apply({backup.as_posix()})
+        self.assertEqual(state.plan()["changed_charts"], [])
+
+        # The .helmignore itself is packaged, so creating it is a change.
+        state.apply({(self.chart_dir / ".helmignore").as_posix()})
+        self.assertEqual(state.plan()["changed_charts"], ["charts/app"])
+
+    def test_gitignored_files_are_not_changes(self):
+        """Vendored dependency archives are ignored by git, so `process` never sees them"""
+        Path(".gitignore").write_text("charts/*/charts/*.tgz\n")
+        archive = self.chart_dir / "charts" / "dep-1.0.0.tgz"
+        archive.parent.mkdir()
+        archive.write_bytes(b"archive")
+        state = self._state()
+        self.assertEqual(state.plan()["changed_charts"], [])
+
+        archive.write_bytes(b"rebuilt archive")
+        state.apply({archive.as_posix()})
+        self.assertEqual(state.plan()["changed_charts"], [])
+
+        # An untracked file that is not ignored would be committed, so it is a change.
+        notes = self.chart_dir / "NOTES.md"
+        notes.write_text("notes\n")
+        state.apply({notes.as_posix()})
+        self.assertEqual(state.plan()["changed_charts"], ["charts/app"])
+        self.assertEqual(WatchState(self.tracker, "HEAD").plan()["changed_charts"], ["charts/app"])
+
+    def test_version_bump_counts_as_existing_bump(self):
+        state = self._state()
+        chart_yaml = self.chart_dir / "Chart.yaml"
+        chart_yaml.write_text("apiVersion: v2\nname: app\nversion: 1.0.1\n")
+        state.apply({chart_yaml.as_posix()})
+        plan = state.plan()
+        self.assertEqual(plan["charts_with_existing_bumps"], ["charts/app"])
+        self.assertEqual(plan["charts_to_bump"], [])
+
+    def test_new_chart_is_indexed(self):
+        state = self._state()
+        new_chart = Path("charts/other")
+        new_chart.mkdir()
+        (new_chart / "Chart.yaml").write_text("apiVersion: v2\nname: other\nversion: 0.1.0\n")
+        state.apply({(new_chart / "Chart.yaml").as_posix()})
+        self.assertIn("charts/other", state.charts())
+        self.assertIn("charts/other", state.plan()["charts_to_bump"])
+
+    def test_stale_docs_only_rerun_when_inputs_change(self):
+        state = self._state()
+        self.assertEqual(self._docs_runs(), 1)
+
+        # A template edit is not a docs input: helm-docs is not re-run.
+        (self.chart_dir / "templates").mkdir()
+        template = self.chart_dir / "templates" / "cm.yaml"
+        template.write_text("kind: ConfigMap\n")
+        state.apply({template.as_posix()})
+        self.assertEqual(self._docs_runs(), 1)
+
+        readme = self.chart_dir / "README.md"
+        readme.write_text("# outdated\n")
+        state.apply({readme.as_posix()})
+        self.assertEqual(self._docs_runs(), 2)
+        self.assertEqual(state.plan()["stale_docs"], ["charts/app"])
+        # helm-docs runs through the tracker's runner, like the git queries.
+        timings = self.tracker.runner.timings
+        self.assertEqual(timings[self.helm_docs.name]["calls"], 2)
+        self.assertEqual(timings["git ls-tree"]["calls"], 1)
+        self.assertEqual(timings["git cat-file"]["calls"], 1)
+
+    def test_head_move_rebuilds_base(self):
+        """Committing with since=HEAD moves the base, so the edit is no longer a change"""
+        state = self._state()
+        daemon = ChartWatchDaemon(state, socket_path=str(self.repo_path / "w.sock"), watcher=PollingWatcher(0.01))
+        daemon.watcher.add_tree("charts")
+        daemon.watcher.add_dir(".git")
+
+        values = self.chart_dir / "values.yaml"
+        values.write_text("replicaCount: 5\n")
+        (self.chart_dir / "README.md").write_text("# app\nreplicaCount: 5\n")
+        daemon.step(0.01)
+        self.assertEqual(state.plan()["charts_to_bump"], ["charts/app"])
+
+        old_base = state.base_commit
+        self._run_git(['commit', '-am', 'Change replicas'])
+        daemon.step(0.01)
+        self.assertNotEqual(state.base_commit, old_base)
+        self.assertEqual(state.plan()["charts_to_bump"], [])
+
+    def _run_daemon_end_to_end(self, watcher):
+        socket_path = str(self.repo_path / "w.sock")
+        daemon = ChartWatchDaemon(self._state(), socket_path=socket_path, watcher=watcher)
+        thread = threading.Thread(target=daemon.serve_forever, daemon=True)
+        thread.start()
+        try:
+            deadline = time.monotonic() + 5
+            while not os.path.exists(socket_path) and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(query(socket_path, "plan")["charts_to_bump"], [])
+
+            (self.chart_dir / "values.yaml").write_text("replicaCount: 3\n")
+            plan = query(socket_path, "plan")
+            while plan["charts_to_bump"] != ["charts/app"] and time.monotonic() < deadline:
+                time.sleep(0.02)
+                plan = query(socket_path, "plan")
+            self.assertEqual(plan["charts_to_bump"], ["charts/app"])
+            self.assertEqual(query(socket_path, "charts"), {"charts": ["charts/app"]})
+            self.assertIn("error", query(socket_path, "bogus"))
+        finally:
+            query(socket_path, "shutdown")
+            thread.join(5)
+        self.assertFalse(thread.is_alive())
+        self.assertFalse(os.path.exists(socket_path))
+
+    def test_daemon_with_polling_watcher(self):
+        self._run_daemon_end_to_end(PollingWatcher(interval=0.02))
+
+    @unittest.skipUnless(_inotify_available(), "inotify not available")
+    def test_daemon_with_inotify_watcher(self):
+        self._run_daemon_end_to_end(InotifyWatcher())
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Unit tests for command_runner.py
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest.mock import patch
+
+from command_runner import CommandRunner, command_name, find_git_dir, read_head_state
+
+
+class TestCommandRunner(unittest.TestCase):
+
+    def setUp(self):
+        """Set up a temporary git repository with one commit"""
+        self.test_dir = tempfile.TemporaryDirectory()
+        self.repo = Path(self.test_dir.name) / "repo"
+        self.repo.mkdir()
+        self._git(['init', '-b', 'main'])
+        self._git(['config', 'user.name', 'Test User'])
+        self._git(['config', 'user.email', 'test@example.com'])
+        self._git(['config', 'commit.gpgsign', 'false'])
+        self._git(['commit', '--allow-empty', '-m', 'Initial commit'])
+
+    def tearDown(self):
+        self.test_dir.cleanup()
+
+    def _git(self, args, cwd=None):
+        return subprocess.run(['git'] + args, cwd=cwd or self.repo, capture_output=True, text=True,
+                              check=True).stdout.strip()
+
+    def test_command_name(self):
+        self.assertEqual(command_name(['git', 'diff', 'HEAD~1..HEAD']), 'git diff')
+        self.assertEqual(command_name(['git', '-c', 'core.quotePath=false', 'log', '--raw']), 'git log')
+        self.assertEqual(command_name(['/usr/local/bin/helm-docs', '--dry-run']), 'helm-docs')
+
+    def test_head_state_follows_loose_packed_and_detached_refs(self):
+        git_dir = find_git_dir(self.repo)
+        head = self._git(['rev-parse', 'HEAD'])
+        self.assertEqual(read_head_state(git_dir), f"refs/heads/main {head}")
+
+        self._git(['pack-refs', '--all'])
+        self.assertFalse((git_dir / "refs/heads/main").exists())
+        self.assertEqual(read_head_state(git_dir), f"refs/heads/main {head}")
+
+        self._git(['checkout', '--detach'])
+        self.assertEqual(read_head_state(git_dir), head)
+
+    def test_find_git_dir_in_subdirectory_and_worktree(self):
+        sub = self.repo / "a" / "b"
+        sub.mkdir(parents=True)
+        self.assertEqual(find_git_dir(sub), (self.repo / ".git").resolve())
+
+        worktree = Path(self.test_dir.name) / "wt"
+        self._git(['worktree', 'add', '-b', 'other', str(worktree)])
+        git_dir = find_git_dir(worktree)
+        self.assertEqual(read_head_state(git_dir), f"refs/heads/other {self._git(['rev-parse', 'HEAD'])}")
+
+        self.assertIsNone(find_git_dir(Path(self.test_dir.name)))
+
+    def test_memoized_query_is_served_until_head_moves(self):
+        runner = CommandRunner()
+        args = ['git', 'log', '--format=%s']
+        first = runner.run(args, cwd=self.repo, memoize=True)
+        self.assertIs(runner.run(args, cwd=self.repo, memoize=True), first)
+        self.assertEqual(runner.timings['git log']['calls'], 2)
+        self.assertEqual(runner.timings['git log']['cached'], 1)
+
+        self._git(['commit', '--allow-empty', '-m', 'Second commit'])
+        second = runner.run(args, cwd=self.repo, memoize=True)
+        self.assertEqual(second.stdout.splitlines(), ['Second commit', 'Initial commit'])
+        self.assertEqual(runner.timings['git log']['cached'], 1)
+
+        # Without memoize every call runs.
+        runner.run(args, cwd=self.repo)
+        self.assertEqual(runner.timings['git log']['cached'], 1)
+        self.assertEqual(runner.timings['git log']['calls'], 4)
+
+    def test_check_and_timeout(self):
+        runner = CommandRunner(timeout=0.2)
+        with self.assertRaises(subprocess.CalledProcessError):
+            runner.run(['git', 'rev-parse', '--verify', 'missing'], cwd=self.repo, check=True)
+        self.assertNotEqual(runner.run(['git', 'rev-parse', '--verify', 'missing'], cwd=self.repo).returncode, 0)
+
+        with self.assertRaises(subprocess.TimeoutExpired):
+            runner.run([sys.executable, '-c', 'import time; time.sleep(5)'])
+        self.assertEqual(runner.timings[os.path.basename(sys.executable)]['calls'], 1)
+
+    def test_concurrency_is_bounded(self):
+        running = []
+        peak = []
+        lock = threading.Lock()
+
+        def fake_run(args, **kwargs):
+            with lock:
+                running.append(args)
+                peak.append(len(running))
+            time.sleep(0.05)
+            with lock:
+                running.remove(args)
+            return subprocess.CompletedProcess(args, 0, stdout=args[1], stderr="")
+
+        runner = CommandRunner(max_workers=2)
+        # More callers than slots, as when pipeline steps run commands at once.
+        with patch('subprocess.run', side_effect=fake_run), ThreadPoolExecutor(max_workers=6) as pool:
+            results = list(pool.map(lambda i: runner.run(['echo', str(i)]).stdout, range(6)))
+
+        self.assertEqual(results, [str(i) for i in range(6)])
+        self.assertEqual(max(peak), 2)
+        self.assertEqual(runner.timings['echo']['calls'], 6)
+
+    def test_executables_are_looked_up_once(self):
+        runner = CommandRunner(resolve_executables=True)
+        with patch('shutil.which', wraps=shutil.which) as which:
+            for _ in range(3):
+                runner.run(['git', 'status'], cwd=self.repo, check=True)
+            # Absolute paths are run as given; unknown names still fail like subprocess.run.
+            with self.assertRaises(FileNotFoundError):
+                runner.run(['no-such-command-xyz'])
+            runner.run([sys.executable, '-c', 'pass'])
+        self.assertEqual([c.args[0] for c in which.call_args_list], ['git', 'no-such-command-xyz'])
+        self.assertEqual(runner.timings['git status']['calls'], 3)
+
+        with patch('subprocess.run') as mock_run:
+            runner.run(['git', 'status'])
+        self.assertTrue(os.path.isabs(mock_run.call_args.args[0][0]))
+        with patch('subprocess.run') as mock_run:
+            CommandRunner().run(['git', 'status'])
+        self.assertEqual(mock_run.call_args.args[0], ['git', 'status'])
+
+    def test_format_timings(self):
+        runner = CommandRunner()
+        runner.run(['git', 'status'], cwd=self.repo)
+        runner.run(['git', 'status'], cwd=self.repo)
+        line, = runner.format_timings()
+        self.assertRegex(line, r"^git status: 2 calls \(0 cached\), \d+\.\d{3}s$")
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Unit tests for ct_install_scheduler.py using a fake ct executable
+"""
+
+import json
+import os
+import sys
+import tempfile
+import textwrap
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from ct_install_scheduler import (
+    CtInstallScheduler,
+    EXIT_ERROR,
+    EXIT_FAILED,
+    EXIT_OK,
+    main,
+)
+
+# Fake `ct`: sleeps for the duration configured for the case, logs start/end
+# timestamps and fails for cases whose name starts with "fail".
+FAKE_CT = textwrap.dedent("""\
+    #!{python}
+    import json, os, sys, time
+    args = sys.argv[1:]
+    chart = args[args.index("--charts") + 1]
+    name = os.path.basename(chart)
+    delays = json.loads(os.environ.get("FAKE_CT_DELAYS", "{{}}"))
+    log = os.environ["FAKE_CT_LOG"]
+    with open(log, "a") as f:
+        f.write(json.dumps({{"event": "start", "case": name, "t": time.monotonic(), "argv": args}}) + "\\n")
+    time.sleep(delays.get(name, 0.0))
+    with open(log, "a") as f:
+        f.write(json.dumps({{"event": "end", "case": name, "t": time.monotonic()}}) + "\\n")
+    print("installed " + name)
+    sys.exit(1 if name.startswith("fail") else 0)
+""")
+
+
+class TestCtInstallScheduler(unittest.TestCase):
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.test_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.test_dir.name)
+        self.cases_dir = self.root / "tests" / "ci"
+        self.history_file = self.root / "history.json"
+        self.log_file = self.root / "ct.log"
+
+        self.fake_ct = self.root / "ct"
+        self.fake_ct.write_text(FAKE_CT.format(python=sys.executable))
+        self.fake_ct.chmod(0o755)
+
+        self.env = patch.dict(os.environ, {"FAKE_CT_LOG": str(self.log_file)})
+        self.env.start()
+
+    def tearDown(self):
+        """Clean up test fixtures"""
+        self.env.stop()
+        self.test_dir.cleanup()
+
+    def _create_cases(self, *names):
+        for name in names:
+            case = self.cases_dir / name
+            case.mkdir(parents=True)
+            (case / "Chart.yaml").write_text(f"apiVersion: v2\nname: {name}\nversion: 0.1.0\n")
+        return [(self.cases_dir / name).as_posix() for name in names]
+
+    def _set_delays(self, delays):
+        os.environ["FAKE_CT_DELAYS"] = json.dumps(delays)
+
+    def _read_log(self):
+        return [json.loads(line) for line in self.log_file.read_text().splitlines()]
+
+    def _scheduler(self, jobs=1, **kwargs):
+        return CtInstallScheduler(ct=str(self.fake_ct), jobs=jobs,
+                                  history_file=str(self.history_file), **kwargs)
+
+    def test_discover_cases(self):
+        """Only directories with a Chart.yaml are cases, in sorted order"""
+        self._create_cases("b-case", "a-case")
+        (self.cases_dir / "not-a-case").mkdir()
+        cases = CtInstallScheduler.discover_cases(str(self.cases_dir))
+        self.assertEqual([Path(c).name for c in cases], ["a-case", "b-case"])
+
+    def test_discover_cases_missing_dir(self):
+        self.assertEqual(CtInstallScheduler.discover_cases(str(self.root / "missing")), [])
+
+    def test_order_cases_longest_first_unknown_first(self):
+        """Unknown cases run first, then known cases by descending duration"""
+        self.history_file.write_text(json.dumps({"durations": {"short": 1.0, "long": 30.0, "mid": 5.0}}))
+        scheduler = self._scheduler()
+        ordered = scheduler.order_cases(["ci/short", "ci/mid", "ci/new", "ci/long"])
+        self.assertEqual(ordered, ["ci/new", "ci/long", "ci/mid", "ci/short"])
+
+    def test_invalid_history_file_uses_empty_history(self):
+        self.history_file.write_text("invalid json content")
+        scheduler = self._scheduler()
+        self.assertEqual(scheduler.history, {"durations": {}})
+
+    def test_build_command(self):
+        cases = self._create_cases("default")
+        scheduler = self._scheduler(target_branch="main", extra_args=["--debug"])
+        cmd = scheduler.build_command(cases[0])
+        self.assertEqual(cmd, [str(self.fake_ct), "install", "--target-branch", "main",
+                               "--charts", str(Path(cases[0]).resolve()), "--debug"])
+
+    def test_run_records_durations_and_schedules_longest_first_next_time(self):
+        """First run records durations; the second run starts the slowest case first"""
+        cases = self._create_cases("fast", "slow")
+        self._set_delays({"slow": 0.3, "fast": 0.0})
+
+        results = self._scheduler().run(cases)
+        self.assertTrue(all(rc == 0 for rc, _ in results.values()))
+        history = json.loads(self.history_file.read_text())["durations"]
+        self.assertGreater(history["slow"], history["fast"])
+
+        self.log_file.unlink()
+        self._scheduler().run(cases)
+        starts = [e["case"] for e in self._read_log() if e["event"] == "start"]
+        self.assertEqual(starts, ["slow", "fast"])
+
+    def test_run_respects_concurrency_limit(self):
+        """Never more than `jobs` ct processes run at the same time"""
+        cases = self._create_cases("c1", "c2", "c3", "c4", "c5")
+        self._set_delays({name: 0.2 for name in ["c1", "c2", "c3", "c4", "c5"]})
+
+        self._scheduler(jobs=2).run(cases)
+
+        running, peak = 0, 0
+        for event in sorted(self._read_log(), key=lambda e: (e["t"], e["event"] == "start")):
+            running += 1 if event["event"] == "start" else -1
+            peak = max(peak, running)
+        self.assertEqual(peak, 2)
+
+    def test_run_reports_failures(self):
+        cases = self._create_cases("ok", "fail-case")
+        results = self._scheduler(jobs=2).run(cases)
+        codes = {Path(case).name: rc for case, (rc, _) in results.items()}
+        self.assertEqual(codes, {"ok": 0, "fail-case": 1})
+
+    def test_run_missing_ct_executable(self):
+        cases = self._create_cases("default")
+        scheduler = CtInstallScheduler(ct=str(self.root / "missing-ct"),
+                                       history_file=str(self.history_file))
+        with patch('builtins.print'):
+            results = scheduler.run(cases)
+        self.assertEqual(results[cases[0]][0], EXIT_ERROR)
+
+    def test_main_exit_codes(self):
+        self._create_cases("ok")
+        argv = ["ct_install_scheduler.py", "--cases-dir", str(self.cases_dir),
+                "--ct", str(self.fake_ct), "--history-file", str(self.history_file)]
+        with patch.object(sys, 'argv', argv), patch('builtins.print'):
+            self.assertEqual(main(), EXIT_OK)
+
+        self._create_cases("fail-case")
+        with patch.object(sys, 'argv', argv), patch('builtins.print'):
+            self.assertEqual(main(), EXIT_FAILED)
+
+    def test_main_no_cases_returns_exit_error(self):
+        argv = ["ct_install_scheduler.py", "--cases-dir", str(self.root / "missing")]
+        with patch.object(sys, 'argv', argv), patch('builtins.print'):
+            self.assertEqual(main(), EXIT_ERROR)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Unit tests for dependency_cache.py using a fake helm executable and file:// dependencies
+"""
+
+import io
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import textwrap
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+from unittest.mock import patch
+
+from dependency_cache import (
+    EXIT_FAILED,
+    EXIT_OK,
+    DependencyCache,
+    discover_charts,
+    main,
+)
+
+# Fake `helm`: `version` prints a version, `dependency build` packs every file://
+# dependency into charts/<name>-<version>.tgz, the way helm resolves local charts
+# (other repositories get a placeholder archive).
+FAKE_HELM = textwrap.dedent("""\
+    #!{python}
+    import os, sys, tarfile, yaml
+    args = sys.argv[1:]
+    with open(os.environ["FAKE_HELM_LOG"], "a") as f:
+        f.write(" ".join(args) + "\\n")
+    if args[0] == "version":
+        print("v3.19.4", end="")
+        sys.exit(0)
+    chart = args[2]
+    dependencies = yaml.safe_load(open(os.path.join(chart, "Chart.yaml")))["dependencies"]
+    os.makedirs(os.path.join(chart, "charts"), exist_ok=True)
+    for dep in dependencies:
+        archive = os.path.join(chart, "charts", dep["name"] + "-" + dep["version"] + ".tgz")
+        if not dep["repository"].startswith("file://"):
+            open(archive, "wb").write(b"downloaded")
+            continue
+        source = os.path.join(chart, dep["repository"][len("file://"):])
+        if not os.path.isdir(source):
+            sys.stderr.write("Error: directory " + source + " not found\\n")
+            sys.exit(1)
+        with tarfile.open(archive, "w:gz") as tar:
+            tar.add(source, arcname=dep["name"])
+""")
+
+
+class TestDependencyCache(unittest.TestCase):
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.test_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.test_dir.cleanup)
+        self.root = Path(self.test_dir.name)
+        self.charts_dir = self.root / "charts"
+        self.cache_dir = self.root / "cache"
+        self.log_file = self.root / "helm.log"
+
+        # A file-based chart repository next to the charts: one directory per library chart.
+        self.repo_dir = self.root / "repo"
+        self._library("common", "1.2.0")
+        self._library("redis", "17.0.1")
+
+        self.app = self._chart("app", [("common", "1.2.0"), ("redis", "17.0.1")])
+        self._chart("plain", [])
+
+        self.fake_helm = self.root / "helm"
+        self.fake_helm.write_text(FAKE_HELM.format(python=sys.executable))
+        self.fake_helm.chmod(0o755)
+
+        env = patch.dict(os.environ, {"FAKE_HELM_LOG": str(self.log_file)})
+        env.start()
+        self.addCleanup(env.stop)
+
+    def _library(self, name, version):
+        library = self.repo_dir / name
+        (library / "templates").mkdir(parents=True)
+        (library / "Chart.yaml").write_text(f"apiVersion: v2\nname: {name}\nversion: {version}\ntype: library\n")
+        (library / "templates" / "_helpers.tpl").write_text(f'{{{{- define "{name}.name" -}}}}{name}{{{{- end }}}}\n')
+
+    def _chart(self, name, dependencies, lock=True, repository="file://../../repo/"):
+        chart = self.charts_dir / name
+        chart.mkdir(parents=True)
+        text = f"apiVersion: v2\nname: {name}\nversion: 0.1.0\n"
+        if dependencies:
+            text += "dependencies:\n" + "".join(
+                f"  - name: {dep}\n    version: {version}\n    repository: {repository}{dep}\n"
+                for dep, version in dependencies)
+        (chart / "Chart.yaml").write_text(text)
+        if dependencies and lock:
+            (chart / "Chart.lock").write_text("dependencies:\n" + "".join(
+                f"- name: {dep}\n  repository: {repository}{dep}\n  version: {version}\n"
+                for dep, version in dependencies) + "digest: sha256:0123\ngenerated: \"2025-01-01T00:00:00Z\"\n")
+        return chart.as_posix()
+
+    def _cache(self, **kwargs):
+        kwargs.setdefault("cache_dir", str(self.cache_dir))
+        kwargs.setdefault("helm", str(self.fake_helm))
+        return DependencyCache(**kwargs)
+
+    def _builds(self):
+        if not self.log_file.exists():
+            return []
+        return [line for line in self.log_file.read_text().splitlines() if line.startswith("dependency build")]
+
+    def _archives(self, chart):
+        return {p.name: p.read_bytes() for p in (Path(chart) / "charts").glob("*.tgz")}
+
+    def test_discover_charts_with_dependencies(self):
+        self.assertEqual(discover_charts(self.charts_dir), [self.app])
+        self.assertEqual(discover_charts(self.root / "missing"), [])
+
+    def test_second_run_restores_from_cache(self):
+        status, archives = self._cache().prepare(self.app)
+        self.assertEqual((status, archives), ("built", ["common-1.2.0.tgz", "redis-17.0.1.tgz"]))
+        built = self._archives(self.app)
+
+        # A fresh checkout: the archives are gone, the cache (e.g. restored by CI) is not.
+        shutil.rmtree(Path(self.app) / "charts")
+        cache = self._cache()
+        self.assertEqual(cache.prepare(self.app)[0], "restored")
+        self.assertEqual(self._archives(self.app), built)
+        self.assertEqual(len(self._builds()), 1)
+
+    def test_key_follows_lock_declared_dependencies_and_local_content(self):
+        cache = self._cache()
+        key = cache.lock_key(self.app)
+        self.assertEqual(cache.lock_key(self.app), key)
+
+        lock = Path(self.app) / "Chart.lock"
+        original = lock.read_text()
+        lock.write_text(original.replace("17.0.1", "17.0.2"))
+        self.assertNotEqual(cache.lock_key(self.app), key)
+        lock.write_text(original)
+
+        chart_yaml = Path(self.app) / "Chart.yaml"
+        chart_yaml.write_text(chart_yaml.read_text() + "    condition: redis.enabled\n")
+        self.assertNotEqual(cache.lock_key(self.app), key)
+
+        chart_yaml.write_text(chart_yaml.read_text().replace("    condition: redis.enabled\n", ""))
+        self.assertEqual(cache.lock_key(self.app), key)
+        (self.repo_dir / "common" / "templates" / "_helpers.tpl").write_text("changed\n")
+        self.assertNotEqual(cache.lock_key(self.app), key)
+
+    def test_restore_drops_archives_the_lock_no_longer_lists(self):
+        self._cache().prepare(self.app)
+        (Path(self.app) / "charts" / "redis-16.0.0.tgz").write_bytes(b"old")
+        self._cache().prepare(self.app)
+        self.assertEqual(sorted(self._archives(self.app)), ["common-1.2.0.tgz", "redis-17.0.1.tgz"])
+
+    def test_remote_dependencies_without_lock_are_built_every_time(self):
+        unlocked = self._chart("unlocked", [("common", "1.2.0")], lock=False, repository="https://charts.example.com/")
+        for _ in range(2):
+            self.assertEqual(self._cache().prepare(unlocked), ("uncached", ["common-1.2.0.tgz"]))
+        self.assertEqual(len(self._builds()), 2)
+        self.assertFalse(self.cache_dir.exists())
+
+    def test_local_dependencies_need_no_lock(self):
+        # Like the tests/ci umbrella charts: only file:// dependencies and no Chart.lock.
+        case = self._chart("case", [("common", "1.2.0")], lock=False)
+        self.assertEqual(self._cache().prepare(case)[0], "built")
+        self.assertEqual(self._cache().prepare(case)[0], "restored")
+        (self.repo_dir / "common" / "values.yaml").write_text("enabled: true\n")
+        self.assertEqual(self._cache().prepare(case)[0], "built")
+
+    def test_charts_sharing_a_lock_share_an_entry(self):
+        twin = self._chart("twin", [("common", "1.2.0"), ("redis", "17.0.1")])
+        cache = self._cache(jobs=2)
+        results = cache.prepare_all([self.app, twin])
+        self.assertFalse(any(isinstance(outcome, Exception) for outcome in results.values()), results)
+        self.assertEqual(cache.stats["restored"] + cache.stats["built"], 2)
+        self.assertEqual([p.name for p in self.cache_dir.iterdir()], [cache.lock_key(self.app)])
+        self.assertEqual(sorted(self._archives(twin)), sorted(self._archives(self.app)))
+
+    def test_prune_keeps_only_entries_used_in_the_run(self):
+        self._cache().prepare(self.app)
+        lock = Path(self.app) / "Chart.lock"
+        lock.write_text(lock.read_text().replace("0123", "4567"))
+        cache = self._cache()
+        cache.prepare(self.app)
+        self.assertEqual(len(list(self.cache_dir.iterdir())), 2)
+        self.assertEqual(cache.prune(), 1)
+        self.assertEqual([p.name for p in self.cache_dir.iterdir()], [cache.lock_key(self.app)])
+
+    def test_main(self):
+        argv = ["dependency_cache.py", "--charts-dir", str(self.charts_dir), "--cache-dir", str(self.cache_dir),
+                "--helm", str(self.fake_helm)]
+        with patch.object(sys, "argv", argv), redirect_stdout(io.StringIO()) as out:
+            self.assertEqual(main(), EXIT_OK)
+        self.assertIn(f"{self.app}: built common-1.2.0.tgz, redis-17.0.1.tgz", out.getvalue())
+        with patch.object(sys, "argv", argv), redirect_stdout(io.StringIO()) as out:
+            self.assertEqual(main(), EXIT_OK)
+        self.assertIn("Dependencies: 1 restored from cache, 0 built", out.getvalue())
+
+        with patch.object(sys, "argv", argv + [self.app, (self.charts_dir / "plain").as_posix()]), \
+                redirect_stdout(io.StringIO()) as out:
+            self.assertEqual(main(), EXIT_OK)
+        self.assertNotIn("plain", out.getvalue())
+        self.assertEqual(len(self._builds()), 1)
+
+        broken = self._chart("broken", [("missing", "0.1.0")])
+        with patch.object(sys, "argv", argv), redirect_stdout(io.StringIO()) as out:
+            self.assertEqual(main(), EXIT_FAILED)
+        self.assertIn(f"Failed to prepare dependencies of {broken}: helm dependency build failed", out.getvalue())
+
+    @unittest.skipIf(shutil.which("helm") is None, "helm is not installed")
+    def test_real_helm(self):
+        chart = self._chart("real", [("common", "1.2.0")], lock=False)
+        subprocess.run(["helm", "dependency", "update", chart], capture_output=True, check=True)
+        shutil.rmtree(Path(chart) / "charts")
+        cache = self._cache(helm="helm")
+        self.assertEqual(cache.prepare(chart), ("built", ["common-1.2.0.tgz"]))
+        shutil.rmtree(Path(chart) / "charts")
+        self.assertEqual(self._cache(helm="helm").prepare(chart), ("restored", ["common-1.2.0.tgz"]))
+        result = subprocess.run(["helm", "template", "x", chart], capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
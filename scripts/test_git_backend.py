@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Tests for git_backend.py
+
+The conformance tests run the same history against git and the in-memory
+backend, including the tracker's process path; the planning scenarios then use
+the in-memory backend only.
+"""
+
+import io
+import subprocess
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+from unittest.mock import patch
+
+from chart_tracker import ChartTracker
+from git_backend import CliGitBackend, MemoryGitBackend
+
+
+def chart_yaml(name, version):
+    return f"apiVersion: v2\nname: {name}\nversion: {version}\n"
+
+
+class BackendConformance:
+    """Backend behaviour both implementations must share; subclasses provide the repository"""
+
+    def make_repo(self):
+        """Return a fresh backend"""
+        raise NotImplementedError
+
+    def commit(self, changes=None, remove=()):
+        """Commit changes/removals on the current branch"""
+        raise NotImplementedError
+
+    def setUp(self):
+        self.backend = self.make_repo()
+        self.commit({"charts/a/Chart.yaml": chart_yaml("a", "1.0.0"), "charts/a/values.yaml": "replicas: 1\n",
+                     "charts/b/Chart.yaml": chart_yaml("b", "0.1.0"), "README.md": "hello\n"})
+        self.commit({"charts/a/values.yaml": "replicas: 2\n"})
+        self.commit({"charts/b/Chart.yaml": chart_yaml("b", "0.2.0"), "charts/c/Chart.yaml": chart_yaml("c", "1.0.0")},
+                    remove=["README.md"])
+
+    def tearDown(self):
+        self.backend.close()
+
+    def test_diff_names(self):
+        self.assertEqual(self.backend.diff_names("HEAD~1"),
+                         ["README.md", "charts/b/Chart.yaml", "charts/c/Chart.yaml"])
+        self.assertEqual(self.backend.diff_names("HEAD~2", "HEAD~1"), ["charts/a/values.yaml"])
+        self.assertEqual(self.backend.diff_names("HEAD"), [])
+
+    def test_read_file(self):
+        self.assertEqual(self.backend.read_file("HEAD~2", "charts/a/values.yaml"), b"replicas: 1\n")
+        self.assertEqual(self.backend.read_text("HEAD", "charts/b/Chart.yaml"), chart_yaml("b", "0.2.0"))
+        self.assertIsNone(self.backend.read_file("HEAD", "README.md"))
+        self.assertIsNone(self.backend.read_file("HEAD~1", "charts/c/Chart.yaml"))
+
+    def test_list_tree(self):
+        tree = self.backend.list_tree("HEAD~1")
+        self.assertEqual(sorted(tree), ["README.md", "charts/a/Chart.yaml", "charts/a/values.yaml",
+                                        "charts/b/Chart.yaml"])
+        # Object ids are real git blob ids: `echo hello | git hash-object --stdin`
+        self.assertEqual(tree["README.md"], ("100644", "ce013625030ba8dba906f756967f9e9ca394464a"))
+        self.assertEqual(sorted(self.backend.list_tree("HEAD", "charts/a")),
+                         ["charts/a/Chart.yaml", "charts/a/values.yaml"])
+
+    def test_export(self):
+        with tempfile.TemporaryDirectory() as dest:
+            chart_dir = self.backend.export("HEAD~1", "charts/a", dest)
+            self.assertEqual(chart_dir, Path(dest) / "charts/a")
+            self.assertEqual((chart_dir / "values.yaml").read_text(), "replicas: 2\n")
+            with self.assertRaises(FileNotFoundError):
+                self.backend.export("HEAD~1", "charts/c", dest)
+
+    def test_process_all_changes(self):
+        """The tracker's default process path decides the same on either backend"""
+        with tempfile.TemporaryDirectory() as state_dir:
+            tracker = ChartTracker(Path(state_dir) / "state.json", git=self.backend)
+            with patch.object(tracker, "run_helm_docs", return_value=[]), redirect_stdout(io.StringIO()) as out:
+                self.assertTrue(tracker.process_all_changes("HEAD~2"))
+        # a changed without a bump, b was bumped, c is new.
+        self.assertEqual(tracker.state["charts_to_bump"], ["charts/a", "charts/c"])
+        self.assertIn("Version already bumped in commits for: charts/b", out.getvalue())
+
+
+class TestCliGitBackend(BackendConformance, unittest.TestCase):
+
+    def make_repo(self):
+        self.test_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.test_dir.cleanup)
+        self.repo = Path(self.test_dir.name)
+        for args in (['init', '-b', 'main'], ['config', 'user.name', 'Test User'],
+                     ['config', 'user.email', 'test@example.com'], ['config', 'commit.gpgsign', 'false']):
+            self._git(args)
+        return CliGitBackend(cwd=self.repo)
+
+    def _git(self, args):
+        subprocess.run(['git'] + args, cwd=self.repo, capture_output=True, check=True)
+
+    def commit(self, changes=None, remove=()):
+        for path in remove:
+            self._git(['rm', '-r', '-q', path])
+        for path, content in (changes or {}).items():
+            target = self.repo / path
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_text(content)
+            self._git(['add', path])
+        self._git(['commit', '-q', '-m', 'change'])
+
+    def test_unknown_revision_raises(self):
+        with self.assertRaises(subprocess.CalledProcessError):
+            self.backend.diff_names("missing")
+
+
+class TestMemoryGitBackend(BackendConformance, unittest.TestCase):
+
+    def make_repo(self):
+        return MemoryGitBackend()
+
+    def commit(self, changes=None, remove=()):
+        return self.backend.commit(changes, remove)
+
+    def test_unknown_revision_raises(self):
+        with self.assertRaises(KeyError):
+            self.backend.diff_names("missing")
+        with self.assertRaises(KeyError):
+            self.backend.resolve("HEAD~3")
+
+    def test_branches_and_detached_head(self):
+        base = self.backend.resolve("HEAD")
+        self.backend.branch("feature")
+        self.backend.checkout("feature")
+        tip = self.commit({"charts/a/values.yaml": "replicas: 3\n"})
+        self.assertEqual(self.backend.resolve("feature"), tip)
+        self.assertEqual(self.backend.resolve("main"), base)
+        self.assertEqual(self.backend.diff_names("main", "feature"), ["charts/a/values.yaml"])
+
+        self.backend.checkout(base)
+        detached = self.commit({"charts/b/values.yaml": "x: 1\n"})
+        self.assertEqual(self.backend.resolve("HEAD"), detached)
+        self.assertEqual(self.backend.resolve("HEAD^"), base)
+        self.assertEqual(self.backend.resolve("feature"), tip)
+
+
+class TestPlanningInMemory(unittest.TestCase):
+    """Bump planning scenarios against MemoryGitBackend: no repository, no subprocesses"""
+
+    def setUp(self):
+        self.repo = MemoryGitBackend()
+        self.repo.commit({
+            "charts/zot/Chart.yaml": chart_yaml("zot", "1.0.0"),
+            "charts/zot/values.yaml": "replicas: 1\n",
+            "charts/zot/charts/redis/Chart.yaml": chart_yaml("redis", "7.0.0"),
+            "charts/zot/extra/Chart.yaml": chart_yaml("extra", "0.1.0"),
+            "charts/other/Chart.yaml": chart_yaml("other", "2.0.0"),
+            "charts/other/templates/cm.yaml": "kind: ConfigMap\n",
+        })
+        self.tracker = ChartTracker("unused-tracker-state.json", git=self.repo)
+        # helm-docs is the only external command in commit mode; its behaviour is covered elsewhere.
+        patcher = patch.object(self.tracker, "check_docs_from_objects", return_value=[])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _plan(self, sinces):
+        with redirect_stdout(io.StringIO()):
+            return {plan["since"]: plan for plan in self.tracker.plan_ranges(sinces, commit="HEAD")}
+
+    def test_unbumped_change_is_planned(self):
+        self.repo.commit({"charts/zot/values.yaml": "replicas: 2\n"})
+        plan = self._plan(["HEAD~1"])["HEAD~1"]
+        self.assertEqual(plan["changed_charts"], ["charts/zot"])
+        self.assertEqual(plan["charts_to_bump"], ["charts/zot"])
+        self.assertEqual(plan["until"], "HEAD")
+
+    def test_existing_bump_depends_on_range(self):
+        self.repo.commit({"charts/other/templates/cm.yaml": "kind: ConfigMap\ndata: {}\n"})
+        self.repo.commit({"charts/other/Chart.yaml": chart_yaml("other", "2.0.1")})
+        self.repo.commit({"charts/zot/values.yaml": "replicas: 2\n"})
+
+        plans = self._plan(["HEAD~1", "HEAD~3"])
+        self.assertEqual(plans["HEAD~1"]["charts_to_bump"], ["charts/zot"])
+        self.assertEqual(plans["HEAD~3"]["charts_with_existing_bumps"], ["charts/other"])
+        self.assertEqual(plans["HEAD~3"]["charts_to_bump"], ["charts/zot"])
+
+    def test_nested_root_and_vendored_dependency(self):
+        self.repo.commit({"charts/zot/extra/values.yaml": "a: 1\n",
+                          "charts/zot/charts/redis/values.yaml": "b: 1\n"})
+        plan = self._plan(["HEAD~1"])["HEAD~1"]
+        # The nested chart is its own root; the vendored dependency belongs to its parent.
+        self.assertEqual(sorted(plan["changed_charts"]), ["charts/zot", "charts/zot/extra"])
+
+    def test_helmignored_changes_are_dropped(self):
+        self.repo.commit({"charts/zot/.helmignore": "*.bak\nci/\n"})
+        self.repo.commit({"charts/zot/values.yaml.bak": "old\n", "charts/zot/ci/test.yaml": "a: 1\n",
+                          "charts/other/templates/.notes": "hidden\n"})
+        plans = self._plan(["HEAD~1", "HEAD~2"])
+        self.assertEqual(plans["HEAD~1"]["changed_charts"], [])
+        # Changing .helmignore changes the package, so it still counts.
+        self.assertEqual(plans["HEAD~2"]["changed_charts"], ["charts/zot"])
+
+    def test_new_and_deleted_charts(self):
+        self.repo.commit({"charts/new/Chart.yaml": chart_yaml("new", "0.1.0")}, remove=["charts/other"])
+        plan = self._plan(["HEAD~1"])["HEAD~1"]
+        self.assertEqual(plan["changed_charts"], ["charts/new"])
+        self.assertEqual(plan["charts_with_existing_bumps"], [])
+
+    def test_branch_tip_without_checkout(self):
+        self.repo.branch("feature")
+        self.repo.checkout("feature")
+        self.repo.commit({"charts/other/Chart.yaml": chart_yaml("other", "3.0.0"),
+                          "charts/other/templates/cm.yaml": "kind: ConfigMap\ndata: {}\n"})
+        self.repo.checkout("main")
+
+        with redirect_stdout(io.StringIO()):
+            plan, = self.tracker.plan_ranges(["main"], commit="feature")
+        self.assertEqual(plan["charts_with_existing_bumps"], ["charts/other"])
+        self.assertEqual(plan["charts_to_bump"], [])
+
+    def test_stale_readme_from_exported_chart(self):
+        self.repo.commit({"charts/zot/README.md": "# old\n"})
+        tracker = ChartTracker("unused-tracker-state.json", git=self.repo)
+        helm_docs = subprocess.CompletedProcess([], 0, stdout="# new\n", stderr="")
+        with patch("subprocess.run", return_value=helm_docs) as mock_run, redirect_stdout(io.StringIO()):
+            stale = tracker.check_docs_from_objects(["charts/other", "charts/zot"], "HEAD")
+        self.assertEqual(stale, ["charts/other", "charts/zot"])
+        self.assertEqual(mock_run.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Unit tests for helm_unittest_runner.py using a fake helm executable
+"""
+
+import io
+import os
+import sys
+import tempfile
+import textwrap
+import time
+import unittest
+import xml.etree.ElementTree as ET
+from contextlib import redirect_stdout
+from pathlib import Path
+from unittest.mock import patch
+
+from helm_unittest_runner import (
+    EXIT_FAILED,
+    EXIT_OK,
+    HelmUnittestRunner,
+    main,
+    merge_junit,
+)
+
+# Fake `helm`: `version` and `plugin list` print versions; `unittest` writes a JUnit
+# report with one suite per test file, fails files containing "fail" and, like
+# helm-unittest, writes a missing snapshot for files containing "matchSnapshot".
+FAKE_HELM = textwrap.dedent("""\
+    #!{python}
+    import os, sys, time
+    args = sys.argv[1:]
+    with open(os.environ["FAKE_HELM_LOG"], "a") as f:
+        f.write(" ".join(args) + "\\n")
+    if args[0] == "version":
+        print("v3.19.4", end="")
+        sys.exit(0)
+    if args[:2] == ["plugin", "list"]:
+        print("NAME    \\tVERSION\\tDESCRIPTION")
+        print("unittest\\t1.0.3  \\tunit test for helm chart")
+        sys.exit(0)
+    time.sleep(float(os.environ.get("FAKE_HELM_DELAY", "0")))
+    chart = args[-1]
+    test_file = args[args.index("--file") + 1]
+    content = open(os.path.join(chart, test_file)).read()
+    failed = "fail" in content
+    name = os.path.basename(test_file)
+    with open(args[args.index("--output-file") + 1], "w") as f:
+        f.write('<testsuites><testsuite name="%s" tests="2" failures="%d" errors="0" time="0.5">'
+                '<testcase name="a"/><testcase name="b"/></testsuite></testsuites>' % (name, int(failed)))
+    snapshot = os.path.join(chart, "unittests", "__snapshot__", name + ".snap")
+    if "matchSnapshot" in content and not os.path.exists(snapshot):
+        os.makedirs(os.path.dirname(snapshot), exist_ok=True)
+        open(snapshot, "w").write("snapshot\\n")
+    print(("FAIL " if failed else "PASS ") + test_file)
+    sys.exit(1 if failed else 0)
+""")
+
+
+class TestHelmUnittestRunner(unittest.TestCase):
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.test_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.test_dir.name)
+
+        self.chart_dir = self.root / "charts" / "zot"
+        (self.chart_dir / "templates").mkdir(parents=True)
+        (self.chart_dir / "unittests").mkdir()
+        (self.chart_dir / "Chart.yaml").write_text("apiVersion: v2\nname: zot\nversion: 0.1.122\n")
+        (self.chart_dir / "values.yaml").write_text("replicaCount: 1\n")
+        (self.chart_dir / "templates" / "deployment.yaml").write_text("kind: Deployment\n")
+        (self.chart_dir / "templates" / "pdb.yaml").write_text("kind: PodDisruptionBudget\n")
+        self._write_test("deployment_test.yaml", "suite: deployment tests\n")
+        self._write_test("pdb_test.yaml", "suite: pdb tests\n")
+
+        self.cache_dir = self.root / "cache"
+        self.log_file = self.root / "helm.log"
+        self.fake_helm = self.root / "helm"
+        self.fake_helm.write_text(FAKE_HELM.format(python=sys.executable))
+        self.fake_helm.chmod(0o755)
+
+        self.env = patch.dict(os.environ, {"FAKE_HELM_LOG": str(self.log_file)})
+        self.env.start()
+
+    def tearDown(self):
+        """Clean up test fixtures"""
+        self.env.stop()
+        self.test_dir.cleanup()
+
+    def _write_test(self, name, content):
+        (self.chart_dir / "unittests" / name).write_text(content)
+
+    def _runner(self, **kwargs):
+        return HelmUnittestRunner(chart_dir=self.chart_dir, cache_dir=self.cache_dir, helm=str(self.fake_helm),
+                                  jobs=2, **kwargs)
+
+    def _run(self, runner=None):
+        runner = runner or self._runner()
+        with redirect_stdout(io.StringIO()):
+            results = runner.run(runner.discover_tests())
+        return runner, results
+
+    def _unittest_calls(self):
+        if not self.log_file.exists():
+            return []
+        return [line for line in self.log_file.read_text().splitlines() if line.startswith("unittest ")]
+
+    def test_discover_tests(self):
+        self.assertEqual(self._runner().discover_tests(),
+                         ["unittests/deployment_test.yaml", "unittests/pdb_test.yaml"])
+        self.assertEqual(HelmUnittestRunner(chart_dir=self.root / "missing").discover_tests(), [])
+
+    def test_build_command(self):
+        runner = self._runner(extra_args=["--debug"])
+        self.assertEqual(runner.build_command("unittests/pdb_test.yaml", "/tmp/r.xml"), [
+            str(self.fake_helm), "unittest", "--strict", "--file", "unittests/pdb_test.yaml",
+            "--output-type", "JUnit", "--output-file", "/tmp/r.xml", "--debug", str(self.chart_dir)
+        ])
+
+    def test_each_file_is_a_job_and_cached_on_success(self):
+        runner, results = self._run()
+        self.assertEqual(runner.ran, 2)
+        self.assertEqual(sorted(results), ["unittests/deployment_test.yaml", "unittests/pdb_test.yaml"])
+        self.assertTrue(all(returncode == 0 and report for returncode, report, _ in results.values()))
+        self.assertEqual(len(self._unittest_calls()), 2)
+
+        runner, results = self._run()
+        self.assertEqual((runner.ran, runner.cached), (0, 2))
+        self.assertTrue(all(cached for _, _, cached in results.values()))
+        self.assertEqual(len(self._unittest_calls()), 2)
+
+    def test_only_files_with_changed_inputs_rerun(self):
+        self._run()
+
+        self._write_test("pdb_test.yaml", "suite: pdb tests\n# changed\n")
+        runner, results = self._run()
+        self.assertEqual((runner.ran, runner.cached), (1, 1))
+        self.assertFalse(results["unittests/pdb_test.yaml"][2])
+
+        # Templates and values are shared inputs: changing one reruns every file.
+        (self.chart_dir / "templates" / "_helpers.tpl").write_text("{{- define \"x\" -}}{{- end -}}\n")
+        runner, _ = self._run()
+        self.assertEqual((runner.ran, runner.cached), (2, 0))
+
+        (self.chart_dir / "values.yaml").write_text("replicaCount: 2\n")
+        runner, _ = self._run()
+        self.assertEqual(runner.ran, 2)
+
+        # Extra helm unittest arguments are part of the key as well.
+        runner, _ = self._run(self._runner(extra_args=["--debug"]))
+        self.assertEqual(runner.ran, 2)
+
+    def test_snapshot_is_part_of_the_key(self):
+        self._write_test("ingress_test.yaml", "suite: ingress\nasserts: [matchSnapshot]\n")
+        runner, _ = self._run()
+        self.assertEqual(runner.ran, 3)
+        snapshot = self.chart_dir / "unittests" / "__snapshot__" / "ingress_test.yaml.snap"
+        self.assertTrue(snapshot.exists())
+
+        # The snapshot written during the first run does not cause a second run.
+        runner, _ = self._run()
+        self.assertEqual(runner.cached, 3)
+
+        snapshot.write_text("edited\n")
+        runner, _ = self._run()
+        self.assertEqual((runner.ran, runner.cached), (1, 2))
+
+    def test_failures_are_not_cached(self):
+        self._write_test("pdb_test.yaml", "suite: pdb tests\n# fail\n")
+        runner, results = self._run()
+        self.assertEqual(results["unittests/pdb_test.yaml"][0], 1)
+        self.assertIsNotNone(results["unittests/pdb_test.yaml"][1])
+
+        runner, results = self._run()
+        self.assertEqual((runner.ran, runner.cached), (1, 1))
+
+    def test_files_run_in_parallel(self):
+        for i in range(4):
+            self._write_test(f"extra{i}_test.yaml", f"suite: extra {i}\n")
+        with patch.dict(os.environ, {"FAKE_HELM_DELAY": "0.3"}):
+            start = time.monotonic()
+            runner, _ = self._run(HelmUnittestRunner(chart_dir=self.chart_dir, cache_dir="", helm=str(self.fake_helm),
+                                                     jobs=6))
+            elapsed = time.monotonic() - start
+        self.assertEqual(runner.ran, 6)
+        # Six serial runs would take at least 1.8s.
+        self.assertLess(elapsed, 1.5)
+
+    def test_merge_junit(self):
+        merged = ET.fromstring(merge_junit([
+            '<testsuites><testsuite name="a" tests="2" failures="1" errors="0" time="0.25"/></testsuites>',
+            '<testsuite name="b" tests="3" failures="0" errors="1" time="1.5"/>',
+        ]))
+        self.assertEqual([suite.get("name") for suite in merged.findall("testsuite")], ["a", "b"])
+        self.assertEqual((merged.get("tests"), merged.get("failures"), merged.get("errors"), merged.get("time")),
+                         ("5", "1", "1", "1.750"))
+
+    def test_main_writes_merged_report(self):
+        self._write_test("pdb_test.yaml", "suite: pdb tests\n# fail\n")
+        report = self.root / "junit.xml"
+        argv = ["helm_unittest_runner.py", "--chart", str(self.chart_dir), "--cache-dir", str(self.cache_dir),
+                "--helm", str(self.fake_helm), "--junit-output", str(report)]
+        with patch.object(sys, "argv", argv), redirect_stdout(io.StringIO()) as out:
+            self.assertEqual(main(), EXIT_FAILED)
+        self.assertIn("  - unittests/pdb_test.yaml", out.getvalue())
+        merged = ET.parse(report).getroot()
+        self.assertEqual((merged.get("tests"), merged.get("failures")), ("4", "1"))
+
+        # Selected files only; the passing one is served from the cache.
+        with patch.object(sys, "argv", argv + ["unittests/deployment_test.yaml"]), \
+                redirect_stdout(io.StringIO()) as out:
+            self.assertEqual(main(), EXIT_OK)
+        self.assertIn("Ran 0 test file(s), 1 served from cache", out.getvalue())
+        self.assertEqual(ET.parse(report).getroot().get("tests"), "2")
+
+    def test_main_without_unittests(self):
+        argv = ["helm_unittest_runner.py", "--chart", str(self.root / "other"), "--helm", str(self.fake_helm)]
+        with patch.object(sys, "argv", argv), redirect_stdout(io.StringIO()):
+            self.assertEqual(main(), EXIT_OK)
+        self.assertEqual(self._unittest_calls(), [])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
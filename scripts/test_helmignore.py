@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Unit tests for helmignore.py
+"""
+
+import re
+import tempfile
+import unittest
+from pathlib import Path
+
+from helmignore import HelmIgnore, translate
+
+
+def go_match(pattern, name):
+    return re.fullmatch(translate(pattern), name, re.DOTALL) is not None
+
+
+class TestTranslate(unittest.TestCase):
+
+    def test_wildcards_stop_at_separators(self):
+        self.assertTrue(go_match("*.tgz", "redis-17.0.0.tgz"))
+        self.assertFalse(go_match("*.tgz", "charts/redis.tgz"))
+        self.assertTrue(go_match("a?c", "abc"))
+        self.assertFalse(go_match("a?c", "a/c"))
+        self.assertTrue(go_match("ci/*.yaml", "ci/values.yaml"))
+
+    def test_character_classes(self):
+        self.assertTrue(go_match("[abc].txt", "b.txt"))
+        self.assertTrue(go_match("[a-c]x", "bx"))
+        self.assertFalse(go_match("[^a-c]x", "bx"))
+        self.assertTrue(go_match("[\\]]", "]"))
+        # A reversed range matches nothing; classes may match the separator.
+        self.assertFalse(go_match("[z-a]x", "ax"))
+        self.assertTrue(go_match("[^z-a]x", "ax"))
+        self.assertTrue(go_match("a[/]b", "a/b"))
+
+    def test_escapes_and_literals(self):
+        self.assertTrue(go_match("\\*.md", "*.md"))
+        self.assertFalse(go_match("\\*.md", "README.md"))
+        self.assertTrue(go_match("a+b(1).txt", "a+b(1).txt"))
+
+    def test_bad_patterns(self):
+        for pattern in ("[", "[]", "[a", "a\\", "[a-]", "[-a]"):
+            with self.subTest(pattern=pattern), self.assertRaises(ValueError):
+                translate(pattern)
+        with self.assertRaises(ValueError):
+            HelmIgnore.parse("**/*.bak\n")
+
+
+class TestHelmIgnore(unittest.TestCase):
+
+    def test_base_name_and_path_patterns(self):
+        rules = HelmIgnore.parse("# comment\n\n*.swp\nci/*.yaml\n/docs\n")
+        self.assertTrue(rules.excludes("a.swp"))
+        self.assertTrue(rules.excludes("templates/deep/b.swp"))
+        self.assertTrue(rules.excludes("ci/values.yaml"))
+        self.assertFalse(rules.excludes("sub/ci/values.yaml"))
+        self.assertTrue(rules.excludes("docs/index.md"))
+        self.assertFalse(rules.excludes("templates/docs.yaml"))
+        self.assertFalse(rules.excludes("values.yaml"))
+
+    def test_directory_rules_and_parents(self):
+        rules = HelmIgnore.parse(".git/\ntests/\n")
+        self.assertTrue(rules.excludes(".git/config"))
+        self.assertTrue(rules.excludes("templates/tests/test-connection.yaml"))
+        # A trailing slash only matches directories.
+        self.assertFalse(rules.excludes("tests"))
+        self.assertFalse(rules.ignores("tests"))
+        self.assertTrue(rules.ignores("tests", is_dir=True))
+
+    def test_defaults_ignore_hidden_templates(self):
+        rules = HelmIgnore.parse("")
+        self.assertTrue(rules.excludes("templates/.keep"))
+        self.assertFalse(rules.excludes(".helmignore"))
+        self.assertFalse(rules.excludes("templates/_helpers.tpl"))
+        self.assertFalse(HelmIgnore.parse("", defaults=False).excludes("templates/.keep"))
+
+    def test_negation_follows_helm(self):
+        # Helm ignores every path that does not match a negated rule.
+        rules = HelmIgnore.parse("!*.yaml\n", defaults=False)
+        self.assertFalse(rules.ignores("values.yaml"))
+        self.assertTrue(rules.ignores("README.md"))
+
+    def test_root_is_never_ignored(self):
+        rules = HelmIgnore.parse("*\n")
+        self.assertFalse(rules.ignores(""))
+        self.assertFalse(rules.ignores("."))
+        self.assertTrue(rules.excludes("Chart.yaml"))
+
+    def test_from_chart(self):
+        with tempfile.TemporaryDirectory() as chart_dir:
+            self.assertFalse(HelmIgnore.from_chart(chart_dir).excludes("a.bak"))
+            (Path(chart_dir) / ".helmignore").write_text("*.bak\n")
+            self.assertTrue(HelmIgnore.from_chart(chart_dir).excludes("a.bak"))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
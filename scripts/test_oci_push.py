@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Tests for oci_push.py against an in-process fake registry
+"""
+
+import base64
+import hashlib
+import io
+import json
+import re
+import sys
+import tempfile
+import threading
+import unittest
+import urllib.parse
+import uuid
+from contextlib import redirect_stdout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest.mock import patch
+
+from oci_push import (
+    CHART_MEDIA_TYPE,
+    CONFIG_MEDIA_TYPE,
+    EXIT_FAILED,
+    EXIT_OK,
+    MANIFEST_MEDIA_TYPE,
+    PROV_MEDIA_TYPE,
+    RegistryClient,
+    main,
+    parse_reference,
+)
+from test_sign_charts import make_package
+
+BLOB_PATH = re.compile(r"^/v2/(?P<repo>.+)/blobs/(?P<digest>sha256:[0-9a-f]{64})$")
+UPLOAD_PATH = re.compile(r"^/v2/(?P<repo>.+)/blobs/uploads/(?P<session>[^/]*)$")
+MANIFEST_PATH = re.compile(r"^/v2/(?P<repo>.+)/manifests/(?P<tag>[^/]+)$")
+
+
+class FakeRegistry:
+    """Just enough of the OCI distribution API for pushes, served on a local port.
+
+    auth="bearer" demands tokens from /token (Basic credentials user:secret) and
+    checks their scope; mounts=False answers every mount request with a plain
+    upload session, like registries that do not support cross-repo mounts.
+    """
+
+    def __init__(self, auth=None, mounts=True):
+        self.auth = auth
+        self.mounts = mounts
+        self.blobs = {}
+        self.manifests = {}
+        self.uploads = {}
+        self.requests = []
+        self.connections = set()
+        self.lock = threading.Lock()
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _handle(self):
+                url = urllib.parse.urlsplit(self.path)
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                with registry.lock:
+                    registry.requests.append((self.command, url.path, urllib.parse.parse_qs(url.query)))
+                    registry.connections.add(self.client_address)
+                status, headers, data = registry.respond(self.command, url, self.headers, body)
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                if self.command != "HEAD":
+                    self.wfile.write(data)
+
+            do_GET = do_HEAD = do_POST = do_PUT = _handle
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.host = f"127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def count(self, method, pattern=""):
+        return sum(1 for m, path, _ in self.requests if m == method and pattern in path)
+
+    def _authorized(self, headers, repo, action):
+        if self.auth != "bearer":
+            return True
+        header = headers.get("Authorization", "")
+        if not header.startswith("Bearer "):
+            return False
+        scopes = json.loads(base64.b64decode(header[len("Bearer "):]))
+        return any(scope.startswith(f"repository:{repo}:") and action in scope.rsplit(":", 1)[1]
+                   for scope in scopes)
+
+    def respond(self, method, url, headers, body):
+        if url.path == "/token":
+            expected = "Basic " + base64.b64encode(b"user:secret").decode()
+            if headers.get("Authorization") != expected:
+                return 401, {}, b""
+            scopes = urllib.parse.parse_qs(url.query).get("scope", [])
+            return 200, {}, json.dumps({"token": base64.b64encode(json.dumps(scopes).encode()).decode()}).encode()
+
+        match = BLOB_PATH.match(url.path) or UPLOAD_PATH.match(url.path) or MANIFEST_PATH.match(url.path)
+        if not match:
+            return 404, {}, b""
+        repo = match.group("repo")
+        action = "pull" if method in ("GET", "HEAD") else "push"
+        if not self._authorized(headers, repo, action):
+            challenge = (f'Bearer realm="http://{self.host}/token",service="fake",'
+                         f'scope="repository:{repo}:{action}"')
+            return 401, {"WWW-Authenticate": challenge}, b""
+
+        query = urllib.parse.parse_qs(url.query)
+        with self.lock:
+            if BLOB_PATH.match(url.path):
+                found = match.group("digest") in self.blobs.get(repo, {})
+                return (200 if found else 404), {}, b""
+            if MANIFEST_PATH.match(url.path) and method == "PUT":
+                manifest = json.loads(body)
+                for descriptor in [manifest["config"], *manifest["layers"]]:
+                    if descriptor["digest"] not in self.blobs.get(repo, {}):
+                        return 400, {}, b"MANIFEST_BLOB_UNKNOWN"
+                self.manifests[(repo, match.group("tag"))] = body
+                return 201, {"Docker-Content-Digest": "sha256:" + hashlib.sha256(body).hexdigest()}, b""
+            if method == "POST" and not match.group("session"):
+                if "mount" in query:
+                    source = query["from"][0]
+                    digest = query["mount"][0]
+                    if self.mounts and digest in self.blobs.get(source, {}) and \
+                            self._authorized(headers, source, "pull"):
+                        self.blobs.setdefault(repo, {})[digest] = self.blobs[source][digest]
+                        return 201, {}, b""
+                session = uuid.uuid4().hex
+                self.uploads[session] = repo
+                return 202, {"Location": f"/v2/{repo}/blobs/uploads/{session}"}, b""
+            if method == "PUT" and self.uploads.get(match.group("session")) == repo:
+                digest = query["digest"][0]
+                if "sha256:" + hashlib.sha256(body).hexdigest() != digest:
+                    return 400, {}, b"DIGEST_INVALID"
+                del self.uploads[match.group("session")]
+                self.blobs.setdefault(repo, {})[digest] = body
+                return 201, {}, b""
+        return 404, {}, b""
+
+
+class TestOciPush(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.test_dir.cleanup)
+        self.packages = [make_package(self.test_dir.name, f"chart{i}", f"1.{i}.0", "description: Test\n")
+                         for i in range(3)]
+
+    def _registry(self, **kwargs):
+        registry = FakeRegistry(**kwargs)
+        registry.__enter__()
+        self.addCleanup(registry.__exit__)
+        return registry
+
+    def _client(self, registry, **kwargs):
+        client = RegistryClient(registry.host, plain_http=True, **kwargs)
+        self.addCleanup(client.close)
+        return client
+
+    def test_parse_reference(self):
+        self.assertEqual(parse_reference("oci://ghcr.io/project-zot/helm-charts"),
+                         ("ghcr.io", "project-zot/helm-charts"))
+        self.assertEqual(parse_reference("oci://localhost:5000/"), ("localhost:5000", ""))
+        with self.assertRaises(ValueError):
+            parse_reference("https://ghcr.io/x")
+
+    def test_manifest_matches_helm_layout(self):
+        Path(f"{self.packages[0]}.prov").write_text("signed\n")
+        registry = self._registry()
+        result = self._client(registry).push_chart(self.packages[0], "charts")
+
+        self.assertEqual(result["reference"], f"{registry.host}/charts/chart0:1.0.0")
+        manifest = json.loads(registry.manifests[("charts/chart0", "1.0.0")])
+        self.assertEqual(manifest["mediaType"], MANIFEST_MEDIA_TYPE)
+        self.assertEqual(manifest["config"]["mediaType"], CONFIG_MEDIA_TYPE)
+        self.assertEqual([layer["mediaType"] for layer in manifest["layers"]], [CHART_MEDIA_TYPE, PROV_MEDIA_TYPE])
+        self.assertEqual(manifest["annotations"]["org.opencontainers.image.version"], "1.0.0")
+        config = registry.blobs["charts/chart0"][manifest["config"]["digest"]]
+        self.assertEqual(json.loads(config), {"name": "chart0", "version": "1.0.0", "description": "Test",
+                                              "apiVersion": "v2"})
+        self.assertEqual(registry.blobs["charts/chart0"][manifest["layers"][0]["digest"]],
+                         self.packages[0].read_bytes())
+
+    def test_existing_blobs_are_not_uploaded_again(self):
+        registry = self._registry()
+        client = self._client(registry)
+        client.push_charts(self.packages, "charts")
+        self.assertEqual(client.stats, {"exists": 0, "mounted": 0, "uploaded": 6})
+
+        again = self._client(registry)
+        results = again.push_charts(self.packages, "charts")
+        self.assertTrue(all(error is None for _, error in results.values()))
+        self.assertEqual(again.stats, {"exists": 6, "mounted": 0, "uploaded": 0})
+        # Only the first run uploaded: one POST and PUT per blob, plus one manifest per chart each run.
+        self.assertEqual(registry.count("POST"), 6)
+        self.assertEqual(registry.count("PUT", "/manifests/"), 6)
+
+    def test_cross_repository_mounts(self):
+        registry = self._registry()
+        self._client(registry).push_charts(self.packages, "charts")
+
+        client = self._client(registry)
+        client.push_charts(self.packages, "mirror", mount_from=["charts"])
+        self.assertEqual(client.stats, {"exists": 0, "mounted": 6, "uploaded": 0})
+        self.assertEqual(registry.count("PUT", "/blobs/uploads/"), 6)
+        self.assertIn(("mirror/chart1", "1.1.0"), registry.manifests)
+
+        # Within one run, a blob pushed to one repository is mounted into the next.
+        both = self._client(registry)
+        both.push_chart(self.packages[0], "a")
+        both.push_chart(self.packages[0], "b")
+        self.assertEqual(both.stats, {"exists": 0, "mounted": 2, "uploaded": 2})
+
+    def test_mount_refused_falls_back_to_upload_session(self):
+        registry = self._registry(mounts=False)
+        self._client(registry).push_chart(self.packages[0], "charts")
+        client = self._client(registry)
+        client.push_chart(self.packages[0], "mirror", mount_from=["charts"])
+        self.assertEqual(client.stats["uploaded"], 2)
+        # The refused mount's session carried the upload; no second POST per blob.
+        self.assertEqual(registry.count("POST", "/v2/mirror/"), 2)
+
+    def test_bearer_token_flow(self):
+        registry = self._registry(auth="bearer")
+        client = self._client(registry, username="user", password="secret")
+        results = client.push_charts(self.packages, "charts")
+        self.assertTrue(all(error is None for _, error in results.values()), results)
+        # One token per repository scope, not one per request.
+        self.assertEqual(registry.count("GET", "/token"), 3)
+
+        denied = self._client(registry, username="user", password="wrong")
+        _, error = denied.push_charts(self.packages[:1], "charts")[self.packages[0]]
+        self.assertIn("Token request", error)
+
+    def test_connections_are_pooled(self):
+        registry = self._registry()
+        client = self._client(registry, jobs=2)
+        client.push_charts(self.packages, "charts")
+        self.assertLessEqual(client.pool.opened, 2)
+        self.assertLessEqual(len(registry.connections), 2)
+        self.assertGreater(len(registry.requests), len(registry.connections) * 5)
+
+    def test_main(self):
+        registry = self._registry(auth="bearer")
+        argv = ["oci_push.py", "--repository", f"oci://{registry.host}/charts", "--plain-http",
+                "--username", "user", "--password-stdin"] + [str(p) for p in self.packages]
+        with patch.object(sys, "argv", argv), patch.object(sys, "stdin", io.StringIO("secret\n")), \
+                redirect_stdout(io.StringIO()) as out:
+            self.assertEqual(main(), EXIT_OK)
+        self.assertIn(f"Pushed: {registry.host}/charts/chart2:1.2.0", out.getvalue())
+        self.assertIn("Blobs: 6 uploaded, 0 mounted, 0 already present", out.getvalue())
+
+        broken = Path(self.test_dir.name) / "broken.tgz"
+        broken.write_text("not an archive")
+        with patch.object(sys, "argv", argv + [str(broken)]), patch.object(sys, "stdin", io.StringIO("secret\n")), \
+                redirect_stdout(io.StringIO()) as out:
+            self.assertEqual(main(), EXIT_FAILED)
+        self.assertIn(f"Failed to push {broken}", out.getvalue())
+        self.assertIn("6 already present", out.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
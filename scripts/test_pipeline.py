@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Tests for pipeline.py and the pipelined process_all_changes
+"""
+
+import io
+import os
+import threading
+import time
+import unittest
+from contextlib import redirect_stdout
+from unittest.mock import patch
+
+from chart_tracker import ChartTracker
+from pipeline import Pipeline
+from test_chart_tracker_integration import ChartRepoTestCase
+
+
+class TestPipeline(unittest.TestCase):
+
+    def test_dependencies_receive_results(self):
+        pipeline = Pipeline()
+        pipeline.step("a", lambda: 1)
+        pipeline.step("b", lambda: 2)
+        pipeline.step("sum", lambda a, b: a + b, deps=["a", "b"])
+        self.assertEqual(pipeline.run(), {"a": 1, "b": 2, "sum": 3})
+
+    def test_undeclared_dependency(self):
+        with self.assertRaises(ValueError):
+            Pipeline().step("b", lambda a: a, deps=["a"])
+
+    def test_independent_steps_overlap_within_bound(self):
+        active, peak = [0], [0]
+        lock = threading.Lock()
+
+        def work():
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.05)
+            with lock:
+                active[0] -= 1
+
+        pipeline = Pipeline(max_workers=2)
+        for name in "abcd":
+            pipeline.step(name, work)
+        pipeline.run()
+        self.assertEqual(peak[0], 2)
+
+    def test_output_replays_in_declaration_order(self):
+        events = []
+
+        def slow():
+            time.sleep(0.05)
+            print("slow")
+            emit("slow_done")
+
+        def fast():
+            print("fast")
+            emit("fast_done")
+
+        pipeline = Pipeline()
+        emit = pipeline.capture_events(lambda event, **fields: events.append(event))
+        pipeline.step("slow", slow)
+        pipeline.step("fast", fast)
+        with redirect_stdout(io.StringIO()) as out:
+            pipeline.run()
+            self.assertEqual(out.getvalue(), "")
+            pipeline.replay("slow", "fast")
+        self.assertEqual(out.getvalue(), "slow\nfast\n")
+        self.assertEqual(events, ["slow_done", "fast_done"])
+
+    def test_streamed_steps_pass_through_in_declaration_order(self):
+        events, seen = [], []
+
+        def first():
+            emit("first_started")
+            time.sleep(0.05)
+            seen.append(list(events))
+            print("first")
+
+        def second():
+            emit("second_done")
+            print("second")
+
+        pipeline = Pipeline()
+        emit = pipeline.capture_events(lambda event, **fields: events.append(event))
+        pipeline.step("first", first, stream=True)
+        pipeline.step("second", second, stream=True)
+        pipeline.step("held", lambda: print("held"))
+        with redirect_stdout(io.StringIO()) as out:
+            pipeline.run()
+            self.assertEqual(out.getvalue(), "first\nsecond\n")
+            pipeline.replay("held")
+        # The first step streams while it runs; the second, finished early, waits for it.
+        self.assertEqual(seen, [["first_started"]])
+        self.assertEqual(events, ["first_started", "second_done"])
+        self.assertEqual(out.getvalue(), "first\nsecond\nheld\n")
+
+    def test_failure_replays_output_up_to_the_failed_step(self):
+        def fail():
+            print("failing")
+            raise RuntimeError("boom")
+
+        pipeline = Pipeline()
+        pipeline.step("first", lambda: print("first"))
+        pipeline.step("fail", fail)
+        pipeline.step("after", lambda fail: None, deps=["fail"])
+        pipeline.step("other", lambda: print("other"))
+        with redirect_stdout(io.StringIO()) as out, self.assertRaisesRegex(RuntimeError, "boom"):
+            pipeline.run()
+        self.assertEqual(out.getvalue(), "first\nfailing\n")
+
+
+class TestPipelinedProcess(ChartRepoTestCase):
+    """process_all_changes prints exactly what a sequential run would"""
+
+    def test_output_matches_sequential_order(self):
+        os.chdir(self.repo_path)
+        self._create_branch('feature-branch')
+        self._modify_chart('charts/test-chart-1/values.yaml', {'replicaCount: 1': 'replicaCount: 2'})
+        self._modify_chart('charts/test-chart-2/values.yaml', {'replicaCount: 1': 'replicaCount: 3'})
+        self._modify_chart('charts/test-chart-2/Chart.yaml', {'version: 2.0.0': 'version: 2.0.1'})
+        self._commit_changes('Change both charts, bump chart 2')
+
+        def helm_docs(charts_dir):
+            # Finishes first: its output must still come after bump detection's.
+            print("helm-docs ran")
+            return ["charts/test-chart-1/README.md"]
+
+        def events(event, chart=None, **fields):
+            print(f"event {event} {chart}")
+
+        tracker = ChartTracker(str(self.state_file), events=events)
+        real_check = tracker.check_version_bumps_in_commits
+
+        streamed = []
+
+        def slow_check(*args):
+            streamed.append(out.getvalue())
+            time.sleep(0.1)
+            return real_check(*args)
+
+        with patch.object(tracker, "run_helm_docs", side_effect=helm_docs), \
+                patch.object(tracker, "check_version_bumps_in_commits", side_effect=slow_check), \
+                redirect_stdout(io.StringIO()) as out:
+            tracker.process_all_changes("HEAD~1")
+
+        # Detection's events are out before bump detection finishes.
+        self.assertIn("event chart_discovered charts/test-chart-2", streamed[0])
+        lines = out.getvalue().splitlines()
+        self.assertEqual(lines[:2], ["event chart_discovered charts/test-chart-1",
+                                     "event chart_discovered charts/test-chart-2"])
+        order = [lines.index(line) for line in (
+            "Found 2 changed charts",
+            "event existing_bump charts/test-chart-2",
+            "Adding 1 charts that need version bumps",
+            "helm-docs ran",
+            "Found 1 changed documentation files",
+        )]
+        self.assertEqual(order, sorted(order))
+        self.assertEqual(tracker.state["charts_to_bump"], ["charts/test-chart-1"])
+        self.assertIs(tracker.events, events)
+
+    def test_fingerprints_are_taken_before_helm_docs(self):
+        os.chdir(self.repo_path)
+        calls = []
+
+        def check_fingerprints(charts_dir):
+            time.sleep(0.1)
+            calls.append("fingerprints")
+            return [], []
+
+        def helm_docs(charts_dir):
+            calls.append("helm-docs")
+            return []
+
+        tracker = ChartTracker(str(self.state_file))
+        tracker.fingerprints = object()
+        with patch.object(tracker, "since_is_usable", return_value=False), \
+                patch.object(tracker, "check_fingerprints", side_effect=check_fingerprints), \
+                patch.object(tracker, "run_helm_docs", side_effect=helm_docs), \
+                redirect_stdout(io.StringIO()):
+            tracker.process_all_changes("0" * 40)
+        self.assertEqual(calls, ["fingerprints", "helm-docs"])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Unit tests for render_benchmark.py using a fake helm executable
+"""
+
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import textwrap
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+from unittest.mock import patch
+
+import yaml
+
+from render_benchmark import (
+    EXIT_ERROR,
+    EXIT_OK,
+    EXIT_REGRESSION,
+    HISTORY_LIMIT,
+    PROFILES,
+    RenderBenchmark,
+    baselines,
+    find_regressions,
+    main,
+)
+
+# Fake `helm`: `version` prints $FAKE_HELM_VERSION, `template` sleeps $FAKE_HELM_DELAY
+# seconds and prints the keys of the values file it was given.
+FAKE_HELM = textwrap.dedent("""\
+    #!{python}
+    import os, sys, time, yaml
+    args = sys.argv[1:]
+    with open(os.environ["FAKE_HELM_LOG"], "a") as f:
+        f.write(" ".join(args) + "\\n")
+    if args[0] == "version":
+        print(os.environ.get("FAKE_HELM_VERSION", "v3.19.4"), end="")
+        sys.exit(0)
+    values = yaml.safe_load(open(args[args.index("--values") + 1])) or {{}}
+    if os.environ.get("FAKE_HELM_FAIL"):
+        sys.stderr.write("Error: render failed\\n")
+        sys.exit(1)
+    time.sleep(float(os.environ.get("FAKE_HELM_DELAY", "0")))
+    print("kind: Deployment")
+    print("keys: " + ",".join(sorted(values)))
+""")
+
+
+def history_run(helm, **medians):
+    return {"helm": helm, "profiles": {name: {"median": median} for name, median in medians.items()}}
+
+
+class TestRenderBenchmark(unittest.TestCase):
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.test_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.test_dir.cleanup)
+        self.root = Path(self.test_dir.name)
+
+        self.chart_dir = self.root / "charts" / "zot"
+        self.chart_dir.mkdir(parents=True)
+        (self.chart_dir / "Chart.yaml").write_text("apiVersion: v2\nname: zot\nversion: 0.1.122\n")
+        self.history_file = self.root / "history.json"
+        self.log_file = self.root / "helm.log"
+        self.fake_helm = self.root / "helm"
+        self.fake_helm.write_text(FAKE_HELM.format(python=sys.executable))
+        self.fake_helm.chmod(0o755)
+
+        env = patch.dict(os.environ, {"FAKE_HELM_LOG": str(self.log_file)})
+        env.start()
+        self.addCleanup(env.stop)
+
+    def _main(self, *args):
+        argv = ["render_benchmark.py", "--chart", str(self.chart_dir), "--helm", str(self.fake_helm),
+                "--history-file", str(self.history_file), "--repeat", "2", "--warmup", "1"] + list(args)
+        with patch.object(sys, "argv", argv), redirect_stdout(io.StringIO()) as out:
+            code = main()
+        return code, out.getvalue()
+
+    def test_profiles_stress_the_documented_values(self):
+        sizes = {name: len(yaml.safe_dump(profile())) for name, profile in PROFILES.items()}
+        self.assertEqual(PROFILES["default"](), {})
+        config = PROFILES["config-files"]()
+        self.assertTrue(config["mountConfig"])
+        self.assertGreater(len(config["configFiles"]["config.json"]), 100 * 1024)
+        secrets = PROFILES["secret-files"]()
+        self.assertTrue(secrets["mountSecret"])
+        self.assertEqual(len(secrets["secretFiles"]["htpasswd"].splitlines()), 5000)
+        self.assertEqual(len(PROFILES["extra-containers"]()["extraContainers"]), 50)
+        self.assertIn("{{ .Values.global.pool }}", PROFILES["tpl-values"]()["tolerations"][0]["value"])
+        self.assertEqual(sizes["combined"], max(sizes.values()))
+        # Deterministic, so runs measure the same input.
+        self.assertEqual(PROFILES["secret-files"](), secrets)
+
+    def test_measure_times_repeats_after_warmup(self):
+        benchmark = RenderBenchmark(chart_dir=str(self.chart_dir), helm=str(self.fake_helm), repeat=3, warmup=2)
+        with patch.dict(os.environ, {"FAKE_HELM_DELAY": "0.05"}):
+            result = benchmark.run(["default", "extra-containers"])
+        self.assertEqual(result["helm"], "v3.19.4")
+        self.assertEqual(list(result["profiles"]), ["default", "extra-containers"])
+        for measured in result["profiles"].values():
+            self.assertGreaterEqual(measured["min"], 0.05)
+            self.assertLessEqual(measured["min"], measured["median"])
+            self.assertLessEqual(measured["median"], measured["max"])
+        self.assertEqual(result["profiles"]["extra-containers"]["bytes"],
+                         len("kind: Deployment\nkeys: extraContainers,extraVolumes\n"))
+        renders = [line for line in self.log_file.read_text().splitlines() if line.startswith("template")]
+        self.assertEqual(len(renders), 2 * (2 + 3))
+        self.assertTrue(all("--namespace default" in line for line in renders))
+
+    def test_baselines_and_regressions(self):
+        history = {"runs": [history_run("v3.18.0", default=0.01)]
+                   + [history_run("v3.19.4", default=median, combined=0.5) for median in (0.1, 0.1, 0.2, 0.1)]}
+        self.assertEqual(baselines(history, "v3.19.4"), {"default": 0.1, "combined": 0.5})
+        self.assertEqual(baselines(history, "v3.19.4", window=1), {"default": 0.1, "combined": 0.5})
+        self.assertEqual(baselines(history, "v3.18.0"), {"default": 0.01})
+
+        result = history_run("v3.19.4", default=0.2, combined=0.55, other=9.0)
+        self.assertEqual(find_regressions(result, {"default": 0.1, "combined": 0.5}), [("default", 0.2, 0.1)])
+        # Relative slowdowns below the absolute floor are jitter.
+        self.assertEqual(find_regressions(history_run("v", fast=0.004), {"fast": 0.001}), [])
+
+    def test_main_records_and_flags_regressions(self):
+        code, out = self._main("default", "tpl-values")
+        self.assertEqual(code, EXIT_OK)
+        self.assertIn("No earlier runs with helm v3.19.4", out)
+        self.assertIn("tpl-values", out)
+
+        with patch.dict(os.environ, {"FAKE_HELM_DELAY": "0.2"}):
+            code, out = self._main("default", "--no-record")
+            self.assertEqual(code, EXIT_REGRESSION)
+            self.assertIn("Regression: default rendered in", out)
+            self.assertEqual(self._main("default", "--threshold", "100")[0], EXIT_OK)
+        self.assertEqual(len(json.loads(self.history_file.read_text())["runs"]), 2)
+
+        # A different helm version starts a new baseline.
+        with patch.dict(os.environ, {"FAKE_HELM_DELAY": "0.2", "FAKE_HELM_VERSION": "v3.20.0"}):
+            self.assertEqual(self._main("default")[0], EXIT_OK)
+
+    def test_history_is_bounded(self):
+        self.history_file.write_text(json.dumps({"runs": [history_run("v0", default=1.0)] * HISTORY_LIMIT}))
+        self.assertEqual(self._main("default")[0], EXIT_OK)
+        runs = json.loads(self.history_file.read_text())["runs"]
+        self.assertEqual(len(runs), HISTORY_LIMIT)
+        self.assertEqual(runs[-1]["helm"], "v3.19.4")
+
+        self.history_file.write_text("not json")
+        code, out = self._main("default")
+        self.assertEqual(code, EXIT_OK)
+        self.assertIn("Warning: Could not load history file", out)
+
+    def test_errors(self):
+        with patch.dict(os.environ, {"FAKE_HELM_FAIL": "1"}):
+            code, out = self._main("default")
+        self.assertEqual(code, EXIT_ERROR)
+        self.assertIn("Error: helm template failed: Error: render failed", out)
+        self.assertFalse(self.history_file.exists())
+
+        with redirect_stdout(io.StringIO()), patch("sys.stderr", io.StringIO()), \
+                self.assertRaises(SystemExit):
+            self._main("no-such-profile")
+
+    @unittest.skipUnless(shutil.which("helm"), "helm is not installed")
+    def test_profiles_render_with_real_helm(self):
+        chart = Path(__file__).resolve().parent.parent / "charts" / "zot"
+        result = RenderBenchmark(chart_dir=str(chart), repeat=1, warmup=0).run(list(PROFILES))
+        self.assertGreater(result["profiles"]["combined"]["bytes"], result["profiles"]["default"]["bytes"])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
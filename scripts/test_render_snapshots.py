@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Unit tests for render_snapshots.py using a fake helm executable
+"""
+
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import textwrap
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+from unittest.mock import patch
+
+from render_snapshots import (
+    EXIT_ERROR,
+    EXIT_MISMATCH,
+    EXIT_OK,
+    RenderSnapshotSuite,
+    load_case_values,
+    main,
+    normalize_manifest,
+)
+
+# Fake `helm`: `version` prints a version, `template` renders a ConfigMap that embeds
+# the values file, with the chart label and a random rollme annotation like the zot chart.
+FAKE_HELM = textwrap.dedent("""\
+    #!{python}
+    import os, random, string, sys
+    args = sys.argv[1:]
+    with open(os.environ["FAKE_HELM_LOG"], "a") as f:
+        f.write(" ".join(args) + "\\n")
+    if args[0] == "version":
+        print("v3.19.4", end="")
+        sys.exit(0)
+    values = open(args[args.index("--values") + 1]).read()
+    if "fail" in values:
+        sys.stderr.write("Error: render failed\\n")
+        sys.exit(1)
+    print("---")
+    print("# Source: zot/templates/configmap.yaml")
+    print("kind: ConfigMap   ")
+    print("metadata:")
+    print("  labels:")
+    print("    helm.sh/chart: zot-0.1.122")
+    print("  annotations:")
+    print('    rollme: "' + "".join(random.choice(string.ascii_letters) for _ in range(5)) + '"')
+    print("data:")
+    for line in values.splitlines():
+        print("  # " + line)
+""")
+
+
+class TestRenderSnapshots(unittest.TestCase):
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.test_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.test_dir.name)
+
+        self.chart_dir = self.root / "charts" / "zot"
+        (self.chart_dir / "templates").mkdir(parents=True)
+        (self.chart_dir / "Chart.yaml").write_text("apiVersion: v2\nname: zot\nversion: 0.1.122\n")
+        (self.chart_dir / "values.yaml").write_text("replicaCount: 1\n")
+        (self.chart_dir / "templates" / "configmap.yaml").write_text("kind: ConfigMap\n")
+
+        self.cases_dir = self.root / "tests" / "ci"
+        self.snapshot_dir = self.root / "tests" / "snapshots"
+        self.cache_dir = self.root / "cache"
+        self.log_file = self.root / "helm.log"
+
+        self.fake_helm = self.root / "helm"
+        self.fake_helm.write_text(FAKE_HELM.format(python=sys.executable))
+        self.fake_helm.chmod(0o755)
+
+        self.env = patch.dict(os.environ, {"FAKE_HELM_LOG": str(self.log_file)})
+        self.env.start()
+
+    def tearDown(self):
+        """Clean up test fixtures"""
+        self.env.stop()
+        self.test_dir.cleanup()
+
+    def _create_case(self, name, values):
+        case = self.cases_dir / name
+        case.mkdir(parents=True, exist_ok=True)
+        (case / "values.yaml").write_text(values)
+        return case.as_posix()
+
+    def _suite(self, **kwargs):
+        kwargs.setdefault("cache_dir", str(self.cache_dir))
+        return RenderSnapshotSuite(chart_dir=str(self.chart_dir), snapshot_dir=str(self.snapshot_dir),
+                                   helm=str(self.fake_helm), jobs=2, **kwargs)
+
+    def _template_calls(self):
+        if not self.log_file.exists():
+            return 0
+        return sum(1 for line in self.log_file.read_text().splitlines() if line.startswith("template"))
+
+    def test_load_case_values_uses_subchart_section_and_global(self):
+        values_file = self.root / "values.yaml"
+        values_file.write_text("global:\n  pool: a\nzot:\n  replicaCount: 2\nother:\n  x: 1\n")
+        self.assertEqual(load_case_values(values_file), {"replicaCount": 2, "global": {"pool": "a"}})
+
+    def test_load_case_values_without_subchart_section(self):
+        values_file = self.root / "values.yaml"
+        values_file.write_text("other: 1\n")
+        self.assertEqual(load_case_values(values_file), {})
+
+    def test_normalize_manifest(self):
+        text = 'kind: A   \n  helm.sh/chart: zot-1.2.3\n  rollme: "aBcDe"\n\n\n'
+        self.assertEqual(normalize_manifest(text, "zot", "1.2.3"),
+                         'kind: A\n  helm.sh/chart: zot-VERSION\n  rollme: "RANDOM"\n')
+
+    def test_discover_cases(self):
+        self._create_case("b", "zot: {}\n")
+        self._create_case("a", "zot: {}\n")
+        (self.cases_dir / "no-values").mkdir()
+        cases = RenderSnapshotSuite.discover_cases(str(self.cases_dir))
+        self.assertEqual([Path(c).name for c in cases], ["a", "b"])
+
+    def test_update_then_check_passes(self):
+        """Update mode writes normalized snapshots; a later check finds no changes"""
+        cases = [self._create_case("default", "zot:\n  replicaCount: 1\n")]
+
+        with patch('builtins.print'):
+            changed = self._suite().run(cases, update=True)
+        self.assertEqual(changed, cases)
+        snapshot = (self.snapshot_dir / "default.yaml").read_text()
+        self.assertIn("helm.sh/chart: zot-VERSION", snapshot)
+        self.assertIn('rollme: "RANDOM"', snapshot)
+
+        with patch('builtins.print'):
+            self.assertEqual(self._suite(cache_dir="").run(cases), [])
+
+    def test_check_reports_mismatch_and_missing(self):
+        cases = [self._create_case("default", "zot:\n  replicaCount: 1\n")]
+        with patch('builtins.print'):
+            self._suite().run(cases, update=True)
+
+        cases.append(self._create_case("tls", "zot:\n  httpGet:\n    scheme: HTTPS\n"))
+        self._create_case("default", "zot:\n  replicaCount: 3\n")
+        with patch('builtins.print'), patch('sys.stdout.writelines') as mock_diff:
+            changed = self._suite().run(cases)
+        self.assertEqual(changed, cases)
+        diff = "".join(mock_diff.call_args[0][0])
+        self.assertIn("+  # replicaCount: 3", diff)
+
+    def test_cache_skips_helm_for_unchanged_inputs(self):
+        """Second run is served entirely from the cache; a chart change invalidates it"""
+        cases = [self._create_case("a", "zot:\n  replicaCount: 1\n"),
+                 self._create_case("b", "zot:\n  replicaCount: 2\n")]
+
+        with patch('builtins.print'):
+            self._suite().run(cases, update=True)
+        self.assertEqual(self._template_calls(), 2)
+
+        suite = self._suite()
+        with patch('builtins.print'):
+            self.assertEqual(suite.run(cases), [])
+        self.assertEqual(self._template_calls(), 2)
+        self.assertEqual((suite.rendered, suite.cached), (0, 2))
+
+        (self.chart_dir / "templates" / "configmap.yaml").write_text("kind: ConfigMap\n# changed\n")
+        with patch('builtins.print'):
+            self._suite().run(cases)
+        self.assertEqual(self._template_calls(), 4)
+
+    def test_list_changed_since_compares_with_committed_snapshots(self):
+        """Only cases rendering differently from their snapshot at the revision are listed"""
+        cases = [self._create_case("a", "zot:\n  replicaCount: 1\n"),
+                 self._create_case("b", "zot:\n  replicaCount: 2\n")]
+        template = Path(cases[0]) / "templates" / "test-connection.yaml"
+        template.parent.mkdir()
+        template.write_text("kind: Pod\n")
+        with patch('builtins.print'):
+            self._suite().run(cases, update=True)
+        for args in (['init', '-q'], ['add', '-A'],
+                     ['-c', 'user.name=Test', '-c', 'user.email=test@example.com', '-c', 'commit.gpgsign=false',
+                      'commit', '-q', '-m', 'Snapshots']):
+            subprocess.run(['git'] + args, cwd=self.root, check=True, capture_output=True)
+
+        self.assertEqual(self._suite().changed_since(cases, "HEAD"), [])
+        # Case-local files are installed alongside the zot chart, though they are not in the snapshot.
+        template.write_text("kind: Job\n")
+        self.assertEqual(self._suite().changed_since(cases, "HEAD"), cases[:1])
+        template.write_text("kind: Pod\n")
+        (template.parent / "new.yaml").write_text("kind: Pod\n")
+        self.assertEqual(self._suite().changed_since(cases, "HEAD"), cases[:1])
+        (template.parent / "new.yaml").unlink()
+
+        self._create_case("b", "zot:\n  replicaCount: 3\n")
+        cases.append(self._create_case("c", "zot:\n  replicaCount: 4\n"))
+        self.assertEqual(self._suite().changed_since(cases, "HEAD"), cases[1:])
+        # Without that revision nothing can be ruled out.
+        self.assertEqual(self._suite().changed_since(cases, "no-such-rev"), cases)
+
+        argv = ["render_snapshots.py", "--cases-dir", str(self.cases_dir), "--chart", str(self.chart_dir),
+                "--snapshot-dir", str(self.snapshot_dir), "--cache-dir", str(self.cache_dir),
+                "--helm", str(self.fake_helm), "--list-changed-since", "HEAD"]
+        with patch.object(sys, 'argv', argv), redirect_stdout(io.StringIO()) as out:
+            self.assertEqual(main(), EXIT_OK)
+        self.assertEqual(out.getvalue().splitlines(), cases[1:])
+
+    def test_render_error_raises(self):
+        cases = [self._create_case("broken", "zot:\n  fail: true\n")]
+        with patch('builtins.print'):
+            with self.assertRaises(RuntimeError):
+                self._suite().run(cases)
+
+    def test_main_exit_codes(self):
+        self._create_case("default", "zot:\n  replicaCount: 1\n")
+        argv = ["render_snapshots.py", "--cases-dir", str(self.cases_dir), "--chart", str(self.chart_dir),
+                "--snapshot-dir", str(self.snapshot_dir), "--cache-dir", str(self.cache_dir),
+                "--helm", str(self.fake_helm)]
+
+        with patch.object(sys, 'argv', argv), patch('builtins.print'):
+            self.assertEqual(main(), EXIT_MISMATCH)
+        with patch.object(sys, 'argv', argv + ["--update"]), patch('builtins.print'):
+            self.assertEqual(main(), EXIT_OK)
+        with patch.object(sys, 'argv', argv), patch('builtins.print'):
+            self.assertEqual(main(), EXIT_OK)
+
+        self._create_case("broken", "zot:\n  fail: true\n")
+        with patch.object(sys, 'argv', argv), patch('builtins.print'):
+            self.assertEqual(main(), EXIT_ERROR)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Tests for run_metrics.py and `chart_tracker.py --metrics-file`
+"""
+
+import io
+import os
+import re
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+from unittest.mock import patch
+
+import run_metrics
+from chart_tracker import main as tracker_main
+from command_runner import CommandRunner
+from run_metrics import BUCKETS, RunMetrics
+from test_chart_tracker_integration import ChartRepoTestCase
+
+SAMPLE_RE = re.compile(r'^(\S+?)(\{.*\})? (\S+)$')
+
+
+def parse_samples(text):
+    """Return {(sample name, label text): value} of an OpenMetrics text"""
+    samples = {}
+    for line in text.splitlines():
+        if line.startswith("#"):
+            continue
+        name, labels, value = SAMPLE_RE.match(line).groups()
+        samples[(name, labels or "")] = float(value)
+    return samples
+
+
+class TestRunMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.test_dir.cleanup)
+        self.path = Path(self.test_dir.name) / "textfile" / "chart-automation.prom"
+
+    def test_render_openmetrics(self):
+        metrics = RunMetrics("release")
+        metrics.inc("subprocess_calls", 3, command="git diff")
+        metrics.set("charts_changed", 2)
+        metrics.set("charts_packaged", 1, phase='say "hi"\n')
+        metrics.observe("phase_duration_seconds", 0.3, phase="docs")
+        text = metrics.render()
+
+        self.assertTrue(text.endswith("# EOF\n"))
+        self.assertIn("# TYPE chart_automation_subprocess_calls counter\n"
+                      "# HELP chart_automation_subprocess_calls External commands started (memoized calls excluded)\n"
+                      'chart_automation_subprocess_calls_total{command="git diff",task="release"} 3\n', text)
+        self.assertIn('chart_automation_charts_changed{task="release"} 2\n', text)
+        self.assertIn('chart_automation_charts_packaged{phase="say \\"hi\\"\\n",task="release"} 1\n', text)
+        self.assertIn('chart_automation_phase_duration_seconds_bucket{phase="docs",task="release",le="0.25"} 0\n'
+                      'chart_automation_phase_duration_seconds_bucket{phase="docs",task="release",le="0.5"} 1\n', text)
+        self.assertIn('chart_automation_phase_duration_seconds_bucket{phase="docs",task="release",le="+Inf"} 1\n'
+                      'chart_automation_phase_duration_seconds_sum{phase="docs",task="release"} 0.3\n'
+                      'chart_automation_phase_duration_seconds_count{phase="docs",task="release"} 1\n', text)
+        # Every family appears once, with its TYPE before its samples.
+        types = re.findall(r"^# TYPE (\S+)", text, re.MULTILINE)
+        self.assertEqual(len(types), len(set(types)))
+
+    def test_runs_accumulate_counters_and_histograms(self):
+        for seconds, changed in ((0.2, 4), (3.0, 1)):
+            metrics = RunMetrics("chart-tracker-process")
+            metrics.inc("subprocess_calls", 2, command="git diff")
+            metrics.observe("phase_duration_seconds", seconds, phase="changes")
+            metrics.set("charts_changed", changed)
+            metrics.write(self.path)
+        other = RunMetrics("release")
+        other.set("charts_changed", 7)
+        other.write(self.path)
+
+        samples = parse_samples(self.path.read_text())
+        labels = '{phase="changes",task="chart-tracker-process"}'
+        self.assertEqual(samples[("chart_automation_subprocess_calls_total",
+                                  '{command="git diff",task="chart-tracker-process"}')], 4)
+        self.assertEqual(samples[("chart_automation_phase_duration_seconds_count", labels)], 2)
+        self.assertAlmostEqual(samples[("chart_automation_phase_duration_seconds_sum", labels)], 3.2)
+        self.assertEqual(samples[("chart_automation_phase_duration_seconds_bucket",
+                                  labels[:-1] + ',le="0.25"}')], 1)
+        self.assertEqual(samples[("chart_automation_phase_duration_seconds_bucket",
+                                  labels[:-1] + ',le="5"}')], 2)
+        # Gauges keep the last value per label set.
+        self.assertEqual(samples[("chart_automation_charts_changed", '{task="chart-tracker-process"}')], 1)
+        self.assertEqual(samples[("chart_automation_charts_changed", '{task="release"}')], 7)
+        self.assertEqual(sorted(p.name for p in self.path.parent.iterdir()),
+                         ["chart-automation.prom", "chart-automation.prom.lock"])
+
+    def test_foreign_samples_are_dropped(self):
+        self.path.parent.mkdir(parents=True)
+        self.path.write_text("# TYPE other gauge\nother 1\nchart_automation_unknown 2\n# EOF\n")
+        RunMetrics("release").write(self.path)
+        self.assertEqual(self.path.read_text(), "# EOF\n")
+
+    def test_record_runner_and_finish(self):
+        runner = CommandRunner()
+        runner.timings = {"git diff": {"calls": 3, "cached": 1, "seconds": 0.5},
+                          "git ls-tree": {"calls": 1, "cached": 0, "seconds": 0.1},
+                          "helm-docs": {"calls": 1, "cached": 0, "seconds": 1.5}}
+        metrics = RunMetrics("chart-tracker-process")
+        metrics.record_runner(runner)
+        metrics.finish(1)
+        samples = parse_samples(metrics.render())
+        task = '{task="chart-tracker-process"}'
+        self.assertEqual(samples[("chart_automation_git_subprocesses", task)], 3)
+        self.assertEqual(samples[("chart_automation_helm_docs_seconds", task)], 1.5)
+        timed = RunMetrics("chart-tracker-process")
+        timed.set("helm_docs_seconds", 2.5)
+        timed.record_runner(runner)
+        self.assertEqual(parse_samples(timed.render())[("chart_automation_helm_docs_seconds", task)], 2.5)
+        self.assertEqual(samples[("chart_automation_runs_total", '{exit_code="1",task="chart-tracker-process"}')], 1)
+        self.assertEqual(samples[("chart_automation_last_run_exit_code", task)], 1)
+        self.assertGreater(samples[("chart_automation_peak_rss_bytes", '{process="self",task="chart-tracker-process"}')],
+                           1 << 20)
+        self.assertEqual(samples[("chart_automation_phase_duration_seconds_count", '{phase="total",task="chart-tracker-process"}')],
+                         1)
+
+    def test_time_command(self):
+        argv = ["run_metrics.py", "time", "--file", str(self.path), "--task", "release", "--phase", "sign",
+                "--set", "charts_packaged=3", "--", sys.executable, "-c", "import sys; sys.exit(3)"]
+        for _ in range(2):
+            with patch.object(sys, "argv", argv):
+                self.assertEqual(run_metrics.main(), 3)
+        samples = parse_samples(self.path.read_text())
+        self.assertEqual(samples[("chart_automation_runs_total", '{exit_code="3",phase="sign",task="release"}')], 2)
+        self.assertEqual(samples[("chart_automation_charts_packaged", '{task="release"}')], 3)
+        self.assertIn(("chart_automation_peak_rss_bytes", '{phase="sign",process="children",task="release"}'), samples)
+
+        # Without a metrics file the command just runs.
+        self.path.unlink()
+        with patch.dict(os.environ, {run_metrics.METRICS_FILE_ENV: ""}), \
+                patch.object(sys, "argv", ["run_metrics.py", "time"] + argv[4:]):
+            self.assertEqual(run_metrics.main(), 3)
+        self.assertFalse(self.path.exists())
+
+        with patch.object(sys, "argv", argv[:-4] + ["--", str(Path(self.test_dir.name) / "missing")]), \
+                redirect_stdout(io.StringIO()) as out:
+            self.assertEqual(run_metrics.main(), run_metrics.EXIT_ERROR)
+        self.assertIn("Error:", out.getvalue())
+
+
+class TestTrackerMetrics(ChartRepoTestCase):
+
+    def test_process_writes_metrics_file(self):
+        os.chdir(self.repo_path)
+        self._write_native_readmes()
+        self._commit_changes('Generate READMEs')
+        self._create_branch('feature-branch')
+        self._modify_chart('charts/test-chart-1/values.yaml', {'replicaCount: 1': 'replicaCount: 2'})
+        self._write_native_readmes()
+        self._commit_changes('Change chart 1')
+        metrics_file = self.repo_path / "metrics" / "tracker.prom"
+
+        # The committed READMEs are what the docs generator renders, so only chart 1 is bumped.
+        argv = ['chart_tracker.py', '--state-file', str(self.state_file), '--metrics-file', str(metrics_file),
+                'process', '--since', 'HEAD~1']
+        with patch.object(sys, 'argv', argv), redirect_stdout(io.StringIO()):
+            self.assertEqual(tracker_main(), 1)
+
+        samples = parse_samples(metrics_file.read_text())
+        task = '{task="chart-tracker-process"}'
+        self.assertEqual(samples[("chart_automation_charts_discovered", task)], 2)
+        self.assertEqual(samples[("chart_automation_charts_changed", task)], 1)
+        self.assertEqual(samples[("chart_automation_charts_to_bump", task)], 1)
+        self.assertGreater(samples[("chart_automation_git_subprocesses", task)], 0)
+        # The native generator runs no helm-docs command, but its wall time is still recorded.
+        self.assertIn(("chart_automation_helm_docs_seconds", task), samples)
+        self.assertEqual(samples[("chart_automation_runs_total", '{exit_code="1",task="chart-tracker-process"}')], 1)
+        for phase in ("changes", "bumps", "docs", "total"):
+            self.assertEqual(samples[("chart_automation_phase_duration_seconds_count",
+                                      f'{{phase="{phase}",task="chart-tracker-process"}}')], 1)
+        self.assertEqual(len(BUCKETS) + 1, sum(1 for name, labels in samples
+                                               if name.endswith("_bucket") and 'phase="docs"' in labels))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
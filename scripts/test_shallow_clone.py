@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Tests for shallow_clone.py using a local bare repository as the remote
+"""
+
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+from unittest.mock import patch
+
+import chart_fingerprint
+from chart_tracker import EXIT_BUMPED, ChartTracker
+from chart_tracker import main as tracker_main
+from shallow_clone import ensure_revisions, has_commit, is_shallow
+
+COMMITS = 12
+
+
+class TestShallowClone(unittest.TestCase):
+
+    def setUp(self):
+        """Create a repository with a linear chart history, a bare remote and a depth-1 clone"""
+        self.test_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.test_dir.name)
+        self.original_cwd = os.getcwd()
+
+        self.source = self.root / "source"
+        self.source.mkdir()
+        self._run_git(['init', '-b', 'main'], self.source)
+        self._run_git(['config', 'user.name', 'Test User'], self.source)
+        self._run_git(['config', 'user.email', 'test@example.com'], self.source)
+        self._run_git(['config', 'commit.gpgsign', 'false'], self.source)
+
+        chart = self.source / "charts" / "app"
+        chart.mkdir(parents=True)
+        (chart / "Chart.yaml").write_text("apiVersion: v2\nname: app\nversion: 1.0.0\n")
+        for i in range(COMMITS):
+            (chart / "values.yaml").write_text(f"replicaCount: {i}\n")
+            self._run_git(['add', '.'], self.source)
+            self._run_git(['commit', '-m', f'Commit {i}'], self.source)
+        self.shas = self._run_git(['rev-list', '--reverse', 'HEAD'], self.source).stdout.split()
+
+        self._run_git(['checkout', '-b', 'other', 'HEAD~4'], self.source)
+        self._run_git(['checkout', 'main'], self.source)
+
+        self.bare = self.root / "remote.git"
+        self._run_git(['clone', '--bare', str(self.source), str(self.bare)], self.root)
+        self.clone = self.root / "clone"
+        self._run_git(['clone', '--depth', '1', '--single-branch', '--branch', 'main',
+                       f'file://{self.bare}', str(self.clone)], self.root)
+
+    def tearDown(self):
+        os.chdir(self.original_cwd)
+        self.test_dir.cleanup()
+
+    def _run_git(self, args, cwd):
+        result = subprocess.run(['git'] + args, cwd=cwd, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"Git command failed: {' '.join(args)}\n{result.stderr}")
+        return result
+
+    def _local_commits(self):
+        return int(self._run_git(['rev-list', '--count', 'HEAD'], self.clone).stdout)
+
+    def test_full_clone_is_untouched(self):
+        self.assertFalse(is_shallow(self.source))
+        with patch('builtins.print'):
+            self.assertEqual(ensure_revisions(['HEAD~3'], cwd=self.source), 0)
+
+    def test_relative_revision_deepens_incrementally(self):
+        self.assertTrue(is_shallow(self.clone))
+        self.assertFalse(has_commit('HEAD~5', self.clone))
+
+        with patch('builtins.print'):
+            fetches = ensure_revisions(['HEAD~5'], cwd=self.clone)
+
+        self.assertTrue(has_commit('HEAD~5', self.clone))
+        self.assertTrue(is_shallow(self.clone))
+        # Deepened by 1 + 2 + 4 commits: more than needed, far less than everything.
+        self.assertEqual(fetches, 3)
+        self.assertEqual(self._local_commits(), 8)
+
+    def test_commit_id_is_fetched_directly(self):
+        old = self.shas[2]
+        with patch('builtins.print'):
+            self.assertEqual(ensure_revisions([old], cwd=self.clone), 1)
+        self.assertTrue(has_commit(old, self.clone))
+        self.assertEqual(self._local_commits(), 1)
+
+    def test_remote_branch_is_fetched(self):
+        self.assertFalse(has_commit('origin/other', self.clone))
+        with patch('builtins.print'):
+            self.assertEqual(ensure_revisions(['origin/other'], cwd=self.clone), 1)
+        self.assertTrue(has_commit('origin/other', self.clone))
+
+    def test_unknown_revision_fails_after_full_history(self):
+        with patch('builtins.print'):
+            with self.assertRaises(RuntimeError):
+                ensure_revisions(['HEAD~50'], cwd=self.clone)
+        self.assertFalse(is_shallow(self.clone))
+
+    def test_tracker_process_in_shallow_clone(self):
+        """process --since HEAD~3 works in a depth-1 clone without fetching full history"""
+        os.chdir(self.clone)
+        tracker = ChartTracker(str(self.root / "state.json"))
+        with patch.object(tracker, 'run_helm_docs', return_value=[]), patch('builtins.print'):
+            tracker.ensure_history(['HEAD~3'])
+            self.assertTrue(tracker.process_all_changes('HEAD~3'))
+        self.assertEqual(tracker.state['charts_to_bump'], ['charts/app'])
+        self.assertLess(self._local_commits(), COMMITS)
+
+    def test_force_pushed_since_falls_back_to_fingerprints(self):
+        """A `since` the remote no longer has is not fatal when released fingerprints are available"""
+        os.chdir(self.clone)
+        store = self.root / "fingerprints.json"
+        with patch.object(sys, 'argv', ['chart_fingerprint.py', '--store', str(store), 'record']), \
+                redirect_stdout(io.StringIO()):
+            chart_fingerprint.main()
+        (self.clone / "charts" / "app" / "values.yaml").write_text("replicaCount: 99\n")
+        self._run_git(['-c', 'user.name=Test User', '-c', 'user.email=test@example.com', '-c', 'commit.gpgsign=false',
+                       'commit', '-qam', 'Change after the force-push'], self.clone)
+
+        force_pushed = "1234567890abcdef1234567890abcdef12345678"
+        argv = ['chart_tracker.py', '--state-file', str(self.root / "state.json"), '--docs-generator', 'native',
+                'process', '--since', force_pushed, '--fingerprints', str(store)]
+        with patch.object(sys, 'argv', argv), redirect_stdout(io.StringIO()) as out:
+            self.assertEqual(tracker_main(), EXIT_BUMPED)
+        self.assertIn(f"Cannot fetch {force_pushed}", out.getvalue())
+        self.assertIn("comparing charts with their last released fingerprints", out.getvalue())
+        self.assertIn("version: 1.0.1", (self.clone / "charts" / "app" / "Chart.yaml").read_text())
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
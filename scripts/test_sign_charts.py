@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Tests for sign_charts.py
+
+A throwaway GPG key is generated once for the test class; nothing touches the
+user's keyring.
+"""
+
+import hashlib
+import io
+import os
+import shutil
+import subprocess
+import sys
+import tarfile
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+from unittest.mock import patch
+
+from sign_charts import EXIT_ERROR, EXIT_FAILED, ProvenanceSigner, main, provenance_message
+
+KEY_UID = "Chart Signer <charts@example.com>"
+PASSPHRASE = "correct horse"
+
+
+def make_package(directory, name, version, extra=""):
+    """Write <name>-<version>.tgz holding <name>/Chart.yaml and a template; returns its path"""
+    src = Path(directory) / "src" / name
+    (src / "templates").mkdir(parents=True, exist_ok=True)
+    (src / "Chart.yaml").write_text(f"apiVersion: v2\nname: {name}\nversion: {version}\n{extra}")
+    (src / "templates" / "cm.yaml").write_text("kind: ConfigMap\n")
+    package = Path(directory) / f"{name}-{version}.tgz"
+    with tarfile.open(package, "w:gz") as tar:
+        tar.add(src, arcname=name)
+    return package
+
+
+@unittest.skipIf(shutil.which("gpg") is None or shutil.which("gpg-connect-agent") is None, "gpg is not installed")
+class TestSignCharts(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.key_dir = tempfile.TemporaryDirectory()
+        cls.key_home = Path(cls.key_dir.name) / "home"
+        cls.key_home.mkdir(mode=0o700)
+        gpg = ["gpg", "--batch", "--pinentry-mode", "loopback", "--passphrase", PASSPHRASE]
+        cls._gpg(gpg + ["--quick-gen-key", KEY_UID, "ed25519", "sign", "never"])
+        cls.keyring = Path(cls.key_dir.name) / "keyring.gpg"
+        cls.keyring.write_bytes(cls._gpg(gpg + ["--export-secret-keys"]).stdout)
+        cls.armored_keyring = Path(cls.key_dir.name) / "keyring.asc"
+        cls.armored_keyring.write_bytes(cls._gpg(gpg + ["--armor", "--export-secret-keys"]).stdout)
+        cls.passphrase_file = Path(cls.key_dir.name) / "passphrase-file.txt"
+        cls.passphrase_file.write_text(PASSPHRASE + "\n")
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._gpg(["gpgconf", "--kill", "gpg-agent"])
+        cls.key_dir.cleanup()
+
+    @classmethod
+    def _gpg(cls, args):
+        return subprocess.run(args, env=dict(os.environ, GNUPGHOME=str(cls.key_home)), capture_output=True, check=True)
+
+    def setUp(self):
+        self.test_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.test_dir.cleanup)
+        self.packages = [make_package(self.test_dir.name, f"chart{i}", f"1.{i}.0") for i in range(4)]
+
+    def _verify(self, prov):
+        result = subprocess.run(["gpg", "--batch", "--verify", str(prov)],
+                                env=dict(os.environ, GNUPGHOME=str(self.key_home)), capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertIn('Good signature from "Chart Signer', result.stderr)
+
+    def test_provenance_message(self):
+        package = make_package(self.test_dir.name, "zot", "0.1.0",
+                               'appVersion: 2.1\ndescription: A registry\nkeywords: []\ncustom: x\n')
+        digest = hashlib.sha256(package.read_bytes()).hexdigest()
+        self.assertEqual(provenance_message(package), (
+            "apiVersion: v2\nappVersion: '2.1'\ndescription: A registry\nname: zot\nversion: 0.1.0\n"
+            "\n...\n"
+            f"files:\n  zot-0.1.0.tgz: sha256:{digest}\n"
+        ))
+
+    def test_signs_all_packages_with_one_key_import(self):
+        with patch("sign_charts.subprocess.run", wraps=subprocess.run) as mock_run:
+            with ProvenanceSigner("charts@example.com", self.keyring, self.passphrase_file, jobs=4) as signer:
+                results = signer.sign_all(self.packages)
+                home = Path(signer.home)
+        self.assertFalse(home.exists())
+
+        commands = [call[0][0] for call in mock_run.call_args_list]
+        self.assertEqual(sum("--import" in args for args in commands), 1)
+        # One signature unlocks the key before the packages are signed.
+        self.assertEqual(sum("--clearsign" in args for args in commands), len(self.packages) + 1)
+        for package in self.packages:
+            prov, error = results[package]
+            self.assertIsNone(error)
+            self.assertEqual(prov, Path(f"{package}.prov"))
+            self._verify(prov)
+            self.assertIn(provenance_message(package), prov.read_text())
+
+    def test_armored_keyring(self):
+        with ProvenanceSigner("charts@example.com", self.armored_keyring, self.passphrase_file) as signer:
+            prov = signer.sign(self.packages[0])
+        self._verify(prov)
+
+    def test_main_reports_failures(self):
+        broken = Path(self.test_dir.name) / "broken-0.1.0.tgz"
+        broken.write_text("not an archive")
+        argv = ["sign_charts.py", "--key", "charts@example.com", "--keyring", str(self.keyring),
+                "--passphrase-file", str(self.passphrase_file), str(self.packages[0]), str(broken)]
+        with patch.object(sys, "argv", argv), redirect_stdout(io.StringIO()) as out:
+            self.assertEqual(main(), EXIT_FAILED)
+        self.assertIn(f"Signed: {self.packages[0]}.prov", out.getvalue())
+        self.assertIn(f"Failed to sign {broken}", out.getvalue())
+        self.assertFalse(Path(f"{broken}.prov").exists())
+
+    def test_wrong_passphrase_fails_before_signing(self):
+        wrong = Path(self.test_dir.name) / "wrong-passphrase.txt"
+        wrong.write_text("nope\n")
+        argv = ["sign_charts.py", "--key", "charts@example.com", "--keyring", str(self.keyring),
+                "--passphrase-file", str(wrong), str(self.packages[0])]
+        with patch.object(sys, "argv", argv), redirect_stdout(io.StringIO()) as out:
+            self.assertEqual(main(), EXIT_ERROR)
+        self.assertIn("Error:", out.getvalue())
+        self.assertFalse(Path(f"{self.packages[0]}.prov").exists())
+
+    @unittest.skipIf(shutil.which("helm") is None, "helm is not installed")
+    def test_helm_verify_accepts_provenance(self):
+        public = Path(self.test_dir.name) / "pubring.gpg"
+        public.write_bytes(self._gpg(["gpg", "--batch", "--export"]).stdout)
+        with ProvenanceSigner("charts@example.com", self.keyring, self.passphrase_file) as signer:
+            signer.sign(self.packages[0])
+        result = subprocess.run(["helm", "verify", "--keyring", str(public), str(self.packages[0])],
+                                capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
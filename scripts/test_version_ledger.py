@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Tests for version_ledger.py using real git repositories
+"""
+
+import os
+import unittest
+from unittest.mock import patch
+
+import version_ledger
+from chart_tracker import ChartTracker
+from test_chart_tracker_integration import ChartRepoTestCase
+from version_ledger import VersionLedger
+
+
+class TestVersionLedger(ChartRepoTestCase):
+    """Ledger indexing and lookups against the two-chart test repository"""
+
+    def setUp(self):
+        super().setUp()
+        os.chdir(self.repo_path)
+        self.ledger = VersionLedger(str(self.repo_path.parent / f"{self.repo_path.name}.sqlite"))
+
+    def tearDown(self):
+        self.ledger.close()
+        os.unlink(self.ledger.path)
+        super().tearDown()
+
+    def _bump_chart1(self, old, new):
+        self._modify_chart('charts/test-chart-1/Chart.yaml', {f'version: {old}': f'version: {new}'})
+        self._commit_changes(f'Bump chart1 to {new}')
+
+    def _head(self):
+        return self.ledger.resolve('HEAD')
+
+    def test_versions_recorded_per_commit(self):
+        base = self._head()
+        self._bump_chart1('1.0.0', '1.0.1')
+        self.assertEqual(self.ledger.update(), 2)
+
+        self.assertEqual(self.ledger.version_at('charts/test-chart-1', base), '1.0.0')
+        self.assertEqual(self.ledger.version_at('charts/test-chart-1', self._head()), '1.0.1')
+        self.assertEqual(self.ledger.version_at('charts/test-chart-2', self._head()), '2.0.0')
+        self.assertIsNone(self.ledger.version_at('charts/missing', self._head()))
+
+    def test_update_only_walks_new_commits(self):
+        self.ledger.update()
+        self.assertEqual(self.ledger.update(), 0)
+
+        self._modify_chart('charts/test-chart-2/values.yaml', {'replicaCount: 1': 'replicaCount: 3'})
+        self._commit_changes('Change chart2 values')
+        self._bump_chart1('1.0.0', '1.0.1')
+        with patch.object(version_ledger, '_git', wraps=version_ledger._git) as git:
+            self.assertEqual(self.ledger.update(), 2)
+        log_args = next(c[0][1] for c in git.call_args_list if 'log' in c[0][1])
+        self.assertIn('--not', log_args)
+
+    def test_bumped_anywhere_in_range(self):
+        """A bump that is later reverted still shows up; net comparison does not"""
+        base = self._head()
+        self._bump_chart1('1.0.0', '1.0.1')
+        self._bump_chart1('1.0.1', '1.0.0')
+        self.ledger.update()
+
+        bumps = self.ledger.bumped_in_range(base)
+        self.assertEqual(list(bumps), ['charts/test-chart-1'])
+        self.assertEqual(len(bumps['charts/test-chart-1']), 2)
+        self.assertEqual(self.ledger.version_at('charts/test-chart-1', self._head()), '1.0.0')
+        self.assertEqual(self.ledger.bumped_in_range('HEAD'), {})
+
+    def test_merge_uses_first_parent(self):
+        self._create_branch('feature')
+        self._bump_chart1('1.0.0', '1.1.0')
+        self._run_git(['checkout', 'main'])
+        self._modify_chart('charts/test-chart-2/values.yaml', {'replicaCount: 1': 'replicaCount: 3'})
+        self._commit_changes('Change chart2 values')
+        self._run_git(['merge', '--no-edit', 'feature'])
+        self.ledger.update()
+
+        merge = self._head()
+        self.assertEqual(self.ledger.version_at('charts/test-chart-1', merge), '1.1.0')
+        # The merge commit itself changed chart1 relative to main, and so did the feature commit.
+        self.assertEqual(len(self.ledger.bumped_in_range('HEAD~1')['charts/test-chart-1']), 2)
+
+    def test_new_and_deleted_charts(self):
+        self._run_git(['rm', '-r', '-q', 'charts/test-chart-2'])
+        new_chart = self.charts_dir / 'test-chart-3'
+        new_chart.mkdir()
+        (new_chart / 'Chart.yaml').write_text('apiVersion: v2\nname: test-chart-3\nversion: 0.1.0\n')
+        vendored = self.chart1_dir / 'charts' / 'dep'
+        vendored.mkdir(parents=True)
+        (vendored / 'Chart.yaml').write_text('apiVersion: v2\nname: dep\nversion: 9.9.9\n')
+        self._commit_changes('Replace chart2 with chart3')
+        self.ledger.update()
+
+        head = self._head()
+        self.assertIsNone(self.ledger.version_at('charts/test-chart-2', head))
+        self.assertEqual(self.ledger.version_at('charts/test-chart-3', head), '0.1.0')
+        self.assertIsNone(self.ledger.version_at('charts/test-chart-1/charts/dep', head))
+        # Adding a chart is not a bump.
+        self.assertEqual(self.ledger.bumped_in_range('HEAD~1'), {})
+
+    def test_rewritten_history_is_indexed(self):
+        self._bump_chart1('1.0.0', '1.0.1')
+        self.ledger.update()
+        self._run_git(['reset', '--hard', 'HEAD~1'])
+        self._bump_chart1('1.0.0', '2.0.0')
+        self.assertEqual(self.ledger.update(), 1)
+        self.assertEqual(self.ledger.version_at('charts/test-chart-1', self._head()), '2.0.0')
+
+    def test_tracker_uses_ledger(self):
+        self._create_branch('feature-branch')
+        self._bump_chart1('1.0.0', '1.0.1')
+        self._modify_chart('charts/test-chart-2/values.yaml', {'replicaCount: 1': 'replicaCount: 3'})
+        self._commit_changes('Change chart2 values')
+
+        tracker = ChartTracker(str(self.state_file), ledger=self.ledger)
+        with patch.object(ChartTracker, 'check_version_bumps_in_commits') as diff_check, \
+                patch.object(tracker, 'run_helm_docs', return_value=[]), patch('builtins.print'):
+            tracker.process_all_changes('main')
+        diff_check.assert_not_called()
+        self.assertEqual(tracker.state['charts_to_bump'], ['charts/test-chart-2'])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
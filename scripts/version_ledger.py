@@ -0,0 +1,194 @@
+"""
+Version Ledger - SQLite record of chart versions at every commit
+
+The ledger stores the Chart.yaml version of every chart at every commit it has
+indexed. Each run only walks commits that are not yet reachable from the tips it
+indexed before (its high-water marks), so bump questions over long ranges become
+indexed lookups instead of diffs.
+"""
+
+import sqlite3
+
+from bump_chart_version import parse_chart_version
+from command_runner import CommandRunner
+from git_objects import GitBlobReader
+
+# Number of indexed tips kept as high-water marks; older ones are dropped.
+MAX_TIPS = 16
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS commits (
+    sha TEXT PRIMARY KEY,
+    seq INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS chart_versions (
+    chart TEXT NOT NULL,
+    sha TEXT NOT NULL,
+    version TEXT,
+    changed INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (chart, sha)
+);
+CREATE INDEX IF NOT EXISTS chart_versions_by_sha ON chart_versions (sha);
+CREATE TABLE IF NOT EXISTS tips (
+    sha TEXT PRIMARY KEY,
+    seq INTEGER NOT NULL
+);
+"""
+
+
+def _git(runner, args, cwd=None, input=None, memoize=False):
+    return runner.run(["git"] + args, check=True, cwd=cwd, input=input, memoize=memoize).stdout
+
+
+class VersionLedger:
+    """Chart versions per commit, indexed incrementally from `git log`.
+
+    A row in chart_versions means the chart exists at that commit; `changed` is
+    set when its version differs from the version at the commit's first parent.
+    """
+
+    def __init__(self, path=".chart-ledger.sqlite", charts_dir="charts", cwd=None, runner=None):
+        self.path = path
+        self.charts_dir = charts_dir.rstrip("/")
+        self.cwd = cwd
+        self.runner = runner or CommandRunner()
+        # Bump detection may run on a pipeline thread; the ledger is only ever used by one thread at a time.
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.db.close()
+
+    def resolve(self, rev):
+        """Return the commit id for a revision"""
+        return _git(self.runner, ["rev-parse", "--verify", f"{rev}^{{commit}}"], cwd=self.cwd, memoize=True).strip()
+
+    def has_commit(self, sha):
+        return self.db.execute("SELECT 1 FROM commits WHERE sha = ?", (sha,)).fetchone() is not None
+
+    def _chart_for(self, path):
+        """Return the chart root owning a Chart.yaml path, or None for other files"""
+        prefix = self.charts_dir + "/"
+        if not path.startswith(prefix) or not path.endswith("/Chart.yaml"):
+            return None
+        parts = path[len(prefix):].split("/")
+        # Same rule as ChartTracker._discover_chart_dirs: skip vendored dependency charts.
+        if len(parts) >= 4 and parts[1] == "charts":
+            return None
+        return path[:-len("/Chart.yaml")]
+
+    def _live_tips(self):
+        """Return the stored tips that still exist in the repository"""
+        tips = [row[0] for row in self.db.execute("SELECT sha FROM tips")]
+        if not tips:
+            return []
+        output = _git(self.runner, ["cat-file", "--batch-check"], cwd=self.cwd, input="\n".join(tips) + "\n")
+        return [line.split()[0] for line in output.splitlines() if not line.endswith(" missing")]
+
+    def _new_commits(self, revs):
+        """Yield (sha, first_parent, raw_lines) for commits not yet indexed, parents first.
+
+        `git log -m` repeats a merge once per parent; only the first block, the diff
+        against the first parent, is used.
+        """
+        args = ["log", "--reverse", "--topo-order", "-m", "--root", "--raw", "--no-abbrev",
+                "--no-renames", "--format=%x01%H %P"] + revs
+        tips = self._live_tips()
+        if tips:
+            args += ["--not"] + tips
+        output = _git(self.runner, ["-c", "core.quotePath=false"] + args, cwd=self.cwd)
+
+        seen = set()
+        for block in output.split("\x01")[1:]:
+            lines = block.splitlines()
+            header = lines[0].split()
+            sha = header[0]
+            if sha in seen:
+                continue
+            seen.add(sha)
+            yield sha, header[1] if len(header) > 1 else None, [line for line in lines[1:] if line]
+
+    def _versions_at(self, sha):
+        return dict(self.db.execute("SELECT chart, version FROM chart_versions WHERE sha = ?", (sha,)))
+
+    def update(self, revs=("HEAD",)):
+        """Index every commit reachable from revs that is not indexed yet; return the count"""
+        revs = [self.resolve(rev) for rev in revs]
+        seq = self.db.execute("SELECT COALESCE(MAX(seq), 0) FROM commits").fetchone()[0]
+        pending = {}
+        count = 0
+
+        with GitBlobReader(cwd=self.cwd, runner=self.runner) as blobs, self.db:
+            for sha, parent, raw_lines in self._new_commits(revs):
+                if self.has_commit(sha):
+                    continue
+                if parent is None:
+                    parent_versions = {}
+                elif parent in pending:
+                    parent_versions = pending[parent]
+                else:
+                    parent_versions = self._versions_at(parent)
+
+                versions = dict(parent_versions)
+                for line in raw_lines:
+                    # ":<old mode> <new mode> <old oid> <new oid> <status>\t<path>"
+                    meta, _, path = line.partition("\t")
+                    chart = self._chart_for(path)
+                    if chart is None:
+                        continue
+                    fields = meta.split()
+                    if fields[4] == "D":
+                        versions.pop(chart, None)
+                    else:
+                        versions[chart] = parse_chart_version(blobs.read_text(fields[3]))
+
+                seq += 1
+                count += 1
+                self.db.execute("INSERT INTO commits (sha, seq) VALUES (?, ?)", (sha, seq))
+                self.db.executemany(
+                    "INSERT INTO chart_versions (chart, sha, version, changed) VALUES (?, ?, ?, ?)",
+                    [(chart, sha, version,
+                      int(parent_versions.get(chart) is not None and parent_versions[chart] != version))
+                     for chart, version in versions.items()]
+                )
+                pending[sha] = versions
+
+            for rev in revs:
+                self.db.execute("INSERT OR REPLACE INTO tips (sha, seq) VALUES (?, ?)", (rev, seq))
+            self.db.execute(
+                "DELETE FROM tips WHERE sha NOT IN (SELECT sha FROM tips ORDER BY seq DESC LIMIT ?)", (MAX_TIPS,)
+            )
+
+        return count
+
+    def version_at(self, chart, sha):
+        """Return the chart's version at an indexed commit, or None if it did not exist"""
+        row = self.db.execute(
+            "SELECT version FROM chart_versions WHERE chart = ? AND sha = ?", (chart, sha)
+        ).fetchone()
+        return row[0] if row else None
+
+    def bumped_in_range(self, since, until="HEAD"):
+        """Return {chart: [commit, ...]} for version changes anywhere in since..until.
+
+        Both ends must already be indexed (see update); the range itself is listed
+        with one `git rev-list` and joined against the index.
+        """
+        commits = _git(self.runner, ["rev-list", f"{since}..{until}"], cwd=self.cwd, memoize=True).split()
+        self.db.execute("CREATE TEMP TABLE IF NOT EXISTS range_commits (sha TEXT PRIMARY KEY)")
+        self.db.execute("DELETE FROM range_commits")
+        self.db.executemany("INSERT INTO range_commits (sha) VALUES (?)", [(sha,) for sha in commits])
+
+        bumps = {}
+        for chart, sha in self.db.execute(
+            "SELECT v.chart, v.sha FROM chart_versions v JOIN range_commits r ON r.sha = v.sha "
+            "JOIN commits c ON c.sha = v.sha WHERE v.changed = 1 ORDER BY v.chart, c.seq"
+        ):
+            bumps.setdefault(chart, []).append(sha)
+        return bumps